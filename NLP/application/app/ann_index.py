@@ -0,0 +1,214 @@
+"""
+Index de recherche approchée (ANN) du service RAG
+Fichier: app/ann_index.py
+
+Les vecteurs bruts restent dans l'index plat de la base (vector_store.py) ;
+l'index de recherche en est dérivé selon `IndexConfig` :
+
+- flat : recherche exacte (force brute), la référence ;
+- ivf_flat : partition en `nlist` cellules (centroïdes entraînés par
+  k-means), seules `nprobe` cellules sont parcourues ;
+- hnsw : graphe navigable, sans entraînement, ajout incrémental ;
+- ivf_pq : IVF + vecteurs compressés par quantification produit
+  (`pq_m` sous-vecteurs de `pq_nbits` bits : 384 floats -> 16 octets).
+
+Métriques : l2 (distance euclidienne), ip (produit scalaire) et cosine
+(produit scalaire sur vecteurs normalisés, requêtes comprises).
+
+`vector_dtype` float16 stocke les vecteurs en demi-précision (scalar
+quantizer QT_fp16) dans l'index plat de la base et dans les index flat,
+ivf_flat et hnsw : moitié moins de mémoire, distances calculées après
+décodage en float32 (ivf_pq compresse déjà ses vecteurs).
+
+Les vecteurs portent l'id de leur segment (add_with_ids) : suppression
+par remove_ids et filtrage par IDSelector pendant la recherche. HNSW ne
+sait pas retirer un vecteur : ses suppressions sont des ids exclus à la
+recherche (voir vector_store.py).
+"""
+
+import math
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+METRICS = ("l2", "ip", "cosine")
+VECTOR_DTYPES = ("float32", "float16")
+
+# faiss recommande au moins 39 points d'entraînement par centroïde
+MIN_POINTS_PER_CENTROID = 39
+# Centroïdes ré-entraînés quand la base a grossi de ce facteur depuis l'entraînement
+RETRAIN_GROWTH = 4
+
+
+@dataclass(frozen=True)
+class IndexConfig:
+    index_type: str = "flat"
+    metric: str = "l2"
+    nlist: int = 0              # 0 : 4 * sqrt(nombre de vecteurs)
+    nprobe: int = 8
+    hnsw_m: int = 32
+    ef_construction: int = 40
+    ef_search: int = 64
+    pq_m: int = 16
+    pq_nbits: int = 8
+    vector_dtype: str = "float32"
+
+    def validate(self, dim: int):
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Type d'index inconnu: {self.index_type} (choix: {', '.join(INDEX_TYPES)})")
+        if self.metric not in METRICS:
+            raise ValueError(f"Métrique inconnue: {self.metric} (choix: {', '.join(METRICS)})")
+        if self.vector_dtype not in VECTOR_DTYPES:
+            raise ValueError(f"Type de vecteurs inconnu: {self.vector_dtype} (choix: {', '.join(VECTOR_DTYPES)})")
+        if self.index_type == "ivf_pq" and dim % self.pq_m:
+            raise ValueError(f"pq_m ({self.pq_m}) doit diviser la dimension des embeddings ({dim})")
+        if min(self.nprobe, self.hnsw_m, self.ef_construction, self.ef_search, self.pq_m, self.pq_nbits) < 1:
+            raise ValueError("Paramètres d'index invalides : valeurs >= 1 attendues")
+
+    def build_params(self) -> Dict[str, Any]:
+        """Paramètres qui déterminent le contenu de l'index (pas nprobe / ef_search, réglables à la recherche)"""
+        params = asdict(self)
+        del params["nprobe"], params["ef_search"]
+        return params
+
+    def describe(self) -> str:
+        if self.index_type in ("ivf_flat", "ivf_pq"):
+            extra = f"nlist={self.nlist or 'auto'}, nprobe={self.nprobe}"
+            if self.index_type == "ivf_pq":
+                extra += f", m={self.pq_m}, nbits={self.pq_nbits}"
+        elif self.index_type == "hnsw":
+            extra = f"M={self.hnsw_m}, efC={self.ef_construction}, efS={self.ef_search}"
+        else:
+            extra = ""
+        if self.vector_dtype != "float32" and self.index_type != "ivf_pq":
+            extra = ", ".join(filter(None, [extra, self.vector_dtype]))
+        return f"{self.index_type}/{self.metric}" + (f" ({extra})" if extra else "")
+
+
+def faiss_metric(metric: str) -> int:
+    return faiss.METRIC_L2 if metric == "l2" else faiss.METRIC_INNER_PRODUCT
+
+
+def prepare(vectors: np.ndarray, metric: str) -> np.ndarray:
+    """Vecteurs float32 contigus, normalisés pour la métrique cosine"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if metric == "cosine":
+        vectors = vectors.copy()
+        faiss.normalize_L2(vectors)
+    return vectors
+
+
+def flat_index(dim: int, metric: int, vector_dtype: str = "float32") -> faiss.Index:
+    """Index exact (force brute) en float32 ou float16"""
+    if vector_dtype == "float16":
+        return faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16, metric)
+    return faiss.IndexFlat(dim, metric)
+
+
+def effective_nlist(config: IndexConfig, n: int) -> int:
+    nlist = config.nlist or int(4 * math.sqrt(n))
+    return max(1, min(nlist, n // MIN_POINTS_PER_CENTROID))
+
+
+def is_trained_type(config: IndexConfig) -> bool:
+    return config.index_type in ("ivf_flat", "ivf_pq")
+
+
+def supports_remove(config: IndexConfig) -> bool:
+    return config.index_type != "hnsw"
+
+
+def build_index(vectors: np.ndarray, ids: np.ndarray, config: IndexConfig) -> Tuple[faiss.Index, Dict[str, Any]]:
+    """
+    Index de recherche sur `vectors` (déjà passés par `prepare`) d'ids
+    `ids`. Retourne (index, paramètres effectifs). Trop peu de vecteurs
+    pour entraîner des centroïdes : index plat, signalé par `fallback`.
+    """
+    n, dim = vectors.shape
+    metric = faiss_metric(config.metric)
+    params: Dict[str, Any] = {"index_type": config.index_type, "metric": config.metric}
+    if is_trained_type(config):
+        params["trained_on"] = n
+
+    fp16 = config.vector_dtype == "float16"
+    if fp16 and config.index_type != "ivf_pq":
+        params["vector_dtype"] = "float16"
+
+    if is_trained_type(config) and n < MIN_POINTS_PER_CENTROID * 2:
+        index = flat_index(dim, metric, config.vector_dtype)
+        params["fallback"] = "flat"
+    elif config.index_type == "ivf_flat":
+        nlist = effective_nlist(config, n)
+        if fp16:
+            index = faiss.IndexIVFScalarQuantizer(faiss.IndexFlat(dim, metric), dim, nlist,
+                                                  faiss.ScalarQuantizer.QT_fp16, metric)
+        else:
+            index = faiss.IndexIVFFlat(faiss.IndexFlat(dim, metric), dim, nlist, metric)
+        index.train(vectors)
+        params["nlist"] = nlist
+    elif config.index_type == "ivf_pq":
+        nlist = effective_nlist(config, n)
+        # 2^nbits centroïdes par sous-quantifieur, MIN_POINTS_PER_CENTROID points d'entraînement chacun
+        nbits = max(1, min(config.pq_nbits, int(math.log2(n / MIN_POINTS_PER_CENTROID))))
+        index = faiss.IndexIVFPQ(faiss.IndexFlat(dim, metric), dim, nlist, config.pq_m, nbits, metric)
+        index.train(vectors)
+        params.update(nlist=nlist, pq_m=config.pq_m, pq_nbits=nbits)
+    elif config.index_type == "hnsw":
+        if fp16:
+            index = faiss.IndexHNSWSQ(dim, faiss.ScalarQuantizer.QT_fp16, config.hnsw_m, metric)
+        else:
+            index = faiss.IndexHNSWFlat(dim, config.hnsw_m, metric)
+        index.hnsw.efConstruction = config.ef_construction
+        params.update(hnsw_m=config.hnsw_m, ef_construction=config.ef_construction)
+    else:
+        index = flat_index(dim, metric, config.vector_dtype)
+
+    if faiss.try_extract_index_ivf(index) is None:
+        # Plat et HNSW numérotent leurs vecteurs 0..n-1 : table des ids des segments
+        index = faiss.IndexIDMap(index)
+    if n:
+        index.add_with_ids(vectors, np.ascontiguousarray(ids, dtype=np.int64))
+    set_search_params(index, config)
+    return index, params
+
+
+def _unwrap(index: faiss.Index) -> faiss.Index:
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def set_search_params(index: faiss.Index, config: IndexConfig):
+    """Réglages de recherche (compromis rappel / latence), sans reconstruire l'index"""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(config.nprobe, ivf.nlist)
+    elif isinstance(_unwrap(index), faiss.IndexHNSW):
+        _unwrap(index).hnsw.efSearch = config.ef_search
+
+
+def search_parameters(index: faiss.Index, selector: Optional[faiss.IDSelector]) -> Optional[faiss.SearchParameters]:
+    """
+    Paramètres de recherche portant `selector` : le filtre est appliqué
+    par FAISS pendant le parcours. Les réglages nprobe / efSearch de
+    l'index sont recopiés (les paramètres explicites les remplacent).
+    """
+    if selector is None:
+        return None
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    inner = _unwrap(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=inner.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+
+def needs_rebuild(config: IndexConfig, params: Dict[str, Any], n: int) -> bool:
+    """Index plat de repli ou centroïdes entraînés sur une base bien plus petite"""
+    if not is_trained_type(config):
+        return False
+    return params.get("fallback") is not None or n > RETRAIN_GROWTH * params["trained_on"]
@@ -0,0 +1,233 @@
+"""
+Banc d'essai des index de recherche : rappel@k et latence face à l'index plat
+Fichier: app/benchmark_index.py
+
+Usage (depuis app/) :
+    python benchmark_index.py
+    python benchmark_index.py --metric l2 --nprobe 1 4 16 --ef-search 16 64 256
+    python benchmark_index.py --scale 100000
+    python benchmark_index.py --backends torch torch-int8 onnx-int8
+
+Le corpus embarqué (../data/data.pdf) est découpé en segments de
+`--chunk-size` mots (chevauchement de moitié) ; les requêtes sont des
+phrases du document. Le rappel@k d'un index est la part des k voisins
+exacts (index plat, même métrique) qu'il retrouve.
+
+Le PDF embarqué ne donne qu'une centaine de segments : les index IVF n'y
+ont que quelques cellules et la force brute reste imbattable.
+`--scale N` complète la base par des copies bruitées de ses vecteurs
+jusqu'à N vecteurs (signalés comme synthétiques dans la sortie).
+
+Stockage : `--vector-dtypes float32 float16` mesure chaque index avec des
+vecteurs en demi-précision, face à la même vérité terrain float32.
+Encodeur : avec plusieurs `--backends` (voir embeddings.py), les vecteurs
+du premier servent de référence ; pour les suivants sont mesurés la
+similarité cosinus avec la référence et le rappel@k de la recherche
+exacte face aux voisins exacts de la référence.
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+from typing import Any, Dict, List, Sequence
+
+import faiss
+import numpy as np
+import PyPDF2
+
+from ann_index import INDEX_TYPES, METRICS, VECTOR_DTYPES, IndexConfig, build_index, faiss_metric, prepare
+
+
+def load_corpus(pdf_path: str, chunk_size: int):
+    """Segments de `chunk_size` mots (pas de chunk_size / 2) et phrases du document"""
+    with open(pdf_path, "rb") as f:
+        pages = [page.extract_text() or "" for page in PyPDF2.PdfReader(f).pages]
+    words = " ".join(pages).split()
+    step = max(1, chunk_size // 2)
+    chunks = [" ".join(words[i:i + chunk_size]) for i in range(0, max(1, len(words) - step), step)]
+    sentences = [s.strip() for page in pages for s in re.split(r"(?<=[.!?])\s+", page)]
+    return chunks, [s for s in sentences if len(s.split()) >= 5]
+
+
+def augment(vectors: np.ndarray, size: int, noise: float, seed: int) -> np.ndarray:
+    """Compléter jusqu'à `size` vecteurs par des copies bruitées (bruit relatif à la norme moyenne)"""
+    if size <= len(vectors):
+        return vectors
+    rng = np.random.default_rng(seed)
+    sources = vectors[rng.integers(0, len(vectors), size - len(vectors))]
+    scale = noise * float(np.linalg.norm(vectors, axis=1).mean()) / np.sqrt(vectors.shape[1])
+    extra = sources + rng.normal(scale=scale, size=sources.shape).astype(np.float32)
+    return np.vstack([vectors, extra]).astype(np.float32)
+
+
+def configs_to_run(args) -> List[IndexConfig]:
+    configs = []
+    for dtype in args.vector_dtypes:
+        configs.append(IndexConfig("flat", args.metric, vector_dtype=dtype))
+        for index_type in args.index_types:
+            if index_type == "ivf_pq" and dtype != "float32":
+                continue  # vecteurs déjà compressés par PQ
+            if index_type in ("ivf_flat", "ivf_pq"):
+                configs += [IndexConfig(index_type, args.metric, nlist=args.nlist, nprobe=nprobe,
+                                        pq_m=args.pq_m, pq_nbits=args.pq_nbits, vector_dtype=dtype)
+                            for nprobe in args.nprobe]
+            elif index_type == "hnsw":
+                configs += [IndexConfig("hnsw", args.metric, hnsw_m=args.hnsw_m, ef_search=ef, vector_dtype=dtype)
+                            for ef in args.ef_search]
+    return configs
+
+
+def measure(index, queries: np.ndarray, k: int) -> Dict[str, Any]:
+    """Latence requête par requête (comme /ask/) et débit en lot"""
+    index.search(queries[:1], k)  # échauffement
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
+    _, ids = index.search(queries, k)
+    batch_s = time.perf_counter() - start
+    return {
+        "ids": ids,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "qps_batch": len(queries) / batch_s if batch_s > 0 else float("inf")
+    }
+
+
+def recall_at_k(ids: np.ndarray, exact_ids: np.ndarray) -> float:
+    k = exact_ids.shape[1]
+    return float(np.mean([len(set(found) & set(expected)) / k for found, expected in zip(ids, exact_ids)]))
+
+
+def run_benchmark(base: np.ndarray, queries: np.ndarray, configs: Sequence[IndexConfig], k: int) -> List[Dict[str, Any]]:
+    """Une ligne par configuration ; la vérité terrain est l'index plat de même métrique"""
+    rows = []
+    exact_ids = {}
+    for config in configs:
+        vectors = prepare(base, config.metric)
+        query_vectors = prepare(queries, config.metric)
+        if config.metric not in exact_ids:
+            exact = faiss.IndexFlat(vectors.shape[1], faiss_metric(config.metric))
+            exact.add(vectors)
+            exact_ids[config.metric] = exact.search(query_vectors, k)[1]
+
+        start = time.perf_counter()
+        index, params = build_index(vectors, np.arange(len(vectors)), config)
+        build_s = time.perf_counter() - start
+        result = measure(index, query_vectors, k)
+        rows.append({
+            "index": config.describe(),
+            "params": params,
+            "build_s": build_s,
+            "bytes": int(faiss.serialize_index(index).size),
+            "recall": recall_at_k(result.pop("ids"), exact_ids[config.metric]),
+            **result
+        })
+    return rows
+
+
+def compare_backends(model_name: str, backends: Sequence[str], chunks: List[str], sentences: List[str],
+                     metric: str, k: int) -> List[Dict[str, Any]]:
+    """Écart des vecteurs de chaque backend à ceux du premier (référence) : cosinus et rappel@k exact"""
+    from embeddings import load_model
+
+    rows, reference = [], None
+    for backend in backends:
+        model = load_model(model_name, backend)
+        start = time.perf_counter()
+        base = np.asarray(model.encode(chunks), dtype=np.float32)
+        queries = np.asarray(model.encode(sentences), dtype=np.float32)
+        encode_s = time.perf_counter() - start
+        exact = faiss.IndexFlat(base.shape[1], faiss_metric(metric))
+        exact.add(prepare(base, metric))
+        ids = exact.search(prepare(queries, metric), k)[1]
+        if reference is None:
+            reference = (prepare(base, "cosine"), ids)
+        cosine = (prepare(base, "cosine") * reference[0]).sum(axis=1)
+        rows.append({
+            "backend": backend,
+            "encode_s": encode_s,
+            "texts_per_s": (len(chunks) + len(sentences)) / encode_s,
+            "cosine_mean": float(cosine.mean()),
+            "cosine_min": float(cosine.min()),
+            "recall": recall_at_k(ids, reference[1])
+        })
+    return rows
+
+
+def print_backends(rows: List[Dict[str, Any]], k: int):
+    print(f"\nBackends d'encodage face à {rows[0]['backend']}, rappel@{k} de la recherche exacte\n")
+    header = f"{'backend':<12} {'cosinus moy':>12} {'cosinus min':>12} {'rappel':>7} {'textes/s':>9}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(f"{row['backend']:<12} {row['cosine_mean']:>12.4f} {row['cosine_min']:>12.4f} "
+              f"{row['recall']:>7.3f} {row['texts_per_s']:>9.0f}")
+
+
+def print_table(rows: List[Dict[str, Any]], k: int, n: int, synthetic: int):
+    print(f"\n{n} vecteurs" + (f" dont {synthetic} synthétiques" if synthetic else "") + f", rappel@{k}\n")
+    header = f"{'index':<60} {'rappel':>7} {'p50 ms':>8} {'p95 ms':>8} {'req/s lot':>10} {'construction s':>15} {'taille Mo':>10}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        name = row["index"] + (" [repli plat]" if row["params"].get("fallback") else "")
+        print(f"{name:<60} {row['recall']:>7.3f} {row['p50_ms']:>8.3f} {row['p95_ms']:>8.3f} "
+              f"{row['qps_batch']:>10.0f} {row['build_s']:>15.3f} {row['bytes'] / 1e6:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rappel@k et latence des index FAISS face à l'index plat")
+    parser.add_argument("--pdf", default="../data/data.pdf")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--chunk-size", type=int, default=50, help="mots par segment")
+    parser.add_argument("--queries", type=int, default=200, help="nombre de phrases requêtes")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--metric", choices=METRICS, default="cosine")
+    parser.add_argument("--index-types", nargs="+", choices=INDEX_TYPES[1:], default=list(INDEX_TYPES[1:]))
+    parser.add_argument("--nlist", type=int, default=0, help="0 : 4 * sqrt(n)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--pq-m", type=int, default=16)
+    parser.add_argument("--pq-nbits", type=int, default=8)
+    parser.add_argument("--vector-dtypes", nargs="+", choices=VECTOR_DTYPES, default=list(VECTOR_DTYPES))
+    parser.add_argument("--backends", nargs="+", default=["torch"],
+                        help="backends d'encodage (embeddings.BACKENDS), le premier sert de référence")
+    parser.add_argument("--scale", type=int, default=0, help="compléter la base jusqu'à N vecteurs (synthétiques)")
+    parser.add_argument("--noise", type=float, default=0.3, help="bruit relatif des vecteurs synthétiques")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="écrire aussi les résultats dans ce fichier")
+    args = parser.parse_args()
+
+    from embeddings import load_model
+
+    chunks, sentences = load_corpus(args.pdf, args.chunk_size)
+    random.Random(args.seed).shuffle(sentences)
+    sentences = sentences[:args.queries]
+    backend_rows = []
+    if len(args.backends) > 1:
+        backend_rows = compare_backends(args.model, args.backends, chunks, sentences, args.metric, args.k)
+        print_backends(backend_rows, args.k)
+
+    model = load_model(args.model, args.backends[0])
+    start = time.perf_counter()
+    base = np.asarray(model.encode(chunks), dtype=np.float32)
+    queries = np.asarray(model.encode(sentences), dtype=np.float32)
+    print(f"{len(chunks)} segments, {len(sentences)} requêtes encodés en {time.perf_counter() - start:.1f}s")
+
+    base = augment(base, args.scale, args.noise, args.seed)
+    rows = run_benchmark(base, queries, configs_to_run(args), args.k)
+    print_table(rows, args.k, len(base), len(base) - len(chunks))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"vectors": len(base), "synthetic": len(base) - len(chunks), "k": args.k,
+                       "rows": rows, "backends": backend_rows}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+Service d'embeddings du RAG (all-MiniLM-L6-v2)
+Fichier: app/embeddings.py
+
+Autour du SentenceTransformer :
+
+- cache des vecteurs par hash du texte : LRU en mémoire, puis table
+  SQLite sur disque (survit aux redémarrages et aux suppressions de
+  documents) ; une ré-ingestion ou une question déjà posée ne repasse
+  pas par le modèle ;
+- regroupement des questions concurrentes : le premier appel attend au
+  plus `max_wait_ms` millisecondes ou `max_batch` questions, puis encode
+  tout le lot en un seul appel ; chaque requête récupère sa ligne ;
+- backends CPU (`load_model`) : torch, torch-int8 (quantification
+  dynamique des couches linéaires), onnx et onnx-int8 (modèle ONNX
+  quantifié publié avec all-MiniLM-L6-v2, extra `sentence-transformers[onnx]`).
+
+Les vecteurs d'un backend quantifié diffèrent légèrement : le nom du
+backend fait partie de l'identifiant des embeddings (`embedding_id`),
+donc de la clé du cache et du modèle enregistré par la base vectorielle.
+L'effet sur le rappel se mesure avec benchmark_index.py --backends.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ann_index import VECTOR_DTYPES
+from vector_store import text_hash
+
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+# Modèle ONNX quantifié (uint8, AVX2) fourni dans le dépôt Hugging Face de all-MiniLM-L6-v2
+ONNX_INT8_FILE = "onnx/model_quint8_avx2.onnx"
+
+
+def embedding_id(model_name: str, backend: str) -> str:
+    """Identifiant des vecteurs produits : le modèle seul pour torch (bases existantes inchangées)"""
+    return model_name if backend == "torch" else f"{model_name}+{backend}"
+
+
+def cache_path(directory: str, name: str, dtype: str) -> str:
+    """Fichier SQLite du cache d'un identifiant d'embeddings (un fichier par type de vecteurs)"""
+    return os.path.join(directory, re.sub(r"[^\w.+-]", "_", name) + f"-{dtype}.sqlite")
+
+
+def load_model(model_name: str, backend: str = "torch"):
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend d'embedding inconnu: {backend} (choix: {', '.join(BACKENDS)})")
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+    if backend == "torch-int8":
+        import torch
+
+        model = SentenceTransformer(model_name, device="cpu")
+        # Poids int8, activations quantifiées à la volée : CPU uniquement
+        torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+        return model
+    model_kwargs = {"file_name": ONNX_INT8_FILE} if backend == "onnx-int8" else None
+    return SentenceTransformer(model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+
+
+def _sql_key(digest: int) -> int:
+    """Hash non signé sur 64 bits -> entier signé SQLite"""
+    return digest - (1 << 64) if digest >= 1 << 63 else digest
+
+
+# ==================== CACHE ====================
+
+class EmbeddingCache:
+    """
+    Vecteurs par hash de texte : LRU de `max_entries` vecteurs en mémoire
+    et, si `path`, table SQLite d'au plus `max_disk_entries` vecteurs (les
+    plus anciens sont retirés). Les vecteurs sont gardés en `dtype`.
+    """
+
+    def __init__(self, dim: int, dtype: str = "float32", max_entries: int = 10000,
+                 path: Optional[str] = None, max_disk_entries: int = 500000):
+        if dtype not in VECTOR_DTYPES:
+            raise ValueError(f"Type de vecteurs inconnu: {dtype} (choix: {', '.join(VECTOR_DTYPES)})")
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.max_entries = max_entries
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = defaultdict(int)
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            # rowid implicite : ordre d'insertion, pour retirer les plus anciens
+            self._db.execute("CREATE TABLE IF NOT EXISTS vectors (hash INTEGER NOT NULL UNIQUE, vector BLOB NOT NULL)")
+            self._db.commit()
+            self._disk_entries = self._db.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def _remember(self, digest: int, vector: np.ndarray):
+        self._memory[digest] = vector
+        self._memory.move_to_end(digest)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, digests: List[int]) -> Dict[int, np.ndarray]:
+        """Vecteurs (float32) des hash connus"""
+        found: Dict[int, np.ndarray] = {}
+        with self._lock:
+            for digest in digests:
+                vector = self._memory.get(digest)
+                if vector is not None:
+                    self._memory.move_to_end(digest)
+                    found[digest] = vector
+            self.counters["memory_hits"] += len(found)
+            missing = [digest for digest in set(digests) if digest not in found]
+            if missing and self._db is not None:
+                # Par paquets : SQLite limite le nombre de paramètres d'une requête
+                for start in range(0, len(missing), 500):
+                    keys = {_sql_key(digest): digest for digest in missing[start:start + 500]}
+                    rows = self._db.execute(
+                        f"SELECT hash, vector FROM vectors WHERE hash IN ({','.join('?' * len(keys))})",
+                        list(keys)).fetchall()
+                    for key, blob in rows:
+                        vector = np.frombuffer(blob, dtype=self.dtype)
+                        found[keys[key]] = vector
+                        self._remember(keys[key], vector)
+                    self.counters["disk_hits"] += len(rows)
+            self.counters["misses"] += len(set(digests)) - len(found)
+        return {digest: vector.astype(np.float32) for digest, vector in found.items()}
+
+    def put_many(self, digests: List[int], vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=self.dtype)
+        with self._lock:
+            for digest, vector in zip(digests, vectors):
+                self._remember(digest, vector)
+            if self._db is None:
+                return
+            # Même hash, même texte : un vecteur déjà présent est gardé
+            cursor = self._db.executemany(
+                "INSERT OR IGNORE INTO vectors (hash, vector) VALUES (?, ?)",
+                [(_sql_key(digest), vector.tobytes()) for digest, vector in zip(digests, vectors)])
+            self._disk_entries += cursor.rowcount
+            excess = self._disk_entries - self.max_disk_entries
+            if excess > 0:
+                self._db.execute("DELETE FROM vectors WHERE rowid IN "
+                                 "(SELECT rowid FROM vectors ORDER BY rowid LIMIT ?)", (excess,))
+                self._disk_entries -= excess
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["misses"]
+            return {
+                "dtype": self.dtype.name,
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "disk_entries": self._disk_entries if self._db is not None else 0,
+                "disk_bytes": os.path.getsize(self.path) if self.path and os.path.exists(self.path) else 0,
+                "memory_hits": self.counters["memory_hits"],
+                "disk_hits": self.counters["disk_hits"],
+                "misses": self.counters["misses"],
+                "hit_rate": round(1 - self.counters["misses"] / lookups, 4) if lookups else 0.0
+            }
+
+
+# ==================== REGROUPEMENT DES QUESTIONS ====================
+
+class _PendingBatch:
+    def __init__(self):
+        self.texts: List[str] = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.vectors: Optional[np.ndarray] = None
+        self.error: Optional[Exception] = None
+
+
+class QueryBatcher:
+    """
+    Questions concurrentes encodées en un seul appel. Les endpoints sont
+    synchrones (threads de FastAPI) : le premier thread d'un lot attend
+    `max_wait_ms` ou que le lot soit plein, encode pour tout le monde,
+    les autres attendent le résultat.
+    """
+
+    def __init__(self, encode, max_wait_ms: float = 5.0, max_batch: int = 32):
+        self.encode = encode
+        self.max_wait_ms = max_wait_ms
+        self.max_batch = max_batch
+        self._pending: Optional[_PendingBatch] = None
+        self._lock = threading.Lock()
+        self.counters = defaultdict(int)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_wait_ms > 0 and self.max_batch > 1
+
+    def submit(self, text: str) -> np.ndarray:
+        if not self.enabled:
+            return self.encode([text])[0]
+        with self._lock:
+            batch = self._pending
+            leader = batch is None
+            if leader:
+                batch = self._pending = _PendingBatch()
+            row = len(batch.texts)
+            batch.texts.append(text)
+            self.counters["requests"] += 1
+            if len(batch.texts) >= self.max_batch:
+                # Lot fermé : la question suivante en ouvre un autre
+                self._pending = None
+                batch.full.set()
+
+        if leader:
+            full = batch.full.wait(self.max_wait_ms / 1000)
+            with self._lock:
+                if self._pending is batch:
+                    self._pending = None
+                self.counters["batches"] += 1
+                self.counters["flush_full" if full else "flush_timeout"] += 1
+            try:
+                batch.vectors = self.encode(batch.texts)
+            except Exception as e:
+                batch.error = e
+            batch.done.set()
+        else:
+            batch.done.wait()
+        if batch.error is not None:
+            raise batch.error
+        return batch.vectors[row]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "max_wait_ms": self.max_wait_ms,
+            "max_batch": self.max_batch,
+            "requests": self.counters["requests"],
+            "batches": self.counters["batches"],
+            "flush_full": self.counters["flush_full"],
+            "flush_timeout": self.counters["flush_timeout"]
+        }
+
+
+# ==================== SERVICE ====================
+
+class EmbeddingService:
+    """Encodage des segments et des questions, avec cache et regroupement"""
+
+    def __init__(self, model, name: str, cache: EmbeddingCache, batch_size: int = 64,
+                 query_wait_ms: float = 5.0, query_batch: int = 32):
+        self.model = model
+        self.name = name
+        self.cache = cache
+        self.batch_size = batch_size
+        self.dim = model.get_sentence_embedding_dimension()
+        self.queries = QueryBatcher(self._encode_uncached, query_wait_ms, query_batch)
+        self.counters = defaultdict(float)
+
+    def _encode_uncached(self, texts: List[str]) -> np.ndarray:
+        start = time.perf_counter()
+        vectors = np.asarray(self.model.encode(texts, batch_size=self.batch_size), dtype=np.float32)
+        self.counters["encoded"] += len(texts)
+        self.counters["model_calls"] += 1
+        self.counters["encode_s"] += time.perf_counter() - start
+        self.cache.put_many([text_hash(text) for text in texts], vectors)
+        # Arrondis au type du cache : un texte a le même vecteur qu'il vienne du modèle ou du cache
+        return vectors.astype(self.cache.dtype).astype(np.float32)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Vecteurs float32 de `texts` ; seuls les textes absents du cache passent par le modèle"""
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        digests = [text_hash(text) for text in texts]
+        found = self.cache.get_many(digests)
+        missing: Dict[int, str] = {}
+        for digest, text in zip(digests, texts):
+            if digest not in found:
+                missing.setdefault(digest, text)
+        if missing:
+            found.update(zip(missing, self._encode_uncached(list(missing.values()))))
+        return np.vstack([found[digest] for digest in digests])
+
+    def encode_query(self, text: str) -> np.ndarray:
+        """Vecteur (1, dim) d'une question, regroupée avec les questions concurrentes si absente du cache"""
+        found = self.cache.get_many([text_hash(text)])
+        if found:
+            return next(iter(found.values()))[None, :]
+        return np.asarray(self.queries.submit(text), dtype=np.float32)[None, :]
+
+    def stats(self) -> Dict[str, Any]:
+        """État du service pour /status/"""
+        return {
+            "name": self.name,
+            "dim": self.dim,
+            "encoded": int(self.counters["encoded"]),
+            "model_calls": int(self.counters["model_calls"]),
+            "encode_s": round(self.counters["encode_s"], 3),
+            "cache": self.cache.stats(),
+            "query_batching": self.queries.stats()
+        }
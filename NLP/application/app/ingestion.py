@@ -0,0 +1,284 @@
+"""
+Ingestion en flux des PDF
+Fichier: app/ingestion.py
+
+Pipeline d'un document, sans jamais tenir tout son texte en mémoire :
+
+1. extract_pages : pages extraites par un pool de processus, par lots de
+   `batch_pages` pages, produites dans l'ordre ; au plus deux lots en
+   vol par processus ;
+2. chunk_stream : phrases regroupées en segments d'au plus `max_tokens`
+   tokens (tokenizer du modèle d'embedding), les dernières phrases d'un
+   segment reprises au début du suivant (`overlap_tokens`) ;
+3. ingest : segments encodés par lots de `embed_batch` au fil de l'eau,
+   puis validés dans la base vectorielle en une fois à la fin.
+
+La progression de chaque ingestion (pages, segments, vecteurs encodés)
+est suivie par IngestionJobs et exposée par /ingestion/.
+"""
+
+import itertools
+import multiprocessing
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import PyPDF2
+
+# Phrase : jusqu'à une ponctuation finale suivie d'un blanc, une ligne vide (titres, listes) ou la fin de page
+SENTENCE_PATTERN = re.compile(r"\S.*?(?:[.!?…]+(?=\s|$)|\n\s*\n|\Z)", re.S)
+
+
+@dataclass(frozen=True)
+class IngestionSettings:
+    workers: int = 4
+    batch_pages: int = 16
+    max_tokens: int = 200
+    overlap_tokens: int = 32
+    embed_batch: int = 64
+
+    def validate(self):
+        if min(self.workers, self.batch_pages, self.max_tokens, self.embed_batch) < 1 or self.overlap_tokens < 0:
+            raise ValueError("Paramètres d'ingestion invalides")
+        if self.overlap_tokens * 2 > self.max_tokens:
+            raise ValueError("Le chevauchement doit rester inférieur à la moitié de la taille des segments")
+
+
+# ==================== EXTRACTION ====================
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn : les processus n'héritent pas des modèles chargés par l'API
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def _extract_range(path: str, start: int, stop: int) -> List[str]:
+    """Texte des pages [start, stop) (dans un processus du pool)"""
+    reader = PyPDF2.PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def count_pages(path: str) -> int:
+    return len(PyPDF2.PdfReader(path).pages)
+
+
+def extract_pages(path: str, settings: IngestionSettings) -> Iterator[Tuple[int, str]]:
+    """(numéro de page à partir de 1, texte), dans l'ordre du document"""
+    n_pages = count_pages(path)
+    if settings.workers <= 1 or n_pages <= settings.batch_pages:
+        reader = PyPDF2.PdfReader(path)
+        for number, page in enumerate(reader.pages, start=1):
+            yield number, page.extract_text() or ""
+        return
+
+    pool = _get_pool(settings.workers)
+    ranges = iter([(start, min(start + settings.batch_pages, n_pages))
+                   for start in range(0, n_pages, settings.batch_pages)])
+    pending = deque((start, pool.submit(_extract_range, path, start, stop))
+                    for start, stop in itertools.islice(ranges, settings.workers * 2))
+    while pending:
+        start, future = pending.popleft()
+        texts = future.result()
+        following = next(ranges, None)
+        if following is not None:
+            pending.append((following[0], pool.submit(_extract_range, path, *following)))
+        for i, text in enumerate(texts):
+            yield start + i + 1, text
+
+
+# ==================== DÉCOUPAGE ====================
+
+@dataclass
+class _Sentence:
+    text: str
+    tokens: int
+    page: int
+    offset: int
+
+
+def split_sentences(pages: Iterable[Tuple[int, str]], count_tokens: Callable[[str], int],
+                    max_tokens: int) -> Iterator[_Sentence]:
+    """Phrases (espaces normalisés) avec leur page et leur position ; une phrase trop longue est coupée"""
+    for page, text in pages:
+        for match in SENTENCE_PATTERN.finditer(text):
+            words = match.group().split()
+            offset = match.start()
+            sentence = " ".join(words)
+            tokens = count_tokens(sentence)
+            if tokens <= max_tokens:
+                yield _Sentence(sentence, tokens, page, offset)
+                continue
+            # Morceaux de mots d'au plus max_tokens tokens (comptés mot à mot)
+            piece, piece_tokens = [], 0
+            for word in words:
+                word_tokens = count_tokens(word)
+                if piece and piece_tokens + word_tokens > max_tokens:
+                    yield _Sentence(" ".join(piece), piece_tokens, page, offset)
+                    piece, piece_tokens = [], 0
+                piece.append(word)
+                piece_tokens += word_tokens
+            if piece:
+                yield _Sentence(" ".join(piece), piece_tokens, page, offset)
+
+
+def chunk_stream(pages: Iterable[Tuple[int, str]], count_tokens: Callable[[str], int],
+                 max_tokens: int, overlap_tokens: int) -> Iterator[Dict[str, Any]]:
+    """
+    Segments (`text`, `page`, `offset` de leur première phrase) faits de
+    phrases entières, d'au plus `max_tokens` tokens ; les phrases de fin
+    d'un segment totalisant au plus `overlap_tokens` ouvrent le suivant.
+    """
+    window: deque = deque()
+    total = 0
+
+    def chunk():
+        first = window[0]
+        return {"text": " ".join(s.text for s in window), "page": first.page, "offset": first.offset}
+
+    for sentence in split_sentences(pages, count_tokens, max_tokens):
+        if window and total + sentence.tokens > max_tokens:
+            yield chunk()
+            kept, kept_tokens = deque(), 0
+            for previous in reversed(window):
+                if kept_tokens + previous.tokens > overlap_tokens:
+                    break
+                kept.appendleft(previous)
+                kept_tokens += previous.tokens
+            window, total = kept, kept_tokens
+            # Le chevauchement ne doit pas empêcher la phrase d'entrer
+            while window and total + sentence.tokens > max_tokens:
+                total -= window.popleft().tokens
+        window.append(sentence)
+        total += sentence.tokens
+    if window:
+        yield chunk()
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+# ==================== SUIVI ====================
+
+class IngestionJob:
+    def __init__(self, name: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.status = "pending"
+        self.total_pages = 0
+        self.pages_done = 0
+        self.chunks = 0
+        self.encoded = 0
+        self.error: Optional[str] = None
+        self.document: Optional[Dict[str, Any]] = None
+        self.cached = False
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0.0
+        return {
+            "job_id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "total_pages": self.total_pages,
+            "pages_done": self.pages_done,
+            "progress": round(self.pages_done / self.total_pages, 4) if self.total_pages else 0.0,
+            "chunks": self.chunks,
+            "encoded": self.encoded,
+            "elapsed_s": round(elapsed, 3),
+            "pages_per_s": round(self.pages_done / elapsed, 2) if elapsed > 0 else 0.0,
+            "error": self.error,
+            "cached": self.cached,
+            "document": self.document
+        }
+
+
+class IngestionJobs:
+    """Ingestions en cours et dernières terminées (gardées pour /ingestion/)"""
+
+    def __init__(self, max_finished: int = 50):
+        self.max_finished = max_finished
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, name: str) -> IngestionJob:
+        job = IngestionJob(name)
+        with self._lock:
+            self._jobs[job.id] = job
+            finished = [key for key, j in self._jobs.items() if j.status in ("completed", "failed")]
+            for key in finished[:max(0, len(finished) - self.max_finished)]:
+                del self._jobs[key]
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [job.snapshot() for job in list(self._jobs.values())]
+
+
+# ==================== PIPELINE ====================
+
+def ingest(store, path: str, digest: str, name: str, settings: IngestionSettings,
+           count_tokens: Callable[[str], int], job: IngestionJob, **metadata) -> Dict[str, Any]:
+    """
+    Extraire, découper et encoder un PDF en flux, puis le valider dans
+    `store`. La mémoire du pipeline est bornée par les lots en vol ; seuls
+    les vecteurs et textes des segments du document sont gardés jusqu'à
+    la validation.
+    """
+    job.status = "running"
+    job.started_at = time.time()
+
+    def pages():
+        for number, text in extract_pages(path, settings):
+            yield number, text
+            job.pages_done = number
+
+    try:
+        job.total_pages = count_pages(path)
+        chunks, vectors = [], []
+        for batch in batched(chunk_stream(pages(), count_tokens, settings.max_tokens, settings.overlap_tokens),
+                             settings.embed_batch):
+            batch_vectors, encoded = store.prepare_vectors([chunk["text"] for chunk in batch])
+            chunks += batch
+            vectors.append(batch_vectors)
+            job.chunks += len(batch)
+            job.encoded += encoded
+
+        chunking = {"max_tokens": settings.max_tokens, "overlap_tokens": settings.overlap_tokens}
+        document, job.cached = store.commit_document(digest, name, chunks, vectors, pages=job.total_pages,
+                                                     chunking=chunking, **metadata)
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+        raise
+    finally:
+        job.finished_at = time.time()
+    job.document = document
+    job.status = "completed"
+    return document
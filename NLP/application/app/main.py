@@ -1,18 +1,83 @@
-from fastapi import FastAPI
+import os
+import shutil
+import tempfile
+from dataclasses import replace
+from glob import glob
+from typing import List, Optional
+
+from fastapi import BackgroundTasks, FastAPI, File, HTTPException, UploadFile
+from fastapi.responses import JSONResponse
 import PyPDF2
-from sentence_transformers import SentenceTransformer
-import faiss
-import numpy as np
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
+import ingestion
+from ann_index import IndexConfig
+from embeddings import EmbeddingCache, EmbeddingService, cache_path, embedding_id, load_model
+from ingestion import IngestionJobs, IngestionSettings
+from vector_store import VectorStore, file_hash
+
+# Dossier des PDF à indexer et de la base vectorielle sauvegardée
+DATA_DIR = os.getenv("RAG_DATA_DIR", "../data")
+INDEX_DIR = os.getenv("RAG_INDEX_DIR", os.path.join(DATA_DIR, "index"))
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# Service d'embeddings (voir embeddings.py) : backend torch, torch-int8, onnx ou onnx-int8,
+# cache LRU + disque (taille 0 : pas de cache disque), regroupement des questions concurrentes
+EMBEDDING_BACKEND = os.getenv("RAG_EMBEDDING_BACKEND", "torch")
+EMBEDDING_CACHE_DIR = os.getenv("RAG_EMBEDDING_CACHE_DIR", os.path.join(DATA_DIR, "embeddings"))
+EMBEDDING_CACHE_SIZE = int(os.getenv("RAG_EMBEDDING_CACHE_SIZE", "10000"))
+EMBEDDING_DISK_CACHE_SIZE = int(os.getenv("RAG_EMBEDDING_DISK_CACHE_SIZE", "500000"))
+QUERY_BATCH_WAIT_MS = float(os.getenv("RAG_QUERY_BATCH_WAIT_MS", "5"))
+QUERY_BATCH_MAX = int(os.getenv("RAG_QUERY_BATCH_MAX", "32"))
+
+# Index de recherche (voir ann_index.py) : flat, ivf_flat, hnsw ou ivf_pq ; métrique l2, ip ou cosine
+INDEX_CONFIG = IndexConfig(
+    index_type=os.getenv("RAG_INDEX_TYPE", "flat"),
+    metric=os.getenv("RAG_METRIC", "l2"),
+    nlist=int(os.getenv("RAG_IVF_NLIST", "0")),
+    nprobe=int(os.getenv("RAG_IVF_NPROBE", "8")),
+    hnsw_m=int(os.getenv("RAG_HNSW_M", "32")),
+    ef_construction=int(os.getenv("RAG_HNSW_EF_CONSTRUCTION", "40")),
+    ef_search=int(os.getenv("RAG_HNSW_EF_SEARCH", "64")),
+    pq_m=int(os.getenv("RAG_PQ_M", "16")),
+    pq_nbits=int(os.getenv("RAG_PQ_NBITS", "8")),
+    # float16 : vecteurs stockés en demi-précision, index deux fois plus petit
+    vector_dtype=os.getenv("RAG_VECTOR_DTYPE", "float32")
+)
+
+# Ingestion en flux (voir ingestion.py) : extraction parallèle, segments en tokens, encodage par lots
+INGESTION_SETTINGS = IngestionSettings(
+    workers=int(os.getenv("RAG_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    batch_pages=int(os.getenv("RAG_EXTRACT_BATCH_PAGES", "16")),
+    max_tokens=int(os.getenv("RAG_CHUNK_TOKENS", "200")),
+    overlap_tokens=int(os.getenv("RAG_CHUNK_OVERLAP_TOKENS", "32")),
+    embed_batch=int(os.getenv("RAG_EMBED_BATCH", "64"))
+)
+
 class QueryRequest(BaseModel):
     query: str
+    # Restreindre la recherche à ces documents (ids de /documents/)
+    document_ids: Optional[List[int]] = None
 
 app = FastAPI()
-model = SentenceTransformer("all-MiniLM-L6-v2")
-index = None
-chunk_list = []
+model = load_model(EMBEDDING_MODEL, EMBEDDING_BACKEND)
+EMBEDDING_ID = embedding_id(EMBEDDING_MODEL, EMBEDDING_BACKEND)
+embedding_cache = EmbeddingCache(
+    model.get_sentence_embedding_dimension(), INDEX_CONFIG.vector_dtype, EMBEDDING_CACHE_SIZE,
+    cache_path(EMBEDDING_CACHE_DIR, EMBEDDING_ID, INDEX_CONFIG.vector_dtype) if EMBEDDING_DISK_CACHE_SIZE else None,
+    EMBEDDING_DISK_CACHE_SIZE
+)
+embeddings = EmbeddingService(model, EMBEDDING_ID, embedding_cache, INGESTION_SETTINGS.embed_batch,
+                              QUERY_BATCH_WAIT_MS, QUERY_BATCH_MAX)
+# Base rouverte depuis le disque : pas de ré-encodage au démarrage
+store = VectorStore(INDEX_DIR, EMBEDDING_ID, embeddings.encode, embeddings.dim, INDEX_CONFIG)
+store.load()
+# Au-delà de max_seq_length tokens (moins [CLS] et [SEP]), le modèle tronque le segment
+INGESTION_SETTINGS = replace(INGESTION_SETTINGS,
+                             max_tokens=min(INGESTION_SETTINGS.max_tokens, model.max_seq_length - 2))
+INGESTION_SETTINGS.validate()
+ingestion_jobs = IngestionJobs()
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,43 +87,122 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def read_pdf(file_bytes):
-    text = ""
-    reader = PyPDF2.PdfReader(file_bytes)
-    for page in reader.pages:
-        text += page.extract_text() + "\n"
-    return text
+@app.on_event("shutdown")
+def shutdown():
+    ingestion.shutdown_pool()
+
+def count_tokens(text):
+    return len(model.tokenizer.tokenize(text))
+
+def ingest_pdf(path, name, source, job=None):
+    """
+    Indexe un PDF en flux (voir ingestion.py) ; (document, True) s'il
+    l'était déjà (même contenu). La progression est suivie par `job`.
+    """
+    job = job or ingestion_jobs.create(name)
+    digest = file_hash(path)
+    document = store.find_document(digest)
+    if document is not None:
+        job.status, job.cached, job.document = "completed", True, document
+        return document, True
+    try:
+        document = ingestion.ingest(store, path, digest, name, INGESTION_SETTINGS, count_tokens, job,
+                                    size_bytes=os.path.getsize(path), source=source)
+    except PyPDF2.errors.PdfReadError as e:
+        raise HTTPException(status_code=400, detail=f"PDF illisible ({name}) : {e}")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {**document, "encoded": job.encoded, "reused": job.chunks - job.encoded}, job.cached
 
-def chunk_text(text, chunk_size=500):
-    words = text.split()
-    return [" ".join(words[i:i+chunk_size]) for i in range(0, len(words), chunk_size)]
+def save_upload(file):
+    """Copie par blocs du fichier reçu dans un fichier temporaire (jamais entièrement en mémoire)"""
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        shutil.copyfileobj(file.file, tmp, 1024 * 1024)
+    return tmp.name
 
-def build_vector_db(chunks):
-    embeddings = model.encode(chunks)
-    dim = embeddings.shape[1]
-    idx = faiss.IndexFlatL2(dim)
-    idx.add(np.array(embeddings))
-    return idx, chunks
+def ingest_upload(path, name, job):
+    """Ingestion en tâche de fond : l'erreur éventuelle est gardée dans le job"""
+    try:
+        ingest_pdf(path, name, "upload", job)
+    except HTTPException:
+        pass
+    finally:
+        os.remove(path)
 
 @app.post("/load_pdf/")
 def load_pdf():
-    global index, chunk_list
-    with open('../data/data.pdf', "rb") as f:
-        text = read_pdf(f)
-    chunk_list = chunk_text(text)
-    index, chunk_list = build_vector_db(chunk_list)
-    return {"message": "Base vectorielle créée", "chunks": len(chunk_list)}
-
-def search(query, top_k=5):
-    query_vec = model.encode([query])
-    D, I = index.search(np.array(query_vec), top_k)
+    """
+    Indexe les PDF de DATA_DIR. Un PDF déjà indexé (même contenu) est
+    ignoré : seuls les nouveaux documents sont lus et encodés.
+    """
+    paths = sorted(glob(os.path.join(DATA_DIR, "*.pdf")))
+    if not paths:
+        raise HTTPException(status_code=404, detail=f"Aucun PDF dans {DATA_DIR}")
+    documents = []
+    for path in paths:
+        document, cached = ingest_pdf(path, os.path.basename(path), "data_dir")
+        documents.append({**document, "cached": cached})
+    return {"message": "Base vectorielle à jour", "chunks": len(store), "documents": documents}
+
+# ===== DOCUMENTS =====
+
+@app.post("/documents/")
+def upload_document(background_tasks: BackgroundTasks, file: UploadFile = File(...), background: bool = False):
+    """
+    Ajoute un PDF au corpus (sans effet s'il est déjà indexé). Avec
+    `background`, répond 202 tout de suite : progression sur /ingestion/{job_id}.
+    """
+    if not (file.filename or "").lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="Seuls les fichiers PDF sont acceptés")
+    path = save_upload(file)
+    if background:
+        job = ingestion_jobs.create(file.filename)
+        background_tasks.add_task(ingest_upload, path, file.filename, job)
+        return JSONResponse(status_code=202, content={"job_id": job.id, "status": job.status})
+    try:
+        document, cached = ingest_pdf(path, file.filename, "upload")
+    finally:
+        os.remove(path)
+    return {**document, "cached": cached}
+
+@app.get("/documents/")
+def list_documents():
+    return {"documents": store.documents, "chunks": len(store)}
+
+@app.delete("/documents/{document_id}")
+def delete_document(document_id: int):
+    """Retire un document et ses vecteurs de l'index (sans reconstruction)"""
+    document = store.delete_document(document_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail=f"Document {document_id} introuvable")
+    return {"message": f"Document {document['name']} supprimé", **document}
+
+@app.get("/ingestion/")
+def list_ingestions():
+    """Ingestions en cours et dernières terminées"""
+    return {"jobs": ingestion_jobs.list()}
+
+@app.get("/ingestion/{job_id}")
+def get_ingestion(job_id: str):
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion {job_id} introuvable")
+    return job.snapshot()
+
+@app.get("/status/")
+def status():
+    return {**store.stats(), "embeddings": embeddings.stats()}
+
+def search(query, top_k=5, document_ids=None):
+    """Ids des segments pertinents, filtrés par mots-clés s'il en reste"""
+    query_vec = embeddings.encode_query(query)
+    chunk_ids = store.search(query_vec, top_k, document_ids)
     keywords = set(query.lower().split())
-    filtered_chunks = []
-    for i in I[0]:
-        chunk = chunk_list[i]
-        if any(word in chunk.lower() for word in keywords):
-            filtered_chunks.append(chunk)
-    return filtered_chunks if filtered_chunks else [chunk_list[i] for i in I[0]]
+    filtered_ids = []
+    for chunk_id in chunk_ids:
+        if any(word in store.text(chunk_id).lower() for word in keywords):
+            filtered_ids.append(chunk_id)
+    return filtered_ids if filtered_ids else chunk_ids
 
 
 # ===== SOLUTION 1 : Ollama avec Qwen 2.5:3b (GRATUIT et LOCAL - RECOMMANDÉ) =====
@@ -181,11 +325,23 @@ def generate_simple_extraction(context, query):
 
 
 @app.post("/ask/")
-async def ask(request: QueryRequest):
-    relevant_chunks = search(request.query)
-    context = "\n".join(relevant_chunks)
+# Synchrone : exécuté dans les threads de FastAPI, ce qui permet le regroupement
+# des questions (embeddings.QueryBatcher) et sort l'appel à Ollama de la boucle asyncio
+def ask(request: QueryRequest):
+    if len(store) == 0:
+        raise HTTPException(status_code=400, detail="Aucun document indexé : appelez d'abord /load_pdf/")
+    if request.document_ids is not None:
+        unknown = [i for i in request.document_ids if store.get_document(i) is None]
+        if unknown:
+            raise HTTPException(status_code=404, detail=f"Documents introuvables : {unknown}")
+    chunk_ids = search(request.query, document_ids=request.document_ids)
+    context = "\n".join(store.text(i) for i in chunk_ids)
     
     # SOLUTION RECOMMANDÉE : Ollama (gratuit et local)
     answer = generate_with_ollama(context, request.query)
     
-    return {"answer": answer}
\ No newline at end of file
+    sources = []
+    for chunk_id in chunk_ids:
+        info = store.chunk_info(chunk_id)
+        sources.append({**info, "name": store.get_document(info["document_id"])["name"]})
+    return {"answer": answer, "sources": sources}
\ No newline at end of file
@@ -1,3 +1,4 @@
+import time
 import streamlit as st
 import requests
 from datetime import datetime
@@ -81,6 +82,13 @@ if 'chunks_count' not in st.session_state:
     st.session_state.chunks_count = 0
 if 'api_url' not in st.session_state:
     st.session_state.api_url = 'http://localhost:8001'
+    # La base vectorielle est sauvegardée côté API : déjà prête après un redémarrage
+    try:
+        status = requests.get(f"{st.session_state.api_url}/status/", timeout=2).json()
+        st.session_state.pdf_loaded = status['chunks'] > 0
+        st.session_state.chunks_count = status['chunks']
+    except Exception:
+        pass
 
 # Sidebar - Configuration
 with st.sidebar:
@@ -128,6 +136,66 @@ with st.sidebar:
     
     st.divider()
     
+    # Section Documents : ajout, suppression et filtre des recherches
+    st.subheader("📚 Documents")
+    
+    uploaded = st.file_uploader("Ajouter un PDF", type=["pdf"])
+    if uploaded is not None and st.button("📤 Indexer ce PDF"):
+        try:
+            # Ingestion en tâche de fond côté API : progression suivie sur /ingestion/{job_id}
+            response = requests.post(
+                f"{st.session_state.api_url}/documents/",
+                params={"background": True},
+                files={'file': (uploaded.name, uploaded.getvalue(), 'application/pdf')}
+            )
+            if response.status_code == 202:
+                job_id = response.json()["job_id"]
+                progress = st.progress(0.0, text="Indexation en cours...")
+                while True:
+                    job = requests.get(f"{st.session_state.api_url}/ingestion/{job_id}", timeout=5).json()
+                    progress.progress(job["progress"],
+                                      text=f"Pages {job['pages_done']}/{job['total_pages']} · {job['chunks']} segments")
+                    if job["status"] in ("completed", "failed"):
+                        break
+                    time.sleep(0.5)
+                progress.empty()
+                if job["status"] == "completed":
+                    data = job["document"]
+                    st.session_state.pdf_loaded = True
+                    st.success(f"{data['name']} déjà indexé" if job['cached'] else f"{data['name']} : {data['chunks']} segments ajoutés")
+                else:
+                    st.error(f"Échec de l'indexation : {job['error']}")
+            else:
+                st.error(f"Erreur {response.status_code}: {response.text}")
+        except Exception as e:
+            st.error(f"Erreur de connexion : {str(e)}")
+    
+    documents = []
+    try:
+        response = requests.get(f"{st.session_state.api_url}/documents/", timeout=5)
+        if response.status_code == 200:
+            documents = response.json()['documents']
+            st.session_state.chunks_count = response.json()['chunks']
+    except Exception:
+        pass
+    
+    for document in documents:
+        col1, col2 = st.columns([4, 1])
+        col1.caption(f"**{document['name']}** · {document['chunks']} segments")
+        if col2.button("🗑️", key=f"delete_{document['id']}"):
+            requests.delete(f"{st.session_state.api_url}/documents/{document['id']}")
+            st.rerun()
+    
+    names = {document['id']: document['name'] for document in documents}
+    st.session_state.document_filter = st.multiselect(
+        "Rechercher dans",
+        options=list(names),
+        format_func=lambda document_id: names[document_id],
+        placeholder="Tous les documents"
+    )
+    
+    st.divider()
+    
     # Informations
     st.subheader("ℹ️ Informations")
     st.info("""
@@ -225,7 +293,10 @@ else:
                 try:
                     response = requests.post(
                         f"{st.session_state.api_url}/ask/",
-                        json={'query': query}  # <-- ici, on utilise json au lieu de params
+                        json={
+                            'query': query,  # <-- ici, on utilise json au lieu de params
+                            'document_ids': st.session_state.get('document_filter') or None
+                        }
                     )
                     
                     if response.status_code == 200:
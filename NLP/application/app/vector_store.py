@@ -0,0 +1,518 @@
+"""
+Base vectorielle persistante du service RAG
+Fichier: app/vector_store.py
+
+L'index FAISS et les métadonnées des segments sont sauvegardés dans
+`directory` et rouverts en mémoire mappée au démarrage : un redémarrage
+ne ré-encode rien. Les vecteurs mappés (IO_FLAG_MMAP_IFC) sont en
+lecture seule : l'index est relu en mémoire au premier ajout ou à la
+première suppression.
+
+- index.faiss : vecteurs des segments (IndexIDMap2 sur un index plat L2,
+  en float16 si `vector_dtype` le demande), chaque vecteur porte l'id de
+  son segment ;
+- search.faiss : index de recherche dérivé des vecteurs (IVF, HNSW, PQ ou
+  plat en produit scalaire, voir ann_index.py), absent pour l'index plat
+  L2 qui cherche directement dans index.faiss ;
+- chunks-<génération>.bin : textes des segments (UTF-8) mis bout à bout ;
+- chunks-<génération>.npy : par segment, id, position et longueur du texte,
+  document, page, position dans la page et hash du texte ;
+- store.json : modèle d'embedding, documents (clé = hash du contenu),
+  compteurs d'ids et génération des fichiers de segments.
+
+Un ajout écrit les données puis store.json ; une suppression écrit
+store.json d'abord. Au chargement, store.json fait foi : les segments et
+vecteurs qu'il ne connaît pas (écriture interrompue) sont écartés.
+
+Un document déjà indexé (même contenu) n'est pas relu ; pour un nouveau
+document, seuls les segments dont le texte n'est pas déjà dans l'index
+passent par le modèle. Supprimer un document retire ses vecteurs par
+remove_ids, sans reconstruire l'index.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import faiss
+import numpy as np
+
+from ann_index import (IndexConfig, build_index, flat_index, needs_rebuild, prepare, search_parameters,
+                       set_search_params, supports_remove)
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 2
+
+CHUNK_DTYPE = np.dtype([
+    ("id", "<i8"), ("start", "<i8"), ("length", "<i4"), ("doc", "<i4"),
+    ("page", "<i4"), ("offset", "<i4"), ("hash", "<u8")
+])
+
+# HNSW : index reconstruit quand les vecteurs supprimés (exclus à la recherche) dépassent cette part
+TOMBSTONE_REBUILD_RATIO = 0.2
+# Textes réécrits (nouvelle génération) quand ceux des documents supprimés dépassent cette part
+TEXTS_COMPACT_RATIO = 0.5
+
+
+def file_hash(path: str, block_size: int = 1024 * 1024) -> str:
+    """Clé d'un document : hash de son contenu brut (lu par blocs)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def text_hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _replace(path: str, write: Callable[[Any], None], mode: str = "wb"):
+    """Écriture atomique : fichier temporaire puis os.replace"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, mode) as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def _id_selector(ids: Iterable[int]) -> faiss.IDSelector:
+    return faiss.IDSelectorBatch(np.fromiter(ids, dtype=np.int64))
+
+
+def _vector_dtype(index: faiss.Index) -> str:
+    """Type de stockage de l'index plat de la base"""
+    return "float16" if isinstance(faiss.downcast_index(index.index), faiss.IndexScalarQuantizer) else "float32"
+
+
+class VectorStore:
+    """
+    Vecteurs (index plat L2, `index`), index de recherche (`search_index`)
+    et textes des segments, persistés dans `directory`
+    """
+
+    def __init__(self, directory: str, model_name: str, encode: Callable[[List[str]], np.ndarray], dim: int,
+                 index_config: IndexConfig = IndexConfig()):
+        index_config.validate(dim)
+        self.directory = directory
+        self.model_name = model_name
+        self.encode = encode
+        self.dim = dim
+        self.index_config = index_config
+        self.index_path = os.path.join(directory, "index.faiss")
+        self.search_path = os.path.join(directory, "search.faiss")
+        self.manifest_path = os.path.join(directory, "store.json")
+        self._lock = threading.RLock()
+        self._reset()
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def _new_base_index(self) -> faiss.Index:
+        return faiss.IndexIDMap2(flat_index(self.dim, faiss.METRIC_L2, self.index_config.vector_dtype))
+
+    def _reset(self):
+        self.index = self._new_base_index()
+        self._index_read_only = False
+        self.chunks = np.zeros(0, dtype=CHUNK_DTYPE)
+        self.documents: List[Dict[str, Any]] = []
+        self.next_id = 0
+        self.next_doc_id = 1
+        self.generation = 0
+        self._texts = None
+        self._hash_ids: Optional[Dict[int, int]] = None
+        self._build_search_index()
+
+    def _texts_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"chunks-{generation}.bin")
+
+    def _chunks_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"chunks-{generation}.npy")
+
+    # -------- index de recherche --------
+
+    def _uses_base_index(self) -> bool:
+        return self.index_config.index_type == "flat" and self.index_config.metric == "l2"
+
+    def _stored_vectors(self):
+        """(vecteurs, ids) de l'index plat de la base"""
+        n = self.index.ntotal
+        if not n:
+            return np.zeros((0, self.dim), dtype=np.float32), np.zeros(0, dtype=np.int64)
+        flat = faiss.downcast_index(self.index.index)
+        return flat.reconstruct_n(0, n), faiss.vector_to_array(self.index.id_map)
+
+    def _build_search_index(self):
+        """(Re)construire l'index de recherche depuis les vecteurs stockés, sans ré-encoder"""
+        self._search_read_only = False
+        self.tombstones = set()
+        if self._uses_base_index():
+            self.search_index = self.index
+            self.search_params = {"index_type": "flat", "metric": "l2"}
+            return
+        start = time.perf_counter()
+        vectors, ids = self._stored_vectors()
+        self.search_index, self.search_params = build_index(prepare(vectors, self.index_config.metric), ids,
+                                                            self.index_config)
+        self.search_params["build_s"] = round(time.perf_counter() - start, 4)
+
+    def _load_search_index(self, saved: Optional[Dict[str, Any]]):
+        """Index de recherche sauvegardé s'il correspond à la configuration et aux vecteurs, sinon reconstruit"""
+        if self._uses_base_index():
+            self._build_search_index()
+            return
+        if (saved and saved["config"] == self.index_config.build_params()
+                and os.path.exists(self.search_path)):
+            index = faiss.read_index(self.search_path, faiss.IO_FLAG_MMAP_IFC)
+            tombstones = set(saved.get("tombstones", []))
+            if index.ntotal - len(tombstones) == len(self):
+                set_search_params(index, self.index_config)
+                self.search_index, self.search_params = index, saved["params"]
+                self.tombstones = tombstones
+                # Vecteurs et listes inversées mappés en lecture seule : rechargés à la première modification
+                self._search_read_only = True
+                return
+        self._build_search_index()
+        self._save_search_index()
+        self._write_manifest()
+
+    def _save_search_index(self):
+        if not self._uses_base_index():
+            _replace(self.search_path, lambda f: f.write(faiss.serialize_index(self.search_index).tobytes()))
+
+    def _writable_search_index(self):
+        if self._search_read_only:
+            self.search_index = faiss.read_index(self.search_path)
+            set_search_params(self.search_index, self.index_config)
+            self._search_read_only = False
+        return self.search_index
+
+    def _writable_index(self):
+        """Index de la base modifiable (relu en mémoire s'il est mappé)"""
+        if self._index_read_only:
+            self.index = faiss.read_index(self.index_path)
+            self._index_read_only = False
+            if self._uses_base_index():
+                self.search_index = self.index
+        return self.index
+
+    def _add_to_search_index(self, vectors: np.ndarray, ids: np.ndarray):
+        if self._uses_base_index():
+            return
+        if needs_rebuild(self.index_config, self.search_params, self.index.ntotal):
+            self._build_search_index()
+            return
+        self._writable_search_index().add_with_ids(prepare(vectors, self.index_config.metric), ids)
+
+    def _remove_from_search_index(self, ids: np.ndarray):
+        if self._uses_base_index():
+            return
+        if supports_remove(self.index_config):
+            self._writable_search_index().remove_ids(_id_selector(ids))
+            return
+        # HNSW : les vecteurs restent dans le graphe, exclus à chaque recherche
+        self.tombstones.update(int(i) for i in ids)
+        if len(self.tombstones) > TOMBSTONE_REBUILD_RATIO * self.search_index.ntotal:
+            self._build_search_index()
+
+    # -------- chargement --------
+
+    def load(self):
+        """Rouvrir la base sauvegardée (index en mémoire mappée), ou partir d'une base vide"""
+        with self._lock:
+            self._reset()
+            if not os.path.exists(self.manifest_path):
+                return
+            with open(self.manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if (manifest.get("format") != FORMAT_VERSION or manifest.get("model") != self.model_name
+                    or manifest.get("dim") != self.dim):
+                logger.warning("Base vectorielle %s d'un autre format ou modèle : ignorée", self.directory)
+                return
+
+            generation = manifest["generation"]
+            chunks = np.load(self._chunks_path(generation))
+            doc_ids = [document["id"] for document in manifest["documents"]]
+            chunks = chunks[(chunks["id"] < manifest["next_id"]) & np.isin(chunks["doc"], doc_ids)]
+            texts_path = self._texts_path(generation)
+            texts_size = os.path.getsize(texts_path) if os.path.exists(texts_path) else 0
+            end = int((chunks["start"] + chunks["length"]).max()) if len(chunks) else 0
+
+            # IO_FLAG_MMAP lirait tout l'index plat en mémoire : seul IO_FLAG_MMAP_IFC mappe ses vecteurs
+            index = faiss.read_index(self.index_path, faiss.IO_FLAG_MMAP_IFC)
+            read_only = True
+            if index.ntotal != len(chunks):
+                # Vecteurs d'un ajout interrompu ou d'un document supprimé
+                index = faiss.read_index(self.index_path)
+                read_only = False
+                known = _id_selector(chunks["id"])
+                index.remove_ids(faiss.IDSelectorNot(known))
+            if index.ntotal != len(chunks) or texts_size < end:
+                logger.warning("Base vectorielle %s incomplète : ignorée", self.directory)
+                return
+
+            self.index = index
+            self._index_read_only = read_only
+            self.chunks = chunks
+            self.documents = manifest["documents"]
+            self.next_id = manifest["next_id"]
+            self.next_doc_id = manifest["next_doc_id"]
+            self.generation = generation
+            if _vector_dtype(index) != self.index_config.vector_dtype:
+                # Type de stockage changé : vecteurs recopiés dans le nouveau format, sans ré-encoder
+                vectors, ids = self._stored_vectors()
+                self.index = self._new_base_index()
+                self._index_read_only = False
+                self.index.add_with_ids(vectors, ids)
+                _replace(self.index_path, lambda f: f.write(faiss.serialize_index(self.index).tobytes()))
+            self._open_texts()
+            self._load_search_index(manifest.get("search_index"))
+
+    def _texts_size(self) -> int:
+        """Taille utile du fichier de textes (fin du dernier segment conservé)"""
+        return int((self.chunks["start"] + self.chunks["length"]).max()) if len(self.chunks) else 0
+
+    def _open_texts(self):
+        size = self._texts_size()
+        self._texts = (np.memmap(self._texts_path(self.generation), dtype=np.uint8, mode="r", shape=(size,))
+                       if size else None)
+
+    # -------- lecture --------
+
+    def _row(self, chunk_id: int):
+        row = int(np.searchsorted(self.chunks["id"], chunk_id))
+        if row == len(self.chunks) or self.chunks[row]["id"] != chunk_id:
+            raise KeyError(chunk_id)
+        return self.chunks[row]
+
+    def has_document(self, digest: str) -> bool:
+        return self.find_document(digest) is not None
+
+    def find_document(self, digest: str) -> Optional[Dict[str, Any]]:
+        return next((document for document in self.documents if document["hash"] == digest), None)
+
+    def get_document(self, document_id: int) -> Optional[Dict[str, Any]]:
+        return next((document for document in self.documents if document["id"] == document_id), None)
+
+    def text(self, chunk_id: int) -> str:
+        chunk = self._row(chunk_id)
+        start = int(chunk["start"])
+        return self._texts[start:start + int(chunk["length"])].tobytes().decode("utf-8")
+
+    def chunk_info(self, chunk_id: int) -> Dict[str, int]:
+        """Origine d'un segment : document, page (à partir de 1) et position du texte dans la page"""
+        chunk = self._row(chunk_id)
+        return {"chunk_id": int(chunk_id), "document_id": int(chunk["doc"]),
+                "page": int(chunk["page"]), "offset": int(chunk["offset"])}
+
+    def search(self, query_vectors: np.ndarray, top_k: int, document_ids: Optional[List[int]] = None) -> List[int]:
+        """
+        Ids des `top_k` segments les plus proches de la première requête.
+        `document_ids` restreint la recherche à ces documents : le filtre
+        est un IDSelector évalué par FAISS pendant le parcours de l'index.
+        """
+        with self._lock:
+            # Les sélecteurs composés ne gardent que des pointeurs : `selectors` les maintient en vie
+            selectors = []
+            selector = None
+            if document_ids is not None:
+                allowed = self.chunks["id"][np.isin(self.chunks["doc"], document_ids)]
+                if not len(allowed):
+                    return []
+                selector = _id_selector(allowed)
+                selectors.append(selector)
+            if self.tombstones:
+                deleted = _id_selector(self.tombstones)
+                alive = faiss.IDSelectorNot(deleted)
+                selectors += [deleted, alive]
+                selector = alive if selector is None else faiss.IDSelectorAnd(selector, alive)
+            params = search_parameters(self.search_index, selector)
+            _, ids = self.search_index.search(prepare(query_vectors, self.index_config.metric),
+                                              min(top_k, len(self)), params=params)
+        return [int(i) for i in ids[0] if i >= 0]
+
+    # -------- ajout --------
+
+    def prepare_vectors(self, texts: List[str]):
+        """
+        Vecteurs de `texts` : un texte déjà dans l'index reprend son vecteur,
+        les autres sont encodés (hors du verrou : les recherches continuent).
+        Retourne (vecteurs, nombre de textes encodés).
+        """
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        to_encode = []
+        with self._lock:
+            if self._hash_ids is None:
+                self._hash_ids = {int(h): int(i) for i, h in zip(self.chunks["id"], self.chunks["hash"])}
+            for i, text in enumerate(texts):
+                chunk_id = self._hash_ids.get(text_hash(text))
+                if chunk_id is None:
+                    to_encode.append(i)
+                else:
+                    vectors[i] = self.index.reconstruct(chunk_id)
+        if to_encode:
+            vectors[to_encode] = np.asarray(self.encode([texts[i] for i in to_encode]), dtype=np.float32)
+        return vectors, len(to_encode)
+
+    def add_document(self, digest: str, name: str, chunks: List[Dict[str, Any]], **metadata) -> Dict[str, Any]:
+        """Indexer les segments (`text`, `page`, `offset`) d'un nouveau document en une fois"""
+        vectors, encoded = self.prepare_vectors([chunk["text"] for chunk in chunks])
+        document, _ = self.commit_document(digest, name, chunks, [vectors], **metadata)
+        return {**document, "encoded": encoded, "reused": len(chunks) - encoded}
+
+    def commit_document(self, digest: str, name: str, chunks: List[Dict[str, Any]], vectors: List[np.ndarray],
+                        **metadata):
+        """
+        Valider un document dont les vecteurs sont prêts (lots dans l'ordre
+        des segments). `metadata` est gardé avec le document. Retourne
+        (document, True) si un document de même contenu a été validé entre-temps.
+        """
+        if not chunks:
+            raise ValueError(f"Aucun texte extrait de {name}")
+        vectors = np.vstack(vectors)
+        with self._lock:
+            existing = self.find_document(digest)
+            if existing is not None:
+                return existing, True
+            texts = [chunk["text"] for chunk in chunks]
+            hashes = [text_hash(text) for text in texts]
+            document_id = self.next_doc_id
+            ids = np.arange(self.next_id, self.next_id + len(chunks), dtype=np.int64)
+            encoded = [text.encode("utf-8") for text in texts]
+            new_chunks = np.zeros(len(chunks), dtype=CHUNK_DTYPE)
+            new_chunks["id"] = ids
+            new_chunks["length"] = [len(data) for data in encoded]
+            new_chunks["start"] = self._texts_size() + np.concatenate(([0], np.cumsum(new_chunks["length"][:-1])))
+            new_chunks["doc"] = document_id
+            new_chunks["page"] = [chunk["page"] for chunk in chunks]
+            new_chunks["offset"] = [chunk["offset"] for chunk in chunks]
+            new_chunks["hash"] = hashes
+
+            document = {
+                "id": document_id,
+                "hash": digest,
+                "name": name,
+                "chunks": len(chunks),
+                **metadata,
+                "added_at": time.time()
+            }
+            self._persist_add(vectors, ids, new_chunks, encoded, document)
+            if self._hash_ids is not None:
+                for h, chunk_id in zip(hashes, ids):
+                    self._hash_ids.setdefault(h, int(chunk_id))
+            return document, False
+
+    def _persist_add(self, vectors: np.ndarray, ids: np.ndarray, new_chunks: np.ndarray,
+                     encoded: List[bytes], document: Dict[str, Any]):
+        """Ajouter textes, métadonnées et vecteurs sur disque ; store.json valide l'ensemble"""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._texts_path(self.generation), "ab") as f:
+            # Ce qui dépasse la partie utile vient d'une écriture interrompue ou d'une suppression
+            f.truncate(self._texts_size())
+            for data in encoded:
+                f.write(data)
+        self._writable_index().add_with_ids(vectors, ids)
+        self._add_to_search_index(vectors, ids)
+        self.chunks = np.concatenate([self.chunks, new_chunks])
+        self.documents = self.documents + [document]
+        self.next_id = int(ids[-1]) + 1
+        self.next_doc_id = document["id"] + 1
+
+        _replace(self._chunks_path(self.generation), lambda f: np.save(f, self.chunks))
+        _replace(self.index_path, lambda f: f.write(faiss.serialize_index(self.index).tobytes()))
+        self._save_search_index()
+        self._write_manifest()
+        self._open_texts()
+
+    # -------- suppression --------
+
+    def delete_document(self, document_id: int) -> Optional[Dict[str, Any]]:
+        """Retirer un document : vecteurs par remove_ids (sans reconstruction), segments et textes"""
+        with self._lock:
+            document = self.get_document(document_id)
+            if document is None:
+                return None
+            removed = self.chunks["doc"] == document_id
+            ids = self.chunks["id"][removed]
+            self.chunks = self.chunks[~removed]
+            self.documents = [d for d in self.documents if d["id"] != document_id]
+            self._hash_ids = None
+            # store.json d'abord : au chargement, les restes du document sont écartés
+            self._write_manifest()
+
+            self._writable_index().remove_ids(_id_selector(ids))
+            self._remove_from_search_index(ids)
+            _replace(self.index_path, lambda f: f.write(faiss.serialize_index(self.index).tobytes()))
+            self._save_search_index()
+
+            old_generation = self.generation
+            live_bytes = int(self.chunks["length"].sum())
+            if self._texts_size() - live_bytes > TEXTS_COMPACT_RATIO * self._texts_size():
+                self._compact_texts()
+            else:
+                _replace(self._chunks_path(self.generation), lambda f: np.save(f, self.chunks))
+            self._write_manifest()
+            self._open_texts()
+            if self.generation != old_generation:
+                for path in (self._texts_path(old_generation), self._chunks_path(old_generation)):
+                    if os.path.exists(path):
+                        os.remove(path)
+            return {**document, "removed_chunks": len(ids)}
+
+    def _compact_texts(self):
+        """Réécrire les textes conservés dans une nouvelle génération de fichiers"""
+        generation = self.generation + 1
+        chunks = self.chunks.copy()
+        chunks["start"] = np.concatenate(([0], np.cumsum(chunks["length"][:-1]))) if len(chunks) else []
+
+        def write(f):
+            for start, length in zip(self.chunks["start"], self.chunks["length"]):
+                f.write(self._texts[int(start):int(start) + int(length)].tobytes())
+
+        _replace(self._texts_path(generation), write)
+        _replace(self._chunks_path(generation), lambda f: np.save(f, chunks))
+        self.chunks = chunks
+        self.generation = generation
+        self._texts = None
+
+    def _write_manifest(self):
+        manifest = {
+            "format": FORMAT_VERSION,
+            "model": self.model_name,
+            "dim": self.dim,
+            "generation": self.generation,
+            "next_id": self.next_id,
+            "next_doc_id": self.next_doc_id,
+            "chunks": len(self.chunks),
+            "documents": self.documents,
+            "search_index": {
+                "config": self.index_config.build_params(),
+                "params": self.search_params,
+                "tombstones": sorted(self.tombstones)
+            }
+        }
+        _replace(self.manifest_path, lambda f: json.dump(manifest, f, ensure_ascii=False), mode="w")
+
+    def stats(self) -> Dict[str, Any]:
+        """État de la base pour /status/"""
+        texts_path = self._texts_path(self.generation)
+        return {
+            "documents": len(self.documents),
+            "chunks": len(self),
+            "dim": self.dim,
+            "model": self.model_name,
+            "vector_dtype": _vector_dtype(self.index),
+            "index_bytes": os.path.getsize(self.index_path) if os.path.exists(self.index_path) else 0,
+            "search_index": {
+                "config": self.index_config.describe(),
+                **self.search_params,
+                "tombstones": len(self.tombstones),
+                "bytes": os.path.getsize(self.search_path) if os.path.exists(self.search_path) else 0
+            },
+            "texts_bytes": os.path.getsize(texts_path) if os.path.exists(texts_path) else 0,
+            "live_texts_bytes": int(self.chunks["length"].sum())
+        }
@@ -0,0 +1,218 @@
+"""
+Stockage des artefacts adressé par leur contenu
+Fichier: backend/artifact_store.py
+
+Chaque artefact est rangé sous une clé dérivée de ce qui le produit :
+
+- upload : hash du fichier brut (et de son extension) ;
+- processed / preprocessor : version du pipeline, hash(données, DataConfig) ;
+- model : hash(données preprocessées, type de modèle, hyperparamètres,
+  split, graine, format de sauvegarde).
+
+Un même fichier, une même configuration de preprocessing ou un même
+entraînement ne sont donc calculés et stockés qu'une fois, tous projets
+confondus. La table content_artifacts compte les références (projets et
+modèles) : un artefact est supprimé quand sa dernière référence disparaît.
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+import artifacts
+from database.database import CRUDArtifact
+
+KINDS = ("upload", "processed", "preprocessor", "model")
+
+# Graine du découpage train / test et des modèles (training.py)
+SPLIT_SEED = 42
+
+
+def make_key(kind: str, digest: str) -> str:
+    return f"{kind}:{digest}"
+
+
+def content_key(kind: str, *parts: Any) -> str:
+    """Clé d'un artefact : hash des éléments qui le déterminent"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return make_key(kind, hashlib.sha256(payload.encode()).hexdigest()[:32])
+
+
+def kind_of(key: str) -> str:
+    return key.split(":", 1)[0]
+
+
+def artifact_files(kind: str, path: str):
+    """Fichiers d'un artefact (un modèle a des annexes : métadonnées XGBoost, export ONNX)"""
+    return artifacts.related_paths(path) if kind == "model" else [path]
+
+
+def files_size(kind: str, path: str) -> int:
+    return sum(os.path.getsize(p) for p in artifact_files(kind, path) if os.path.exists(p))
+
+
+def remove_files(kind: str, path: str):
+    for p in artifact_files(kind, path):
+        if os.path.exists(p):
+            os.remove(p)
+
+
+class ArtifactStore:
+    """
+    Fichiers sous `root/<kind>/<hash>.<ext>`, références en base.
+
+    Les fichiers sans entrée en base plus vieux que `orphan_grace_s`
+    (écriture interrompue) sont supprimés par `collect`.
+    """
+
+    def __init__(self, root: str, orphan_grace_s: float = 3600.0):
+        self.root = root
+        self.orphan_grace_s = orphan_grace_s
+        self.counters = defaultdict(int)
+
+    def path_for(self, key: str, extension: str) -> str:
+        directory = os.path.join(self.root, kind_of(key))
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, key.split(":", 1)[1] + extension)
+
+    def lookup(self, db, key: str, count: bool = True):
+        """
+        Artefact rangé sous `key`, ou None. Avec `count`, la consultation
+        compte comme un succès / échec du cache.
+        """
+        entry = CRUDArtifact.get(db, key)
+        if entry is not None and not os.path.exists(entry.path):
+            # Fichier supprimé hors du store : l'entrée n'est plus valable
+            CRUDArtifact.delete(db, key)
+            self.counters["missing_files"] += 1
+            entry = None
+        if count:
+            self.counters[f"{kind_of(key)}_{'hits' if entry is not None else 'misses'}"] += 1
+            if entry is not None:
+                CRUDArtifact.record_hit(db, key)
+        return entry
+
+    def register(self, db, key: str, path: str, meta: Optional[Dict[str, Any]] = None):
+        """Enregistrer un fichier déjà écrit dans le store (sans référence)"""
+        entry = CRUDArtifact.get(db, key)
+        if entry is not None:
+            return entry
+        kind = kind_of(key)
+        self.counters[f"{kind}_stored"] += 1
+        return CRUDArtifact.create(db, {
+            "key": key,
+            "kind": kind,
+            "path": path,
+            "size_bytes": files_size(kind, path),
+            "meta": meta or {},
+            "refcount": 0
+        })
+
+    def adopt_model(self, db, key: str, model_path: str, meta: Dict[str, Any],
+                    fallback_key: Optional[str] = None):
+        """
+        Ranger dans le store un modèle qui vient d'être entraîné.
+
+        Si `key` existe déjà (même entraînement terminé entre-temps), le
+        nouveau fichier est supprimé au profit de l'existant, sauf si
+        `fallback_key` est donné : il est alors gardé sous cette clé.
+        """
+        if self.lookup(db, key, count=False) is not None:
+            if fallback_key is None:
+                artifacts.delete_model_files(model_path)
+                self.counters["model_deduplicated"] += 1
+                return CRUDArtifact.get(db, key)
+            key = fallback_key
+        extension = artifacts.FORMAT_EXTENSIONS[artifacts.format_from_path(model_path)]
+        dest_path = artifacts.move_model_files(model_path, self.path_for(key, extension))
+        return self.register(db, key, dest_path, meta)
+
+    # -------- références --------
+
+    def acquire(self, db, key: str):
+        return CRUDArtifact.add_references(db, key, 1)
+
+    def release(self, db, key: str) -> int:
+        """Retirer une référence ; supprime l'artefact à la dernière. Retourne les octets libérés"""
+        entry = CRUDArtifact.add_references(db, key, -1)
+        if entry is None or entry.refcount > 0:
+            return 0
+        return self._delete(db, entry)
+
+    def replace(self, db, old_path: Optional[str], new_key: str):
+        """Une référence passe de l'artefact de `old_path` (s'il vient du store) à `new_key`"""
+        old = CRUDArtifact.get_by_path(db, old_path) if old_path else None
+        if old is not None and old.key == new_key:
+            return
+        self.acquire(db, new_key)
+        if old is not None:
+            self.release(db, old.key)
+
+    def _delete(self, db, entry) -> int:
+        # Taille relue : un export ONNX a pu s'ajouter depuis l'enregistrement
+        size = files_size(entry.kind, entry.path)
+        remove_files(entry.kind, entry.path)
+        CRUDArtifact.delete(db, entry.key)
+        self.counters["collected"] += 1
+        self.counters["bytes_collected"] += size
+        return size
+
+    # -------- ramasse-miettes --------
+
+    def collect(self, db) -> Dict[str, int]:
+        """Supprimer les artefacts sans référence et les fichiers orphelins du store"""
+        collected = freed = 0
+        for entry in CRUDArtifact.get_unreferenced(db):
+            freed += self._delete(db, entry)
+            collected += 1
+
+        known = set()
+        for kind, path in CRUDArtifact.get_paths(db):
+            known.update(os.path.normpath(p) for p in artifact_files(kind, path))
+        orphans = 0
+        cutoff = time.time() - self.orphan_grace_s
+        for kind in KINDS:
+            directory = os.path.join(self.root, kind)
+            if not os.path.isdir(directory):
+                continue
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if (entry.is_file() and os.path.normpath(entry.path) not in known
+                            and entry.stat().st_mtime < cutoff):
+                        freed += entry.stat().st_size
+                        os.remove(entry.path)
+                        orphans += 1
+        self.counters["orphans_removed"] += orphans
+        return {"collected": collected, "orphans_removed": orphans, "bytes_freed": freed}
+
+    def stats(self, db) -> Dict[str, Any]:
+        """État du store pour /api/health, /metrics et /api/storage/stats"""
+        by_kind = CRUDArtifact.summary(db)
+        totals = {
+            field: sum(values[field] for values in by_kind.values())
+            for field in ("objects", "bytes", "references", "bytes_deduplicated")
+        }
+        hits = sum(self.counters[f"{kind}_hits"] for kind in KINDS)
+        misses = sum(self.counters[f"{kind}_misses"] for kind in KINDS)
+        return {
+            **totals,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "model_deduplicated": self.counters["model_deduplicated"],
+            "collected": self.counters["collected"],
+            "bytes_collected": self.counters["bytes_collected"],
+            "orphans_removed": self.counters["orphans_removed"],
+            "by_kind": {
+                kind: {
+                    **by_kind.get(kind, {"objects": 0, "bytes": 0, "references": 0,
+                                         "bytes_deduplicated": 0, "hits": 0}),
+                    "session_hits": self.counters[f"{kind}_hits"],
+                    "session_misses": self.counters[f"{kind}_misses"]
+                }
+                for kind in KINDS
+            }
+        }
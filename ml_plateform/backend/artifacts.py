@@ -0,0 +1,302 @@
+"""
+Formats de sérialisation des modèles
+Fichier: backend/artifacts.py
+
+- pickle : format historique (.pkl), toujours lisible ;
+- joblib : compressé (.joblib), algorithme/niveau via FRAMEML_MODEL_COMPRESSION ;
+- joblib-mmap : non compressé (.mmap.joblib), rechargé avec mmap_mode="r"
+  (les gros tableaux numpy restent sur disque, partagés entre processus) ;
+- xgboost-json / xgboost-ubj : booster XGBoost natif (.json / .ubj), avec
+  un fichier annexe (.meta.joblib) contenant le preprocessing fusionné ;
+- onnx : export uniquement (.onnx), servable par onnxruntime.
+
+Le format se déduit de l'extension du fichier : les modèles existants
+n'ont pas besoin d'être migrés.
+"""
+
+import os
+import pickle
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+
+import preprocessing
+
+FORMAT_EXTENSIONS = {
+    "pickle": ".pkl",
+    "joblib": ".joblib",
+    "joblib-mmap": ".mmap.joblib",
+    "xgboost-json": ".json",
+    "xgboost-ubj": ".ubj",
+    "onnx": ".onnx"
+}
+LOADABLE_FORMATS = ("pickle", "joblib", "joblib-mmap", "xgboost-json", "xgboost-ubj")
+XGBOOST_FORMATS = ("xgboost-json", "xgboost-ubj")
+
+META_SUFFIX = ".meta.joblib"
+DEFAULT_COMPRESSION = "zlib:3"
+
+ONNX_OPSET = 17
+ONNX_ML_OPSET = 3
+
+
+def parse_compression(value: Optional[str]) -> Any:
+    """"zlib:3" -> ("zlib", 3) ; "lz4" -> "lz4" ; "none" / "" -> 0"""
+    if not value or value.lower() in ("none", "0"):
+        return 0
+    method, _, level = value.partition(":")
+    return (method, int(level)) if level else method
+
+
+def format_from_path(path: str) -> str:
+    # .mmap.joblib avant .joblib : on teste les extensions les plus longues d'abord
+    for fmt, extension in sorted(FORMAT_EXTENSIONS.items(), key=lambda item: -len(item[1])):
+        if path.endswith(extension):
+            return fmt
+    raise ValueError(f"Format de modèle inconnu: {path}")
+
+
+def artifact_path(directory: str, model_id: str, fmt: str) -> str:
+    if fmt not in FORMAT_EXTENSIONS:
+        raise ValueError(f"Format non supporté: {fmt} (attendu: {', '.join(FORMAT_EXTENSIONS)})")
+    return os.path.join(directory, f"{model_id}{FORMAT_EXTENSIONS[fmt]}")
+
+
+def _base_path(path: str) -> str:
+    return path[:-len(FORMAT_EXTENSIONS[format_from_path(path)])]
+
+
+def is_xgboost(model) -> bool:
+    return type(preprocessing.get_estimator(model)).__module__.startswith("xgboost")
+
+
+# ==================== SAUVEGARDE / CHARGEMENT ====================
+
+def save_model(model, path: str, compression: Optional[str] = DEFAULT_COMPRESSION) -> str:
+    """Écrire le modèle au format correspondant à l'extension de `path`"""
+    fmt = format_from_path(path)
+
+    if fmt == "pickle":
+        with open(path, 'wb') as f:
+            pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+    elif fmt == "joblib":
+        joblib.dump(model, path, compress=parse_compression(compression))
+    elif fmt == "joblib-mmap":
+        joblib.dump(model, path, compress=0)
+    elif fmt in XGBOOST_FORMATS:
+        if not is_xgboost(model):
+            raise ValueError("Les formats XGBoost natifs ne s'appliquent qu'aux modèles XGBoost")
+        estimator = preprocessing.get_estimator(model)
+        estimator.save_model(path)
+        joblib.dump({
+            "estimator_class": type(estimator).__name__,
+            "preprocess": model.named_steps["preprocess"] if preprocessing.is_fused(model) else None
+        }, _base_path(path) + META_SUFFIX, compress=3)
+    else:
+        export_onnx(model, path)
+    return path
+
+
+def load_model(path: str, mmap: bool = True):
+    """Charger un modèle quel que soit son format (déduit de l'extension)"""
+    fmt = format_from_path(path)
+
+    if fmt == "pickle":
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    if fmt == "joblib":
+        return joblib.load(path)
+    if fmt == "joblib-mmap":
+        return joblib.load(path, mmap_mode="r" if mmap else None)
+    if fmt in XGBOOST_FORMATS:
+        import xgboost as xgb
+
+        meta = joblib.load(_base_path(path) + META_SUFFIX)
+        estimator = getattr(xgb, meta["estimator_class"])()
+        estimator.load_model(path)
+        if meta["preprocess"] is not None:
+            return preprocessing.fuse_with_estimator(meta["preprocess"], estimator)
+        return estimator
+    raise ValueError(f"Le format {fmt} n'est pas rechargeable en Python")
+
+
+def related_paths(path: str) -> List[str]:
+    """Fichiers appartenant au même modèle (annexe XGBoost, export ONNX en cache)"""
+    base = _base_path(path)
+    return list(dict.fromkeys([path, base + META_SUFFIX, base + FORMAT_EXTENSIONS["onnx"]]))
+
+
+def delete_model_files(path: str):
+    for related in related_paths(path):
+        if os.path.exists(related):
+            os.remove(related)
+
+
+def export_path(path: str, fmt: str) -> str:
+    """Chemin d'un export du modèle (ONNX en cache), à côté du fichier stocké"""
+    return _base_path(path) + FORMAT_EXTENSIONS[fmt]
+
+
+def move_model_files(path: str, dest_path: str) -> str:
+    """Déplacer un modèle et ses annexes ; `dest_path` doit garder le même format"""
+    for source, dest in zip(related_paths(path), related_paths(dest_path)):
+        if os.path.exists(source):
+            os.replace(source, dest)
+    return dest_path
+
+
+# ==================== ONNX ====================
+
+def _register_xgboost_converters():
+    import xgboost as xgb
+    from onnxmltools.convert.xgboost.operator_converters.XGBoost import convert_xgboost
+    from skl2onnx import update_registered_converter
+    from skl2onnx.common.shape_calculator import (
+        calculate_linear_classifier_output_shapes, calculate_linear_regressor_output_shapes
+    )
+
+    update_registered_converter(
+        xgb.XGBClassifier, "XGBoostXGBClassifier",
+        calculate_linear_classifier_output_shapes, convert_xgboost,
+        options={"nocl": [True, False], "zipmap": [True, False, "columns"]}
+    )
+    update_registered_converter(
+        xgb.XGBRegressor, "XGBoostXGBRegressor",
+        calculate_linear_regressor_output_shapes, convert_xgboost
+    )
+
+
+def onnx_input_types(model) -> List[Tuple[str, Any]]:
+    """
+    Entrées ONNX : une entrée par colonne brute pour un modèle fusionné
+    (float ou string selon la colonne), sinon une matrice float.
+    """
+    from skl2onnx.common.data_types import FloatTensorType, StringTensorType
+
+    if not preprocessing.is_fused(model):
+        return [("input", FloatTensorType([None, int(model.n_features_in_)]))]
+
+    columns = model.named_steps["preprocess"].named_steps["columns"]
+    categorical = set()
+    for name, _, cols in columns.transformers_:
+        if name == "cat":
+            categorical.update(cols)
+    return [
+        (col, StringTensorType([None, 1]) if col in categorical else FloatTensorType([None, 1]))
+        for col in model.feature_names_in_
+    ]
+
+
+def _onnx_compatible_copy(model):
+    """
+    skl2onnx n'accepte que des valeurs manquantes texte pour un imputer de
+    chaînes. Côté ONNX les catégorielles arrivent déjà converties en texte
+    (NaN -> "nan", la valeur de remplissage) : l'imputer n'a rien à faire.
+    Le convertisseur XGBoost exige des noms de features "f0", "f1"... : on
+    retire ceux du booster (l'ordre des colonnes est inchangé).
+    """
+    import copy
+
+    model = copy.deepcopy(model)
+    if is_xgboost(model):
+        preprocessing.get_estimator(model).get_booster().feature_names = None
+    columns = model.named_steps["preprocess"].named_steps["columns"]
+    for name, transformer, _ in columns.transformers_:
+        if name == "cat" and hasattr(transformer, "named_steps") and "imputer" in transformer.named_steps:
+            transformer.named_steps["imputer"].missing_values = ""
+    return model
+
+
+def export_onnx(model, path: str) -> str:
+    """
+    Convertir le modèle (preprocessing compris) en ONNX.
+
+    Nécessite skl2onnx (et onnxmltools pour XGBoost). Les classifieurs
+    exportent les probabilités sous forme de tenseur (zipmap désactivé).
+    """
+    try:
+        from skl2onnx import to_onnx
+    except ImportError:
+        raise ValueError("L'export ONNX nécessite skl2onnx (pip install skl2onnx onnxmltools)")
+
+    if is_xgboost(model):
+        _register_xgboost_converters()
+
+    if preprocessing.is_fused(model):
+        model = _onnx_compatible_copy(model)
+    estimator = preprocessing.get_estimator(model)
+    options = {id(estimator): {"zipmap": False}} if hasattr(estimator, "predict_proba") else None
+    # onnxmltools ne sait pas encore produire la version 5 du domaine ai.onnx.ml
+    target_opset = {"": ONNX_OPSET, "ai.onnx.ml": ONNX_ML_OPSET}
+    onnx_model = to_onnx(model, initial_types=onnx_input_types(model), options=options,
+                         target_opset=target_opset)
+    with open(path, 'wb') as f:
+        f.write(onnx_model.SerializeToString())
+    return path
+
+
+def onnx_feeds(model, X) -> Dict[str, Any]:
+    """Entrées onnxruntime correspondant à onnx_input_types pour un DataFrame brut"""
+    import numpy as np
+
+    if not preprocessing.is_fused(model):
+        return {"input": np.asarray(X, dtype=np.float32)}
+    feeds = {}
+    for name, tensor_type in onnx_input_types(model):
+        values = X[name].to_numpy()
+        if type(tensor_type).__name__ == "StringTensorType":
+            feeds[name] = values.astype(str).astype(object).reshape(-1, 1)
+        else:
+            feeds[name] = values.astype(np.float32).reshape(-1, 1)
+    return feeds
+
+
+# ==================== BENCHMARK ====================
+
+def _load_for_benchmark(path: str):
+    if format_from_path(path) == "onnx":
+        import onnxruntime as ort
+        return ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+    return load_model(path)
+
+
+def benchmark_formats(model, formats: List[str], compression: Optional[str] = DEFAULT_COMPRESSION,
+                      repeats: int = 3) -> Dict[str, Dict[str, Any]]:
+    """
+    Taille et temps de chargement du modèle dans chaque format.
+
+    Chaque format est écrit dans un dossier temporaire puis rechargé
+    `repeats` fois (on garde le meilleur temps). Un format inapplicable
+    (XGBoost natif pour un autre modèle, ONNX sans skl2onnx...) est
+    reporté avec son erreur.
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for fmt in formats:
+            if fmt in XGBOOST_FORMATS and not is_xgboost(model):
+                continue
+            path = artifact_path(directory, "benchmark", fmt)
+            try:
+                start = time.perf_counter()
+                save_model(model, path, compression)
+                save_ms = (time.perf_counter() - start) * 1000
+
+                load_times = []
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    _load_for_benchmark(path)
+                    load_times.append((time.perf_counter() - start) * 1000)
+
+                size = os.path.getsize(path)
+                if os.path.exists(_base_path(path) + META_SUFFIX):
+                    size += os.path.getsize(_base_path(path) + META_SUFFIX)
+                results[fmt] = {
+                    "size_mb": round(size / (1024 * 1024), 4),
+                    "save_ms": round(save_ms, 2),
+                    "load_ms": round(min(load_times), 2)
+                }
+            except Exception as e:
+                results[fmt] = {"error": str(e)}
+    return results
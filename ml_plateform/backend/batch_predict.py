@@ -0,0 +1,180 @@
+"""
+Prédictions par lots
+Fichier: backend/batch_predict.py
+
+Lecture des entrées par morceaux (matrice JSON, CSV, Parquet, Arrow IPC),
+application vectorisée des transformations du projet et sérialisation
+des résultats en NDJSON ou CSV. La mémoire utilisée dépend de la taille
+des morceaux, pas de la taille totale de l'entrée.
+"""
+
+import io
+import json
+import pickle
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import preprocessing
+
+DEFAULT_CHUNK_SIZE = 10000
+
+# Types de contenu acceptés en corps brut
+ARROW_CONTENT_TYPES = ("application/vnd.apache.arrow.stream", "application/vnd.apache.arrow.file")
+PARQUET_CONTENT_TYPES = ("application/vnd.apache.parquet", "application/x-parquet")
+
+
+def load_transformations(path: Optional[str]) -> Dict[str, Any]:
+    """Charger les transformations sauvegardées par /api/data/configure"""
+    if not path:
+        return {}
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def get_input_columns(model, transformations: Dict[str, Any]) -> Optional[List[str]]:
+    """Colonnes brutes attendues en entrée, dans l'ordre"""
+    if preprocessing.is_fused(model):
+        return list(model.feature_names_in_)
+    if transformations.get("pipeline") is not None:
+        return list(transformations["input_columns"])
+    return get_feature_columns(transformations)
+
+
+def get_feature_columns(transformations: Dict[str, Any]) -> Optional[List[str]]:
+    """Retrouver l'ordre des colonnes attendu par le modèle (anciennes transformations)"""
+    if transformations.get("feature_columns"):
+        return list(transformations["feature_columns"])
+    scaler = transformations.get("scaler")
+    if scaler is not None and hasattr(scaler, "feature_names_in_"):
+        return list(scaler.feature_names_in_)
+    return None
+
+
+def select_columns(df: pd.DataFrame, columns: Optional[List[str]]) -> pd.DataFrame:
+    if columns is None:
+        return df
+    missing = [col for col in columns if col not in df.columns]
+    if missing:
+        raise ValueError(f"Colonnes manquantes: {missing}")
+    return df[columns]
+
+
+def apply_transformations(df: pd.DataFrame, transformations: Dict[str, Any],
+                          feature_columns: Optional[List[str]]) -> pd.DataFrame:
+    """Ré-appliquer encodeurs et scaler sur un morceau, de façon vectorisée"""
+    df = select_columns(df, feature_columns)
+    if transformations.get("pipeline") is not None:
+        return transformations["pipeline"].transform(df)
+    df = df.copy()
+
+    # Encodage des catégorielles : les modalités inconnues deviennent -1
+    for col, le in transformations.get("label_encoders", {}).items():
+        if col in df.columns:
+            mapping = {cls: code for code, cls in enumerate(le.classes_)}
+            df[col] = df[col].astype(str).map(mapping).fillna(-1).astype(int)
+
+    scaler = transformations.get("scaler")
+    if scaler is not None:
+        df = pd.DataFrame(scaler.transform(df), columns=df.columns)
+
+    return df
+
+
+# ==================== LECTURE PAR MORCEAUX ====================
+
+def iter_matrix_chunks(rows: List[List[Any]], columns: Optional[List[str]],
+                       chunk_size: int) -> Iterator[pd.DataFrame]:
+    for start in range(0, len(rows), chunk_size):
+        yield pd.DataFrame(rows[start:start + chunk_size], columns=columns)
+
+
+def iter_csv_chunks(file_obj, chunk_size: int) -> Iterator[pd.DataFrame]:
+    yield from pd.read_csv(file_obj, chunksize=chunk_size)
+
+
+def iter_parquet_chunks(path: str, chunk_size: int,
+                        columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path, memory_map=True)
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+        yield batch.to_pandas()
+
+
+def iter_arrow_chunks(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    import pyarrow as pa
+
+    with pa.memory_map(path, 'r') as source:
+        try:
+            reader = pa.ipc.open_stream(source)
+        except pa.ArrowInvalid:
+            source.seek(0)
+            reader = pa.ipc.open_file(source)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        else:
+            batches = iter(reader)
+        for batch in batches:
+            for start in range(0, batch.num_rows, chunk_size):
+                yield batch.slice(start, chunk_size).to_pandas()
+
+
+# ==================== PRÉDICTION ====================
+
+def predict_chunks(model, chunks: Iterator[pd.DataFrame], transformations: Dict[str, Any]
+                   ) -> Iterator[Dict[str, Any]]:
+    """Prédire morceau par morceau ; produit un dict par morceau"""
+    input_columns = get_input_columns(model, transformations)
+    fused = preprocessing.is_fused(model)
+    offset = 0
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        if fused:
+            # Le modèle fusionné applique lui-même le pipeline de preprocessing
+            X = select_columns(chunk, input_columns)
+        else:
+            X = apply_transformations(chunk, transformations, input_columns)
+        predictions = model.predict(X)
+        probabilities = model.predict_proba(X) if hasattr(model, "predict_proba") else None
+        yield {
+            "offset": offset,
+            "predictions": predictions,
+            "probabilities": probabilities
+        }
+        offset += len(chunk)
+
+
+def _to_python(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def format_ndjson(results: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    """Une ligne JSON par observation"""
+    for result in results:
+        probabilities = result["probabilities"]
+        lines = []
+        for i, prediction in enumerate(result["predictions"]):
+            row = {"row": result["offset"] + i, "prediction": _to_python(prediction)}
+            if probabilities is not None:
+                row["probabilities"] = probabilities[i].tolist()
+            lines.append(json.dumps(row))
+        yield "\n".join(lines) + "\n"
+
+
+def format_csv(results: Iterator[Dict[str, Any]], classes=None) -> Iterator[str]:
+    """CSV avec une colonne par classe pour les probabilités"""
+    header_written = False
+    for result in results:
+        out = pd.DataFrame({"row": np.arange(len(result["predictions"])) + result["offset"],
+                            "prediction": result["predictions"]})
+        probabilities = result["probabilities"]
+        if probabilities is not None:
+            labels = classes if classes is not None else range(probabilities.shape[1])
+            for j, label in enumerate(labels):
+                out[f"proba_{label}"] = probabilities[:, j]
+        buffer = io.StringIO()
+        out.to_csv(buffer, index=False, header=not header_written)
+        header_written = True
+        yield buffer.getvalue()
@@ -3,20 +3,44 @@ Module de gestion de la base de données SQLite
 Fichier: backend/database.py
 """
 
-from sqlalchemy import create_engine, Column, String, Float, Integer, DateTime, Boolean, JSON, Text
+from sqlalchemy import (
+    create_engine, event, Column, String, Float, Integer, DateTime, Boolean, JSON, Text,
+    ForeignKey, Index, func, tuple_, case, or_, select
+)
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, relationship, joinedload, load_only
 from datetime import datetime
+import base64
+import json
 import os
 
 # Configuration de la base de données
-DATABASE_URL = "sqlite:///./frameml.db"
+DATABASE_URL = os.getenv("FRAMEML_DATABASE_URL", "sqlite:///./frameml.db")
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
 
 engine = create_engine(
     DATABASE_URL, 
-    connect_args={"check_same_thread": False}
+    connect_args={"check_same_thread": False, "timeout": 30} if IS_SQLITE else {},
+    # Pool dimensionné pour l'API + les callbacks d'entraînement
+    pool_size=int(os.getenv("FRAMEML_DB_POOL_SIZE", "10")),
+    max_overflow=int(os.getenv("FRAMEML_DB_MAX_OVERFLOW", "20")),
+    pool_pre_ping=True,
+    # default=str : les analyses pandas peuvent contenir des Timestamp, numpy...
+    json_serializer=lambda obj: json.dumps(obj, default=str)
 )
 
+if IS_SQLITE:
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """WAL : les lectures ne sont plus bloquées par les écritures"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=30000")
+        cursor.execute("PRAGMA cache_size=-64000")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -40,13 +64,17 @@ class Project(Base):
     data_analysis = Column(JSON, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_projects_created", "created_at", "id"),
+    )
 
 class Experiment(Base):
     """Table des expériences d'entraînement"""
     __tablename__ = "experiments"
     
     id = Column(String, primary_key=True, index=True)
-    project_id = Column(String, nullable=False, index=True)
+    project_id = Column(String, ForeignKey("projects.id"), nullable=False)
     model_id = Column(String, nullable=True)
     name = Column(String, nullable=True)
     model_type = Column(String, nullable=False)
@@ -54,9 +82,23 @@ class Experiment(Base):
     hyperparameters = Column(JSON, nullable=True)
     metrics = Column(JSON, nullable=True)
     training_time = Column(Float, nullable=True)
-    status = Column(String, default="pending")  # pending, running, completed, failed
+    timings = Column(JSON, nullable=True)  # durées par phase (s) : load, cv, fit, predict, metrics, serialization
+    status = Column(String, default="queued")  # queued, running, completed, failed, stopped
+    error = Column(Text, nullable=True)
+    search_id = Column(String, nullable=True)  # recherche d'hyperparamètres d'origine
+    parent_experiment_id = Column(String, nullable=True)  # reprise d'entraînement : expérience du modèle parent
+    continuation = Column(JSON, nullable=True)  # mode de reprise, estimateurs ajoutés, temps gagné
+    cache_hit = Column(Boolean, default=False)  # modèle repris du store sans réentraînement
     created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_experiments_project_created", "project_id", "created_at", "id"),
+        Index("ix_experiments_created", "created_at", "id"),
+        Index("ix_experiments_status", "status"),
+        Index("ix_experiments_search", "search_id"),
+    )
 
 class Model(Base):
     """Table des modèles entraînés"""
@@ -64,28 +106,75 @@ class Model(Base):
     
     id = Column(String, primary_key=True, index=True)
     name = Column(String, nullable=False)
-    project_id = Column(String, nullable=False, index=True)
+    project_id = Column(String, ForeignKey("projects.id"), nullable=False)
     experiment_id = Column(String, nullable=True)
     model_type = Column(String, nullable=False)
     model_path = Column(String, nullable=False)
+    model_format = Column(String, nullable=True)  # pickle, joblib, joblib-mmap, xgboost-json, xgboost-ubj
     version = Column(String, default="1.0.0")
     metrics = Column(JSON, nullable=True)
     size_mb = Column(Float, nullable=True)
+    format_benchmarks = Column(JSON, nullable=True)  # format -> size_mb, save_ms, load_ms
+    inference_backend = Column(String, default="sklearn")  # sklearn, compiled (ensembles d'arbres)
+    inference_benchmarks = Column(JSON, nullable=True)  # latence sklearn / compilé par taille de lot
+    pipeline_version = Column(String, nullable=True)  # version du preprocessing fusionné
+    parent_model_id = Column(String, nullable=True)  # modèle dont l'entraînement a été poursuivi
+    artifact_keys = Column(JSON, nullable=True)  # références tenues dans le store (modèle, données preprocessées)
     status = Column(String, default="active")  # active, deployed, archived
     deployed = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Chargé via joinedload pour récupérer task_type / problem_type sans N+1
+    project = relationship("Project", lazy="select")
+    
+    __table_args__ = (
+        Index("ix_models_project_created", "project_id", "created_at", "id"),
+        Index("ix_models_created", "created_at", "id"),
+        Index("ix_models_status", "status"),
+        Index("ix_models_deployed", "deployed"),
+    )
 
 class Prediction(Base):
     """Table des prédictions"""
     __tablename__ = "predictions"
     
     id = Column(String, primary_key=True, index=True)
-    model_id = Column(String, nullable=False, index=True)
+    model_id = Column(String, nullable=False)
     features = Column(JSON, nullable=False)
     prediction = Column(JSON, nullable=False)
     probabilities = Column(JSON, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_predictions_model_created", "model_id", "created_at"),
+    )
+
+class PredictionRollup(Base):
+    """Nombre de prédictions par modèle et par minute (évite de compter la table predictions)"""
+    __tablename__ = "prediction_rollups"
+    
+    model_id = Column(String, primary_key=True)
+    minute = Column(DateTime, primary_key=True)  # created_at tronqué à la minute
+    count = Column(Integer, nullable=False, default=0)
+
+class ContentArtifact(Base):
+    """Artefacts du stockage adressé par contenu (uploads, données preprocessées, modèles)"""
+    __tablename__ = "content_artifacts"
+    
+    key = Column(String, primary_key=True)  # "<kind>:<hash>"
+    kind = Column(String, nullable=False)  # upload, processed, preprocessor, model
+    path = Column(String, nullable=False, unique=True)
+    size_bytes = Column(Integer, default=0)  # fichier + annexes (métadonnées XGBoost, export ONNX)
+    meta = Column(JSON, nullable=True)  # analyse de l'upload, métriques de l'entraînement...
+    refcount = Column(Integer, nullable=False, default=0)  # projets et modèles qui l'utilisent
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_content_artifacts_refcount", "refcount"),
+    )
 
 class User(Base):
     """Table des utilisateurs (optionnel)"""
@@ -119,6 +208,170 @@ def reset_database():
     Base.metadata.create_all(bind=engine)
     print("⚠️ Base de données réinitialisée")
 
+def to_dict(obj) -> dict:
+    """Convertir une ligne en dict JSON-compatible (dates en ISO 8601)"""
+    data = {}
+    for column in obj.__table__.columns:
+        value = getattr(obj, column.name)
+        data[column.name] = value.isoformat() if isinstance(value, datetime) else value
+    return data
+
+# ==================== PAGINATION ====================
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Colonnes triables par table -> valeur substituée aux NULL (None : colonne jamais nulle)
+EXPERIMENT_SORTS = {"created_at": None, "training_time": 0.0, "model_type": "", "status": "", "name": ""}
+MODEL_SORTS = {"created_at": None, "size_mb": 0.0, "model_type": "", "status": "", "name": ""}
+# Métriques où la meilleure valeur est la plus petite
+LOWER_IS_BETTER = {"mse", "rmse", "mae", "log_loss"}
+# Une métrique absente est triée après toutes les autres (ordre décroissant)
+MISSING_METRIC = -1e308
+
+def encode_cursor(value, row_id: str, sort: str = "created_at") -> str:
+    if sort == "created_at":
+        # Format historique : les curseurs déjà distribués restent valides
+        raw = f"{value.isoformat()}|{row_id}"
+    else:
+        raw = "json:" + json.dumps([sort, value, row_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str, sort: str = "created_at"):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        if raw.startswith("json:"):
+            cursor_sort, value, row_id = json.loads(raw[len("json:"):])
+        else:
+            created_at, row_id = raw.split("|", 1)
+            cursor_sort, value = "created_at", datetime.fromisoformat(created_at)
+    except Exception:
+        raise ValueError("Curseur de pagination invalide")
+    if cursor_sort != sort:
+        raise ValueError(f"Curseur obtenu avec un autre tri ({cursor_sort})")
+    return value, row_id
+
+def metric_expression(table, name: str):
+    """
+    Valeur numérique de metrics[name] (JSON_EXTRACT sous SQLite, ->> sous
+    PostgreSQL). SQLite refuse les JSON contenant NaN (scores de CV en
+    échec...) : ces lignes sont traitées comme sans métrique.
+    """
+    if not name.isidentifier():
+        raise ValueError(f"Nom de métrique invalide: {name}")
+    value = table.metrics[name].as_float()
+    if IS_SQLITE:
+        value = case((func.json_valid(table.metrics) == 1, value), else_=None)
+    return value
+
+def sort_expression(table, sort: str, sortable: dict):
+    """Expression SQL du tri : une colonne de `sortable` ou "metrics.<nom>" """
+    if sort.startswith("metrics."):
+        return func.coalesce(metric_expression(table, sort[len("metrics."):]), MISSING_METRIC)
+    if sort not in sortable:
+        raise ValueError(f"Tri non supporté: {sort} (attendu: {', '.join(sortable)} ou metrics.<nom>)")
+    column = getattr(table, sort)
+    # coalesce : un NULL casserait la comparaison de clés (NULL < x est NULL)
+    return column if sortable[sort] is None else func.coalesce(column, sortable[sort])
+
+def apply_filters(query, table, filters: dict = None):
+    """
+    Filtres de listing : égalité (une liste donne un IN), `search` sur le
+    nom et le type de modèle, bornes `created_after` / `created_before`,
+    `metric_range` = (métrique, min inclus, max exclu).
+    """
+    for name, value in (filters or {}).items():
+        if value is None or value == [] or value == "":
+            continue
+        if name == "created_after":
+            query = query.filter(table.created_at >= value)
+        elif name == "created_before":
+            query = query.filter(table.created_at < value)
+        elif name == "metric_range":
+            metric, minimum, maximum = value
+            expression = metric_expression(table, metric)
+            if minimum is not None:
+                query = query.filter(expression >= minimum)
+            if maximum is not None:
+                query = query.filter(expression < maximum)
+        elif name == "search":
+            pattern = f"%{value}%"
+            query = query.filter(or_(table.name.ilike(pattern), table.model_type.ilike(pattern)))
+        elif isinstance(value, (list, tuple)):
+            query = query.filter(getattr(table, name).in_(value))
+        else:
+            query = query.filter(getattr(table, name) == value)
+    return query
+
+def keyset_paginate(query, table, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE,
+                    sort: str = "created_at", descending: bool = True, sortable: dict = None):
+    """
+    Pagination par clé (valeur de tri, id), décroissante par défaut.
+    
+    Contrairement à OFFSET, le coût d'une page ne dépend pas de sa position :
+    la requête repart de la dernière clé vue en s'appuyant sur l'index
+    (created_at, id) de la table. Les autres tris (colonne ou métrique)
+    utilisent la même clé composite avec l'id pour départager les égalités.
+    Retourne (lignes, curseur suivant ou None).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    expression = table.created_at if sort == "created_at" else sort_expression(table, sort, sortable or {})
+    if cursor:
+        value, row_id = decode_cursor(cursor, sort)
+        key, last = tuple_(expression, table.id), tuple_(value, row_id)
+        query = query.filter(key < last if descending else key > last)
+    if descending:
+        query = query.order_by(expression.desc(), table.id.desc())
+    else:
+        query = query.order_by(expression.asc(), table.id.asc())
+    # La valeur de tri est lue en SQL : le curseur suivant correspond exactement à l'ordre
+    rows = query.add_columns(expression.label("sort_value")).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].sort_value, rows[-1][0].id, sort)
+    return [row[0] for row in rows], next_cursor
+
+def project_columns(query, table, columns=None, sort: str = "created_at"):
+    """Ne charger que `columns` (+ id, created_at et la colonne de tri)"""
+    if not columns:
+        return query
+    names = set(columns) | {"id", "created_at"}
+    if hasattr(table, sort):
+        names.add(sort)
+    return query.options(load_only(*[getattr(table, name) for name in sorted(names)]))
+
+def summarize(query, table, metric_names=(), group_by=()):
+    """
+    Agrégats calculés par la base sur une requête filtrée : effectifs par
+    valeur des colonnes `group_by`, et pour chaque métrique nombre,
+    moyenne, min, max et meilleure ligne.
+    """
+    summary = {"total": query.with_entities(func.count(table.id)).scalar() or 0}
+    for column in group_by:
+        counts = query.with_entities(column, func.count(table.id)).group_by(column).all()
+        summary[f"by_{column.key}"] = {str(value): count for value, count in counts}
+    
+    metrics = {}
+    for name in metric_names:
+        value = metric_expression(table, name)
+        count, average, minimum, maximum = query.with_entities(
+            func.count(value), func.avg(value), func.min(value), func.max(value)
+        ).one()
+        if not count:
+            continue
+        order = value.asc() if name in LOWER_IS_BETTER else value.desc()
+        best = query.filter(value.isnot(None)).with_entities(
+            table.id, table.name, table.model_type, value
+        ).order_by(order, table.id).first()
+        metrics[name] = {
+            "count": count, "avg": average, "min": minimum, "max": maximum,
+            "best": {"id": best[0], "name": best[1], "model_type": best[2], "value": best[3]}
+        }
+    summary["metrics"] = metrics
+    return summary
+
 # ==================== CRUD OPERATIONS ====================
 
 class CRUDProject:
@@ -140,6 +393,14 @@ class CRUDProject:
     def get_all(db):
         return db.query(Project).all()
     
+    @staticmethod
+    def get_page(db, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE):
+        return keyset_paginate(db.query(Project), Project, cursor, limit)
+    
+    @staticmethod
+    def count(db):
+        return db.query(Project).count()
+    
     @staticmethod
     def update(db, project_id: str, update_data: dict):
         db_project = db.query(Project).filter(Project.id == project_id).first()
@@ -184,6 +445,34 @@ class CRUDExperiment:
             Experiment.project_id == project_id
         ).order_by(Experiment.created_at.desc()).all()
     
+    @staticmethod
+    def get_page(db, project_id: str = None, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE,
+                 filters: dict = None, sort: str = "created_at", descending: bool = True,
+                 columns=None):
+        query = apply_filters(db.query(Experiment), Experiment, {"project_id": project_id, **(filters or {})})
+        query = project_columns(query, Experiment, columns, sort)
+        return keyset_paginate(query, Experiment, cursor, limit, sort, descending, EXPERIMENT_SORTS)
+    
+    @staticmethod
+    def summary(db, filters: dict = None, metric_names=()):
+        query = apply_filters(db.query(Experiment), Experiment, filters)
+        summary = summarize(query, Experiment, metric_names, (Experiment.status, Experiment.model_type))
+        total_time, average_time = query.with_entities(
+            func.sum(Experiment.training_time), func.avg(Experiment.training_time)
+        ).one()
+        summary["training_time"] = {"total": total_time or 0.0, "avg": average_time}
+        return summary
+    
+    @staticmethod
+    def get_by_search(db, search_id: str):
+        return db.query(Experiment).filter(
+            Experiment.search_id == search_id
+        ).order_by(Experiment.created_at, Experiment.id).all()
+    
+    @staticmethod
+    def count(db):
+        return db.query(Experiment).count()
+    
     @staticmethod
     def update(db, experiment_id: str, update_data: dict):
         db_experiment = db.query(Experiment).filter(Experiment.id == experiment_id).first()
@@ -194,6 +483,16 @@ class CRUDExperiment:
             db.refresh(db_experiment)
         return db_experiment
     
+    @staticmethod
+    def fail_unfinished(db, error: str) -> int:
+        """Passer en échec les expériences restées en file ou en cours (jobs perdus à l'arrêt du serveur)"""
+        count = db.query(Experiment).filter(Experiment.status.in_(("queued", "running"))).update(
+            {"status": "failed", "error": error, "completed_at": datetime.utcnow()},
+            synchronize_session=False
+        )
+        db.commit()
+        return count
+    
     @staticmethod
     def delete(db, experiment_id: str):
         db_experiment = db.query(Experiment).filter(Experiment.id == experiment_id).first()
@@ -215,7 +514,7 @@ class CRUDModel:
     
     @staticmethod
     def get(db, model_id: str):
-        return db.query(Model).filter(Model.id == model_id).first()
+        return db.query(Model).options(joinedload(Model.project)).filter(Model.id == model_id).first()
     
     @staticmethod
     def get_all(db):
@@ -227,6 +526,46 @@ class CRUDModel:
             Model.project_id == project_id
         ).order_by(Model.created_at.desc()).all()
     
+    @staticmethod
+    def _filtered(db, filters: dict = None):
+        filters = dict(filters or {})
+        query = db.query(Model)
+        # task_type est porté par le projet : sous-requête plutôt qu'une jointure
+        task_type = filters.pop("task_type", None)
+        if task_type:
+            task_types = task_type if isinstance(task_type, (list, tuple)) else [task_type]
+            query = query.filter(Model.project_id.in_(
+                select(Project.id).where(Project.task_type.in_(task_types))
+            ))
+        return apply_filters(query, Model, filters)
+    
+    @staticmethod
+    def get_page(db, project_id: str = None, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE,
+                 filters: dict = None, sort: str = "created_at", descending: bool = True,
+                 columns=None):
+        query = CRUDModel._filtered(db, {"project_id": project_id, **(filters or {})})
+        query = project_columns(query.options(joinedload(Model.project)), Model, columns, sort)
+        return keyset_paginate(query, Model, cursor, limit, sort, descending, MODEL_SORTS)
+    
+    @staticmethod
+    def summary(db, filters: dict = None, metric_names=()):
+        query = CRUDModel._filtered(db, filters)
+        summary = summarize(query, Model, metric_names, (Model.status, Model.model_type))
+        by_task = query.join(Project, Model.project_id == Project.id).with_entities(
+            Project.task_type, func.count(Model.id)
+        ).group_by(Project.task_type).all()
+        summary["by_task_type"] = {str(task_type): count for task_type, count in by_task}
+        deployed, total_size, average_size = query.with_entities(
+            func.count(case((Model.deployed == True, 1))), func.sum(Model.size_mb), func.avg(Model.size_mb)
+        ).one()
+        summary["deployed"] = deployed
+        summary["size_mb"] = {"total": total_size or 0.0, "avg": average_size}
+        return summary
+    
+    @staticmethod
+    def count(db):
+        return db.query(Model).count()
+    
     @staticmethod
     def get_active(db):
         return db.query(Model).filter(Model.status == "active").all()
@@ -254,6 +593,33 @@ class CRUDModel:
             db.commit()
         return True
 
+def truncate_to_minute(value: datetime) -> datetime:
+    return value.replace(second=0, microsecond=0)
+
+def _upsert_rollups(db, counts: dict):
+    """Ajouter {(model_id, minute): n} aux compteurs par minute"""
+    if not counts:
+        return
+    rows = [{"model_id": model_id, "minute": minute, "count": n} for (model_id, minute), n in counts.items()]
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(PredictionRollup).values(rows)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=["model_id", "minute"],
+            set_={"count": PredictionRollup.count + statement.excluded.count}
+        ))
+        return
+    for row in rows:
+        rollup = db.get(PredictionRollup, (row["model_id"], row["minute"]))
+        if rollup is None:
+            db.add(PredictionRollup(**row))
+        else:
+            rollup.count += row["count"]
+
 class CRUDPrediction:
     """Opérations CRUD pour les prédictions"""
     
@@ -261,10 +627,30 @@ class CRUDPrediction:
     def create(db, prediction_data: dict):
         db_prediction = Prediction(**prediction_data)
         db.add(db_prediction)
+        db.flush()
+        _upsert_rollups(db, {(db_prediction.model_id, truncate_to_minute(db_prediction.created_at)): 1})
         db.commit()
         db.refresh(db_prediction)
         return db_prediction
     
+    @staticmethod
+    def bulk_create(db, rows: list) -> int:
+        """
+        Insérer un lot de prédictions en une transaction (executemany) et
+        mettre à jour les compteurs par minute. Chaque dict doit contenir
+        id, model_id, features, prediction, probabilities et created_at.
+        """
+        if not rows:
+            return 0
+        counts = {}
+        for row in rows:
+            key = (row["model_id"], truncate_to_minute(row["created_at"]))
+            counts[key] = counts.get(key, 0) + 1
+        db.bulk_insert_mappings(Prediction, rows)
+        _upsert_rollups(db, counts)
+        db.commit()
+        return len(rows)
+    
     @staticmethod
     def get(db, prediction_id: str):
         return db.query(Prediction).filter(Prediction.id == prediction_id).first()
@@ -276,8 +662,99 @@ class CRUDPrediction:
         ).order_by(Prediction.created_at.desc()).limit(limit).all()
     
     @staticmethod
-    def count_by_model(db, model_id: str):
-        return db.query(Prediction).filter(Prediction.model_id == model_id).count()
+    def count_by_model(db, model_id: str, since: datetime = None):
+        """Nombre de prédictions, lu dans les compteurs par minute"""
+        query = db.query(func.coalesce(func.sum(PredictionRollup.count), 0)).filter(
+            PredictionRollup.model_id == model_id
+        )
+        if since is not None:
+            query = query.filter(PredictionRollup.minute >= truncate_to_minute(since))
+        return int(query.scalar())
+    
+    @staticmethod
+    def get_rollups(db, model_id: str, since: datetime = None):
+        query = db.query(PredictionRollup).filter(PredictionRollup.model_id == model_id)
+        if since is not None:
+            query = query.filter(PredictionRollup.minute >= truncate_to_minute(since))
+        return query.order_by(PredictionRollup.minute).all()
+    
+    @staticmethod
+    def delete_by_model(db, model_id: str):
+        db.query(Prediction).filter(Prediction.model_id == model_id).delete(synchronize_session=False)
+        db.query(PredictionRollup).filter(PredictionRollup.model_id == model_id).delete(synchronize_session=False)
+        db.commit()
+
+class CRUDArtifact:
+    """Opérations CRUD pour le stockage adressé par contenu"""
+    
+    @staticmethod
+    def create(db, artifact_data: dict):
+        db_artifact = ContentArtifact(**artifact_data)
+        db.add(db_artifact)
+        db.commit()
+        db.refresh(db_artifact)
+        return db_artifact
+    
+    @staticmethod
+    def get(db, key: str):
+        return db.query(ContentArtifact).filter(ContentArtifact.key == key).first()
+    
+    @staticmethod
+    def get_by_path(db, path: str):
+        return db.query(ContentArtifact).filter(ContentArtifact.path == path).first()
+    
+    @staticmethod
+    def get_unreferenced(db):
+        return db.query(ContentArtifact).filter(ContentArtifact.refcount <= 0).all()
+    
+    @staticmethod
+    def get_paths(db):
+        return db.query(ContentArtifact.kind, ContentArtifact.path).all()
+    
+    @staticmethod
+    def add_references(db, key: str, delta: int):
+        """refcount += delta (UPDATE atomique), puis l'artefact à jour"""
+        db.query(ContentArtifact).filter(ContentArtifact.key == key).update(
+            {"refcount": ContentArtifact.refcount + delta, "last_used_at": datetime.utcnow()},
+            synchronize_session=False
+        )
+        db.commit()
+        return CRUDArtifact.get(db, key)
+    
+    @staticmethod
+    def record_hit(db, key: str):
+        db.query(ContentArtifact).filter(ContentArtifact.key == key).update(
+            {"hits": ContentArtifact.hits + 1, "last_used_at": datetime.utcnow()},
+            synchronize_session=False
+        )
+        db.commit()
+    
+    @staticmethod
+    def summary(db):
+        """Par type : objets, octets, références, octets évités par le partage"""
+        shared_bytes = func.sum(case(
+            (ContentArtifact.refcount > 1, ContentArtifact.size_bytes * (ContentArtifact.refcount - 1)),
+            else_=0
+        ))
+        rows = db.query(
+            ContentArtifact.kind,
+            func.count(ContentArtifact.key),
+            func.coalesce(func.sum(ContentArtifact.size_bytes), 0),
+            func.coalesce(func.sum(ContentArtifact.refcount), 0),
+            func.coalesce(shared_bytes, 0),
+            func.coalesce(func.sum(ContentArtifact.hits), 0)
+        ).group_by(ContentArtifact.kind).all()
+        return {
+            kind: {"objects": objects, "bytes": int(size), "references": int(references),
+                   "bytes_deduplicated": int(shared), "hits": int(hits)}
+            for kind, objects, size, references, shared, hits in rows
+        }
+    
+    @staticmethod
+    def delete(db, key: str):
+        db.query(ContentArtifact).filter(ContentArtifact.key == key).delete(synchronize_session=False)
+        db.commit()
+        return True
 
 # ==================== INITIALISATION ====================
 
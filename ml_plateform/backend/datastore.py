@@ -0,0 +1,196 @@
+"""
+Stockage colonnaire des jeux de données
+Fichier: backend/datastore.py
+
+Les fichiers uploadés et preprocessés sont conservés en Parquet : les types
+sont préservés, on peut ne lire que certaines colonnes et la lecture passe
+par un memory map. Les anciens fichiers CSV restent lisibles et peuvent
+être migrés à la volée.
+"""
+
+import os
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from profiling import DatasetProfiler, merge_dtypes, normalize_dtype
+
+COLUMNAR_EXTENSIONS = (".parquet", ".feather", ".arrow")
+
+ARROW_TYPES = {
+    "int64": pa.int64(),
+    "float64": pa.float64(),
+    "bool": pa.bool_(),
+    "object": pa.string()
+}
+
+
+def is_columnar(path: str) -> bool:
+    return path.endswith(COLUMNAR_EXTENSIONS)
+
+
+def _prepare_for_arrow(df: pd.DataFrame) -> pd.DataFrame:
+    """Rendre un DataFrame sérialisable en Arrow sans perdre les types simples"""
+    df = df.copy(deep=False)
+    df.columns = [str(col) for col in df.columns]
+    for col in df.columns:
+        # Une colonne object aux types mélangés (ex: "12" et 12) n'a pas de type Arrow
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True).startswith("mixed"):
+            df[col] = df[col].astype(str).where(df[col].notna())
+    return df
+
+
+def save_dataframe(df: pd.DataFrame, path: str) -> str:
+    """Écrire un DataFrame en Parquet (sans l'index pandas)"""
+    table = pa.Table.from_pandas(_prepare_for_arrow(df), preserve_index=False)
+    pq.write_table(table, path, compression="snappy")
+    return path
+
+
+def load_dataframe(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Charger un jeu de données, éventuellement limité à certaines colonnes.
+
+    Parquet/Arrow sont lus via memory map ; le CSV reste supporté pour les
+    projets créés avant le passage au stockage colonnaire.
+    """
+    if path.endswith(".parquet"):
+        return pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+    if path.endswith((".feather", ".arrow")):
+        import pyarrow.feather as feather
+        return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+    return pd.read_csv(path, usecols=columns)
+
+
+def read_column_names(path: str) -> List[str]:
+    """Lire les noms de colonnes sans charger les données"""
+    if path.endswith(".parquet"):
+        return pq.read_schema(path).names
+    if path.endswith((".feather", ".arrow")):
+        with pa.memory_map(path, "r") as source:
+            return pa.ipc.open_file(source).schema.names
+    return pd.read_csv(path, nrows=0).columns.tolist()
+
+
+def iter_csv(path: str, chunk_rows: int, dtypes: Optional[Dict[str, str]] = None) -> Iterator[pd.DataFrame]:
+    """Lire un CSV par morceaux de `chunk_rows` lignes"""
+    yield from pd.read_csv(path, chunksize=chunk_rows, dtype=dtypes)
+
+
+def infer_csv_dtypes(path: str, chunk_rows: int) -> Dict[str, str]:
+    """
+    Déduire un type stable par colonne sur l'ensemble du fichier.
+
+    pandas infère les types morceau par morceau (une colonne entière peut
+    devenir float dans un morceau contenant des NaN) : on fusionne ces
+    types pour obtenir un schéma commun à tout le fichier.
+    """
+    dtypes: Dict[str, str] = {}
+    for chunk in iter_csv(path, chunk_rows):
+        for col in chunk.columns:
+            dtypes[col] = merge_dtypes(dtypes.get(col), normalize_dtype(chunk[col].dtype))
+    return dtypes
+
+
+def write_chunks(chunks: Iterable[pd.DataFrame], path: str, dtypes: Dict[str, str]) -> str:
+    """Écrire des morceaux successifs dans un même fichier Parquet"""
+    schema = pa.schema([(str(col), ARROW_TYPES[dtype]) for col, dtype in dtypes.items()])
+    with pq.ParquetWriter(path, schema, compression="snappy") as writer:
+        for chunk in chunks:
+            chunk = chunk.copy(deep=False)
+            chunk.columns = [str(col) for col in chunk.columns]
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    return path
+
+
+def ingest_file(raw_path: str, filename: str, dest_path: str, chunk_rows: int) -> Dict:
+    """
+    Convertir un fichier uploadé (déjà écrit sur disque) en Parquet.
+
+    Les CSV sont lus en deux passes par morceaux : typage, puis écriture et
+    profilage incrémental. Excel et JSON n'ont pas de lecteur par morceaux
+    et sont chargés en une fois. Retourne le dict `analysis`.
+    """
+    profiler = DatasetProfiler()
+
+    if filename.endswith('.csv'):
+        dtypes = infer_csv_dtypes(raw_path, chunk_rows)
+
+        def profiled_chunks():
+            for chunk in iter_csv(raw_path, chunk_rows, dtypes):
+                profiler.update(chunk)
+                yield chunk
+
+        write_chunks(profiled_chunks(), dest_path, dtypes)
+    else:
+        if filename.endswith(('.xlsx', '.xls')):
+            df = pd.read_excel(raw_path)
+        else:
+            df = pd.read_json(raw_path)
+        profiler.update(df)
+        save_dataframe(df, dest_path)
+
+    return profiler.result()
+
+
+def iter_chunks(path: str, chunk_rows: int, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Lire un jeu de données par morceaux de `chunk_rows` lignes, sans
+    jamais le charger entièrement (entraînement hors mémoire).
+    """
+    if path.endswith(".parquet"):
+        parquet_file = pq.ParquetFile(path, memory_map=True)
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    elif path.endswith((".feather", ".arrow")):
+        with pa.memory_map(path, "r") as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                if columns is not None:
+                    batch = batch.select(columns)
+                for offset in range(0, batch.num_rows, chunk_rows):
+                    yield batch.slice(offset, chunk_rows).to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows, usecols=columns)
+
+
+def estimated_memory_bytes(path: str) -> int:
+    """
+    Taille approximative du jeu de données une fois chargé. Les données
+    preprocessées sont numériques : 8 octets par valeur pour Parquet
+    (compressé sur disque), la taille du fichier sinon.
+    """
+    if path.endswith(".parquet"):
+        metadata = pq.read_metadata(path)
+        return metadata.num_rows * metadata.num_columns * 8
+    return os.path.getsize(path)
+
+
+def count_rows(path: str) -> int:
+    """Nombre de lignes, lu dans les métadonnées pour Parquet"""
+    if path.endswith(".parquet"):
+        return pq.read_metadata(path).num_rows
+    return len(load_dataframe(path, columns=[read_column_names(path)[0]]))
+
+
+def columnar_path(path: str) -> str:
+    """Chemin Parquet correspondant à un fichier CSV"""
+    return os.path.splitext(path)[0] + ".parquet"
+
+
+def migrate_to_parquet(path: str) -> str:
+    """
+    Convertir un fichier CSV existant en Parquet.
+
+    Retourne le nouveau chemin ; le CSV n'est supprimé qu'une fois le
+    Parquet écrit. Les fichiers déjà colonnaires sont retournés tels quels.
+    """
+    if is_columnar(path) or not os.path.exists(path):
+        return path
+    new_path = columnar_path(path)
+    save_dataframe(pd.read_csv(path), new_path)
+    os.remove(path)
+    return new_path
@@ -0,0 +1,164 @@
+"""
+Requêtes conditionnelles (ETag / Last-Modified) sur les lectures JSON
+Fichier: backend/http_cache.py
+
+Middleware ASGI : pour une réponse JSON 200 à un GET, l'ETag est le hash
+du corps. Si le client renvoie cet ETag (If-None-Match), la réponse
+devient un 304 sans corps : ni transfert ni décodage JSON côté client.
+
+Les endpoints qui connaissent la date de modification de la ressource
+(projet, modèle) posent aussi Last-Modified ; If-Modified-Since n'est
+évalué qu'en l'absence d'If-None-Match (RFC 9110, §13.2.2).
+
+Le corps est toujours calculé par l'endpoint : le gain porte sur le
+réseau et le client, pas sur la requête SQL.
+"""
+
+import hashlib
+from collections import defaultdict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Iterable, Optional
+
+# En-têtes conservés dans une réponse 304 (RFC 9110, §15.4.5)
+NOT_MODIFIED_HEADERS = (b"cache-control", b"content-location", b"date", b"etag", b"expires", b"vary", b"last-modified")
+
+
+def compute_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def http_date(value: datetime) -> str:
+    """Date HTTP (GMT) d'un datetime UTC naïf, tel que stocké en base"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Comparaison faible : W/"x" et "x" désignent la même représentation"""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+def not_modified_since(if_modified_since: str, last_modified: str) -> bool:
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+class ConditionalGetMiddleware:
+    """
+    ETag + réponses 304 pour les GET JSON dont le chemin commence par un
+    des `prefixes`. Les corps plus gros que `max_bytes` (ou en streaming
+    non JSON : téléchargements, exports) passent sans être mis en tampon.
+    """
+
+    def __init__(self, app, prefixes: Iterable[str] = ("/api/",), max_bytes: int = 8 * 1024 * 1024,
+                 stats: Optional["ConditionalGetStats"] = None):
+        self.app = app
+        self.prefixes = tuple(prefixes)
+        self.max_bytes = max_bytes
+        self.stats = stats if stats is not None else ConditionalGetStats()
+
+    async def __call__(self, scope, receive, send):
+        # Pas de HEAD : son corps vide donnerait un ETag différent de celui du GET
+        if (scope["type"] != "http" or scope["method"] != "GET"
+                or not scope["path"].startswith(self.prefixes)):
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = dict(scope["headers"])
+        if_none_match = request_headers.get(b"if-none-match", b"").decode("latin-1")
+        if_modified_since = request_headers.get(b"if-modified-since", b"").decode("latin-1")
+
+        start_message = None
+        chunks = []
+        size = 0
+        passthrough = False
+
+        async def buffered_send(message):
+            nonlocal start_message, size, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                content_type = headers.get(b"content-type", b"")
+                if (message["status"] != 200 or b"etag" in headers
+                        or not content_type.startswith(b"application/json")):
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = message
+                return
+            # http.response.body
+            chunks.append(message.get("body", b""))
+            size += len(chunks[-1])
+            if size > self.max_bytes:
+                # Trop gros pour être hashé : on rend la main au flux d'origine
+                passthrough = True
+                self.stats.counters["skipped_large"] += 1
+                await send(start_message)
+                await send({"type": "http.response.body", "body": b"".join(chunks),
+                            "more_body": message.get("more_body", False)})
+                return
+            if not message.get("more_body", False):
+                await self._finish(send, start_message, b"".join(chunks), if_none_match, if_modified_since)
+
+        await self.app(scope, receive, buffered_send)
+
+    async def _finish(self, send, start_message, body: bytes, if_none_match: str, if_modified_since: str):
+        etag = compute_etag(body)
+        headers = [(name, value) for name, value in start_message.get("headers", [])
+                   if name not in (b"etag", b"cache-control")]
+        # no-cache : réutilisable, mais à revalider (l'ETag rend la revalidation peu coûteuse)
+        headers += [(b"etag", etag.encode("latin-1")), (b"cache-control", b"no-cache")]
+        last_modified = dict(headers).get(b"last-modified", b"").decode("latin-1")
+
+        self.stats.counters["responses"] += 1
+        if if_none_match:
+            not_modified = etag_matches(if_none_match, etag)
+        else:
+            not_modified = bool(if_modified_since and last_modified
+                                and not_modified_since(if_modified_since, last_modified))
+
+        if not_modified:
+            self.stats.counters["not_modified"] += 1
+            self.stats.counters["bytes_saved"] += len(body)
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                # Les en-têtes CORS restent nécessaires au navigateur sur un 304
+                "headers": [(name, value) for name, value in headers
+                            if name in NOT_MODIFIED_HEADERS or name.startswith(b"access-control-")]
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if if_none_match or if_modified_since:
+            self.stats.counters["modified"] += 1
+        await send({**start_message, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+class ConditionalGetStats:
+    """Compteurs partagés entre le middleware et /api/health, /metrics"""
+
+    def __init__(self):
+        self.counters: Dict[str, int] = defaultdict(int)
+
+    def stats(self) -> Dict[str, Any]:
+        conditional = self.counters["not_modified"] + self.counters["modified"]
+        return {
+            "responses": self.counters["responses"],
+            "conditional_requests": conditional,
+            "not_modified": self.counters["not_modified"],
+            "modified": self.counters["modified"],
+            "skipped_large": self.counters["skipped_large"],
+            "bytes_saved": self.counters["bytes_saved"],
+            "not_modified_rate": round(self.counters["not_modified"] / conditional, 4) if conditional else 0.0
+        }
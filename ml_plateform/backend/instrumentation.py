@@ -0,0 +1,268 @@
+"""
+Instrumentation du backend : métriques au format Prometheus et profilage
+Fichier: backend/instrumentation.py
+
+Registre minimal (compteurs, jauges, histogrammes avec labels) rendu au
+format texte d'exposition Prometheus par /metrics. Les valeurs qui
+existent déjà ailleurs (cache de modèles, file d'entraînement, taille des
+fichiers sur disque) sont lues au moment du scrape via des collecteurs.
+
+Le profilage par requête (cProfile ou pyinstrument) est opt-in : activé
+par FRAMEML_PROFILING_ENABLED puis déclenché par l'en-tête X-Profile.
+"""
+
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Bornes (s) des histogrammes de latence, proches des valeurs par défaut de Prometheus
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PHASE_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 1800.0)
+SIZE_BUCKETS = tuple(float(1024 ** 2 * size) for size in (0.1, 1, 10, 50, 100, 500, 1024, 5120))
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [
+        f'{name}="{_escape(value)}"'
+        for name, value in zip(names, values)
+    ]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = labels
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            items = [(key, list(counts), self._sums[key]) for key, counts in self._counts.items()]
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.label_names + ("le",), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Ensemble des métriques exposées par /metrics"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[_Metric]]] = []
+
+    def counter(self, name, documentation, labels=()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()) -> Gauge:
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[_Metric]]):
+        """`collector()` retourne des métriques calculées au moment du scrape"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for metric in collector():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def metrics_from_stats(prefix: str, documentation: str, stats: Dict[str, object],
+                       counters: Tuple[str, ...] = ()) -> List[_Metric]:
+    """
+    Une métrique par valeur numérique d'un dict de stats (cache, file d'attente...).
+
+    Les clés de `counters` sont monotones et exposées comme compteurs
+    (suffixe _total), les autres comme jauges.
+    """
+    metrics = []
+    for key, value in stats.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        if key in counters:
+            metric = Counter(f"{prefix}_{key}_total", f"{documentation} ({key})")
+        else:
+            metric = Gauge(f"{prefix}_{key}", f"{documentation} ({key})")
+        metric.inc(value)
+        metrics.append(metric)
+    return metrics
+
+
+def directory_size(path: str, predicate: Optional[Callable[[str], bool]] = None) -> Tuple[int, int]:
+    """(nombre de fichiers, octets) d'un dossier, éventuellement filtré par nom"""
+    files, total = 0, 0
+    if not os.path.isdir(path):
+        return files, total
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_file() and (predicate is None or predicate(entry.name)):
+                files += 1
+                total += entry.stat().st_size
+    return files, total
+
+
+# ==================== PROFILAGE ====================
+
+PROFILERS = ("cprofile", "pyinstrument")
+
+# Un seul profil cProfile à la fois : son hook est global à l'interpréteur
+# (un second enable() le détourne en 3.11 et lève une erreur en 3.12+)
+_cprofile_lock = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    """Un profil cProfile est déjà en cours"""
+
+
+class RequestProfiler:
+    """
+    Profil d'une requête, écrit dans `output_dir`.
+
+    Seul le thread de la boucle asyncio est profilé : le code des endpoints
+    synchrones (`def`), exécuté dans le threadpool, n'apparaît pas. cProfile
+    n'accepte qu'une requête à la fois (`ProfilerBusy` sinon) ; pyinstrument
+    en mode async suit chaque requête séparément et peut être concurrent.
+    """
+
+    def __init__(self, kind: str, output_dir: str, label: str):
+        if kind not in PROFILERS:
+            raise ValueError(f"Profileur non supporté: {kind} (attendu: {', '.join(PROFILERS)})")
+        self.kind = kind
+        self.output_dir = output_dir
+        self.label = label
+        self._profiler = None
+
+    def start(self):
+        if self.kind == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                raise ValueError("pyinstrument n'est pas installé")
+            self._profiler = Profiler(async_mode="enabled")
+            self._profiler.start()
+        else:
+            import cProfile
+            if not _cprofile_lock.acquire(blocking=False):
+                raise ProfilerBusy("Un profil cProfile est déjà en cours, réessayer plus tard")
+            try:
+                self._profiler = cProfile.Profile()
+                self._profiler.enable()
+            except BaseException:
+                _cprofile_lock.release()
+                raise
+
+    def stop(self) -> str:
+        """Arrêter le profilage et retourner le chemin du fichier produit"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        safe_label = "".join(c if c.isalnum() else "_" for c in self.label).strip("_")
+        timestamp = time.strftime('%Y%m%d-%H%M%S') + f"{time.time() % 1:.3f}"[1:]
+        base = os.path.join(self.output_dir, f"{timestamp}_{safe_label}")
+        if self.kind == "pyinstrument":
+            self._profiler.stop()
+            path = base + ".html"
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self._profiler.output_html())
+        else:
+            try:
+                self._profiler.disable()
+            finally:
+                _cprofile_lock.release()
+            path = base + ".prof"
+            self._profiler.dump_stats(path)
+        return path
@@ -0,0 +1,142 @@
+"""
+File d'attente des entraînements et pool de workers
+Fichier: backend/jobs.py
+
+Les entraînements sont exécutés dans un ProcessPoolExecutor borné pour ne
+jamais bloquer la boucle asyncio de l'API. Chaque job passe par les états
+queued -> running -> completed / failed.
+
+Les essais des recherches d'hyperparamètres passent par le même pool
+(`run_task`) et prennent les mêmes places de worker : le nombre de
+processus actifs reste borné par `max_workers`.
+"""
+
+import asyncio
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class QueueFullError(Exception):
+    """Levée quand la file d'attente des entraînements est pleine"""
+
+
+class TrainingJobManager:
+    """Planificateur des jobs d'entraînement"""
+
+    def __init__(self, max_workers: int = 2, max_jobs_per_project: int = 1, max_pending: int = 50,
+                 initializer: Optional[Callable] = None, initargs: Tuple = ()):
+        self.max_workers = max_workers
+        self.max_jobs_per_project = max_jobs_per_project
+        self.max_pending = max_pending
+        # Exécuté une fois par worker (ex. file des événements de progression)
+        self.initializer = initializer
+        self.initargs = initargs
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._worker_slots: Optional[asyncio.Semaphore] = None
+        self._project_slots: Dict[str, asyncio.Semaphore] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._statuses: Dict[str, str] = {}
+        self._running_tasks = 0
+        self.counters = defaultdict(int)
+
+    def start(self):
+        """Créer le pool de processus (appelé au démarrage de l'API)"""
+        if self._executor is None:
+            # "spawn" évite de forker un processus qui contient déjà des threads (uvicorn, OpenMP)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=self.initializer,
+                initargs=self.initargs
+            )
+            self._worker_slots = asyncio.Semaphore(self.max_workers)
+
+    def shutdown(self):
+        """Arrêter le pool (les jobs en attente sont annulés)"""
+        for task in self._tasks.values():
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    def submit(self, job_id: str, project_id: str, func: Callable, payload: Dict[str, Any],
+               on_status: Callable, on_success: Callable):
+        """
+        Mettre un job en file d'attente.
+
+        `on_status(job_id, status, fields)` est appelé à chaque changement
+        d'état pour persister l'expérience ; `on_success(result)` est appelé
+        avec le résultat du worker avant le passage à l'état completed.
+        Ces callbacks s'exécutent dans la boucle asyncio.
+        """
+        if self.pending >= self.max_pending:
+            raise QueueFullError("File d'attente des entraînements pleine")
+
+        self.start()
+        self.counters["queued"] += 1
+        self._statuses[job_id] = "queued"
+        self._tasks[job_id] = asyncio.create_task(
+            self._run(job_id, project_id, func, payload, on_status, on_success)
+        )
+
+    async def run_task(self, func: Callable, payload: Any) -> Any:
+        """Exécuter une tâche courte (ex. essai de recherche) dès qu'une place de worker se libère"""
+        self.start()
+        async with self._worker_slots:
+            self._running_tasks += 1
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self._executor, func, payload)
+            finally:
+                self._running_tasks -= 1
+                self.counters["tasks"] += 1
+
+    def _set_status(self, job_id, status, on_status, **fields):
+        self._statuses[job_id] = status
+        on_status(job_id, status, fields)
+
+    async def _run(self, job_id, project_id, func, payload, on_status, on_success):
+        project_slots = self._project_slots.setdefault(
+            project_id, asyncio.Semaphore(self.max_jobs_per_project)
+        )
+        loop = asyncio.get_running_loop()
+        try:
+            async with project_slots, self._worker_slots:
+                self._set_status(job_id, "running", on_status, started_at=datetime.utcnow())
+                result = await loop.run_in_executor(self._executor, func, payload)
+            on_success(result)
+            self._set_status(job_id, "completed", on_status, completed_at=datetime.utcnow())
+            self.counters["completed"] += 1
+        except asyncio.CancelledError:
+            self.counters["failed"] += 1
+            self._set_status(job_id, "failed", on_status, completed_at=datetime.utcnow(),
+                             error="Entraînement annulé")
+            raise
+        except Exception as e:
+            self.counters["failed"] += 1
+            self._set_status(job_id, "failed", on_status, completed_at=datetime.utcnow(),
+                             error=f"Erreur lors de l'entraînement: {str(e)}")
+        finally:
+            self._tasks.pop(job_id, None)
+            self._statuses.pop(job_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques de la file pour /api/health"""
+        running = sum(1 for status in self._statuses.values() if status == "running")
+        return {
+            "max_workers": self.max_workers,
+            "max_jobs_per_project": self.max_jobs_per_project,
+            "pending": self.pending,
+            "running": running,
+            "queued": self.pending - running,
+            "completed": self.counters["completed"],
+            "failed": self.counters["failed"],
+            "running_tasks": self._running_tasks,
+            "tasks": self.counters["tasks"]
+        }
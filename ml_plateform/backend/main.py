@@ -1,29 +1,48 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request, Response, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse, PlainTextResponse, JSONResponse
+from starlette.background import BackgroundTask
+from starlette.routing import Match
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from sqlalchemy.orm import Session
+from typing import List, Optional, Dict, Any, Union, Callable
 import pandas as pd
 import numpy as np
-import pickle
 import json
+import logging
 import os
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import uuid
 import io
+import asyncio
+import itertools
+import multiprocessing
+import shutil
+import tempfile
+import time
 import uvicorn
-# Imports ML
-from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor, GradientBoostingClassifier
-from sklearn.svm import SVC, SVR
-from sklearn.linear_model import LogisticRegression, LinearRegression
-from sklearn.neighbors import KNeighborsClassifier
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.metrics import (
-    accuracy_score, precision_score, recall_score, f1_score,
-    confusion_matrix, classification_report, mean_squared_error, r2_score
+from training import run_training_job, run_continuation_job, CONTINUATION_MODES, ENSEMBLE_MODEL_TYPES
+from out_of_core import STREAMING_MODES
+from jobs import TrainingJobManager, QueueFullError
+from search import HyperparameterSearch, DEFAULT_SEARCH_SPACES
+from model_cache import ModelCache
+import batch_predict
+import datastore
+import preprocessing
+import instrumentation
+import http_cache
+import artifacts
+import tree_inference
+import microbatch
+import progress
+from prediction_log import PredictionLogger
+from artifact_store import ArtifactStore, content_key, make_key, SPLIT_SEED
+from database.database import (
+    SessionLocal, get_db, init_database, to_dict, DEFAULT_PAGE_SIZE,
+    Experiment, Model, CRUDProject, CRUDExperiment, CRUDModel, CRUDPrediction, CRUDArtifact
 )
-import xgboost as xgb
+
+logger = logging.getLogger(__name__)
 
 # Configuration
 app = FastAPI(
@@ -41,18 +60,294 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Requêtes conditionnelles : ETag + 304 sur les GET JSON de /api (If-None-Match)
+HTTP_ETAG_ENABLED = os.getenv("FRAMEML_HTTP_ETAG_ENABLED", "true").lower() == "true"
+HTTP_ETAG_MAX_BYTES = int(os.getenv("FRAMEML_HTTP_ETAG_MAX_BYTES", str(8 * 1024 * 1024)))
+http_cache_stats = http_cache.ConditionalGetStats()
+if HTTP_ETAG_ENABLED:
+    app.add_middleware(
+        http_cache.ConditionalGetMiddleware,
+        prefixes=("/api/",), max_bytes=HTTP_ETAG_MAX_BYTES, stats=http_cache_stats
+    )
+
 # Dossiers de stockage
 UPLOAD_DIR = "data/uploads"
 MODELS_DIR = "data/models"
 RESULTS_DIR = "data/results"
+FOLDS_DIR = "data/cache/folds"
+STORE_DIR = "data/store"
 
-for directory in [UPLOAD_DIR, MODELS_DIR, RESULTS_DIR]:
+for directory in [UPLOAD_DIR, MODELS_DIR, RESULTS_DIR, FOLDS_DIR, STORE_DIR]:
     os.makedirs(directory, exist_ok=True)
 
-# Stockage en mémoire (à remplacer par une vraie DB en production)
-projects_db = {}
-experiments_db = {}
-models_db = {}
+# Stockage adressé par contenu (uploads, données preprocessées, modèles) :
+# fichiers orphelins (écriture interrompue) supprimés par le GC après ce délai
+STORE_ORPHAN_GRACE_S = float(os.getenv("FRAMEML_STORE_ORPHAN_GRACE_S", "3600"))
+artifact_store = ArtifactStore(STORE_DIR, orphan_grace_s=STORE_ORPHAN_GRACE_S)
+
+# File d'attente des entraînements (configurable par variables d'environnement)
+TRAINING_WORKERS = int(os.getenv("FRAMEML_TRAINING_WORKERS", "2"))
+TRAINING_JOBS_PER_PROJECT = int(os.getenv("FRAMEML_TRAINING_JOBS_PER_PROJECT", "1"))
+TRAINING_MAX_PENDING = int(os.getenv("FRAMEML_TRAINING_MAX_PENDING", "50"))
+
+# Entraînement hors mémoire : choisi automatiquement ("training_mode": "auto")
+# au-delà de cette taille estimée des données preprocessées une fois chargées
+TRAINING_MODES = ("auto", "in_memory", "out_of_core")
+OUT_OF_CORE_THRESHOLD_MB = float(os.getenv("FRAMEML_OUT_OF_CORE_THRESHOLD_MB", "2048"))
+OUT_OF_CORE_CHUNK_ROWS = int(os.getenv("FRAMEML_OUT_OF_CORE_CHUNK_ROWS", "100000"))
+
+# Folds de validation croisée ajustés en parallèle dans chaque worker
+CV_N_JOBS = int(os.getenv("FRAMEML_CV_N_JOBS", "0")) or max(1, (os.cpu_count() or 1) // TRAINING_WORKERS)
+
+# Progression des entraînements (SSE) : les workers publient dans cette file
+PROGRESS_HISTORY = int(os.getenv("FRAMEML_PROGRESS_HISTORY", "2000"))
+PROGRESS_KEEPALIVE_S = float(os.getenv("FRAMEML_PROGRESS_KEEPALIVE_S", "15"))
+progress_queue = multiprocessing.get_context("spawn").Queue()
+progress_hub = progress.ProgressHub(history=PROGRESS_HISTORY, keepalive=PROGRESS_KEEPALIVE_S)
+
+training_jobs = TrainingJobManager(
+    max_workers=TRAINING_WORKERS,
+    max_jobs_per_project=TRAINING_JOBS_PER_PROJECT,
+    max_pending=TRAINING_MAX_PENDING,
+    initializer=progress.init_worker,
+    initargs=(progress_queue,)
+)
+
+# Format des modèles sauvegardés (voir artifacts.py) et formats comparés après l'entraînement
+MODEL_FORMAT = os.getenv("FRAMEML_MODEL_FORMAT", "joblib")
+MODEL_COMPRESSION = os.getenv("FRAMEML_MODEL_COMPRESSION", artifacts.DEFAULT_COMPRESSION)
+MODEL_BENCHMARK_FORMATS = [
+    fmt.strip() for fmt in
+    os.getenv("FRAMEML_MODEL_BENCHMARK_FORMATS", "pickle,joblib,joblib-mmap,xgboost-json,xgboost-ubj,onnx").split(",")
+    if fmt.strip()
+]
+# Extension demandée à /api/models/download -> format d'artefact
+DOWNLOAD_FORMATS = {
+    "pkl": "pickle",
+    "joblib": "joblib",
+    "json": "xgboost-json",
+    "ubj": "xgboost-ubj",
+    "onnx": "onnx"
+}
+
+# Inférence compilée des ensembles d'arbres (voir tree_inference.py) : tailles de lot
+# comparées après l'entraînement, et taille au-delà de laquelle on repasse par sklearn
+INFERENCE_BENCHMARK_BATCHES = [
+    int(size) for size in os.getenv("FRAMEML_INFERENCE_BENCHMARK_BATCHES", "1,32,1024").split(",")
+    if size.strip()
+]
+COMPILED_FALLBACK_ROWS = int(os.getenv("FRAMEML_COMPILED_FALLBACK_ROWS", "256")) or None
+
+# Recherche d'hyperparamètres : essais en vol par recherche, pris sur le pool
+# d'entraînement (défaut et plafond = FRAMEML_TRAINING_WORKERS)
+SEARCH_WORKERS = int(os.getenv("FRAMEML_SEARCH_WORKERS", "0")) or None
+SEARCH_MAX_TRIALS = int(os.getenv("FRAMEML_SEARCH_MAX_TRIALS", "200"))
+SEARCH_HISTORY = int(os.getenv("FRAMEML_SEARCH_HISTORY", "100"))
+
+# Recherches lancées en arrière-plan : search_id -> état / résumé, et tâches en cours
+searches: Dict[str, Dict[str, Any]] = {}
+search_tasks: Dict[str, asyncio.Task] = {}
+
+# Cache des modèles chargés pour les prédictions
+MODEL_CACHE_MAX_MODELS = int(os.getenv("FRAMEML_MODEL_CACHE_MAX_MODELS", "8"))
+MODEL_CACHE_MAX_SIZE_MB = float(os.getenv("FRAMEML_MODEL_CACHE_MAX_SIZE_MB", "1024"))
+MODEL_CACHE_WARMUP = os.getenv("FRAMEML_MODEL_CACHE_WARMUP", "true").lower() == "true"
+
+model_cache = ModelCache(
+    max_models=MODEL_CACHE_MAX_MODELS,
+    max_size_mb=MODEL_CACHE_MAX_SIZE_MB
+)
+
+# Micro-batching de /api/predict : attente maximale (latence) et taille de lot (débit).
+# FRAMEML_PREDICT_BATCH_MAX_WAIT_MS=0 désactive le regroupement.
+PREDICT_BATCH_MAX_WAIT_MS = float(os.getenv("FRAMEML_PREDICT_BATCH_MAX_WAIT_MS", "2"))
+PREDICT_BATCH_MAX_ROWS = int(os.getenv("FRAMEML_PREDICT_BATCH_MAX_ROWS", "64"))
+
+# Journal des prédictions de /api/predict, écrit en base par lots en arrière-plan
+PREDICTION_LOG_ENABLED = os.getenv("FRAMEML_PREDICTION_LOG_ENABLED", "true").lower() == "true"
+PREDICTION_LOG_CAPACITY = int(os.getenv("FRAMEML_PREDICTION_LOG_CAPACITY", "10000"))
+PREDICTION_LOG_FLUSH_ROWS = int(os.getenv("FRAMEML_PREDICTION_LOG_FLUSH_ROWS", "500"))
+PREDICTION_LOG_FLUSH_MS = float(os.getenv("FRAMEML_PREDICTION_LOG_FLUSH_MS", "1000"))
+
+def write_prediction_log(rows: List[Dict[str, Any]]) -> int:
+    """Écrivain du journal : une session et une transaction par lot"""
+    db = SessionLocal()
+    try:
+        return CRUDPrediction.bulk_create(db, rows)
+    finally:
+        db.close()
+
+prediction_logger = PredictionLogger(
+    write_prediction_log,
+    capacity=PREDICTION_LOG_CAPACITY,
+    flush_rows=PREDICTION_LOG_FLUSH_ROWS,
+    flush_interval_ms=PREDICTION_LOG_FLUSH_MS
+)
+
+# Upload : taille des blocs écrits sur disque et des morceaux lus par pandas
+UPLOAD_SPOOL_CHUNK_BYTES = int(os.getenv("FRAMEML_UPLOAD_SPOOL_CHUNK_BYTES", str(1024 * 1024)))
+UPLOAD_CHUNK_ROWS = int(os.getenv("FRAMEML_UPLOAD_CHUNK_ROWS", "100000"))
+UPLOAD_EXTENSIONS = ('.csv', '.xlsx', '.xls', '.json')
+
+# ==================== INSTRUMENTATION ====================
+
+# Profilage par requête (en-tête X-Profile: cprofile | pyinstrument), désactivé par défaut
+PROFILING_ENABLED = os.getenv("FRAMEML_PROFILING_ENABLED", "false").lower() == "true"
+PROFILES_DIR = os.path.join(RESULTS_DIR, "profiles")
+
+metrics_registry = instrumentation.MetricsRegistry()
+REQUEST_LATENCY = metrics_registry.histogram(
+    "frameml_http_request_duration_seconds", "Latence des requêtes HTTP par route",
+    ("method", "route", "status")
+)
+REQUESTS_IN_FLIGHT = metrics_registry.gauge(
+    "frameml_http_requests_in_flight", "Requêtes HTTP en cours par route", ("method", "route")
+)
+TRAINING_PHASE_SECONDS = metrics_registry.histogram(
+    "frameml_training_phase_seconds", "Durée des phases d'entraînement",
+    ("model_type", "phase"), instrumentation.PHASE_BUCKETS
+)
+PREDICTION_ROWS = metrics_registry.counter(
+    "frameml_prediction_rows_total", "Lignes prédites", ("endpoint", "model_type")
+)
+PREDICTION_SECONDS = metrics_registry.counter(
+    "frameml_prediction_seconds_total", "Temps passé à prédire", ("endpoint", "model_type")
+)
+FILE_SIZE_BYTES = metrics_registry.histogram(
+    "frameml_file_size_bytes", "Taille des fichiers écrits", ("kind",), instrumentation.SIZE_BUCKETS
+)
+PREDICT_BATCH_ROWS = metrics_registry.histogram(
+    "frameml_predict_batch_rows", "Requêtes regroupées par lot de /api/predict", ("model_type",),
+    instrumentation.BATCH_BUCKETS
+)
+PREDICT_BATCH_WAIT_SECONDS = metrics_registry.histogram(
+    "frameml_predict_batch_wait_seconds", "Attente du premier arrivé avant l'exécution du lot", ("model_type",)
+)
+
+def observe_prediction_batch(key, rows: int, wait_seconds: float, predict_seconds: float):
+    """Callback du micro-batcher ; la clé commence par (model_id, model_type)"""
+    model_type = key[1]
+    PREDICT_BATCH_ROWS.observe(rows, model_type=model_type)
+    PREDICT_BATCH_WAIT_SECONDS.observe(wait_seconds, model_type=model_type)
+    PREDICTION_SECONDS.inc(predict_seconds, endpoint="predict", model_type=model_type)
+    PREDICTION_ROWS.inc(rows, endpoint="predict", model_type=model_type)
+
+prediction_batcher = microbatch.MicroBatcher(
+    max_wait_ms=PREDICT_BATCH_MAX_WAIT_MS,
+    max_batch_rows=PREDICT_BATCH_MAX_ROWS,
+    on_batch=observe_prediction_batch
+)
+
+def is_processed_file(name: str) -> bool:
+    return "_processed_" in name
+
+def is_preprocessor_file(name: str) -> bool:
+    return "_preprocessor_" in name or name.endswith("_transformations.pkl")
+
+def is_upload_file(name: str) -> bool:
+    return not (is_processed_file(name) or is_preprocessor_file(name))
+
+def collect_runtime_metrics():
+    """Métriques lues au moment du scrape : cache, file d'entraînement, disque"""
+    yield from instrumentation.metrics_from_stats(
+        "frameml_model_cache", "Cache des modèles", model_cache.stats(),
+        counters=("hits", "misses", "evictions")
+    )
+    yield from instrumentation.metrics_from_stats(
+        "frameml_training_queue", "File d'entraînement", training_jobs.stats(),
+        counters=("completed", "failed")
+    )
+    yield from instrumentation.metrics_from_stats(
+        "frameml_predict_batcher", "Micro-batching de /api/predict", prediction_batcher.stats(),
+        counters=("requests", "batches", "flush_full", "flush_timeout", "batch_errors")
+    )
+    yield from instrumentation.metrics_from_stats(
+        "frameml_prediction_log", "Journal des prédictions", prediction_logger.stats(),
+        counters=("logged", "written", "dropped", "failed", "flushes")
+    )
+    yield from instrumentation.metrics_from_stats(
+        "frameml_http_conditional", "Requêtes conditionnelles (ETag)", http_cache_stats.stats(),
+        counters=("responses", "conditional_requests", "not_modified", "modified", "skipped_large", "bytes_saved")
+    )
+    yield from instrumentation.metrics_from_stats(
+        "frameml_training_progress", "Progression des entraînements (SSE)", progress_hub.stats(),
+        counters=("events", "dropped", "subscriptions")
+    )
+    
+    db = SessionLocal()
+    try:
+        store_stats = artifact_store.stats(db)
+    finally:
+        db.close()
+    yield from instrumentation.metrics_from_stats(
+        "frameml_artifact_store", "Stockage adressé par contenu", store_stats,
+        counters=("hits", "misses", "model_deduplicated", "collected", "bytes_collected", "orphans_removed")
+    )
+    
+    # Fichiers du store + fichiers des projets antérieurs au store
+    storage_files = instrumentation.Gauge("frameml_storage_files", "Fichiers stockés", ("kind",))
+    storage_bytes = instrumentation.Gauge("frameml_storage_bytes", "Taille des fichiers stockés", ("kind",))
+    for kind, directory, predicate in (
+        ("upload", UPLOAD_DIR, is_upload_file),
+        ("processed", UPLOAD_DIR, is_processed_file),
+        ("preprocessor", UPLOAD_DIR, is_preprocessor_file),
+        ("model", MODELS_DIR, None)
+    ):
+        files, size = instrumentation.directory_size(directory, predicate)
+        store_files, store_size = instrumentation.directory_size(os.path.join(STORE_DIR, kind))
+        storage_files.set(files + store_files, kind=kind)
+        storage_bytes.set(size + store_size, kind=kind)
+    yield storage_files
+    yield storage_bytes
+
+metrics_registry.add_collector(collect_runtime_metrics)
+
+def resolve_route(scope) -> str:
+    """Gabarit de la route (/api/models/{model_id}) pour borner la cardinalité des labels"""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    """Latence et requêtes en cours par route ; profilage opt-in via X-Profile"""
+    route = resolve_route(request.scope)
+    method = request.method
+    
+    profiler = None
+    profile_kind = request.headers.get("x-profile")
+    if PROFILING_ENABLED and profile_kind:
+        try:
+            profiler = instrumentation.RequestProfiler(profile_kind.lower(), PROFILES_DIR, f"{method}_{route}")
+            profiler.start()
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"detail": str(e)})
+        except instrumentation.ProfilerBusy as e:
+            return JSONResponse(status_code=409, content={"detail": str(e)})
+    
+    REQUESTS_IN_FLIGHT.inc(method=method, route=route)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        # Pour les réponses en streaming, mesure jusqu'à l'envoi des en-têtes
+        REQUEST_LATENCY.observe(time.perf_counter() - start, method=method, route=route, status=status)
+        REQUESTS_IN_FLIGHT.dec(method=method, route=route)
+        if profiler is not None:
+            profile_path = profiler.stop()
+    
+    if profiler is not None:
+        response.headers["X-Profile-Path"] = profile_path
+    return response
+
+def observe_training_timings(model_type: str, timings: Dict[str, Any]):
+    for phase, seconds in timings.items():
+        if isinstance(seconds, (int, float)):
+            TRAINING_PHASE_SECONDS.observe(seconds, model_type=model_type, phase=phase)
 
 # ==================== MODÈLES PYDANTIC ====================
 
@@ -66,9 +361,10 @@ class DataConfig(BaseModel):
     project_id: str
     target_column: str
     handle_missing: bool = True
-    missing_strategy: str = "mean"
+    missing_strategy: Optional[str] = "mean"
     normalize: bool = True
-    normalize_method: str = "StandardScaler"
+    normalize_method: Optional[str] = "StandardScaler"
+    feature_columns: Optional[List[str]] = None  # None = toutes les colonnes sauf la cible
 
 class ModelConfig(BaseModel):
     project_id: str
@@ -77,28 +373,244 @@ class ModelConfig(BaseModel):
     train_test_split: float = 0.8
     cv_folds: int = 5
     use_cross_validation: bool = True
+    cv_n_jobs: Optional[int] = None  # None = FRAMEML_CV_N_JOBS
+    holdout_from_oof: bool = False  # Métriques de test sur les prédictions hors fold
+    inference_backend: str = "sklearn"  # sklearn, compiled (ensembles d'arbres uniquement)
+    reuse_cached: bool = True  # Même entraînement déjà fait : réutiliser le modèle stocké
+    training_mode: str = "auto"  # auto, in_memory, out_of_core (données lues par morceaux)
+    chunk_rows: Optional[int] = None  # hors mémoire : lignes par morceau (None = FRAMEML_OUT_OF_CORE_CHUNK_ROWS)
+    epochs: int = 1  # hors mémoire : passes de partial_fit sur les données
+
+class ContinueConfig(BaseModel):
+    additional_estimators: int = 50  # arbres / tours de boosting ajoutés (Random Forest, Gradient Boosting, XGBoost)
+    new_rows_only: bool = False  # uniquement les lignes absentes des données du modèle parent
+    train_test_split: float = 0.8
+    epochs: int = 1  # passes de partial_fit (SGD)
+    chunk_rows: int = 10000  # taille des morceaux passés à partial_fit
+    measure_full_retrain: bool = False  # mesurer le réentraînement complet au lieu de l'estimer
+
+class SearchConfig(BaseModel):
+    project_id: str
+    model_type: str
+    # Paramètre -> liste de valeurs, ou distribution {"low", "high", "log", "type": "int"}
+    search_space: Optional[Dict[str, Any]] = None  # None = espace par défaut du modèle
+    hyperparameters: Dict[str, Any] = {}  # Paramètres fixes communs à tous les essais
+    strategy: str = "random"  # grid, random, halving, hyperband
+    n_trials: int = 20
+    train_test_split: float = 0.8
+    cv_folds: int = 3
+    scoring: Optional[str] = None  # Scorer sklearn (défaut: accuracy / r2)
+    n_workers: Optional[int] = None
+    eta: int = 3
+    min_resource: float = 0.1  # Fraction minimale des lignes (halving / hyperband)
+    early_stopping: bool = True
+    random_state: int = 42
+    refit: bool = False  # Ré-entraîner la meilleure configuration comme un modèle
 
 class PredictionRequest(BaseModel):
     model_id: str
-    features: List[float]
+    # Données brutes (liste dans l'ordre des colonnes d'origine, ou dict colonne -> valeur)
+    features: Union[List[Any], Dict[str, Any]]
+    # True : features déjà transformées, le pipeline de preprocessing est ignoré
+    preprocessed: bool = False
+
+class InferenceBackendUpdate(BaseModel):
+    backend: str  # sklearn, compiled
+
+class BatchPredictionRequest(BaseModel):
+    features: List[List[Any]]
+    columns: Optional[List[str]] = None
+
+# ==================== UTILITAIRES DB ====================
+
+def get_project_or_404(db: Session, project_id: str):
+    project = CRUDProject.get(db, project_id)
+    if project is None:
+        raise HTTPException(status_code=404, detail="Projet non trouvé")
+    return project
+
+def get_model_or_404(db: Session, model_id: str):
+    model = CRUDModel.get(db, model_id)
+    if model is None:
+        raise HTTPException(status_code=404, detail="Modèle non trouvé")
+    return model
+
+def get_experiment_or_404(db: Session, experiment_id: str):
+    experiment = CRUDExperiment.get(db, experiment_id)
+    if experiment is None:
+        raise HTTPException(status_code=404, detail="Expérience non trouvée")
+    return experiment
+
+def model_to_dict(model) -> Dict[str, Any]:
+    """Modèle + task_type / problem_type du projet (chargé par joinedload)"""
+    model_info = to_dict(model)
+    model_info["task_type"] = model.project.task_type if model.project else None
+    model_info["problem_type"] = model.project.problem_type if model.project else None
+    return model_info
+
+def ensure_columnar(db: Session, project, field: str) -> str:
+    """Migrer à la volée un fichier CSV d'un ancien projet vers Parquet"""
+    path = getattr(project, field)
+    if path and not datastore.is_columnar(path):
+        new_path = datastore.migrate_to_parquet(path)
+        if new_path != path:
+            CRUDProject.update(db, project.id, {field: new_path})
+        return new_path
+    return path
+
+def set_last_modified(response: Response, updated_at: Optional[datetime]):
+    """Last-Modified d'une ressource dont la date de mise à jour est fiable"""
+    if updated_at is not None:
+        response.headers["Last-Modified"] = http_cache.http_date(updated_at)
+
+def page_or_400(fetch, *args, **kwargs):
+    """Appeler une requête paginée ; un curseur, un tri ou une métrique invalide donne une 400"""
+    try:
+        return fetch(*args, **kwargs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# ==================== LISTINGS (FILTRES / TRI / PROJECTION) ====================
+
+# Métriques agrégées par défaut dans les résumés (absentes : ignorées)
+SUMMARY_METRICS = ("test_accuracy", "f1_score", "test_r2", "rmse")
+
+# Champs calculés des modèles (portés par le projet)
+MODEL_EXTRA_FIELDS = {
+    "task_type": lambda model: model.project.task_type if model.project else None,
+    "problem_type": lambda model: model.project.problem_type if model.project else None
+}
+
+def split_csv(value: Optional[str]) -> Optional[List[str]]:
+    """"a,b" -> ["a", "b"] (filtres à valeurs multiples)"""
+    if not value:
+        return None
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Les dates sont stockées en UTC sans fuseau (datetime.utcnow)"""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def listing_filters(model_type: Optional[str] = None, status: Optional[str] = None,
+                    search: Optional[str] = None, created_after: Optional[datetime] = None,
+                    created_before: Optional[datetime] = None, metric: Optional[str] = None,
+                    metric_min: Optional[float] = None, metric_max: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Filtres communs des listings (valeurs multiples séparées par des
+    virgules). `metric` + `metric_min` / `metric_max` bornent une métrique
+    (ex: metric=test_accuracy&metric_min=0.9).
+    """
+    metric_range = None
+    if metric_min is not None or metric_max is not None:
+        if not metric:
+            raise HTTPException(status_code=400, detail="metric_min / metric_max nécessitent metric")
+        metric_range = (metric, metric_min, metric_max)
+    return {
+        "model_type": split_csv(model_type),
+        "status": split_csv(status),
+        "search": search,
+        "created_after": naive_utc(created_after),
+        "created_before": naive_utc(created_before),
+        "metric_range": metric_range
+    }
+
+def parse_fields(fields: Optional[str], table, extras: Dict[str, Any] = None) -> Optional[List[str]]:
+    """
+    Projection `fields=id,name,metrics.test_accuracy` : colonnes de la
+    table, champs calculés (`extras`) ou clé d'une colonne JSON.
+    """
+    names = split_csv(fields)
+    if not names:
+        return None
+    columns = table.__table__.columns
+    for name in names:
+        top, _, key = name.partition(".")
+        if top not in columns and top not in (extras or {}):
+            raise HTTPException(status_code=400, detail=f"Champ inconnu: {top}")
+        if key and (top not in columns or columns[top].type.__class__.__name__ != "JSON"):
+            raise HTTPException(status_code=400, detail=f"{top} n'est pas un champ JSON")
+    return names
+
+def row_fields(row, fields: List[str], extras: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Dict limité aux champs demandés ; "metrics.x" donne {"metrics": {"x": ...}}"""
+    data = {"id": row.id}
+    for name in fields:
+        top, _, key = name.partition(".")
+        value = extras[top](row) if extras and top in extras else getattr(row, top)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        if key:
+            parent = data.setdefault(top, {})
+            if isinstance(parent, dict):
+                parent[key] = (value or {}).get(key)
+        else:
+            data[top] = value
+    return data
+
+def sort_order_or_400(order: str) -> bool:
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order doit valoir asc ou desc")
+    return order == "desc"
+
+def list_page(fetch, table, key: str, to_item, project_id: Optional[str], cursor: Optional[str],
+              limit: int, filters: Dict[str, Any], sort: str, order: str, fields: Optional[str],
+              db: Session, extras: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Page d'un listing filtré / trié, éventuellement réduite à `fields`"""
+    descending = sort_order_or_400(order)
+    projection = parse_fields(fields, table, extras)
+    columns = None
+    if projection is not None:
+        columns = [name.partition(".")[0] for name in projection if name.partition(".")[0] in table.__table__.columns]
+    rows, next_cursor = page_or_400(
+        fetch, db, project_id, cursor, limit,
+        filters=filters, sort=sort, descending=descending, columns=columns
+    )
+    return {
+        "status": "success",
+        key: [to_item(row) if projection is None else row_fields(row, projection, extras) for row in rows],
+        "next_cursor": next_cursor
+    }
+
+def get_inference_model(model_info):
+    """
+    Modèle servi pour les prédictions, depuis le cache. La version
+    compilée a sa propre entrée : /api/models/download continue de
+    travailler sur l'estimateur sklearn. Bloquant (désérialisation,
+    compilation) : depuis un endpoint async, passer par asyncio.to_thread.
+    
+    Le cache est indexé par fichier : des modèles dédupliqués vers le même
+    artefact du store partagent une seule copie en mémoire.
+    """
+    if model_info.inference_backend == "compiled":
+        return model_cache.get(
+            f"{model_info.model_path}:compiled", model_info.model_path, model_info.size_mb,
+            loader=lambda path: tree_inference.load_compiled(path, COMPILED_FALLBACK_ROWS)
+        )
+    return model_cache.get(model_info.model_path, model_info.model_path, model_info.size_mb)
+
+def invalidate_cached_model(model_path: str):
+    """Retirer du cache le modèle chargé depuis `model_path` (et sa version compilée)"""
+    model_cache.invalidate(model_path)
+    model_cache.invalidate(f"{model_path}:compiled")
 
 # ==================== ENDPOINTS PROJETS ====================
 
 @app.post("/api/projects/create")
-async def create_project(project: ProjectCreate):
+async def create_project(project: ProjectCreate, db: Session = Depends(get_db)):
     """Créer un nouveau projet ML"""
     project_id = str(uuid.uuid4())
     
-    projects_db[project_id] = {
+    CRUDProject.create(db, {
         "id": project_id,
         "name": project.name,
         "description": project.description,
         "problem_type": project.problem_type,
         "task_type": project.task_type,
-        "created_at": datetime.now().isoformat(),
         "status": "created",
         "data_uploaded": False
-    }
+    })
     
     return {
         "status": "success",
@@ -107,472 +619,1232 @@ async def create_project(project: ProjectCreate):
     }
 
 @app.get("/api/projects/list")
-async def list_projects():
-    """Lister tous les projets"""
+async def list_projects(cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                        db: Session = Depends(get_db)):
+    """Lister les projets (pagination par curseur, plus récents d'abord)"""
+    rows, next_cursor = page_or_400(CRUDProject.get_page, db, cursor, limit)
     return {
         "status": "success",
-        "projects": list(projects_db.values())
+        "projects": [to_dict(row) for row in rows],
+        "next_cursor": next_cursor
     }
 
 @app.get("/api/projects/{project_id}")
-async def get_project(project_id: str):
-    """Obtenir les détails d'un projet"""
-    if project_id not in projects_db:
-        raise HTTPException(status_code=404, detail="Projet non trouvé")
+async def get_project(project_id: str, response: Response, db: Session = Depends(get_db)):
+    """Obtenir les détails d'un projet (Last-Modified = updated_at)"""
+    project = get_project_or_404(db, project_id)
+    set_last_modified(response, project.updated_at)
     
     return {
         "status": "success",
-        "project": projects_db[project_id]
+        "project": to_dict(project)
     }
 
 # ==================== ENDPOINTS DONNÉES ====================
 
-@app.post("/api/data/upload")
-async def upload_data(project_id: str, file: UploadFile = File(...)):
-    """Upload et analyse d'un fichier de données"""
-    if project_id not in projects_db:
-        raise HTTPException(status_code=404, detail="Projet non trouvé")
+async def _spool_body_to_disk(request: Request, suffix: str) -> str:
+    """Écrire le corps de la requête sur disque, morceau par morceau"""
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=UPLOAD_DIR)
+    with os.fdopen(fd, 'wb') as f:
+        async for chunk in request.stream():
+            f.write(chunk)
+    return path
+
+async def ingest_upload(db: Session, project_id: str, filename: str, raw_path: str) -> Dict[str, Any]:
+    """
+    Convertir un fichier brut spoolé sur disque en Parquet et l'analyser.
     
+    Le Parquet est rangé dans le store sous le hash du fichier brut : un
+    fichier déjà uploadé, par ce projet ou un autre, n'est ni reconverti
+    ni réanalysé.
+    """
+    partial_path = None
     try:
-        # Lire le fichier
-        contents = await file.read()
+        FILE_SIZE_BYTES.observe(os.path.getsize(raw_path), kind="upload_raw")
+        raw_hash = await asyncio.to_thread(preprocessing.file_hash, raw_path)
+        key = content_key("upload", raw_hash, os.path.splitext(filename)[1].lower())
         
-        # Détecter le type de fichier et charger les données
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(contents))
-        elif file.filename.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(io.BytesIO(contents))
-        elif file.filename.endswith('.json'):
-            df = pd.read_json(io.BytesIO(contents))
-        else:
-            raise HTTPException(status_code=400, detail="Format de fichier non supporté")
-        
-        # Sauvegarder le fichier
-        file_path = os.path.join(UPLOAD_DIR, f"{project_id}_{file.filename}")
-        df.to_csv(file_path, index=False)
+        entry = artifact_store.lookup(db, key)
+        cached = entry is not None
+        if not cached:
+            # Sauvegarder le fichier en Parquet (types conservés, lecture par colonnes)
+            file_path = artifact_store.path_for(key, ".parquet")
+            # Un fichier partiel par requête : le même contenu peut être uploadé deux fois en parallèle
+            fd, partial_path = tempfile.mkstemp(dir=os.path.dirname(file_path), suffix=".partial")
+            os.close(fd)
+            
+            # Lecture par morceaux + profilage incrémental, hors de la boucle asyncio
+            analysis = await asyncio.to_thread(
+                datastore.ingest_file, raw_path, filename, partial_path, UPLOAD_CHUNK_ROWS
+            )
+            data_hash = await asyncio.to_thread(preprocessing.file_hash, partial_path)
+            # Sans await jusqu'au register : une requête concurrente terminée entre-temps a déjà rangé le fichier
+            entry = artifact_store.lookup(db, key, count=False)
+            if entry is None:
+                os.replace(partial_path, file_path)
+                FILE_SIZE_BYTES.observe(os.path.getsize(file_path), kind="upload")
+                entry = artifact_store.register(db, key, file_path, {
+                    "filename": filename, "analysis": analysis, "data_hash": data_hash
+                })
         
-        # Analyser les données
-        analysis = {
-            "rows": len(df),
-            "columns": len(df.columns),
-            "column_names": df.columns.tolist(),
-            "column_types": df.dtypes.astype(str).to_dict(),
-            "missing_values": df.isnull().sum().to_dict(),
-            "numeric_columns": df.select_dtypes(include=[np.number]).columns.tolist(),
-            "categorical_columns": df.select_dtypes(include=['object']).columns.tolist(),
-            "preview": df.head(10).to_dict('records'),
-            "statistics": df.describe().to_dict()
-        }
-        
-        # Mettre à jour le projet
-        projects_db[project_id]["data_uploaded"] = True
-        projects_db[project_id]["file_path"] = file_path
-        projects_db[project_id]["data_analysis"] = analysis
+        # Mettre à jour le projet (et les références : nouveau fichier pris, ancien rendu)
+        project = CRUDProject.get(db, project_id)
+        artifact_store.replace(db, project.file_path, key)
+        CRUDProject.update(db, project_id, {
+            "data_uploaded": True,
+            "file_path": entry.path,
+            "data_analysis": entry.meta["analysis"]
+        })
         
         return {
             "status": "success",
             "message": "Fichier uploadé et analysé avec succès",
-            "analysis": analysis
+            "analysis": entry.meta["analysis"],
+            "cached": cached
         }
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de l'upload: {str(e)}")
+    finally:
+        for path in (raw_path, partial_path):
+            if path and os.path.exists(path):
+                os.remove(path)
+
+def check_upload_filename(filename: Optional[str]):
+    if not filename or not filename.endswith(UPLOAD_EXTENSIONS):
+        raise HTTPException(status_code=400, detail="Format de fichier non supporté")
+
+@app.post("/api/data/upload")
+async def upload_data(project_id: str, file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """Upload et analyse d'un fichier de données"""
+    get_project_or_404(db, project_id)
+    check_upload_filename(file.filename)
+    
+    # Copier le fichier sur disque bloc par bloc (jamais entièrement en mémoire)
+    fd, raw_path = tempfile.mkstemp(suffix=os.path.splitext(file.filename)[1], dir=UPLOAD_DIR)
+    with os.fdopen(fd, 'wb') as f:
+        while chunk := await file.read(UPLOAD_SPOOL_CHUNK_BYTES):
+            f.write(chunk)
+    
+    return await ingest_upload(db, project_id, file.filename, raw_path)
+
+@app.post("/api/data/upload/stream")
+async def upload_data_stream(project_id: str, filename: str, request: Request, db: Session = Depends(get_db)):
+    """
+    Upload d'un gros fichier envoyé en corps brut (sans multipart).
+    
+    Le corps est écrit sur disque au fil de l'eau, puis traité comme
+    /api/data/upload.
+    """
+    get_project_or_404(db, project_id)
+    check_upload_filename(filename)
+    
+    raw_path = await _spool_body_to_disk(request, os.path.splitext(filename)[1])
+    return await ingest_upload(db, project_id, filename, raw_path)
+
+def write_atomic(path: str, save: Callable[[str], Any]):
+    """
+    Écrire `path` via un fichier partiel propre à l'appel puis un renommage :
+    le store ne voit que des fichiers complets, même si deux requêtes
+    écrivent le même fichier en parallèle.
+    """
+    fd, partial_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".partial")
+    os.close(fd)
+    try:
+        save(partial_path)
+        os.replace(partial_path, path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+
+def fit_preprocessing(file_path: str, columns: Optional[List[str]], config: Dict[str, Any], version: str,
+                      data_hash: str, processed_path: str, transformations_path: str):
+    """
+    Ajuster le preprocessing et écrire les données preprocessées et le
+    pipeline. Bloquant (lecture complète, ajustement, écriture) : appelé
+    via asyncio.to_thread. Lève ValueError si le preprocessing échoue.
+    """
+    # Charger uniquement les colonnes utiles
+    df = datastore.load_dataframe(file_path, columns=columns)
+    input_columns = [col for col in df.columns if col != config["target_column"]]
+    pipeline, X, y = preprocessing.fit_preprocessor(config, df)
+    
+    # Sauvegarder les données preprocessées et le pipeline ajusté
+    processed_df = pd.concat([X, y], axis=1)
+    write_atomic(processed_path, lambda path: datastore.save_dataframe(processed_df, path))
+    FILE_SIZE_BYTES.observe(os.path.getsize(processed_path), kind="processed")
+    
+    artifact = preprocessing.make_artifact(pipeline, version, data_hash, config, input_columns)
+    write_atomic(transformations_path, lambda path: preprocessing.save_artifact(artifact, path))
+    return artifact, len(X)
 
 @app.post("/api/data/configure")
-async def configure_data(config: DataConfig):
+async def configure_data(config: DataConfig, db: Session = Depends(get_db)):
     """Configurer le preprocessing des données"""
-    if config.project_id not in projects_db:
-        raise HTTPException(status_code=404, detail="Projet non trouvé")
+    project = get_project_or_404(db, config.project_id)
     
-    project = projects_db[config.project_id]
-    
-    if not project.get("data_uploaded"):
+    if not project.data_uploaded:
         raise HTTPException(status_code=400, detail="Aucune donnée uploadée pour ce projet")
     
-    # Charger les données
-    df = pd.read_csv(project["file_path"])
+    file_path = ensure_columnar(db, project, "file_path")
     
-    # Vérifier que la colonne cible existe
-    if config.target_column not in df.columns:
+    # Vérifier les colonnes sans charger les données
+    available_columns = datastore.read_column_names(file_path)
+    if config.target_column not in available_columns:
         raise HTTPException(status_code=400, detail="Colonne cible non trouvée")
     
-    # Séparer features et target
-    X = df.drop(columns=[config.target_column])
-    y = df[config.target_column]
-    
-    # Gérer les valeurs manquantes
-    if config.handle_missing:
-        if config.missing_strategy == "mean":
-            X = X.fillna(X.mean())
-        elif config.missing_strategy == "median":
-            X = X.fillna(X.median())
-        elif config.missing_strategy == "drop":
-            X = X.dropna()
-            y = y[X.index]
-        elif config.missing_strategy == "zero":
-            X = X.fillna(0)
-    
-    # Encoder les variables catégorielles
-    categorical_cols = X.select_dtypes(include=['object']).columns
-    label_encoders = {}
-    
-    for col in categorical_cols:
-        le = LabelEncoder()
-        X[col] = le.fit_transform(X[col].astype(str))
-        label_encoders[col] = le
-    
-    # Normalisation
-    scaler = None
-    if config.normalize:
-        if config.normalize_method == "StandardScaler":
-            scaler = StandardScaler()
-            X = pd.DataFrame(scaler.fit_transform(X), columns=X.columns)
-    
-    # Sauvegarder les données preprocessées
-    processed_path = os.path.join(UPLOAD_DIR, f"{config.project_id}_processed.csv")
-    processed_df = pd.concat([X, y], axis=1)
-    processed_df.to_csv(processed_path, index=False)
-    
-    # Sauvegarder les transformations
-    transformations_path = os.path.join(UPLOAD_DIR, f"{config.project_id}_transformations.pkl")
-    with open(transformations_path, 'wb') as f:
-        pickle.dump({
-            'scaler': scaler,
-            'label_encoders': label_encoders,
-            'target_column': config.target_column
-        }, f)
-    
-    # Mettre à jour le projet
-    projects_db[config.project_id]["processed_path"] = processed_path
-    projects_db[config.project_id]["transformations_path"] = transformations_path
-    projects_db[config.project_id]["target_column"] = config.target_column
-    projects_db[config.project_id]["status"] = "configured"
+    columns = None
+    if config.feature_columns:
+        unknown = [col for col in config.feature_columns if col not in available_columns]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Colonnes non trouvées: {unknown}")
+        columns = [col for col in config.feature_columns if col != config.target_column] + [config.target_column]
+    
+    # Le pipeline est versionné par le contenu des données et la configuration
+    # (hash calculé à l'upload pour les fichiers du store)
+    upload_entry = CRUDArtifact.get_by_path(db, file_path)
+    data_hash = (upload_entry.meta or {}).get("data_hash") if upload_entry else None
+    data_hash = data_hash or await asyncio.to_thread(preprocessing.file_hash, file_path)
+    version = preprocessing.pipeline_version(data_hash, config.model_dump())
+    processed_key = make_key("processed", version)
+    preprocessor_key = make_key("preprocessor", version)
+    
+    # Même données + même configuration, quel que soit le projet : pas de nouvel ajustement
+    processed_entry = artifact_store.lookup(db, processed_key)
+    preprocessor_entry = artifact_store.lookup(db, preprocessor_key)
+    reused = processed_entry is not None and preprocessor_entry is not None
+    if reused:
+        processed_path = processed_entry.path
+        transformations_path = preprocessor_entry.path
+        artifact = await asyncio.to_thread(preprocessing.load_artifact, transformations_path)
+        n_rows = await asyncio.to_thread(datastore.count_rows, processed_path)
+    else:
+        processed_path = artifact_store.path_for(processed_key, ".parquet")
+        transformations_path = artifact_store.path_for(preprocessor_key, ".pkl")
+        # Ajustement et écritures hors de la boucle d'événements
+        try:
+            artifact, n_rows = await asyncio.to_thread(
+                fit_preprocessing, file_path, columns, config.model_dump(), version, data_hash,
+                processed_path, transformations_path
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Erreur de preprocessing: {str(e)}")
+        
+        artifact_store.register(db, processed_key, processed_path, {"rows": n_rows})
+        artifact_store.register(db, preprocessor_key, transformations_path, {"data_hash": data_hash})
+    
+    # Mettre à jour le projet (et les références : nouveaux fichiers pris, anciens rendus)
+    artifact_store.replace(db, project.processed_path, processed_key)
+    artifact_store.replace(db, project.transformations_path, preprocessor_key)
+    CRUDProject.update(db, config.project_id, {
+        "processed_path": processed_path,
+        "transformations_path": transformations_path,
+        "target_column": config.target_column,
+        "status": "configured"
+    })
     
     return {
         "status": "success",
         "message": "Données configurées avec succès",
-        "shape": X.shape,
-        "features": X.columns.tolist()
+        "shape": [n_rows, len(artifact["feature_columns"])],
+        "features": artifact["feature_columns"],
+        "pipeline_version": version,
+        "reused": reused
     }
 
 # ==================== ENDPOINTS ENTRAÎNEMENT ====================
 
-def get_model_instance(model_type: str, task_type: str, hyperparameters: Dict):
-    """Instancier un modèle selon le type"""
-    if model_type == "Random Forest":
-        if task_type == "Classification":
-            return RandomForestClassifier(**hyperparameters)
-        else:
-            return RandomForestRegressor(**hyperparameters)
+def update_experiment_status(experiment_id: str, status: str, fields: Dict[str, Any]):
+    """Persister un changement d'état d'un job d'entraînement et le publier aux abonnés"""
+    db = SessionLocal()
+    try:
+        CRUDExperiment.update(db, experiment_id, {"status": status, **fields})
+    finally:
+        db.close()
+    progress_hub.publish_status(experiment_id, status, error=fields.get("error"))
+
+def next_model_version(version: Optional[str]) -> str:
+    """Version d'un modèle dont l'entraînement est poursuivi : 1.0.0 -> 1.1.0"""
+    parts = (version or "1.0.0").split(".")
+    if len(parts) == 3 and all(part.isdigit() for part in parts):
+        return f"{parts[0]}.{int(parts[1]) + 1}.0"
+    return f"{version}.1"
+
+# Champs du résultat d'entraînement gardés avec le modèle dans le store (réutilisation)
+CACHED_RESULT_FIELDS = (
+    "metrics", "training_time", "timings", "model_format", "size_mb", "format_benchmarks",
+    "inference_backend", "inference_benchmarks", "pipeline_version"
+)
+
+def training_key(db: Session, project, config: ModelConfig, processed_path: str) -> str:
+    """Clé du modèle produit par un entraînement : mêmes données preprocessées + même configuration"""
+    processed_entry = CRUDArtifact.get_by_path(db, processed_path)
+    data_key = processed_entry.key if processed_entry is not None else preprocessing.file_hash(processed_path)
+    # Hors mémoire, le découpage en morceaux et le nombre de passes changent le modèle
+    streaming = (config.chunk_rows, config.epochs) if config.training_mode == "out_of_core" else None
+    return content_key(
+        "model", data_key, project.task_type, config.model_type, config.hyperparameters,
+        config.train_test_split, SPLIT_SEED, config.use_cross_validation, config.cv_folds,
+        config.holdout_from_oof, config.inference_backend, MODEL_FORMAT, MODEL_COMPRESSION,
+        config.training_mode, streaming
+    )
+
+def resolve_training_mode(config: ModelConfig, processed_path: str) -> ModelConfig:
+    """
+    Fixer le mode d'entraînement : "auto" devient "out_of_core" si les
+    données preprocessées dépassent FRAMEML_OUT_OF_CORE_THRESHOLD_MB une
+    fois chargées, "in_memory" sinon.
+    """
+    if config.training_mode not in TRAINING_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Mode d'entraînement inconnu: {config.training_mode} (attendu: {', '.join(TRAINING_MODES)})"
+        )
+    mode = config.training_mode
+    if mode == "auto":
+        too_large = datastore.estimated_memory_bytes(processed_path) > OUT_OF_CORE_THRESHOLD_MB * 1024 * 1024
+        mode = "out_of_core" if too_large else "in_memory"
+    if mode == "out_of_core" and config.model_type not in STREAMING_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Données trop volumineuses pour {config.model_type} en mémoire : entraînement hors "
+                   f"mémoire possible avec {', '.join(STREAMING_MODES)}"
+                   + (" (ou forcer training_mode=in_memory)" if config.training_mode == "auto" else "")
+        )
+    if config.epochs < 1 or (config.chunk_rows is not None and config.chunk_rows < 1):
+        raise HTTPException(status_code=400, detail="epochs et chunk_rows doivent être >= 1")
+    return config.model_copy(update={
+        "training_mode": mode,
+        "chunk_rows": (config.chunk_rows or OUT_OF_CORE_CHUNK_ROWS) if mode == "out_of_core" else None
+    })
+
+def acquire_model_artifacts(db: Session, model_key: str, pipeline_version: Optional[str]) -> List[str]:
+    """Références d'un nouveau modèle : son fichier et les données preprocessées dont il dépend"""
+    keys = [model_key]
+    if pipeline_version:
+        processed_key = make_key("processed", pipeline_version)
+        if artifact_store.lookup(db, processed_key, count=False) is not None:
+            keys.append(processed_key)
+    for key in keys:
+        artifact_store.acquire(db, key)
+    return keys
+
+def queue_training(db: Session, project, config: ModelConfig, func=run_training_job,
+                   job_fields: Optional[Dict[str, Any]] = None, parent=None) -> Dict[str, Any]:
+    """
+    Créer l'expérience et soumettre le job d'entraînement (`func` exécuté
+    par un worker). Avec `parent` (modèle dont l'entraînement est
+    poursuivi), le nouveau modèle en est une nouvelle version liée.
     
-    elif model_type == "XGBoost":
-        if task_type == "Classification":
-            return xgb.XGBClassifier(**hyperparameters)
-        else:
-            return xgb.XGBRegressor(**hyperparameters)
+    Un entraînement ordinaire déjà fait (mêmes données preprocessées, même
+    modèle, mêmes hyperparamètres et split) n'est pas relancé : le modèle
+    stocké est réutilisé et l'expérience est terminée immédiatement.
+    """
+    experiment_id = str(uuid.uuid4())
+    model_id = str(uuid.uuid4())
+    project_name = project.name
+    processed_path = ensure_columnar(db, project, "processed_path")
+    cache_key = None
+    if func is run_training_job:
+        config = resolve_training_mode(config, processed_path)
+        cache_key = training_key(db, project, config, processed_path)
     
-    elif model_type == "SVM":
-        if task_type == "Classification":
-            return SVC(**hyperparameters, probability=True)
-        else:
-            return SVR(**hyperparameters)
+    job = {
+        "config": config.model_dump(),
+        "task_type": project.task_type,
+        "processed_path": processed_path,
+        "target_column": project.target_column,
+        "preprocessor_path": project.transformations_path,
+        "models_dir": MODELS_DIR,
+        "folds_dir": FOLDS_DIR,
+        "cv_n_jobs": config.cv_n_jobs or CV_N_JOBS,
+        "model_format": MODEL_FORMAT,
+        "compression": MODEL_COMPRESSION,
+        "benchmark_formats": MODEL_BENCHMARK_FORMATS,
+        "inference_batch_sizes": INFERENCE_BENCHMARK_BATCHES,
+        "model_id": model_id,
+        "experiment_id": experiment_id,
+        "training_mode": config.training_mode,
+        "chunk_rows": config.chunk_rows,
+        "epochs": config.epochs,
+        **(job_fields or {})
+    }
+    lineage = {}
+    if parent is not None:
+        lineage = {"parent_model_id": parent.id, "version": next_model_version(parent.version)}
+    model_name = f"{config.model_type} - {project_name}"
+    if parent is not None:
+        model_name = f"{parent.name.split(' (v')[0]} (v{lineage['version']})"
     
-    elif model_type == "Logistic Regression":
-        return LogisticRegression(**hyperparameters)
+    cached = artifact_store.lookup(db, cache_key) if cache_key is not None and config.reuse_cached else None
+    if cached is not None:
+        meta = cached.meta
+        now = datetime.utcnow()
+        CRUDExperiment.create(db, {
+            "id": experiment_id,
+            "project_id": config.project_id,
+            "model_id": model_id,
+            "model_type": config.model_type,
+            "task_type": project.task_type,
+            "hyperparameters": config.hyperparameters,
+            "metrics": meta["metrics"],
+            "training_time": meta["training_time"],
+            "timings": meta["timings"],
+            "cache_hit": True,
+            "status": "completed",
+            "started_at": now,
+            "completed_at": now
+        })
+        CRUDModel.create(db, {
+            "id": model_id,
+            "name": model_name,
+            "project_id": config.project_id,
+            "experiment_id": experiment_id,
+            "model_type": config.model_type,
+            "model_path": cached.path,
+            **{field: meta[field] for field in CACHED_RESULT_FIELDS if field not in ("training_time", "timings")},
+            "artifact_keys": acquire_model_artifacts(db, cached.key, meta["pipeline_version"]),
+            "status": "active",
+            "deployed": False
+        })
+        progress_hub.publish_status(experiment_id, "completed")
+        return {"experiment_id": experiment_id, "model_id": model_id, "cached": True}
     
-    elif model_type == "Linear Regression":
-        return LinearRegression(**hyperparameters)
+    def on_success(result):
+        observe_training_timings(config.model_type, result["timings"])
+        FILE_SIZE_BYTES.observe(os.path.getsize(result["model_path"]), kind="model")
+        
+        session = SessionLocal()
+        try:
+            # Ranger le modèle dans le store. Sans réutilisation demandée, un
+            # modèle identique déjà stocké n'est pas remplacé : le nouveau
+            # fichier est gardé sous une clé propre au modèle
+            own_key = make_key("model", model_id)
+            stored = artifact_store.adopt_model(
+                session, cache_key or own_key, result["model_path"],
+                {field: result[field] for field in CACHED_RESULT_FIELDS},
+                fallback_key=None if cache_key and config.reuse_cached else own_key
+            )
+            
+            experiment_update = {
+                "metrics": result["metrics"],
+                "training_time": result["training_time"],
+                "timings": result["timings"]
+            }
+            if "continuation" in result:
+                experiment_update["continuation"] = result["continuation"]
+            if "hyperparameters" in result:
+                experiment_update["hyperparameters"] = result["hyperparameters"]
+            CRUDExperiment.update(session, experiment_id, experiment_update)
+            
+            # Sauvegarder le modèle dans la DB
+            CRUDModel.create(session, {
+                "id": model_id,
+                "name": model_name,
+                "project_id": config.project_id,
+                "experiment_id": experiment_id,
+                "model_type": config.model_type,
+                "model_path": stored.path,
+                "model_format": result["model_format"],
+                "metrics": result["metrics"],
+                "size_mb": result["size_mb"],
+                "format_benchmarks": result["format_benchmarks"],
+                "inference_backend": result["inference_backend"],
+                "inference_benchmarks": result["inference_benchmarks"],
+                "pipeline_version": result["pipeline_version"],
+                "artifact_keys": acquire_model_artifacts(session, stored.key, result["pipeline_version"]),
+                "status": "active",
+                "deployed": False,
+                **lineage
+            })
+        finally:
+            session.close()
     
-    elif model_type == "KNN":
-        return KNeighborsClassifier(**hyperparameters)
+    # Créer l'expérience tout de suite : son statut évolue avec le job
+    CRUDExperiment.create(db, {
+        "id": experiment_id,
+        "project_id": config.project_id,
+        "model_id": model_id,
+        "model_type": config.model_type,
+        "task_type": project.task_type,
+        "hyperparameters": config.hyperparameters,
+        "parent_experiment_id": parent.experiment_id if parent is not None else None,
+        "status": "queued"
+    })
     
-    elif model_type == "Gradient Boosting":
-        return GradientBoostingClassifier(**hyperparameters)
+    try:
+        training_jobs.submit(
+            experiment_id, config.project_id, func, job,
+            update_experiment_status, on_success
+        )
+    except QueueFullError as e:
+        CRUDExperiment.update(db, experiment_id, {"status": "failed", "error": str(e)})
+        raise HTTPException(status_code=503, detail=str(e))
+    progress_hub.publish_status(experiment_id, "queued")
     
-    else:
-        raise ValueError(f"Type de modèle non supporté: {model_type}")
+    return {"experiment_id": experiment_id, "model_id": model_id, "cached": False}
 
 @app.post("/api/train/start")
-async def start_training(config: ModelConfig, background_tasks: BackgroundTasks):
-    """Démarrer l'entraînement d'un modèle"""
-    if config.project_id not in projects_db:
-        raise HTTPException(status_code=404, detail="Projet non trouvé")
+async def start_training(config: ModelConfig, db: Session = Depends(get_db)):
+    """Mettre en file d'attente l'entraînement d'un modèle"""
+    project = get_project_or_404(db, config.project_id)
+    
+    if project.status != "configured":
+        raise HTTPException(status_code=400, detail="Les données doivent être configurées d'abord")
+    if config.inference_backend not in tree_inference.INFERENCE_BACKENDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Backend d'inférence inconnu: {config.inference_backend} "
+                   f"(attendu: {', '.join(tree_inference.INFERENCE_BACKENDS)})"
+        )
+    
+    ids = queue_training(db, project, config)
+    
+    if ids["cached"]:
+        return {
+            "status": "success",
+            "message": "Entraînement identique déjà effectué : modèle réutilisé",
+            **ids,
+            "training_status": "completed"
+        }
+    return {
+        "status": "success",
+        "message": "Entraînement mis en file d'attente",
+        **ids,
+        "training_status": "queued"
+    }
+
+@app.post("/api/train/continue/{model_id}")
+async def continue_training(model_id: str, config: ContinueConfig, db: Session = Depends(get_db)):
+    """
+    Poursuivre l'entraînement d'un modèle au lieu de repartir de zéro.
     
-    project = projects_db[config.project_id]
+    Random Forest / Gradient Boosting : warm_start (arbres ajoutés) ;
+    XGBoost : tours de boosting ajoutés au booster existant (xgb_model) ;
+    Logistic Regression : warm_start du solveur ; SGD : partial_fit par
+    morceaux. Le résultat est une nouvelle version du modèle, liée au
+    parent, et l'expérience indique le temps gagné par rapport à un
+    réentraînement complet.
+    """
+    parent = get_model_or_404(db, model_id)
+    project = get_project_or_404(db, parent.project_id)
     
-    if project.get("status") != "configured":
+    mode = CONTINUATION_MODES.get(parent.model_type)
+    if mode is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Reprise d'entraînement non supportée pour {parent.model_type} "
+                   f"(supportés: {', '.join(CONTINUATION_MODES)})"
+        )
+    if project.status != "configured":
         raise HTTPException(status_code=400, detail="Les données doivent être configurées d'abord")
+    if parent.model_format not in artifacts.LOADABLE_FORMATS or not os.path.exists(parent.model_path):
+        raise HTTPException(status_code=400, detail="Fichier du modèle parent absent ou non rechargeable")
+    if parent.model_type in ENSEMBLE_MODEL_TYPES and config.additional_estimators < 1:
+        raise HTTPException(status_code=400, detail="additional_estimators doit être >= 1")
+    if config.epochs < 1 or config.chunk_rows < 1 or not 0 < config.train_test_split < 1:
+        raise HTTPException(status_code=400, detail="epochs, chunk_rows ou train_test_split invalide")
     
-    try:
-        # Charger les données preprocessées
-        df = pd.read_csv(project["processed_path"])
-        target_column = project["target_column"]
-        
-        X = df.drop(columns=[target_column])
-        y = df[target_column]
-        
-        # Split train/test
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=1-config.train_test_split, random_state=42
+    parent_experiment = CRUDExperiment.get(db, parent.experiment_id) if parent.experiment_id else None
+    parent_processed_path = None
+    if parent.pipeline_version:
+        processed_entry = artifact_store.lookup(db, make_key("processed", parent.pipeline_version), count=False)
+        parent_processed_path = processed_entry.path if processed_entry is not None else os.path.join(
+            UPLOAD_DIR, f"{project.id}_processed_{parent.pipeline_version}.parquet"
         )
-        
-        # Instancier le modèle
-        model = get_model_instance(
-            config.model_type,
-            project["task_type"],
-            config.hyperparameters
+    
+    model_config = ModelConfig(
+        project_id=project.id,
+        model_type=parent.model_type,
+        hyperparameters=(parent_experiment.hyperparameters if parent_experiment else None) or {},
+        train_test_split=config.train_test_split,
+        use_cross_validation=False,
+        inference_backend=parent.inference_backend or "sklearn"
+    )
+    ids = queue_training(db, project, model_config, run_continuation_job, {
+        "parent_model_id": parent.id,
+        "parent_experiment_id": parent.experiment_id,
+        "parent_model_path": parent.model_path,
+        "parent_pipeline_version": parent.pipeline_version,
+        "parent_processed_path": parent_processed_path,
+        "parent_training_time": parent_experiment.training_time if parent_experiment else None,
+        "raw_path": ensure_columnar(db, project, "file_path"),
+        "additional_estimators": config.additional_estimators,
+        "new_rows_only": config.new_rows_only,
+        "epochs": config.epochs,
+        "chunk_rows": config.chunk_rows,
+        "measure_full_retrain": config.measure_full_retrain
+    }, parent=parent)
+    
+    return {
+        "status": "success",
+        "message": "Reprise d'entraînement mise en file d'attente",
+        **ids,
+        "parent_model_id": parent.id,
+        "mode": mode,
+        "training_status": "queued"
+    }
+
+@app.post("/api/train/search")
+async def search_hyperparameters(config: SearchConfig, db: Session = Depends(get_db)):
+    """
+    Recherche d'hyperparamètres (grille, aléatoire, successive halving, Hyperband).
+    
+    La recherche tourne en arrière-plan : ses essais passent par le pool
+    d'entraînement et en partagent les places, chacun est enregistré comme
+    une expérience liée à la recherche. Retourne tout de suite le
+    `search_id` ; le classement se suit via GET /api/train/search/{search_id}.
+    """
+    project = get_project_or_404(db, config.project_id)
+    
+    if project.status != "configured":
+        raise HTTPException(status_code=400, detail="Les données doivent être configurées d'abord")
+    
+    space = config.search_space or DEFAULT_SEARCH_SPACES.get(config.model_type)
+    if not space:
+        raise HTTPException(status_code=400, detail=f"Aucun espace de recherche pour {config.model_type}")
+    
+    search_id = str(uuid.uuid4())
+    base_task = {
+        "processed_path": ensure_columnar(db, project, "processed_path"),
+        "target_column": project.target_column,
+        "task_type": project.task_type,
+        "model_type": config.model_type,
+        "train_test_split": config.train_test_split,
+        "cv_folds": config.cv_folds,
+        "scoring": config.scoring,
+        "random_state": config.random_state
+    }
+    
+    def write_trial(trial):
+        session = SessionLocal()
+        try:
+            CRUDExperiment.create(session, {
+                "id": str(uuid.uuid4()),
+                "project_id": config.project_id,
+                "name": f"Recherche {search_id[:8]} - essai {trial['trial']}",
+                "model_type": config.model_type,
+                "task_type": project.task_type,
+                "hyperparameters": trial["hyperparameters"],
+                "metrics": {
+                    "cv_scores": trial["cv_scores"],
+                    "cv_mean": trial["score"],
+                    "cv_std": trial.get("cv_std"),
+                    "resource": trial["resource"],
+                    "rung": trial["rung"],
+                    "bracket": trial["bracket"],
+                    "search_strategy": config.strategy
+                },
+                "training_time": trial["fit_time"],
+                "status": trial["status"],
+                "error": trial["error"],
+                "search_id": search_id,
+                "completed_at": datetime.utcnow()
+            })
+        finally:
+            session.close()
+    
+    async def record_trial(trial):
+        # Écriture SQLite synchrone : hors de la boucle d'événements
+        await asyncio.to_thread(write_trial, trial)
+    
+    try:
+        search = HyperparameterSearch(
+            base_task, space, config.hyperparameters,
+            run_task=training_jobs.run_task,
+            strategy=config.strategy,
+            n_trials=config.n_trials,
+            eta=config.eta,
+            min_resource=config.min_resource,
+            early_stopping=config.early_stopping,
+            n_workers=min(config.n_workers or SEARCH_WORKERS or TRAINING_WORKERS, TRAINING_WORKERS),
+            n_threads=CV_N_JOBS,
+            max_trials=SEARCH_MAX_TRIALS,
+            random_state=config.random_state,
+            on_trial=record_trial
         )
-        
-        # Entraîner le modèle
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    summary = {
+        "search_status": "running",
+        "project_id": config.project_id,
+        "strategy": config.strategy,
+        "n_workers": search.n_workers,
+        "threads_per_worker": search.n_threads
+    }
+    register_search(search_id, summary)
+    
+    async def run_search():
         start_time = datetime.now()
-        model.fit(X_train, y_train)
-        training_time = (datetime.now() - start_time).total_seconds()
-        
-        # Prédictions
-        y_pred_train = model.predict(X_train)
-        y_pred_test = model.predict(X_test)
-        
-        # Calculer les métriques
-        if project["task_type"] == "Classification":
-            metrics = {
-                "train_accuracy": float(accuracy_score(y_train, y_pred_train)),
-                "test_accuracy": float(accuracy_score(y_test, y_pred_test)),
-                "precision": float(precision_score(y_test, y_pred_test, average='weighted', zero_division=0)),
-                "recall": float(recall_score(y_test, y_pred_test, average='weighted', zero_division=0)),
-                "f1_score": float(f1_score(y_test, y_pred_test, average='weighted', zero_division=0)),
-                "confusion_matrix": confusion_matrix(y_test, y_pred_test).tolist(),
-                "classification_report": classification_report(y_test, y_pred_test, output_dict=True, zero_division=0)
-            }
-        else:
-            metrics = {
-                "train_r2": float(r2_score(y_train, y_pred_train)),
-                "test_r2": float(r2_score(y_test, y_pred_test)),
-                "mse": float(mean_squared_error(y_test, y_pred_test)),
-                "rmse": float(np.sqrt(mean_squared_error(y_test, y_pred_test)))
-            }
-        
-        # Cross-validation
-        if config.use_cross_validation:
-            cv_scores = cross_val_score(model, X, y, cv=config.cv_folds)
-            metrics["cv_scores"] = cv_scores.tolist()
-            metrics["cv_mean"] = float(cv_scores.mean())
-            metrics["cv_std"] = float(cv_scores.std())
-        
-        # Sauvegarder le modèle
-        model_id = str(uuid.uuid4())
-        model_path = os.path.join(MODELS_DIR, f"{model_id}.pkl")
-        
-        with open(model_path, 'wb') as f:
-            pickle.dump(model, f)
-        
-        # Créer l'expérience
-        experiment = {
-            "id": str(uuid.uuid4()),
-            "project_id": config.project_id,
-            "model_id": model_id,
-            "model_type": config.model_type,
-            "task_type": project["task_type"],
-            "hyperparameters": config.hyperparameters,
-            "metrics": metrics,
-            "training_time": training_time,
-            "created_at": datetime.now().isoformat(),
-            "status": "completed"
-        }
-        
-        experiments_db[experiment["id"]] = experiment
-        
-        # Sauvegarder le modèle dans la DB
-        models_db[model_id] = {
-            "id": model_id,
-            "name": f"{config.model_type} - {project['name']}",
-            "project_id": config.project_id,
-            "experiment_id": experiment["id"],
-            "model_type": config.model_type,
-            "model_path": model_path,
-            "metrics": metrics,
-            "created_at": datetime.now().isoformat(),
-            "size_mb": os.path.getsize(model_path) / (1024 * 1024)
-        }
-        
-        return {
-            "status": "success",
-            "message": "Entraînement terminé avec succès",
-            "experiment_id": experiment["id"],
-            "model_id": model_id,
-            "metrics": metrics,
-            "training_time": training_time
-        }
+        try:
+            leaderboard = await search.run()
+            best = leaderboard[0] if leaderboard and leaderboard[0]["status"] == "completed" else None
+            
+            # Ré-entraîner la meilleure configuration via la file d'entraînement habituelle
+            refit = None
+            if config.refit and best is not None:
+                session = SessionLocal()
+                try:
+                    refit = queue_training(session, get_project_or_404(session, config.project_id), ModelConfig(
+                        project_id=config.project_id,
+                        model_type=config.model_type,
+                        hyperparameters=best["hyperparameters"],
+                        train_test_split=config.train_test_split,
+                        cv_folds=config.cv_folds
+                    ))
+                finally:
+                    session.close()
+            
+            statuses = [trial["status"] for trial in leaderboard]
+            summary.update({
+                "search_status": "completed",
+                "n_trials": len(leaderboard),
+                "n_completed": statuses.count("completed"),
+                "n_stopped": statuses.count("stopped"),
+                "n_failed": statuses.count("failed"),
+                "best": best,
+                "refit": refit
+            })
+        except asyncio.CancelledError:
+            summary.update({"search_status": "failed", "error": "Recherche interrompue"})
+            raise
+        except Exception as e:
+            summary.update({"search_status": "failed", "error": getattr(e, "detail", str(e))})
+        finally:
+            summary["search_time"] = (datetime.now() - start_time).total_seconds()
+            search_tasks.pop(search_id, None)
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erreur lors de l'entraînement: {str(e)}")
+    search_tasks[search_id] = asyncio.create_task(run_search())
+    
+    return {
+        "status": "success",
+        "message": "Recherche lancée",
+        "search_id": search_id,
+        **summary
+    }
+
+def register_search(search_id: str, summary: Dict[str, Any]):
+    """Enregistrer une recherche ; oublier les plus anciennes recherches terminées"""
+    searches[search_id] = summary
+    finished = [sid for sid, info in searches.items() if info["search_status"] != "running"]
+    for sid in finished[:max(0, len(finished) - SEARCH_HISTORY)]:
+        del searches[sid]
+
+@app.get("/api/train/search/{search_id}")
+async def get_search(search_id: str, db: Session = Depends(get_db)):
+    """
+    État d'une recherche et ses expériences (essais terminés jusqu'ici),
+    triées par score de validation croisée. Le résumé (meilleur essai,
+    compteurs, refit) n'est connu que du processus qui a lancé la recherche.
+    """
+    summary = searches.get(search_id)
+    experiments = [to_dict(e) for e in CRUDExperiment.get_by_search(db, search_id)]
+    if not experiments and summary is None:
+        raise HTTPException(status_code=404, detail="Recherche non trouvée")
+    
+    # Même ordre que le classement de la recherche (search.py)
+    order = {"completed": 0, "stopped": 1, "failed": 2}
+    
+    def rank(experiment):
+        metrics = experiment["metrics"] or {}
+        score = metrics.get("cv_mean")
+        return (order.get(experiment["status"], 3), -(metrics.get("resource") or 0.0),
+                -score if score is not None else float("inf"))
+    
+    experiments.sort(key=rank)
+    
+    return {
+        "status": "success",
+        "search_id": search_id,
+        # Inconnue en mémoire (redémarrage) : seules les expériences enregistrées restent
+        **(summary or {"search_status": "unknown"}),
+        "leaderboard": experiments
+    }
 
 @app.get("/api/train/status/{experiment_id}")
-async def get_training_status(experiment_id: str):
+async def get_training_status(experiment_id: str, db: Session = Depends(get_db)):
     """Obtenir le statut d'un entraînement"""
-    if experiment_id not in experiments_db:
-        raise HTTPException(status_code=404, detail="Expérience non trouvée")
+    experiment = get_experiment_or_404(db, experiment_id)
     
     return {
         "status": "success",
-        "experiment": experiments_db[experiment_id]
+        "experiment": to_dict(experiment)
     }
 
+def format_sse(event: Dict[str, Any]) -> str:
+    """Un événement au format text/event-stream"""
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+@app.get("/api/train/events/{experiment_id}")
+async def training_events(experiment_id: str, request: Request, db: Session = Depends(get_db)):
+    """
+    Progression d'un entraînement en Server-Sent Events : changements
+    d'état (status), début/fin des phases avec leur durée (phase), score
+    de chaque fold de validation croisée (cv_fold) et pertes par itération
+    des modèles de boosting (iteration). Le flux se ferme après l'état
+    final ; l'en-tête Last-Event-ID permet de reprendre après une coupure.
+    """
+    experiment = get_experiment_or_404(db, experiment_id)
+    status, error = experiment.status, experiment.error
+    # Pas de connexion SQLite gardée pendant toute la durée du flux
+    db.close()
+    
+    try:
+        last_event_id = int(request.headers.get("last-event-id") or 0)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Last-Event-ID invalide")
+    
+    async def stream():
+        if status in progress.TERMINAL_STATUSES and not progress_hub.has(experiment_id):
+            # Entraînement terminé avant le démarrage de l'API : seul l'état final est connu
+            yield format_sse({"id": last_event_id + 1, "type": "status", "status": status,
+                              "error": error, "experiment_id": experiment_id})
+            return
+        async for event in progress_hub.subscribe(experiment_id, last_event_id):
+            if event is None:
+                yield ": keepalive\n\n"
+            else:
+                yield format_sse(event)
+    
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 # ==================== ENDPOINTS MODÈLES ====================
 
 @app.get("/api/models/list")
-async def list_models():
-    """Lister tous les modèles avec task_type et problem_type"""
-    models_with_info = []
-    
-    for model in models_db.values():
-        # Récupérer les informations du projet associé
-        project_id = model.get("project_id")
-        task_type = None
-        problem_type = None
-        
-        if project_id and project_id in projects_db:
-            project = projects_db[project_id]
-            task_type = project.get("task_type")
-            problem_type = project.get("problem_type")
-        
-        # Créer une copie du modèle avec les nouveaux champs
-        model_info = model.copy()
-        model_info["task_type"] = task_type
-        model_info["problem_type"] = problem_type
-        
-        models_with_info.append(model_info)
+async def list_models(project_id: Optional[str] = None, task_type: Optional[str] = None,
+                      deployed: Optional[bool] = None, cursor: Optional[str] = None,
+                      limit: int = DEFAULT_PAGE_SIZE, sort: str = "created_at", order: str = "desc",
+                      fields: Optional[str] = None, filters: Dict[str, Any] = Depends(listing_filters),
+                      db: Session = Depends(get_db)):
+    """
+    Lister les modèles avec task_type et problem_type (une seule requête jointe).
     
-    return {
-        "status": "success",
-        "models": models_with_info
-    }
+    Filtres (model_type, status, task_type : valeurs séparées par des
+    virgules ; search, deployed, created_after/created_before,
+    metric/metric_min/metric_max), tri
+    (sort=created_at|size_mb|name|model_type|status|metrics.<nom>,
+    order=asc|desc) et projection (fields=id,name,metrics.test_accuracy).
+    """
+    filters = {**filters, "task_type": split_csv(task_type), "deployed": deployed}
+    return list_page(
+        CRUDModel.get_page, Model, "models", model_to_dict, project_id, cursor, limit,
+        filters, sort, order, fields, db, MODEL_EXTRA_FIELDS
+    )
+
+@app.get("/api/models/summary")
+async def models_summary(project_id: Optional[str] = None, task_type: Optional[str] = None,
+                         deployed: Optional[bool] = None, metrics: Optional[str] = None,
+                         filters: Dict[str, Any] = Depends(listing_filters),
+                         db: Session = Depends(get_db)):
+    """Effectifs, taille et agrégats de métriques (moyenne, meilleur modèle) calculés en SQL"""
+    filters = {**filters, "project_id": project_id, "task_type": split_csv(task_type), "deployed": deployed}
+    summary = page_or_400(CRUDModel.summary, db, filters, split_csv(metrics) or SUMMARY_METRICS)
+    return {"status": "success", "summary": summary}
 
 @app.get("/api/models/{model_id}")
-async def get_model(model_id: str):
-    """Obtenir les détails d'un modèle avec task_type et problem_type"""
-    if model_id not in models_db:
-        raise HTTPException(status_code=404, detail="Modèle non trouvé")
-    
-    model = models_db[model_id].copy()
-    
-    # Récupérer les informations du projet associé
-    project_id = model.get("project_id")
-    if project_id and project_id in projects_db:
-        project = projects_db[project_id]
-        model["task_type"] = project.get("task_type")
-        model["problem_type"] = project.get("problem_type")
-    else:
-        model["task_type"] = None
-        model["problem_type"] = None
+async def get_model(model_id: str, response: Response, db: Session = Depends(get_db)):
+    """Obtenir les détails d'un modèle avec task_type et problem_type (Last-Modified = updated_at)"""
+    model = get_model_or_404(db, model_id)
+    set_last_modified(response, model.updated_at)
     
     return {
         "status": "success",
-        "model": model
+        "model": model_to_dict(model)
     }
 @app.get("/api/models/download/{model_id}")
-async def download_model(model_id: str, format: str = "pkl"):
-    """Télécharger un modèle"""
-    if model_id not in models_db:
-        raise HTTPException(status_code=404, detail="Modèle non trouvé")
+async def download_model(model_id: str, format: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Télécharger un modèle.
     
-    model_info = models_db[model_id]
-    model_path = model_info["model_path"]
+    Sans `format`, le fichier stocké est renvoyé tel quel. Sinon le modèle
+    est converti : pkl, joblib, json / ubj (booster XGBoost natif) ou onnx
+    (preprocessing compris, servable par onnxruntime). L'export ONNX est
+    gardé en cache à côté du modèle.
+    """
+    model_info = get_model_or_404(db, model_id)
+    model_path = model_info.model_path
     
     if not os.path.exists(model_path):
         raise HTTPException(status_code=404, detail="Fichier modèle non trouvé")
     
+    stored_format = artifacts.format_from_path(model_path)
+    if format is None:
+        target_format = stored_format
+    elif format in DOWNLOAD_FORMATS:
+        target_format = DOWNLOAD_FORMATS[format]
+    else:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Format non supporté: {format} (attendu: {', '.join(DOWNLOAD_FORMATS)})"
+        )
+    filename = f"{model_id}{artifacts.FORMAT_EXTENSIONS[target_format]}"
+    
+    if target_format == stored_format:
+        return FileResponse(model_path, media_type="application/octet-stream", filename=filename)
+    
+    model = await asyncio.to_thread(model_cache.get, model_path, model_path, model_info.size_mb)
+    
+    if target_format == "onnx":
+        # À côté du fichier stocké : partagé par les modèles qui partagent ce fichier
+        onnx_path = artifacts.export_path(model_path, "onnx")
+        if not os.path.exists(onnx_path):
+            try:
+                await asyncio.to_thread(artifacts.export_onnx, model, onnx_path)
+            except Exception as e:
+                if os.path.exists(onnx_path):
+                    os.remove(onnx_path)
+                raise HTTPException(status_code=422, detail=f"Export ONNX impossible: {str(e)}")
+        return FileResponse(onnx_path, media_type="application/octet-stream", filename=filename)
+    
+    # Conversion ponctuelle dans un dossier temporaire, supprimé après l'envoi
+    temp_dir = tempfile.mkdtemp(dir=MODELS_DIR)
+    temp_path = artifacts.artifact_path(temp_dir, model_id, target_format)
+    try:
+        await asyncio.to_thread(artifacts.save_model, model, temp_path, MODEL_COMPRESSION)
+    except ValueError as e:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise HTTPException(status_code=400, detail=str(e))
+    
     return FileResponse(
-        model_path,
+        temp_path,
         media_type="application/octet-stream",
-        filename=f"{model_id}.{format}"
+        filename=filename,
+        background=BackgroundTask(shutil.rmtree, temp_dir, ignore_errors=True)
     )
 
+@app.get("/api/models/{model_id}/predictions")
+async def get_model_predictions(model_id: str, limit: int = 100, db: Session = Depends(get_db)):
+    """Dernières prédictions journalisées (celles encore en tampon n'apparaissent qu'après écriture)"""
+    get_model_or_404(db, model_id)
+    rows = CRUDPrediction.get_by_model(db, model_id, limit=min(max(limit, 1), 1000))
+    
+    return {
+        "status": "success",
+        "count": CRUDPrediction.count_by_model(db, model_id),
+        "predictions": [to_dict(row) for row in rows]
+    }
+
+@app.get("/api/models/{model_id}/predictions/rollup")
+async def get_model_prediction_rollup(model_id: str, minutes: int = 60, db: Session = Depends(get_db)):
+    """Nombre de prédictions par minute sur les `minutes` dernières minutes"""
+    get_model_or_404(db, model_id)
+    since = datetime.utcnow() - timedelta(minutes=minutes)
+    rollups = CRUDPrediction.get_rollups(db, model_id, since=since)
+    
+    return {
+        "status": "success",
+        "model_id": model_id,
+        "total": sum(rollup.count for rollup in rollups),
+        "per_minute": [{"minute": rollup.minute.isoformat(), "count": rollup.count} for rollup in rollups]
+    }
+
+@app.put("/api/models/{model_id}/inference")
+async def set_inference_backend(model_id: str, update: InferenceBackendUpdate, db: Session = Depends(get_db)):
+    """
+    Choisir le moteur d'inférence du modèle.
+    
+    "compiled" n'est accepté que pour les ensembles d'arbres sklearn
+    (Random Forest, Extra Trees, Gradient Boosting) : les sorties sont
+    identiques à sklearn, seule la latence change.
+    """
+    model_info = get_model_or_404(db, model_id)
+    if update.backend not in tree_inference.INFERENCE_BACKENDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Backend d'inférence inconnu: {update.backend} "
+                   f"(attendu: {', '.join(tree_inference.INFERENCE_BACKENDS)})"
+        )
+    
+    if update.backend == "compiled":
+        try:
+            model = await asyncio.to_thread(
+                model_cache.get, model_info.model_path, model_info.model_path, model_info.size_mb
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Erreur lors du chargement du modèle: {str(e)}")
+        reason = tree_inference.unsupported_reason(model)
+        if reason is not None:
+            raise HTTPException(status_code=400, detail=reason)
+    
+    # Pas d'invalidation : les entrées du cache ne dépendent que du fichier
+    # (éventuellement partagé) et du backend, qui a sa propre clé
+    CRUDModel.update(db, model_id, {"inference_backend": update.backend})
+    
+    return {
+        "status": "success",
+        "model_id": model_id,
+        "inference_backend": update.backend,
+        "inference_benchmarks": model_info.inference_benchmarks
+    }
+
 @app.delete("/api/models/{model_id}")
-async def delete_model(model_id: str):
+async def delete_model(model_id: str, db: Session = Depends(get_db)):
     """Supprimer un modèle"""
-    if model_id not in models_db:
-        raise HTTPException(status_code=404, detail="Modèle non trouvé")
+    model_info = get_model_or_404(db, model_id)
     
-    model_info = models_db[model_id]
+    # Retirer le modèle du cache avant de supprimer le fichier, seulement si
+    # c'en est la dernière référence : sinon il reste servi aux autres modèles
+    model_entry = CRUDArtifact.get_by_path(db, model_info.model_path)
+    if model_entry is None or model_entry.refcount <= 1:
+        invalidate_cached_model(model_info.model_path)
     
-    # Supprimer le fichier
-    if os.path.exists(model_info["model_path"]):
-        os.remove(model_info["model_path"])
+    bytes_freed = 0
+    if model_info.artifact_keys:
+        # Fichiers du store (éventuellement partagés) : supprimés avec leur dernière référence
+        for key in model_info.artifact_keys:
+            bytes_freed += artifact_store.release(db, key)
+    else:
+        # Modèle antérieur au store : supprimer le fichier (et ses annexes : métadonnées XGBoost, export ONNX)
+        artifacts.delete_model_files(model_info.model_path)
     
-    # Supprimer de la DB
-    del models_db[model_id]
+    # Supprimer de la DB (avec son journal de prédictions)
+    CRUDPrediction.delete_by_model(db, model_id)
+    CRUDModel.delete(db, model_id)
     
     return {
         "status": "success",
-        "message": "Modèle supprimé avec succès"
+        "message": "Modèle supprimé avec succès",
+        "bytes_freed": bytes_freed
     }
 
 # ==================== ENDPOINTS PRÉDICTIONS ====================
 
+def raw_feature_record(model, features: Union[List[Any], Dict[str, Any]]) -> Dict[str, Any]:
+    """Ligne brute (colonne -> valeur) pour un modèle fusionné"""
+    columns = list(model.feature_names_in_)
+    if isinstance(features, dict):
+        missing = [col for col in columns if col not in features]
+        if missing:
+            raise ValueError(f"Colonnes manquantes: {missing}")
+        return features
+    if len(features) != len(columns):
+        raise ValueError(f"{len(columns)} valeurs attendues ({', '.join(columns)}), {len(features)} reçues")
+    return dict(zip(columns, features))
+
 @app.post("/api/predict")
-async def make_prediction(request: PredictionRequest):
+async def make_prediction(request: PredictionRequest, db: Session = Depends(get_db)):
     """Faire une prédiction avec un modèle"""
-    if request.model_id not in models_db:
-        raise HTTPException(status_code=404, detail="Modèle non trouvé")
-    
-    model_info = models_db[request.model_id]
+    model_info = get_model_or_404(db, request.model_id)
     
     try:
-        # Charger le modèle
-        with open(model_info["model_path"], 'rb') as f:
-            model = pickle.load(f)
+        # Charger le modèle (depuis le cache si possible), hors de la boucle d'événements
+        model = await asyncio.to_thread(get_inference_model, model_info)
+        
+        # Une ligne par requête : les modèles fusionnés appliquent eux-mêmes le preprocessing
+        raw_input = preprocessing.is_fused(model) and not request.preprocessed
+        if raw_input:
+            record = raw_feature_record(model, request.features)
+        else:
+            model = preprocessing.get_estimator(model)
+            values = list(request.features.values()) if isinstance(request.features, dict) else request.features
+            record = np.array(values, dtype=float)
         
-        # Faire la prédiction
-        features = np.array(request.features).reshape(1, -1)
-        prediction = model.predict(features)
+        # Les requêtes concurrentes sur le même modèle sont prédites en un seul lot.
+        # On rend la connexion SQLite avant d'attendre : sinon des centaines de
+        # requêtes en attente épuisent le pool de connexions.
+        key = (request.model_id, model_info.model_type, raw_input, id(model))
+        db.close()
+        if prediction_batcher.enabled:
+            prediction, probabilities = await prediction_batcher.submit(key, model, record)
+        else:
+            start = time.perf_counter()
+            prediction, probabilities = microbatch.predict_records(model, [record])[0]
+            observe_prediction_batch(key, 1, 0.0, time.perf_counter() - start)
         
-        # Probabilités si classification
-        probabilities = None
-        if hasattr(model, 'predict_proba'):
-            probabilities = model.predict_proba(features).tolist()
+        if PREDICTION_LOG_ENABLED:
+            prediction_logger.log({
+                "id": str(uuid.uuid4()),
+                "model_id": request.model_id,
+                "features": request.features,
+                "prediction": prediction,
+                "probabilities": probabilities,
+                "created_at": datetime.utcnow()
+            })
         
         return {
             "status": "success",
-            "prediction": prediction.tolist()[0],
-            "probabilities": probabilities
+            "prediction": prediction,
+            "probabilities": [probabilities] if probabilities is not None else None
         }
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la prédiction: {str(e)}")
 
+@app.post("/api/predict/batch")
+async def make_batch_prediction(
+    request: Request,
+    model_id: str,
+    output: str = "ndjson",
+    chunk_size: int = batch_predict.DEFAULT_CHUNK_SIZE,
+    db: Session = Depends(get_db)
+):
+    """
+    Prédictions par lots.
+    
+    Le corps peut être une matrice JSON ({"features": [[...]], "columns": [...]}),
+    un fichier CSV/Parquet en multipart (champ "file") ou un flux Arrow/Parquet brut.
+    Les transformations du projet sont ré-appliquées et les résultats sont
+    renvoyés en streaming (NDJSON ou CSV).
+    """
+    model_info = get_model_or_404(db, model_id)
+    if output not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Format de sortie non supporté (ndjson ou csv)")
+    if chunk_size <= 0:
+        raise HTTPException(status_code=400, detail="chunk_size doit être positif")
+    
+    transformations_path = model_info.project.transformations_path if model_info.project else None
+    try:
+        # Chargements bloquants (désérialisation) hors de la boucle d'événements
+        model = await asyncio.to_thread(get_inference_model, model_info)
+        transformations = await asyncio.to_thread(batch_predict.load_transformations, transformations_path)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors du chargement du modèle: {str(e)}")
+    
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    temp_path = None
+    
+    # Sélection du lecteur selon le type de contenu
+    if content_type == "application/json":
+        payload = BatchPredictionRequest(**(await request.json()))
+        columns = payload.columns or batch_predict.get_input_columns(model, transformations)
+        chunks = batch_predict.iter_matrix_chunks(payload.features, columns, chunk_size)
+    elif content_type == "multipart/form-data":
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or not hasattr(upload, "filename"):
+            raise HTTPException(status_code=400, detail="Champ 'file' manquant")
+        if upload.filename.endswith(".parquet"):
+            fd, temp_path = tempfile.mkstemp(suffix=".parquet", dir=UPLOAD_DIR)
+            with os.fdopen(fd, 'wb') as f:
+                shutil.copyfileobj(upload.file, f)
+            chunks = batch_predict.iter_parquet_chunks(temp_path, chunk_size)
+        elif upload.filename.endswith(".csv"):
+            chunks = batch_predict.iter_csv_chunks(upload.file, chunk_size)
+        else:
+            raise HTTPException(status_code=400, detail="Format de fichier non supporté")
+    elif content_type in batch_predict.PARQUET_CONTENT_TYPES:
+        temp_path = await _spool_body_to_disk(request, ".parquet")
+        chunks = batch_predict.iter_parquet_chunks(temp_path, chunk_size)
+    elif content_type in batch_predict.ARROW_CONTENT_TYPES:
+        temp_path = await _spool_body_to_disk(request, ".arrow")
+        chunks = batch_predict.iter_arrow_chunks(temp_path, chunk_size)
+    elif content_type == "text/csv":
+        temp_path = await _spool_body_to_disk(request, ".csv")
+        chunks = batch_predict.iter_csv_chunks(temp_path, chunk_size)
+    else:
+        raise HTTPException(status_code=415, detail=f"Type de contenu non supporté: {content_type}")
+    
+    def counted(results):
+        # Débit de prédiction : lignes et temps de calcul par morceau
+        while True:
+            start = time.perf_counter()
+            result = next(results, None)
+            if result is None:
+                return
+            PREDICTION_SECONDS.inc(time.perf_counter() - start, endpoint="batch", model_type=model_info.model_type)
+            PREDICTION_ROWS.inc(len(result["predictions"]), endpoint="batch", model_type=model_info.model_type)
+            yield result
+    
+    # Le premier morceau est calculé avant d'envoyer la réponse pour
+    # pouvoir encore retourner une erreur HTTP propre (colonnes manquantes...).
+    # Lecture, transformation et prédiction dans un thread, comme le reste du flux
+    results = counted(batch_predict.predict_chunks(model, chunks, transformations))
+    try:
+        first = await asyncio.to_thread(next, results, None)
+    except Exception as e:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise HTTPException(status_code=400, detail=f"Erreur lors de la prédiction: {str(e)}")
+    if first is not None:
+        results = itertools.chain([first], results)
+    
+    if output == "csv":
+        body = batch_predict.format_csv(results, getattr(model, "classes_", None))
+        media_type = "text/csv"
+    else:
+        body = batch_predict.format_ndjson(results)
+        media_type = "application/x-ndjson"
+    
+    def stream():
+        try:
+            yield from body
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    return StreamingResponse(stream(), media_type=media_type)
+
 # ==================== ENDPOINTS EXPÉRIENCES ====================
 
 @app.get("/api/experiments/list")
-async def list_experiments():
-    """Lister toutes les expériences"""
-    return {
-        "status": "success",
-        "experiments": list(experiments_db.values())
-    }
+async def list_experiments(project_id: Optional[str] = None, cursor: Optional[str] = None,
+                           limit: int = DEFAULT_PAGE_SIZE, sort: str = "created_at", order: str = "desc",
+                           fields: Optional[str] = None, filters: Dict[str, Any] = Depends(listing_filters),
+                           db: Session = Depends(get_db)):
+    """
+    Lister les expériences (pagination par curseur, plus récentes d'abord).
+    
+    Filtres (model_type, status : valeurs séparées par des virgules ;
+    search, created_after/created_before, metric/metric_min/metric_max),
+    tri (sort=created_at|
+    training_time|name|model_type|status|metrics.<nom>, order=asc|desc)
+    et projection (fields=id,name,metrics.test_accuracy).
+    """
+    return list_page(
+        CRUDExperiment.get_page, Experiment, "experiments", to_dict, project_id, cursor, limit,
+        filters, sort, order, fields, db
+    )
+
+@app.get("/api/experiments/summary")
+async def experiments_summary(project_id: Optional[str] = None, metrics: Optional[str] = None,
+                              filters: Dict[str, Any] = Depends(listing_filters),
+                              db: Session = Depends(get_db)):
+    """Effectifs par statut / modèle, temps d'entraînement et agrégats de métriques calculés en SQL"""
+    filters = {**filters, "project_id": project_id}
+    summary = page_or_400(CRUDExperiment.summary, db, filters, split_csv(metrics) or SUMMARY_METRICS)
+    return {"status": "success", "summary": summary}
 
 @app.get("/api/experiments/{experiment_id}")
-async def get_experiment(experiment_id: str):
+async def get_experiment(experiment_id: str, db: Session = Depends(get_db)):
     """Obtenir les détails d'une expérience"""
-    if experiment_id not in experiments_db:
-        raise HTTPException(status_code=404, detail="Expérience non trouvée")
+    experiment = get_experiment_or_404(db, experiment_id)
     
     return {
         "status": "success",
-        "experiment": experiments_db[experiment_id]
+        "experiment": to_dict(experiment)
     }
 
 @app.get("/api/experiments/project/{project_id}")
-async def get_project_experiments(project_id: str):
-    """Obtenir toutes les expériences d'un projet"""
-    project_experiments = [
-        exp for exp in experiments_db.values()
-        if exp["project_id"] == project_id
-    ]
+async def get_project_experiments(project_id: str, cursor: Optional[str] = None,
+                                  limit: int = DEFAULT_PAGE_SIZE, sort: str = "created_at",
+                                  order: str = "desc", fields: Optional[str] = None,
+                                  filters: Dict[str, Any] = Depends(listing_filters),
+                                  db: Session = Depends(get_db)):
+    """Obtenir les expériences d'un projet (index project_id + created_at)"""
+    return list_page(
+        CRUDExperiment.get_page, Experiment, "experiments", to_dict, project_id, cursor, limit,
+        filters, sort, order, fields, db
+    )
+
+# ==================== ENDPOINTS STOCKAGE ====================
+
+@app.get("/api/storage/stats")
+async def storage_stats(db: Session = Depends(get_db)):
+    """Objets du store adressé par contenu : taille, références, octets évités par le partage"""
+    return artifact_store.stats(db)
+
+@app.post("/api/storage/gc")
+async def storage_gc(db: Session = Depends(get_db)):
+    """
+    Supprimer les artefacts sans référence et les fichiers orphelins du store.
     
-    return {
-        "status": "success",
-        "experiments": project_experiments
-    }
+    La suppression d'un modèle libère déjà ses fichiers à la dernière
+    référence : ce ramasse-miettes rattrape les écritures interrompues.
+    """
+    result = artifact_store.collect(db)
+    return {"status": "success", **result, "store": artifact_store.stats(db)}
 
 # ==================== ENDPOINT RACINE ====================
 
@@ -589,20 +1861,85 @@ async def root():
             "train": "/api/train",
             "models": "/api/models",
             "predict": "/api/predict",
-            "experiments": "/api/experiments"
+            "experiments": "/api/experiments",
+            "storage": "/api/storage"
         }
     }
 
 @app.get("/api/health")
-async def health_check():
+async def health_check(db: Session = Depends(get_db)):
     """Health check"""
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "projects": len(projects_db),
-        "models": len(models_db),
-        "experiments": len(experiments_db)
+        "projects": CRUDProject.count(db),
+        "models": CRUDModel.count(db),
+        "experiments": CRUDExperiment.count(db),
+        "training_queue": training_jobs.stats(),
+        "model_cache": model_cache.stats(),
+        "predict_batcher": prediction_batcher.stats(),
+        "prediction_log": prediction_logger.stats(),
+        "http_conditional": http_cache_stats.stats(),
+        "training_progress": progress_hub.stats(),
+        "artifact_store": artifact_store.stats(db)
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Métriques au format texte d'exposition Prometheus"""
+    return PlainTextResponse(metrics_registry.render(), media_type=instrumentation.CONTENT_TYPE)
+
+# ==================== CYCLE DE VIE ====================
+
+def warm_up_model_cache():
+    """Précharger les modèles déployés dans le cache"""
+    db = SessionLocal()
+    try:
+        deployed = CRUDModel.get_deployed(db)
+    finally:
+        db.close()
+    
+    for model_info in deployed:
+        if not os.path.exists(model_info.model_path):
+            continue
+        try:
+            get_inference_model(model_info)
+        except Exception as e:
+            logger.warning("Préchargement du modèle %s impossible : %s", model_info.id, e)
+
+def fail_interrupted_experiments():
+    """
+    La file d'entraînement ne vit qu'en mémoire : les expériences restées
+    en file ou en cours à l'arrêt (redémarrage, crash) ne finiraient jamais.
+    """
+    db = SessionLocal()
+    try:
+        count = CRUDExperiment.fail_unfinished(db, "Interrompu par un redémarrage du serveur")
+    finally:
+        db.close()
+    if count:
+        logger.warning("%d entraînement(s) interrompu(s) par le redémarrage marqué(s) en échec", count)
+
+@app.on_event("startup")
+async def startup():
+    """Initialiser la DB, démarrer le pool d'entraînement et précharger les modèles déployés"""
+    init_database()
+    fail_interrupted_experiments()
+    progress_hub.start_reader(progress_queue, asyncio.get_running_loop())
+    training_jobs.start()
+    if PREDICTION_LOG_ENABLED:
+        prediction_logger.start()
+    if MODEL_CACHE_WARMUP:
+        warm_up_model_cache()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Arrêter le pool d'entraînement et écrire les prédictions encore en tampon"""
+    for task in list(search_tasks.values()):
+        task.cancel()
+    training_jobs.shutdown()
+    progress_hub.stop_reader(progress_queue)
+    await prediction_logger.stop()
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,183 @@
+"""
+Regroupement des prédictions unitaires (micro-batching)
+Fichier: backend/microbatch.py
+
+Les appels concurrents à /api/predict sur un même modèle sont mis en
+attente au plus `max_wait_ms` millisecondes ou jusqu'à `max_batch_rows`
+lignes, puis prédits en un seul appel vectorisé (dans un thread, pour ne
+pas bloquer la boucle asyncio). Chaque requête récupère ensuite sa ligne.
+
+Pour un classifieur, predict_proba n'est calculé qu'une fois et le label
+en est déduit (argmax), sauf pour les modèles dont predict ne suit pas
+les probabilités.
+"""
+
+import asyncio
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.svm import SVC
+
+import preprocessing
+
+# predict de SVC utilise la fonction de décision, pas les probabilités
+# calibrées (Platt) : l'argmax de predict_proba peut donner un autre label
+PROBA_MISMATCH_TYPES = (SVC,)
+
+Prediction = Tuple[Any, Optional[List[float]]]
+
+
+def labels_from_proba(model) -> bool:
+    """Le label de `model` est-il l'argmax de predict_proba ?"""
+    return (
+        hasattr(model, "predict_proba")
+        and hasattr(model, "classes_")
+        and not isinstance(preprocessing.get_estimator(model), PROBA_MISMATCH_TYPES)
+    )
+
+
+def records_to_frame(model, records: List[Any]):
+    """
+    Entrée du modèle pour un lot : DataFrame de colonnes brutes (dicts,
+    modèle fusionné) ou matrice float (features déjà transformées).
+    """
+    if isinstance(records[0], dict):
+        return pd.DataFrame.from_records(records, columns=list(model.feature_names_in_))
+    return np.vstack(records)
+
+
+def predict_records(model, records: List[Any]) -> List[Prediction]:
+    """Prédire un lot ; retourne (label, probabilités ou None) par ligne"""
+    X = records_to_frame(model, records)
+
+    if labels_from_proba(model):
+        probabilities = model.predict_proba(X)
+        predictions = model.classes_.take(np.argmax(probabilities, axis=1), axis=0)
+    else:
+        predictions = model.predict(X)
+        probabilities = model.predict_proba(X) if hasattr(model, "predict_proba") else None
+
+    predictions = predictions.tolist()
+    if probabilities is None:
+        return [(prediction, None) for prediction in predictions]
+    return list(zip(predictions, probabilities.tolist()))
+
+
+class _PendingBatch:
+    def __init__(self, key: Hashable, model):
+        self.key = key
+        self.model = model
+        self.records: List[Any] = []
+        self.futures: List[asyncio.Future] = []
+        self.enqueued_at: List[float] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MicroBatcher:
+    """
+    File de prédictions par clé (modèle + type d'entrée).
+
+    `on_batch(key, rows, wait_seconds, predict_seconds)` est appelé dans
+    la boucle asyncio après chaque lot (métriques).
+    """
+
+    def __init__(self, max_wait_ms: float = 2.0, max_batch_rows: int = 64,
+                 predict: Callable[[Any, List[Any]], List[Prediction]] = predict_records,
+                 on_batch: Optional[Callable[[Hashable, int, float, float], None]] = None):
+        self.max_wait_ms = max_wait_ms
+        self.max_batch_rows = max_batch_rows
+        self.predict = predict
+        self.on_batch = on_batch
+        self._pending: Dict[Hashable, _PendingBatch] = {}
+        self._running: set = set()
+        self.counters = defaultdict(int)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_wait_ms > 0 and self.max_batch_rows > 1
+
+    async def submit(self, key: Hashable, model, record) -> Prediction:
+        """Ajouter une ligne au lot en cours pour `key` et attendre son résultat"""
+        loop = asyncio.get_running_loop()
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = _PendingBatch(key, model)
+            batch.timer = loop.call_later(self.max_wait_ms / 1000, self._flush, key, "timeout")
+
+        future = loop.create_future()
+        batch.records.append(record)
+        batch.futures.append(future)
+        batch.enqueued_at.append(time.perf_counter())
+        self.counters["requests"] += 1
+
+        if len(batch.records) >= self.max_batch_rows:
+            self._flush(key, "full")
+        return await future
+
+    def _flush(self, key: Hashable, reason: str):
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        batch.timer.cancel()
+        self.counters["batches"] += 1
+        self.counters[f"flush_{reason}"] += 1
+
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        # Garder une référence : une tâche non référencée peut être collectée
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: _PendingBatch):
+        started = time.perf_counter()
+        results = await asyncio.to_thread(self._predict_isolated, batch.model, batch.records)
+        predict_seconds = time.perf_counter() - started
+
+        for future, result in zip(batch.futures, results):
+            if future.done():  # requête annulée (client déconnecté)
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+        if self.on_batch is not None:
+            wait_seconds = started - min(batch.enqueued_at)
+            self.on_batch(batch.key, len(batch.records), wait_seconds, predict_seconds)
+
+    def _predict_isolated(self, model, records: List[Any]) -> List[Any]:
+        """
+        Prédire le lot ; s'il échoue, reprendre ligne par ligne pour que
+        seule la requête fautive reçoive l'erreur.
+        """
+        try:
+            return self.predict(model, records)
+        except Exception as e:
+            if len(records) == 1:
+                return [e]
+        self.counters["batch_errors"] += 1
+        results = []
+        for record in records:
+            try:
+                results.append(self.predict(model, [record])[0])
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """État des files pour /api/health et /metrics"""
+        return {
+            "enabled": self.enabled,
+            "max_wait_ms": self.max_wait_ms,
+            "max_batch_rows": self.max_batch_rows,
+            "queues": len(self._pending),
+            "queued_requests": sum(len(batch.records) for batch in self._pending.values()),
+            "running_batches": len(self._running),
+            "requests": self.counters["requests"],
+            "batches": self.counters["batches"],
+            "flush_full": self.counters["flush_full"],
+            "flush_timeout": self.counters["flush_timeout"],
+            "batch_errors": self.counters["batch_errors"]
+        }
@@ -0,0 +1,120 @@
+"""
+Cache LRU des modèles chargés en mémoire
+Fichier: backend/model_cache.py
+
+Évite de désérialiser le modèle à chaque appel de /api/predict. L'éviction
+se fait selon l'ordre d'utilisation, en respectant à la fois un nombre
+maximal de modèles et une taille totale maximale (en Mo). Les demandes
+simultanées d'un modèle absent partagent un seul chargement.
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+from artifacts import load_model
+
+
+class ModelCache:
+    """Cache LRU partagé entre les requêtes"""
+
+    def __init__(self, max_models: int = 8, max_size_mb: float = 1024.0):
+        self.max_models = max_models
+        self.max_size_mb = max_size_mb
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Chargements en cours : clé -> Future attendu par les autres demandes
+        self._loading: Dict[str, Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.shared_loads = 0
+        self.evictions = 0
+
+    @property
+    def size_mb(self) -> float:
+        return sum(entry["size_mb"] for entry in self._entries.values())
+
+    def get(self, key: str, path: str, size_mb: Optional[float] = None,
+            loader: Callable[[str], Any] = load_model):
+        """
+        Retourner le modèle depuis le cache, en le chargeant si absent.
+        Bloquant : depuis la boucle asyncio, appeler via asyncio.to_thread.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry["model"]
+            self.misses += 1
+            pending = self._loading.get(key)
+            if pending is None:
+                pending = self._loading[key] = Future()
+                owner = True
+            else:
+                self.shared_loads += 1
+                owner = False
+
+        if not owner:
+            # Un autre appel charge déjà ce modèle : attendre son résultat
+            return pending.result()
+
+        # Chargement hors verrou : un gros modèle ne bloque pas les autres lectures
+        try:
+            model = loader(path)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            pending.set_exception(e)
+            raise
+        with self._lock:
+            self._put(key, model, size_mb or 0.0)
+            del self._loading[key]
+        pending.set_result(model)
+        return model
+
+    def put(self, key: str, model: Any, size_mb: float = 0.0):
+        """Ajouter un modèle puis évincer les moins récemment utilisés"""
+        with self._lock:
+            self._put(key, model, size_mb)
+
+    def _put(self, key: str, model: Any, size_mb: float):
+        self._entries[key] = {"model": model, "size_mb": size_mb}
+        self._entries.move_to_end(key)
+        self._evict()
+
+    def _evict(self):
+        # On garde toujours au moins le dernier modèle ajouté
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_models or self.size_mb > self.max_size_mb
+        ):
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: str) -> bool:
+        """Retirer un modèle du cache (suppression, ré-entraînement...)"""
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques du cache pour /api/health"""
+        lookups = self.hits + self.misses
+        return {
+            "models": len(self._entries),
+            "size_mb": round(self.size_mb, 3),
+            "max_models": self.max_models,
+            "max_size_mb": self.max_size_mb,
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared_loads": self.shared_loads,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,282 @@
+"""
+Entraînement hors mémoire (out-of-core)
+Fichier: backend/out_of_core.py
+
+Pour les données preprocessées plus grosses que la mémoire disponible :
+elles sont lues par morceaux (Parquet, Arrow ou CSV) et jamais chargées
+entièrement.
+
+- Split train / test par hash du contenu de chaque ligne : stable quel
+  que soit le découpage en morceaux, sans liste d'indices en mémoire.
+- Apprentissage incrémental : partial_fit morceau par morceau (SGD,
+  Naive Bayes) ou DMatrix XGBoost en mémoire externe (pages en cache
+  sur disque).
+- Métriques accumulées morceau par morceau (matrice de confusion,
+  sommes des carrés), avec les mêmes clés que training.compute_metrics.
+
+Comme training.py, ce module ne doit pas importer main.py.
+"""
+
+import os
+import tempfile
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+import datastore
+import progress
+
+# Type de modèle -> façon d'apprendre sans charger les données
+STREAMING_MODES = {
+    "SGD": "partial_fit",
+    "Naive Bayes": "partial_fit",
+    "XGBoost": "external_memory"
+}
+
+HASH_BUCKETS = 1_000_000
+# Lignes de test gardées pour le benchmark d'inférence (package_model)
+SAMPLE_ROWS = 1000
+
+
+class ChunkSource:
+    """Morceaux (X, y, masque de test) d'un fichier de données preprocessées"""
+
+    def __init__(self, path: str, target_column: str, chunk_rows: int, test_fraction: float, seed: int = 42):
+        self.path = path
+        self.target_column = target_column
+        self.chunk_rows = chunk_rows
+        self.test_fraction = test_fraction
+        # hash_pandas_object attend une clé de 16 caractères
+        self.hash_key = f"{seed:016d}"[-16:]
+
+    def n_chunks(self) -> int:
+        return -(-datastore.count_rows(self.path) // self.chunk_rows)
+
+    def test_mask(self, X: pd.DataFrame) -> np.ndarray:
+        """Ligne de test si le hash de son contenu tombe sous `test_fraction`"""
+        hashes = pd.util.hash_pandas_object(X, index=False, hash_key=self.hash_key).to_numpy()
+        return hashes % HASH_BUCKETS < self.test_fraction * HASH_BUCKETS
+
+    def chunks(self) -> Iterator[Tuple[pd.DataFrame, pd.Series, np.ndarray]]:
+        for df in datastore.iter_chunks(self.path, self.chunk_rows):
+            y = df.pop(self.target_column)
+            yield df, y, self.test_mask(df)
+
+    def train_chunks(self) -> Iterator[Tuple[pd.DataFrame, pd.Series]]:
+        for X, y, is_test in self.chunks():
+            if not is_test.all():
+                yield X[~is_test], y[~is_test]
+
+    def classes(self) -> np.ndarray:
+        """Classes de la cible (passe sur la seule colonne cible)"""
+        classes = None
+        for df in datastore.iter_chunks(self.path, self.chunk_rows, columns=[self.target_column]):
+            values = df[self.target_column].unique()
+            classes = np.unique(values) if classes is None else np.union1d(classes, values)
+        if classes is None:
+            raise ValueError("Aucune donnée d'entraînement")
+        return classes
+
+
+# ==================== APPRENTISSAGE ====================
+
+def fit_partial(model, source: ChunkSource, classes: Optional[np.ndarray], epochs: int, seed: int = 42):
+    """
+    `epochs` passes de partial_fit sur les morceaux d'entraînement. Les
+    lignes sont mélangées à l'intérieur de chaque morceau (l'ordre des
+    morceaux reste celui du fichier).
+    """
+    total = source.n_chunks() * epochs
+    reporter = progress.IterationReporter(total, metric="chunks")
+    done = 0
+    for epoch in range(epochs):
+        rng = np.random.default_rng(seed + epoch)
+        for X, y in source.train_chunks():
+            order = rng.permutation(len(X))
+            X, y = X.iloc[order], y.iloc[order]
+            if classes is not None:
+                model.partial_fit(X, y, classes=classes)
+            else:
+                model.partial_fit(X, y)
+            done += 1
+            reporter(done)
+    if done < total:  # morceaux sans ligne d'entraînement : dernière itération quand même publiée
+        reporter(done, force=True)
+    return model
+
+
+class _TrainChunkIterator(xgb.DataIter):
+    """Morceaux d'entraînement lus à la demande par XGBoost (une passe par page construite)"""
+
+    def __init__(self, source: ChunkSource, cache_dir: str):
+        self.source = source
+        self._chunks = None
+        super().__init__(cache_prefix=os.path.join(cache_dir, "cache"), release_data=True)
+
+    def next(self, input_data) -> bool:
+        if self._chunks is None:
+            self._chunks = self.source.train_chunks()
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return False
+        X, y = chunk
+        input_data(data=X, label=y)
+        return True
+
+    def reset(self):
+        self._chunks = None
+
+
+def fit_external_memory(model, source: ChunkSource, task_type: str, classes: Optional[np.ndarray],
+                        cache_dir: str):
+    """
+    XGBoost en mémoire externe : les données d'entraînement sont
+    quantifiées page par page dans un cache disque (ExtMemQuantileDMatrix),
+    puis le booster est chargé dans l'estimateur sklearn `model`.
+    """
+    params = {key: value for key, value in model.get_xgb_params().items() if value is not None}
+    if task_type == "Classification":
+        if not np.array_equal(classes, np.arange(len(classes))):
+            raise ValueError(f"XGBoost attend des classes 0..{len(classes) - 1}, reçu: {classes.tolist()}")
+        if len(classes) > 2:
+            params.update(objective="multi:softprob", num_class=len(classes))
+    rounds = model.get_params().get("n_estimators") or 100
+
+    with tempfile.TemporaryDirectory(dir=cache_dir, prefix="xgb-external-") as directory:
+        dtrain = xgb.ExtMemQuantileDMatrix(
+            _TrainChunkIterator(source, directory), max_bin=model.get_params().get("max_bin") or 256
+        )
+        booster = xgb.train(params, dtrain, num_boost_round=rounds,
+                            callbacks=[progress.xgboost_callback(rounds)])
+        del dtrain
+
+    model.load_model(bytearray(booster.save_raw("json")))
+    return model
+
+
+# ==================== MÉTRIQUES EN STREAMING ====================
+
+class ClassificationMetrics:
+    """Matrice de confusion accumulée sur toutes les classes connues"""
+
+    def __init__(self, classes: np.ndarray):
+        self.classes = np.asarray(classes)
+        self.matrix = np.zeros((len(classes), len(classes)), dtype=np.int64)
+
+    @property
+    def n(self) -> int:
+        return int(self.matrix.sum())
+
+    def update(self, y_true, y_pred):
+        true_idx = np.searchsorted(self.classes, np.asarray(y_true))
+        pred_idx = np.searchsorted(self.classes, np.asarray(y_pred))
+        np.add.at(self.matrix, (true_idx, pred_idx), 1)
+
+    def accuracy(self) -> float:
+        return float(np.trace(self.matrix) / self.n) if self.n else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        """precision / recall / f1 pondérés, matrice et rapport comme sklearn (zero_division=0)"""
+        # Comme sklearn : seules les classes présentes (vraies ou prédites)
+        present = (self.matrix.sum(axis=0) + self.matrix.sum(axis=1)) > 0
+        matrix = self.matrix[present][:, present]
+        labels = self.classes[present]
+
+        tp = np.diag(matrix).astype(float)
+        support = matrix.sum(axis=1).astype(float)
+        predicted = matrix.sum(axis=0).astype(float)
+        zeros = np.zeros_like(tp)
+        precision = np.divide(tp, predicted, out=zeros.copy(), where=predicted > 0)
+        recall = np.divide(tp, support, out=zeros.copy(), where=support > 0)
+        f1 = np.divide(2 * precision * recall, precision + recall, out=zeros.copy(), where=precision + recall > 0)
+        total = support.sum()
+        weights = support / total if total else zeros
+
+        report = {
+            str(label): {"precision": float(p), "recall": float(r), "f1-score": float(f), "support": int(s)}
+            for label, p, r, f, s in zip(labels, precision, recall, f1, support)
+        }
+        report["accuracy"] = self.accuracy()
+        report["macro avg"] = {"precision": float(precision.mean()), "recall": float(recall.mean()),
+                               "f1-score": float(f1.mean()), "support": int(total)}
+        report["weighted avg"] = {"precision": float(weights @ precision), "recall": float(weights @ recall),
+                                  "f1-score": float(weights @ f1), "support": int(total)}
+        return {
+            "precision": float(weights @ precision),
+            "recall": float(weights @ recall),
+            "f1_score": float(weights @ f1),
+            "confusion_matrix": matrix.tolist(),
+            "classification_report": report
+        }
+
+
+class RegressionMetrics:
+    """Somme des carrés des erreurs et variance de la cible (combinaison de Chan)"""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.sse = 0.0
+
+    def update(self, y_true, y_pred):
+        y_true = np.asarray(y_true, dtype=float)
+        if not len(y_true):
+            return
+        n_b = len(y_true)
+        mean_b = y_true.mean()
+        m2_b = float(((y_true - mean_b) ** 2).sum())
+        delta = mean_b - self.mean
+        total = self.n + n_b
+        self.m2 += m2_b + delta ** 2 * self.n * n_b / total
+        self.mean += delta * n_b / total
+        self.n = total
+        self.sse += float(((y_true - np.asarray(y_pred, dtype=float)) ** 2).sum())
+
+    def r2(self) -> float:
+        return 1.0 - self.sse / self.m2 if self.m2 > 0 else 0.0
+
+    def mse(self) -> float:
+        return self.sse / self.n if self.n else 0.0
+
+
+def evaluate(model, source: ChunkSource, task_type: str, classes: Optional[np.ndarray]):
+    """
+    Une passe de prédiction : métriques train et test accumulées, et un
+    échantillon de lignes de test (benchmark d'inférence). Retourne
+    (accumulateur train, accumulateur test, échantillon).
+    """
+    if task_type == "Classification":
+        train, test = ClassificationMetrics(classes), ClassificationMetrics(classes)
+    else:
+        train, test = RegressionMetrics(), RegressionMetrics()
+
+    samples, kept = [], 0
+    for X, y, is_test in source.chunks():
+        y_pred = np.asarray(model.predict(X))
+        y = y.to_numpy()
+        train.update(y[~is_test], y_pred[~is_test])
+        test.update(y[is_test], y_pred[is_test])
+        if kept < SAMPLE_ROWS and is_test.any():
+            sample = X[is_test].iloc[:SAMPLE_ROWS - kept]
+            samples.append(sample)
+            kept += len(sample)
+
+    if test.n == 0:
+        raise ValueError("Jeu de test vide : trop peu de lignes pour ce train_test_split")
+    return train, test, pd.concat(samples)
+
+
+def streaming_metrics(task_type: str, train, test) -> Dict[str, Any]:
+    """Métriques finales, mêmes clés que training.compute_metrics"""
+    if task_type == "Classification":
+        return {"train_accuracy": train.accuracy(), "test_accuracy": test.accuracy(), **test.summary()}
+    mse = test.mse()
+    return {
+        "train_r2": train.r2(),
+        "test_r2": test.r2(),
+        "mse": mse,
+        "rmse": float(np.sqrt(mse))
+    }
@@ -0,0 +1,115 @@
+"""
+Journal asynchrone des prédictions
+Fichier: backend/prediction_log.py
+
+/api/predict ne fait qu'ajouter la prédiction dans un tampon circulaire en
+mémoire ; une tâche de fond l'écrit en base par lots (une transaction et
+un executemany par lot) dès que `flush_rows` lignes sont en attente ou
+toutes les `flush_interval_ms` millisecondes. Une requête ne paie donc
+jamais un commit SQLite.
+
+Contre-pression : atteindre `flush_rows` réveille l'écrivain sans
+attendre la fin de l'intervalle. Si l'écriture ne suit toujours pas et
+que le tampon atteint `capacity`, les plus anciennes entrées sont
+écrasées et comptées dans `dropped` : la journalisation ne ralentit
+jamais les prédictions.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionLogger:
+    """Tampon circulaire + écrivain de fond"""
+
+    def __init__(self, write: Callable[[List[Dict[str, Any]]], int], capacity: int = 10000,
+                 flush_rows: int = 500, flush_interval_ms: float = 1000.0):
+        self.write = write
+        self.capacity = capacity
+        self.flush_rows = flush_rows
+        self.flush_interval_ms = flush_interval_ms
+        self._buffer: deque = deque(maxlen=capacity)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.logged = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Démarrer l'écrivain de fond (dans la boucle asyncio de l'API)"""
+        if not self.running:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Arrêter l'écrivain après avoir écrit ce qui reste dans le tampon"""
+        if self._task is not None:
+            # Pas de cancel() : une écriture en cours dans le thread doit aller au bout
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        while self._buffer:
+            await self._flush()
+
+    def log(self, entry: Dict[str, Any]):
+        """Ajouter une prédiction (non bloquant)"""
+        if len(self._buffer) == self.capacity:
+            # deque(maxlen) écrase l'entrée la plus ancienne
+            self.dropped += 1
+        self._buffer.append(entry)
+        self.logged += 1
+        if len(self._buffer) >= self.flush_rows and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._buffer:
+                await self._flush()
+
+    async def _flush(self):
+        rows = [self._buffer.popleft() for _ in range(min(self.flush_rows, len(self._buffer)))]
+        if not rows:
+            return
+        start = time.perf_counter()
+        try:
+            # Écriture dans un thread : la boucle asyncio continue de servir les requêtes
+            self.written += await asyncio.to_thread(self.write, rows)
+        except Exception as e:
+            self.failed += len(rows)
+            logger.warning("Écriture du journal des prédictions impossible (%d lignes) : %s", len(rows), e)
+        self.flushes += 1
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+
+    def stats(self) -> Dict[str, Any]:
+        """État du journal pour /api/health et /metrics"""
+        return {
+            "running": self.running,
+            "capacity": self.capacity,
+            "buffered": len(self._buffer),
+            "logged": self.logged,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "last_flush_ms": round(self.last_flush_ms, 2)
+        }
@@ -0,0 +1,157 @@
+"""
+Pipeline de preprocessing compilé à partir de DataConfig
+Fichier: backend/preprocessing.py
+
+Le pipeline (imputation, encodage des catégorielles, normalisation) est
+ajusté une seule fois par couple (données, configuration) et versionné
+par un hash de contenu. Le même objet sert à /api/data/configure, à
+l'entraînement, puis est fusionné avec l'estimateur pour que
+/api/predict et /api/predict/batch acceptent directement des données brutes.
+"""
+
+import hashlib
+import json
+import pickle
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MinMaxScaler, OrdinalEncoder, RobustScaler, StandardScaler
+
+SCALERS = {
+    "StandardScaler": StandardScaler,
+    "MinMaxScaler": MinMaxScaler,
+    "RobustScaler": RobustScaler
+}
+
+# Paramètres de DataConfig qui influencent le pipeline
+PIPELINE_CONFIG_KEYS = (
+    "target_column", "handle_missing", "missing_strategy",
+    "normalize", "normalize_method", "feature_columns"
+)
+
+HASH_BLOCK_BYTES = 1024 * 1024
+
+
+def file_hash(path: str) -> str:
+    """Hash SHA-256 d'un fichier, lu par blocs"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while block := f.read(HASH_BLOCK_BYTES):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def pipeline_version(data_hash: str, config: Dict[str, Any]) -> str:
+    """Version du pipeline : hash des données + de la configuration"""
+    relevant = {key: config.get(key) for key in PIPELINE_CONFIG_KEYS}
+    payload = data_hash + json.dumps(relevant, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def split_column_types(X: pd.DataFrame):
+    """Colonnes numériques (booléens compris) / catégorielles"""
+    numeric = X.select_dtypes(include=[np.number, "bool"]).columns.tolist()
+    categorical = [col for col in X.columns if col not in numeric]
+    return numeric, categorical
+
+
+def build_preprocessor(config: Dict[str, Any], X: pd.DataFrame) -> Pipeline:
+    """Construire (sans l'ajuster) le pipeline correspondant à DataConfig"""
+    numeric_cols, categorical_cols = split_column_types(X)
+
+    numeric_steps = []
+    strategy = config.get("missing_strategy")
+    if config.get("handle_missing") and strategy in ("mean", "median"):
+        numeric_steps.append(("imputer", SimpleImputer(strategy=strategy)))
+    elif config.get("handle_missing") and strategy == "zero":
+        numeric_steps.append(("imputer", SimpleImputer(strategy="constant", fill_value=0)))
+    numeric_pipeline = Pipeline(numeric_steps) if numeric_steps else "passthrough"
+
+    # Équivalent de LabelEncoder(astype(str)) mais tolérant aux modalités inconnues
+    categorical_pipeline = Pipeline([
+        ("imputer", SimpleImputer(strategy="constant", fill_value="nan")),
+        ("encoder", OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=-1))
+    ])
+
+    columns = ColumnTransformer(
+        [("num", numeric_pipeline, numeric_cols), ("cat", categorical_pipeline, categorical_cols)],
+        verbose_feature_names_out=False
+    )
+    steps = [("columns", columns)]
+
+    if config.get("normalize"):
+        scaler = SCALERS.get(config.get("normalize_method") or "StandardScaler")
+        if scaler is None:
+            raise ValueError(f"Méthode de normalisation non supportée: {config.get('normalize_method')}")
+        steps.append(("scaler", scaler()))
+
+    return Pipeline(steps).set_output(transform="pandas")
+
+
+def fit_preprocessor(config: Dict[str, Any], df: pd.DataFrame):
+    """
+    Ajuster le pipeline sur les données brutes.
+
+    Retourne (pipeline, X transformé, y). La stratégie "drop" retire les
+    lignes incomplètes avant l'ajustement : ce n'est pas une transformation
+    rejouable au moment de la prédiction.
+    """
+    target_column = config["target_column"]
+    if config.get("handle_missing") and config.get("missing_strategy") == "drop":
+        df = df.dropna()
+    df = df.reset_index(drop=True)
+
+    X = df.drop(columns=[target_column])
+    y = df[target_column]
+
+    # Les catégorielles sont traitées comme des chaînes (comme LabelEncoder(astype(str)))
+    _, categorical_cols = split_column_types(X)
+    X = X.astype({col: object for col in categorical_cols})
+
+    pipeline = build_preprocessor(config, X)
+    X_transformed = pipeline.fit_transform(X)
+    return pipeline, X_transformed, y
+
+
+def make_artifact(pipeline: Pipeline, version: str, data_hash: str, config: Dict[str, Any],
+                  input_columns: List[str]) -> Dict[str, Any]:
+    """Artefact sauvegardé sur disque (pipeline + métadonnées de version)"""
+    return {
+        "pipeline": pipeline,
+        "version": version,
+        "data_hash": data_hash,
+        "config": {key: config.get(key) for key in PIPELINE_CONFIG_KEYS},
+        "target_column": config["target_column"],
+        "input_columns": input_columns,
+        "feature_columns": list(pipeline.get_feature_names_out())
+    }
+
+
+def save_artifact(artifact: Dict[str, Any], path: str):
+    with open(path, 'wb') as f:
+        pickle.dump(artifact, f)
+
+
+def load_artifact(path: Optional[str]) -> Dict[str, Any]:
+    if not path:
+        return {}
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def fuse_with_estimator(preprocessor: Pipeline, estimator) -> Pipeline:
+    """Pipeline preprocessing + modèle, déjà ajustés, pour une inférence en un appel"""
+    return Pipeline([("preprocess", preprocessor), ("model", estimator)])
+
+
+def is_fused(model) -> bool:
+    return isinstance(model, Pipeline) and "preprocess" in model.named_steps
+
+
+def get_estimator(model):
+    """Estimateur nu, que le modèle soit fusionné ou non"""
+    return model.named_steps["model"] if is_fused(model) else model
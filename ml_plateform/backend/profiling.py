@@ -0,0 +1,151 @@
+"""
+Profilage incrémental des jeux de données
+Fichier: backend/profiling.py
+
+Calcule le dict `analysis` de /api/data/upload morceau par morceau. Chaque
+statistique est un agrégat fusionnable (compteurs, moyenne/variance de
+Welford-Chan, min/max, échantillon par clés aléatoires pour les
+quantiles), si bien que la mémoire dépend de la taille d'un morceau et
+non de celle du fichier.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+PREVIEW_ROWS = 10
+QUANTILE_SAMPLE_SIZE = 10000
+
+
+def merge_dtypes(left: Optional[str], right: str) -> str:
+    """Type commun à deux morceaux d'une même colonne"""
+    if left is None or left == right:
+        return right
+    numeric = {"int64", "float64"}
+    if left in numeric and right in numeric:
+        return "float64"
+    return "object"
+
+
+def normalize_dtype(dtype) -> str:
+    """Ramener un dtype pandas à int64 / float64 / bool / object"""
+    if pd.api.types.is_bool_dtype(dtype):
+        return "bool"
+    if pd.api.types.is_integer_dtype(dtype):
+        return "int64"
+    if pd.api.types.is_float_dtype(dtype):
+        return "float64"
+    return "object"
+
+
+class NumericColumnStats:
+    """Agrégats fusionnables pour une colonne numérique"""
+
+    def __init__(self, sample_size: int = QUANTILE_SAMPLE_SIZE, seed: int = 0):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.sample_size = sample_size
+        self._rng = np.random.default_rng(seed)
+        # Échantillon "bottom-k" : on garde les valeurs de plus petites clés aléatoires
+        self._sample_values = np.empty(0)
+        self._sample_keys = np.empty(0)
+
+    def update(self, values: np.ndarray):
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        chunk = NumericColumnStats(self.sample_size)
+        chunk.count = len(values)
+        chunk.mean = float(values.mean())
+        chunk.m2 = float(((values - chunk.mean) ** 2).sum())
+        chunk.min = float(values.min())
+        chunk.max = float(values.max())
+        chunk._sample_values = values
+        chunk._sample_keys = self._rng.random(len(values))
+        self.merge(chunk)
+
+    def merge(self, other: "NumericColumnStats"):
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+        values = np.concatenate([self._sample_values, other._sample_values])
+        keys = np.concatenate([self._sample_keys, other._sample_keys])
+        if len(values) > self.sample_size:
+            keep = np.argpartition(keys, self.sample_size)[:self.sample_size]
+            values, keys = values[keep], keys[keep]
+        self._sample_values, self._sample_keys = values, keys
+
+    def describe(self) -> Dict[str, float]:
+        """Même clés que DataFrame.describe() ; quantiles exacts tant que count <= sample_size"""
+        if self.count == 0:
+            return {"count": 0.0, "mean": None, "std": None, "min": None,
+                    "25%": None, "50%": None, "75%": None, "max": None}
+        q25, q50, q75 = np.quantile(self._sample_values, [0.25, 0.5, 0.75])
+        std = float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else None
+        return {
+            "count": float(self.count),
+            "mean": float(self.mean),
+            "std": std,
+            "min": float(self.min),
+            "25%": float(q25),
+            "50%": float(q50),
+            "75%": float(q75),
+            "max": float(self.max)
+        }
+
+
+class DatasetProfiler:
+    """Construit le dict `analysis` à partir de morceaux successifs"""
+
+    def __init__(self):
+        self.rows = 0
+        self.column_names: List[str] = []
+        self.dtypes: Dict[str, str] = {}
+        self.missing: Dict[str, int] = {}
+        self.numeric: Dict[str, NumericColumnStats] = {}
+        self.preview: List[Dict[str, Any]] = []
+
+    def update(self, chunk: pd.DataFrame):
+        if not self.column_names:
+            self.column_names = [str(col) for col in chunk.columns]
+
+        self.rows += len(chunk)
+        if len(self.preview) < PREVIEW_ROWS:
+            self.preview.extend(chunk.head(PREVIEW_ROWS - len(self.preview)).to_dict('records'))
+
+        missing = chunk.isnull().sum()
+        for col in chunk.columns:
+            name = str(col)
+            self.missing[name] = self.missing.get(name, 0) + int(missing[col])
+            self.dtypes[name] = merge_dtypes(self.dtypes.get(name), normalize_dtype(chunk[col].dtype))
+            if self.dtypes[name] in ("int64", "float64"):
+                stats = self.numeric.setdefault(name, NumericColumnStats())
+                stats.update(chunk[col].to_numpy(dtype=float, na_value=np.nan))
+            else:
+                # La colonne n'est plus numérique : ses stats n'ont plus de sens
+                self.numeric.pop(name, None)
+
+    def result(self) -> Dict[str, Any]:
+        numeric_columns = [col for col in self.column_names if self.dtypes.get(col) in ("int64", "float64")]
+        return {
+            "rows": self.rows,
+            "columns": len(self.column_names),
+            "column_names": self.column_names,
+            "column_types": {col: self.dtypes[col] for col in self.column_names},
+            "missing_values": {col: self.missing[col] for col in self.column_names},
+            "numeric_columns": numeric_columns,
+            "categorical_columns": [col for col in self.column_names if self.dtypes.get(col) == "object"],
+            "preview": self.preview,
+            "statistics": {col: self.numeric[col].describe() for col in numeric_columns if col in self.numeric}
+        }
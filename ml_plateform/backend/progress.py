@@ -0,0 +1,244 @@
+"""
+Progression des entraînements en temps réel
+Fichier: backend/progress.py
+
+Côté worker (processus du pool d'entraînement) : `emit` pousse des
+événements (phase, fold de validation croisée, itération de boosting)
+dans une file multiprocessing transmise par l'initializer du pool.
+
+Côté API : un thread lit cette file et remet les événements à la boucle
+asyncio ; `ProgressHub` les numérote, garde un historique par
+expérience (rejoué aux abonnés tardifs, reprise via Last-Event-ID) et
+les diffuse aux abonnés du flux SSE /api/train/events/{experiment_id}.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from typing import Any, AsyncIterator, Dict, Optional
+
+TERMINAL_STATUSES = ("completed", "failed", "stopped")
+
+# ==================== CÔTÉ WORKER ====================
+
+_queue = None
+_experiment_id: Optional[str] = None
+
+
+def init_worker(queue):
+    """Initializer du ProcessPoolExecutor : file partagée avec l'API"""
+    global _queue
+    _queue = queue
+
+
+def set_experiment(experiment_id: Optional[str]):
+    """Expérience à laquelle rattacher les prochains événements du worker"""
+    global _experiment_id
+    _experiment_id = experiment_id
+
+
+def emit(event_type: str, **fields):
+    """Publier un événement (sans effet hors d'un worker ou sans expérience)"""
+    if _queue is None or _experiment_id is None:
+        return
+    try:
+        _queue.put_nowait({"experiment_id": _experiment_id, "type": event_type, "time": time.time(), **fields})
+    except Exception:
+        # La progression est informative : elle ne doit jamais faire échouer un entraînement
+        pass
+
+
+class IterationReporter:
+    """
+    Événements "iteration" d'un modèle de boosting, limités à un toutes
+    les `min_interval` secondes (la dernière itération est toujours émise).
+    """
+
+    def __init__(self, total: int, metric: Optional[str] = None, min_interval: float = 0.1):
+        self.total = total
+        self.metric = metric
+        self.min_interval = min_interval
+        self._last_emit = 0.0
+
+    def __call__(self, iteration: int, train_loss: Optional[float] = None,
+                 valid_loss: Optional[float] = None, force: bool = False):
+        now = time.perf_counter()
+        if not force and iteration < self.total and now - self._last_emit < self.min_interval:
+            return
+        self._last_emit = now
+        emit("iteration", iteration=iteration, total=self.total, metric=self.metric,
+             train_loss=train_loss, valid_loss=valid_loss)
+
+
+def xgboost_callback(total: int):
+    """Callback XGBoost : pertes du dernier tour sur validation_0 (train) et validation_1 (test)"""
+    import xgboost as xgb
+
+    class XGBoostProgress(xgb.callback.TrainingCallback):
+        def __init__(self):
+            super().__init__()
+            self.reporter = IterationReporter(total)
+
+        def after_iteration(self, model, epoch, evals_log):
+            losses = []
+            for name in ("validation_0", "validation_1"):
+                metrics = evals_log.get(name) or {}
+                metric, values = next(iter(metrics.items()), (None, None))
+                if metric is not None:
+                    self.reporter.metric = metric
+                losses.append(float(values[-1]) if values else None)
+            self.reporter(epoch + 1, *losses)
+            return False  # ne jamais interrompre l'entraînement
+
+    return XGBoostProgress()
+
+
+class GradientBoostingMonitor:
+    """`monitor` de GradientBoosting*.fit : perte d'entraînement après chaque étage"""
+
+    def __init__(self, total: int):
+        self.reporter = IterationReporter(total, metric="train_score")
+
+    def __call__(self, i, estimator, local_variables) -> bool:
+        self.reporter(i + 1, float(estimator.train_score_[i]))
+        return False
+
+
+# ==================== CÔTÉ API ====================
+
+class _Channel:
+    def __init__(self, history: int):
+        self.events: deque = deque(maxlen=history)
+        self.subscribers: set = set()
+        self.next_id = 1
+        self.finished = False
+
+
+class ProgressHub:
+    """Historique + diffusion des événements de progression, par expérience"""
+
+    def __init__(self, history: int = 2000, max_finished: int = 100, subscriber_queue: int = 1000,
+                 terminal_delay: float = 0.25, keepalive: float = 15.0):
+        self.history = history
+        self.max_finished = max_finished
+        self.subscriber_queue = subscriber_queue
+        # Les derniers événements d'un worker peuvent arriver après la fin du job
+        # (file multiprocessing) : le statut final est publié avec ce délai
+        self.terminal_delay = terminal_delay
+        self.keepalive = keepalive
+        self._channels: "OrderedDict[str, _Channel]" = OrderedDict()
+        self._reader: Optional[threading.Thread] = None
+        self.counters = defaultdict(int)
+
+    def has(self, experiment_id: str) -> bool:
+        return experiment_id in self._channels
+
+    def _channel(self, experiment_id: str) -> _Channel:
+        channel = self._channels.get(experiment_id)
+        if channel is None:
+            channel = self._channels[experiment_id] = _Channel(self.history)
+        return channel
+
+    def publish(self, experiment_id: str, event: Dict[str, Any]):
+        """Publier un événement (dans la boucle asyncio)"""
+        channel = self._channel(experiment_id)
+        event = {**event, "id": channel.next_id, "experiment_id": experiment_id}
+        event.setdefault("time", time.time())
+        channel.next_id += 1
+        channel.events.append(event)
+        self.counters["events"] += 1
+        for queue in channel.subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.counters["dropped"] += 1
+
+        if event["type"] == "status" and event.get("status") in TERMINAL_STATUSES:
+            channel.finished = True
+            self._channels.move_to_end(experiment_id)
+            self._evict_finished()
+
+    def publish_status(self, experiment_id: str, status: str, **fields):
+        """Changement d'état du job ; l'état final est différé de `terminal_delay`"""
+        event = {"type": "status", "status": status, **fields}
+        if status in TERMINAL_STATUSES and self.terminal_delay > 0:
+            asyncio.get_running_loop().call_later(self.terminal_delay, self.publish, experiment_id, event)
+        else:
+            self.publish(experiment_id, event)
+
+    def _evict_finished(self):
+        finished = [key for key, channel in self._channels.items() if channel.finished and not channel.subscribers]
+        for key in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._channels[key]
+
+    async def subscribe(self, experiment_id: str, last_event_id: int = 0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Événements postérieurs à `last_event_id` (historique puis direct),
+        jusqu'au statut final. Produit None toutes les `keepalive` secondes
+        sans événement (maintien de la connexion).
+        """
+        channel = self._channel(experiment_id)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.subscriber_queue)
+        replay = [event for event in channel.events if event["id"] > last_event_id]
+        finished = channel.finished
+        channel.subscribers.add(queue)
+        self.counters["subscriptions"] += 1
+        try:
+            for event in replay:
+                yield event
+            if finished:
+                return
+            last_seen = replay[-1]["id"] if replay else last_event_id
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=self.keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event["id"] <= last_seen:
+                    continue
+                last_seen = event["id"]
+                yield event
+                if event["type"] == "status" and event.get("status") in TERMINAL_STATUSES:
+                    return
+        finally:
+            channel.subscribers.discard(queue)
+
+    # -------- lecture de la file des workers --------
+
+    def start_reader(self, queue, loop: asyncio.AbstractEventLoop):
+        """Thread qui transfère les événements des workers vers la boucle asyncio"""
+        if self._reader is not None:
+            return
+
+        def read():
+            while True:
+                event = queue.get()
+                if event is None:
+                    return
+                experiment_id = event.pop("experiment_id")
+                try:
+                    loop.call_soon_threadsafe(self.publish, experiment_id, event)
+                except RuntimeError:  # boucle fermée
+                    return
+
+        self._reader = threading.Thread(target=read, name="training-progress-reader", daemon=True)
+        self._reader.start()
+
+    def stop_reader(self, queue):
+        if self._reader is not None:
+            queue.put(None)
+            self._reader.join(timeout=2)
+            self._reader = None
+
+    def stats(self) -> Dict[str, Any]:
+        """État du hub pour /api/health et /metrics"""
+        return {
+            "experiments": len(self._channels),
+            "active_experiments": sum(1 for channel in self._channels.values() if not channel.finished),
+            "subscribers": sum(len(channel.subscribers) for channel in self._channels.values()),
+            "events": self.counters["events"],
+            "dropped": self.counters["dropped"],
+            "subscriptions": self.counters["subscriptions"]
+        }
@@ -0,0 +1,388 @@
+"""
+Recherche d'hyperparamètres parallèle
+Fichier: backend/search.py
+
+Stratégies : grille, aléatoire, successive halving et Hyperband. Chaque
+essai est évalué en validation croisée dans le pool de processus des
+entraînements (`run_task`, voir jobs.py), dont il partage les places ; le
+nombre de threads BLAS/OpenMP et le `n_jobs` des modèles sont bornés à
+`n_threads` pour que les essais parallèles ne se marchent pas dessus.
+
+Les essais perdants sont arrêtés tôt : règle de la médiane sur le premier
+fold pour grille/aléatoire, élimination par paliers de ressources (fraction
+des lignes d'entraînement) pour successive halving et Hyperband.
+
+Comme training.py, ce module ne doit pas importer main.py.
+"""
+
+import asyncio
+import itertools
+import math
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import KFold, StratifiedKFold, train_test_split
+from threadpoolctl import threadpool_limits
+
+import datastore
+from training import get_model_instance
+
+STRATEGIES = ("grid", "random", "halving", "hyperband")
+
+# Nombre minimal de premiers folds observés avant d'appliquer la règle de la médiane
+MEDIAN_STOPPING_MIN_TRIALS = 3
+
+# Espaces de recherche utilisés quand la requête n'en fournit pas
+DEFAULT_SEARCH_SPACES = {
+    "Random Forest": {
+        "n_estimators": [50, 100, 200, 400],
+        "max_depth": [None, 5, 10, 20],
+        "min_samples_leaf": [1, 2, 5]
+    },
+    "XGBoost": {
+        "n_estimators": [100, 200, 400],
+        "learning_rate": {"low": 0.01, "high": 0.3, "log": True},
+        "max_depth": {"low": 3, "high": 10, "type": "int"},
+        "subsample": {"low": 0.5, "high": 1.0}
+    },
+    "SVM": {
+        "C": {"low": 0.01, "high": 100.0, "log": True},
+        "kernel": ["rbf", "linear"]
+    },
+    "Logistic Regression": {
+        "C": {"low": 0.001, "high": 100.0, "log": True},
+        "max_iter": [1000]
+    },
+    "Linear Regression": {
+        "fit_intercept": [True, False]
+    },
+    "KNN": {
+        "n_neighbors": {"low": 1, "high": 50, "type": "int"},
+        "weights": ["uniform", "distance"]
+    },
+    "Gradient Boosting": {
+        "n_estimators": [50, 100, 200],
+        "learning_rate": {"low": 0.01, "high": 0.3, "log": True},
+        "max_depth": {"low": 2, "high": 8, "type": "int"}
+    }
+}
+
+
+# ==================== ESPACE DE RECHERCHE ====================
+
+def _is_distribution(values) -> bool:
+    return isinstance(values, dict)
+
+
+def grid_candidates(space: Dict[str, Any], max_trials: int) -> List[Dict[str, Any]]:
+    """Produit cartésien des valeurs ; les distributions continues sont refusées"""
+    continuous = [name for name, values in space.items() if _is_distribution(values)]
+    if continuous:
+        raise ValueError(f"La recherche par grille demande des listes de valeurs: {continuous}")
+    names = list(space)
+    values = [space[name] if isinstance(space[name], list) else [space[name]] for name in names]
+    size = math.prod(len(v) for v in values)
+    if size > max_trials:
+        raise ValueError(f"Grille trop grande: {size} combinaisons (max {max_trials})")
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+def sample_value(values, rng: np.random.Generator):
+    """Tirer une valeur : liste -> choix, dict {low, high, log, type} -> distribution"""
+    if isinstance(values, list):
+        return values[rng.integers(len(values))]
+    if not _is_distribution(values):
+        return values
+    low, high = values["low"], values["high"]
+    if values.get("log"):
+        value = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+    else:
+        value = float(rng.uniform(low, high))
+    if values.get("type") == "int":
+        return int(round(value))
+    return value
+
+
+def random_candidates(space: Dict[str, Any], n_trials: int, rng: np.random.Generator) -> List[Dict[str, Any]]:
+    return [{name: sample_value(values, rng) for name, values in space.items()} for _ in range(n_trials)]
+
+
+def halving_resources(min_resource: float, eta: int) -> List[float]:
+    """Paliers de ressources eta^-k, ..., eta^-1, 1"""
+    rungs = max(0, int(math.floor(math.log(1 / min_resource, eta) + 1e-9)))
+    return [float(eta ** (i - rungs)) for i in range(rungs + 1)]
+
+
+# ==================== WORKER ====================
+
+# Données chargées une fois par processus du pool
+_DATA_CACHE: Dict[Any, Any] = {}
+
+
+def _load_training_data(path: str, target_column: str, train_size: float):
+    """Partie entraînement du split utilisé par run_training_job (même graine)"""
+    key = (path, target_column, train_size, os.path.getmtime(path))
+    if key not in _DATA_CACHE:
+        _DATA_CACHE.clear()
+        df = datastore.load_dataframe(path)
+        X = df.drop(columns=[target_column])
+        y = df[target_column]
+        X_train, _, y_train, _ = train_test_split(X, y, test_size=1-train_size, random_state=42)
+        _DATA_CACHE[key] = (X_train.reset_index(drop=True), y_train.reset_index(drop=True))
+    return _DATA_CACHE[key]
+
+
+def _cv_splits(task_type: str, X, y, cv_folds: int, seed: int):
+    if task_type == "Classification":
+        try:
+            return list(StratifiedKFold(cv_folds, shuffle=True, random_state=seed).split(X, y))
+        except ValueError:
+            # Classe trop rare dans le sous-échantillon : pas de stratification
+            pass
+    return list(KFold(cv_folds, shuffle=True, random_state=seed).split(X))
+
+
+def _limit_model_threads(model, n_threads: int, hyperparameters: Dict[str, Any]):
+    """Borner le parallélisme interne du modèle si l'utilisateur ne l'a pas fixé"""
+    if "n_jobs" in model.get_params() and "n_jobs" not in hyperparameters:
+        model.set_params(n_jobs=n_threads)
+    return model
+
+
+def run_search_trial(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Évaluer une configuration sur certains folds (point d'entrée des workers).
+
+    `task["resource"]` est la fraction des lignes d'entraînement utilisée ;
+    `task["folds"]` la liste des folds à évaluer. Retourne les scores
+    (plus grand = meilleur) et le temps passé.
+    """
+    X, y = _load_training_data(task["processed_path"], task["target_column"], task["train_test_split"])
+    seed = task["random_state"]
+
+    resource = task["resource"]
+    if resource < 1.0:
+        n_rows = max(int(len(X) * resource), 2 * task["cv_folds"])
+        rows = np.random.default_rng(seed).permutation(len(X))[:n_rows]
+        X, y = X.iloc[rows].reset_index(drop=True), y.iloc[rows].reset_index(drop=True)
+
+    splits = _cv_splits(task["task_type"], X, y, task["cv_folds"], seed)
+    scorer = get_scorer(task["scoring"]) if task.get("scoring") else None
+
+    scores = []
+    start_time = time.perf_counter()
+    with threadpool_limits(limits=task["n_threads"]):
+        for fold in task["folds"]:
+            train_idx, valid_idx = splits[fold]
+            model = get_model_instance(task["model_type"], task["task_type"], task["hyperparameters"])
+            model = _limit_model_threads(model, task["n_threads"], task["hyperparameters"])
+            model.fit(X.iloc[train_idx], y.iloc[train_idx])
+            X_valid, y_valid = X.iloc[valid_idx], y.iloc[valid_idx]
+            score = scorer(model, X_valid, y_valid) if scorer else model.score(X_valid, y_valid)
+            scores.append(float(score))
+
+    return {"scores": scores, "fit_time": time.perf_counter() - start_time}
+
+
+# ==================== COORDINATION ====================
+
+class HyperparameterSearch:
+    """
+    Orchestration d'une recherche dans la boucle asyncio.
+
+    `run_task(func, payload)` exécute un essai dans un processus worker ;
+    au plus `n_workers` essais de la recherche sont en vol à la fois, avec
+    `n_threads` threads chacun. `on_trial(trial)` (coroutine) est attendu
+    une fois par essai terminé (completed, stopped ou failed) pour
+    l'enregistrer comme expérience.
+    """
+
+    def __init__(self, base_task: Dict[str, Any], space: Dict[str, Any], fixed: Dict[str, Any],
+                 run_task: Callable[[Callable, Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                 strategy: str = "random", n_trials: int = 20, eta: int = 3,
+                 min_resource: float = 0.1, early_stopping: bool = True,
+                 n_workers: int = 1, n_threads: int = 1, max_trials: int = 200,
+                 random_state: int = 42, on_trial: Optional[Callable[[Dict[str, Any]], Awaitable]] = None):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Stratégie non supportée: {strategy} (attendu: {', '.join(STRATEGIES)})")
+        if eta < 2:
+            raise ValueError("eta doit être >= 2")
+        if not 0 < min_resource <= 1:
+            raise ValueError("min_resource doit être dans ]0, 1]")
+        if not space:
+            raise ValueError("Espace de recherche vide")
+        if strategy != "grid" and n_trials < 1:
+            raise ValueError("n_trials doit être >= 1")
+        if strategy == "grid":
+            # Grille invalide ou trop grande : erreur avant de lancer quoi que ce soit
+            grid_candidates(space, max_trials)
+
+        self.base_task = base_task
+        self.space = space
+        self.fixed = fixed
+        self.strategy = strategy
+        self.n_trials = min(n_trials, max_trials)
+        self.eta = eta
+        self.min_resource = min_resource
+        self.early_stopping = early_stopping
+        self.max_trials = max_trials
+        self.rng = np.random.default_rng(random_state)
+        self.on_trial = on_trial
+
+        self.run_task = run_task
+        self.n_workers = max(1, n_workers)
+        self.n_threads = max(1, n_threads)
+
+        self.trials: List[Dict[str, Any]] = []
+        self._first_fold_scores: List[float] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    # ---------- évaluation ----------
+
+    def _new_trial(self, params: Dict[str, Any], bracket: Optional[int] = None) -> Dict[str, Any]:
+        trial = {
+            "trial": len(self.trials),
+            "params": params,
+            "hyperparameters": {**self.fixed, **params},
+            "status": "running",
+            "score": None,
+            "cv_scores": [],
+            "resource": None,
+            "rung": 0,
+            "bracket": bracket,
+            "fit_time": 0.0,
+            "error": None
+        }
+        self.trials.append(trial)
+        return trial
+
+    async def _evaluate(self, trial: Dict[str, Any], folds: List[int], resource: float) -> List[float]:
+        task = {
+            **self.base_task,
+            "hyperparameters": trial["hyperparameters"],
+            "folds": folds,
+            "resource": resource,
+            "n_threads": self.n_threads,
+            "random_state": self.base_task["random_state"]
+        }
+        async with self._slots:
+            result = await self.run_task(run_search_trial, task)
+        trial["fit_time"] += result["fit_time"]
+        trial["resource"] = resource
+        return result["scores"]
+
+    async def _finish(self, trial: Dict[str, Any], status: str, error: Optional[str] = None):
+        trial["status"] = status
+        trial["error"] = error
+        if trial["cv_scores"]:
+            trial["score"] = float(np.mean(trial["cv_scores"]))
+            trial["cv_std"] = float(np.std(trial["cv_scores"]))
+        if self.on_trial is not None:
+            await self.on_trial(trial)
+
+    async def _run_full_trial(self, trial: Dict[str, Any]):
+        """Grille / aléatoire : premier fold, règle de la médiane, puis folds restants"""
+        cv_folds = self.base_task["cv_folds"]
+        try:
+            first = await self._evaluate(trial, [0], 1.0)
+            trial["cv_scores"] = first
+            previous = list(self._first_fold_scores)
+            self._first_fold_scores.append(first[0])
+            if (self.early_stopping and len(previous) >= MEDIAN_STOPPING_MIN_TRIALS
+                    and first[0] < float(np.median(previous))):
+                await self._finish(trial, "stopped")
+                return
+            trial["cv_scores"] += await self._evaluate(trial, list(range(1, cv_folds)), 1.0)
+        except Exception as e:
+            await self._finish(trial, "failed", str(e))
+            return
+        await self._finish(trial, "completed")
+
+    async def _successive_halving(self, candidates: List[Dict[str, Any]], resources: List[float],
+                                  bracket: Optional[int] = None):
+        """Évaluer tous les survivants à chaque palier, ne garder que le meilleur 1/eta"""
+        folds = list(range(self.base_task["cv_folds"]))
+        survivors = [self._new_trial(params, bracket) for params in candidates]
+
+        for rung, resource in enumerate(resources):
+            async def evaluate(trial):
+                try:
+                    trial["cv_scores"] = await self._evaluate(trial, folds, resource)
+                    trial["rung"] = rung
+                except Exception as e:
+                    await self._finish(trial, "failed", str(e))
+
+            await asyncio.gather(*(evaluate(trial) for trial in survivors))
+            survivors = [trial for trial in survivors if trial["status"] == "running"]
+            survivors.sort(key=lambda trial: float(np.mean(trial["cv_scores"])), reverse=True)
+
+            if rung == len(resources) - 1:
+                for trial in survivors:
+                    await self._finish(trial, "completed")
+                return
+
+            keep = max(1, len(survivors) // self.eta)
+            for trial in survivors[keep:]:
+                await self._finish(trial, "stopped")
+            survivors = survivors[:keep]
+
+    def _candidates(self, n: int) -> List[Dict[str, Any]]:
+        # Espace entièrement discret et plus petit que n : on prend toute la grille
+        if all(not _is_distribution(values) for values in self.space.values()):
+            grid = grid_candidates(self.space, 10 ** 9)
+            if len(grid) <= n:
+                return grid
+        return random_candidates(self.space, n, self.rng)
+
+    # ---------- stratégies ----------
+
+    async def _run_strategy(self):
+        if self.strategy == "grid":
+            trials = [self._new_trial(params) for params in grid_candidates(self.space, self.max_trials)]
+            await asyncio.gather(*(self._run_full_trial(trial) for trial in trials))
+
+        elif self.strategy == "random":
+            trials = [self._new_trial(params) for params in self._candidates(self.n_trials)]
+            await asyncio.gather(*(self._run_full_trial(trial) for trial in trials))
+
+        elif self.strategy == "halving":
+            resources = halving_resources(self.min_resource, self.eta)
+            await self._successive_halving(self._candidates(self.n_trials), resources)
+
+        else:
+            # Hyperband : plusieurs brackets de successive halving, du plus
+            # agressif (beaucoup de configs, peu de données) au plus prudent
+            s_max = len(halving_resources(self.min_resource, self.eta)) - 1
+            sizes = {s: int(math.ceil((s_max + 1) / (s + 1) * self.eta ** s)) for s in range(s_max, -1, -1)}
+            # n_trials essais au total, répartis au prorata des tailles nominales des brackets
+            scale = self.n_trials / sum(sizes.values())
+            brackets = []
+            budget = self.n_trials
+            for s, size in sizes.items():
+                # Le dernier bracket prend le reste (arrondis)
+                n = budget if s == 0 else min(max(1, int(round(size * scale))), budget)
+                if n <= 0:
+                    break
+                budget -= n
+                resources = [float(self.eta ** (i - s)) for i in range(s + 1)]
+                brackets.append(self._successive_halving(self._candidates(n), resources, bracket=s))
+            await asyncio.gather(*brackets)
+
+    async def run(self) -> List[Dict[str, Any]]:
+        """Lancer la recherche ; retourne le classement"""
+        self._slots = asyncio.Semaphore(self.n_workers)
+        await self._run_strategy()
+        return self.leaderboard()
+
+    def leaderboard(self) -> List[Dict[str, Any]]:
+        """Essais complets d'abord, puis arrêtés (ressource atteinte, score), puis en échec"""
+        order = {"completed": 0, "stopped": 1, "failed": 2, "running": 3}
+        ranked = sorted(
+            self.trials,
+            key=lambda trial: (order[trial["status"]], -(trial["resource"] or 0.0),
+                               -(trial["score"] if trial["score"] is not None else -np.inf))
+        )
+        return [{"rank": rank + 1, **trial} for rank, trial in enumerate(ranked)]
@@ -0,0 +1,592 @@
+"""
+Moteur d'entraînement exécuté dans les workers
+Fichier: backend/training.py
+
+Ce module ne doit pas importer main.py : il est chargé par les processus
+du pool d'entraînement (voir jobs.py).
+"""
+
+from typing import Dict, Any, List, Optional
+from contextlib import contextmanager
+import pandas as pd
+import numpy as np
+
+import os
+import time
+# Imports ML
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor, GradientBoostingClassifier
+from sklearn.svm import SVC, SVR
+from sklearn.linear_model import LogisticRegression, LinearRegression, SGDClassifier, SGDRegressor
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.naive_bayes import GaussianNB
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split, KFold, StratifiedKFold
+from sklearn.metrics import (
+    accuracy_score, precision_score, recall_score, f1_score,
+    confusion_matrix, classification_report, mean_squared_error, r2_score
+)
+import xgboost as xgb
+from joblib import Parallel, delayed
+
+import artifacts
+import progress
+import datastore
+import out_of_core
+import preprocessing
+import tree_inference
+
+
+def get_model_instance(model_type: str, task_type: str, hyperparameters: Dict):
+    """Instancier un modèle selon le type"""
+    if model_type == "Random Forest":
+        if task_type == "Classification":
+            return RandomForestClassifier(**hyperparameters)
+        else:
+            return RandomForestRegressor(**hyperparameters)
+
+    elif model_type == "XGBoost":
+        if task_type == "Classification":
+            return xgb.XGBClassifier(**hyperparameters)
+        else:
+            return xgb.XGBRegressor(**hyperparameters)
+
+    elif model_type == "SVM":
+        if task_type == "Classification":
+            return SVC(**hyperparameters, probability=True)
+        else:
+            return SVR(**hyperparameters)
+
+    elif model_type == "Logistic Regression":
+        return LogisticRegression(**hyperparameters)
+
+    elif model_type == "Linear Regression":
+        return LinearRegression(**hyperparameters)
+
+    elif model_type == "KNN":
+        return KNeighborsClassifier(**hyperparameters)
+
+    elif model_type == "Gradient Boosting":
+        return GradientBoostingClassifier(**hyperparameters)
+
+    elif model_type == "SGD":
+        if task_type == "Classification":
+            return SGDClassifier(**hyperparameters)
+        else:
+            return SGDRegressor(**hyperparameters)
+
+    elif model_type == "Naive Bayes":
+        if task_type != "Classification":
+            raise ValueError("Naive Bayes ne supporte que la classification")
+        return GaussianNB(**hyperparameters)
+
+    else:
+        raise ValueError(f"Type de modèle non supporté: {model_type}")
+
+
+def compute_metrics(task_type: str, y_train, y_pred_train, y_test, y_pred_test) -> Dict[str, Any]:
+    """Calculer les métriques train/test selon le type de tâche"""
+    if task_type == "Classification":
+        return {
+            "train_accuracy": float(accuracy_score(y_train, y_pred_train)),
+            "test_accuracy": float(accuracy_score(y_test, y_pred_test)),
+            "precision": float(precision_score(y_test, y_pred_test, average='weighted', zero_division=0)),
+            "recall": float(recall_score(y_test, y_pred_test, average='weighted', zero_division=0)),
+            "f1_score": float(f1_score(y_test, y_pred_test, average='weighted', zero_division=0)),
+            "confusion_matrix": confusion_matrix(y_test, y_pred_test).tolist(),
+            "classification_report": classification_report(y_test, y_pred_test, output_dict=True, zero_division=0)
+        }
+
+    mse = float(mean_squared_error(y_test, y_pred_test))
+    return {
+        "train_r2": float(r2_score(y_train, y_pred_train)),
+        "test_r2": float(r2_score(y_test, y_pred_test)),
+        "mse": mse,
+        "rmse": float(np.sqrt(mse))
+    }
+
+
+@contextmanager
+def phase_timer(timings: Dict[str, float], phase: str):
+    """Cumuler la durée (s) d'une phase de l'entraînement dans `timings` (et la publier)"""
+    progress.emit("phase", phase=phase, state="started")
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        timings[phase] = timings.get(phase, 0.0) + elapsed
+        progress.emit("phase", phase=phase, state="finished", seconds=elapsed)
+
+
+# ==================== VALIDATION CROISÉE ====================
+
+def fold_assignments(y: pd.Series, task_type: str, cv_folds: int,
+                     cache_dir: Optional[str] = None, data_version: Optional[str] = None) -> np.ndarray:
+    """
+    Numéro de fold de chaque ligne (stratifié en classification).
+
+    Même découpage que `cross_val_score(model, X, y, cv=cv_folds)` : folds
+    contigus, sans mélange, pour que cv_scores / cv_mean restent
+    comparables avec les expériences existantes.
+
+    Le résultat ne dépend que des données et des paramètres du découpage :
+    il est mis en cache sur disque par version des données, et partagé
+    par tous les entraînements du projet.
+    """
+    cache_path = None
+    if cache_dir and data_version:
+        kind = "stratified" if task_type == "Classification" else "kfold"
+        cache_path = os.path.join(cache_dir, f"folds_{data_version}_{kind}_{cv_folds}.npy")
+        if os.path.exists(cache_path):
+            folds = np.load(cache_path)
+            if len(folds) == len(y):
+                return folds
+
+    # StratifiedKFold refuse seulement si aucune classe n'a cv_folds lignes
+    if task_type == "Classification" and y.value_counts().max() >= cv_folds:
+        splitter = StratifiedKFold(cv_folds)
+    else:
+        splitter = KFold(cv_folds)
+
+    folds = np.empty(len(y), dtype=np.int16)
+    for fold, (_, valid_idx) in enumerate(splitter.split(np.zeros(len(y)), y)):
+        folds[valid_idx] = fold
+
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.save(cache_path, folds)
+    return folds
+
+
+def fold_score(task_type: str, y_true, y_pred) -> float:
+    """Score d'un fold : accuracy ou R², comme cross_val_score"""
+    if task_type == "Classification":
+        return float(accuracy_score(y_true, y_pred))
+    return float(r2_score(y_true, y_pred))
+
+
+def _fit_fold(estimator, X: pd.DataFrame, y: pd.Series, folds: np.ndarray, fold: int, task_type: str):
+    """Ajuster un clone sur les autres folds et prédire/scorer le fold `fold`"""
+    valid = folds == fold
+    model = clone(estimator)
+    start = time.perf_counter()
+    model.fit(X[~valid], y[~valid])
+    fit_time = time.perf_counter() - start
+    predictions = model.predict(X[valid])
+    score = fold_score(task_type, y[valid], predictions)
+    progress.emit("cv_fold", fold=fold, n_folds=int(folds.max()) + 1, score=score, fit_seconds=fit_time)
+    return np.flatnonzero(valid), predictions, score, fit_time
+
+
+def cross_validate_oof(estimator, X: pd.DataFrame, y: pd.Series, folds: np.ndarray,
+                       task_type: str, n_jobs: int = 1) -> Dict[str, Any]:
+    """
+    Validation croisée parallèle (un fit par fold, `n_jobs` folds à la fois).
+
+    Retourne les scores par fold (accuracy ou R², comme cross_val_score)
+    et les prédictions hors fold de chaque ligne.
+    """
+    n_folds = int(folds.max()) + 1
+    # Threads plutôt que processus : on tourne déjà dans un worker du pool
+    # d'entraînement, et les fits (arbres, XGBoost, libsvm) relâchent le GIL
+    results = Parallel(n_jobs=n_jobs, backend="threading")(
+        delayed(_fit_fold)(estimator, X, y, folds, fold, task_type) for fold in range(n_folds)
+    )
+
+    oof = np.empty(len(y), dtype=np.asarray(results[0][1]).dtype)
+    for valid_idx, predictions, _, _ in results:
+        oof[valid_idx] = predictions
+
+    return {
+        "scores": np.array([score for _, _, score, _ in results]),
+        "oof_predictions": oof,
+        "fold_fit_times": [fit_time for _, _, _, fit_time in results]
+    }
+
+
+def fit_with_progress(model, X_train, y_train, X_valid=None, y_valid=None, **fit_params):
+    """
+    Ajustement final, en publiant la perte après chaque itération pour les
+    modèles de boosting (XGBoost : train et, si fourni, jeu de validation ;
+    GradientBoosting : perte d'entraînement). Les autres modèles n'ont pas
+    de progression intermédiaire : seules les phases sont publiées.
+    """
+    if isinstance(model, (xgb.XGBClassifier, xgb.XGBRegressor)):
+        total = model.get_params().get("n_estimators") or 100
+        eval_set = [(X_train, y_train)]
+        if X_valid is not None:
+            eval_set.append((X_valid, y_valid))
+        model.set_params(callbacks=[progress.xgboost_callback(total)])
+        try:
+            model.fit(X_train, y_train, eval_set=eval_set, verbose=False, **fit_params)
+        finally:
+            # Le callback n'a pas à être sauvegardé avec le modèle
+            model.set_params(callbacks=None)
+    elif isinstance(model, GradientBoostingClassifier):
+        model.fit(X_train, y_train, monitor=progress.GradientBoostingMonitor(model.n_estimators))
+    else:
+        model.fit(X_train, y_train)
+
+
+def run_training_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Exécuter un entraînement complet (point d'entrée des workers).
+
+    `job` contient uniquement des données sérialisables : chemins des
+    données preprocessées, configuration du modèle et identifiant du
+    modèle à produire. Retourne les métriques, les durées par phase et
+    les infos du fichier modèle sauvegardé.
+
+    Avec `holdout_from_oof`, il n'y a pas de split train/test : les
+    métriques de test sont calculées sur les prédictions hors fold de la
+    validation croisée, et le modèle final est ajusté une seule fois sur
+    toutes les données.
+
+    Avec `training_mode` = "out_of_core", les données ne sont jamais
+    chargées entièrement (voir out_of_core.py).
+    """
+    config = job["config"]
+    task_type = job["task_type"]
+    timings: Dict[str, Any] = {}
+    progress.set_experiment(job.get("experiment_id"))
+    try:
+        if job.get("training_mode") == "out_of_core":
+            return _run_out_of_core_job(job, config, task_type, timings)
+        return _run_training_job(job, config, task_type, timings)
+    finally:
+        progress.set_experiment(None)
+
+
+def _run_training_job(job: Dict[str, Any], config: Dict[str, Any], task_type: str,
+                      timings: Dict[str, Any]) -> Dict[str, Any]:
+
+    # Charger les données preprocessées (Parquet, memory map)
+    with phase_timer(timings, "load"):
+        df = datastore.load_dataframe(job["processed_path"])
+        artifact = preprocessing.load_artifact(job.get("preprocessor_path"))
+    target_column = job["target_column"]
+
+    X = df.drop(columns=[target_column])
+    y = df[target_column]
+
+    # Instancier le modèle
+    model = get_model_instance(
+        config["model_type"],
+        task_type,
+        config["hyperparameters"]
+    )
+
+    use_cv = config["use_cross_validation"] or config.get("holdout_from_oof")
+    cv = None
+    if use_cv:
+        with phase_timer(timings, "cv"):
+            # La version du pipeline identifie les données preprocessées
+            data_version = artifact.get("version") or preprocessing.file_hash(job["processed_path"])
+            folds = fold_assignments(y, task_type, config["cv_folds"],
+                                     cache_dir=job.get("folds_dir"), data_version=data_version)
+            cv = cross_validate_oof(model, X, y, folds, task_type, n_jobs=job.get("cv_n_jobs", 1))
+
+    if config.get("holdout_from_oof"):
+        # Modèle final sur toutes les données ; le "test" est hors fold
+        with phase_timer(timings, "fit"):
+            fit_with_progress(model, X, y)
+        with phase_timer(timings, "predict"):
+            y_pred_train = model.predict(X)
+        y_train, y_test, y_pred_test = y, y, cv["oof_predictions"]
+        X_test = X
+    else:
+        # Split train/test
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=1-config["train_test_split"], random_state=42
+        )
+        with phase_timer(timings, "fit"):
+            fit_with_progress(model, X_train, y_train, X_test, y_test)
+        with phase_timer(timings, "predict"):
+            y_pred_train = model.predict(X_train)
+            y_pred_test = model.predict(X_test)
+
+    # Métriques
+    with phase_timer(timings, "metrics"):
+        metrics = compute_metrics(task_type, y_train, y_pred_train, y_test, y_pred_test)
+        if cv is not None and config["use_cross_validation"]:
+            metrics["cv_scores"] = cv["scores"].tolist()
+            metrics["cv_mean"] = float(cv["scores"].mean())
+            metrics["cv_std"] = float(cv["scores"].std())
+        if config.get("holdout_from_oof"):
+            metrics["holdout"] = "out_of_fold"
+
+    if cv is not None:
+        timings["cv_fold_fits"] = cv["fold_fit_times"]
+
+    return package_model(job, config, model, artifact.get("pipeline"), artifact.get("version"),
+                         X_test, metrics, timings)
+
+
+def _run_out_of_core_job(job: Dict[str, Any], config: Dict[str, Any], task_type: str,
+                         timings: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Entraînement hors mémoire : morceaux de `chunk_rows` lignes, split
+    train/test par hash des lignes, pas de validation croisée.
+    """
+    mode = out_of_core.STREAMING_MODES.get(config["model_type"])
+    if mode is None:
+        raise ValueError(f"Entraînement hors mémoire non supporté pour {config['model_type']} "
+                         f"(supportés: {', '.join(out_of_core.STREAMING_MODES)})")
+
+    with phase_timer(timings, "load"):
+        artifact = preprocessing.load_artifact(job.get("preprocessor_path"))
+        source = out_of_core.ChunkSource(job["processed_path"], job["target_column"], job["chunk_rows"],
+                                         test_fraction=1 - config["train_test_split"])
+        classes = source.classes() if task_type == "Classification" else None
+
+    model = get_model_instance(config["model_type"], task_type, config["hyperparameters"])
+    with phase_timer(timings, "fit"):
+        if mode == "partial_fit":
+            out_of_core.fit_partial(model, source, classes, job.get("epochs", 1))
+        else:
+            out_of_core.fit_external_memory(model, source, task_type, classes, job["models_dir"])
+
+    # Une passe de prédiction : métriques train et test accumulées morceau par morceau
+    with phase_timer(timings, "predict"):
+        train, test, X_sample = out_of_core.evaluate(model, source, task_type, classes)
+    with phase_timer(timings, "metrics"):
+        metrics = out_of_core.streaming_metrics(task_type, train, test)
+        metrics.update(training_mode="out_of_core", train_rows=train.n, test_rows=test.n)
+
+    return package_model(job, config, model, artifact.get("pipeline"), artifact.get("version"),
+                         X_sample, metrics, timings)
+
+
+def package_model(job: Dict[str, Any], config: Dict[str, Any], model, pipeline, pipeline_version: Optional[str],
+                  X_test, metrics: Dict[str, Any], timings: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fin commune des jobs : benchmark d'inférence, fusion avec le pipeline
+    de preprocessing, sauvegarde et comparaison des formats. Retourne le
+    résultat transmis à l'API.
+    """
+    # Ensembles d'arbres : latence sklearn vs moteur compilé, sur les features transformées
+    inference_benchmarks = None
+    compilable = tree_inference.is_compilable(model)
+    if compilable and job.get("inference_batch_sizes"):
+        with phase_timer(timings, "inference_benchmark"):
+            inference_benchmarks = tree_inference.benchmark_inference(
+                model, X_test, job["inference_batch_sizes"]
+            )
+    requested_backend = config.get("inference_backend") or "sklearn"
+    inference_backend = requested_backend if compilable else "sklearn"
+
+    # Fusionner avec le pipeline de preprocessing du projet : le modèle
+    # sauvegardé prend alors directement des données brutes
+    if pipeline is not None:
+        model = preprocessing.fuse_with_estimator(pipeline, model)
+
+    # Sauvegarder le modèle (les formats XGBoost natifs ne valent que pour XGBoost)
+    model_format = job.get("model_format", "joblib")
+    if model_format in artifacts.XGBOOST_FORMATS and not artifacts.is_xgboost(model):
+        model_format = "joblib"
+    model_path = artifacts.artifact_path(job["models_dir"], job["model_id"], model_format)
+    with phase_timer(timings, "serialization"):
+        artifacts.save_model(model, model_path, job.get("compression"))
+
+    # Taille et temps de chargement dans chaque format, pour comparaison
+    format_benchmarks = None
+    if job.get("benchmark_formats"):
+        with phase_timer(timings, "format_benchmark"):
+            format_benchmarks = artifacts.benchmark_formats(
+                model, job["benchmark_formats"], job.get("compression")
+            )
+
+    return {
+        "metrics": metrics,
+        "training_time": timings["fit"],
+        "timings": timings,
+        "model_path": model_path,
+        "model_format": model_format,
+        "size_mb": os.path.getsize(model_path) / (1024 * 1024),
+        "format_benchmarks": format_benchmarks,
+        "inference_backend": inference_backend,
+        "inference_benchmarks": inference_benchmarks,
+        "pipeline_version": pipeline_version
+    }
+
+
+# ==================== REPRISE D'ENTRAÎNEMENT ====================
+
+# Type de modèle -> façon de poursuivre l'entraînement d'un modèle existant
+CONTINUATION_MODES = {
+    "Random Forest": "warm_start",        # arbres supplémentaires ajoutés à la forêt
+    "Gradient Boosting": "warm_start",    # étages de boosting supplémentaires
+    "Logistic Regression": "warm_start",  # solveur initialisé avec les coefficients existants
+    "XGBoost": "xgb_model",               # tours de boosting ajoutés au booster existant
+    "SGD": "partial_fit"                  # passes supplémentaires, morceau par morceau
+}
+# Modèles dont la reprise ajoute des estimateurs (n_estimators)
+ENSEMBLE_MODEL_TYPES = ("Random Forest", "Gradient Boosting", "XGBoost")
+
+
+def n_estimators_of(estimator) -> int:
+    """Nombre d'arbres / de tours de boosting déjà ajustés"""
+    if isinstance(estimator, (xgb.XGBClassifier, xgb.XGBRegressor)):
+        return estimator.get_booster().num_boosted_rounds()
+    return len(estimator.estimators_)
+
+
+def row_hashes(X: pd.DataFrame) -> np.ndarray:
+    return pd.util.hash_pandas_object(X, index=False).to_numpy()
+
+
+def continuation_data(job: Dict[str, Any], pipeline):
+    """
+    (X, y) de la reprise, dans l'espace de features du modèle parent.
+
+    Si le projet utilise toujours le pipeline du parent, ce sont ses
+    données preprocessées ; sinon (nouvelles données uploadées depuis),
+    les données brutes actuelles sont transformées par le pipeline du
+    parent, qui reste celui du modèle produit.
+    """
+    target_column = job["target_column"]
+    if pipeline is None or job["processed_path"] == job.get("parent_processed_path"):
+        df = datastore.load_dataframe(job["processed_path"])
+        return df.drop(columns=[target_column]), df[target_column]
+
+    df = datastore.load_dataframe(job["raw_path"])
+    df = df[df[target_column].notna()].reset_index(drop=True)
+    X_raw = df[list(pipeline.feature_names_in_)]
+    _, categorical_cols = preprocessing.split_column_types(X_raw)
+    X_raw = X_raw.astype({col: object for col in categorical_cols})
+    return pipeline.transform(X_raw), df[target_column]
+
+
+def continue_fit(estimator, mode: str, X_train, y_train, X_test, y_test, job: Dict[str, Any]):
+    """Poursuivre l'ajustement de `estimator` (modifié en place)"""
+    if mode == "xgb_model":
+        booster = estimator.get_booster()
+        estimator.set_params(n_estimators=job["additional_estimators"])
+        fit_with_progress(estimator, X_train, y_train, X_test, y_test, xgb_model=booster)
+        # Paramètres cohérents avec le booster obtenu (parent + nouveaux tours)
+        estimator.set_params(n_estimators=estimator.get_booster().num_boosted_rounds())
+    elif mode == "warm_start":
+        params = {"warm_start": True}
+        if hasattr(estimator, "estimators_"):
+            params["n_estimators"] = n_estimators_of(estimator) + job["additional_estimators"]
+        estimator.set_params(**params)
+        try:
+            fit_with_progress(estimator, X_train, y_train)
+        finally:
+            estimator.set_params(warm_start=False)
+    else:
+        chunk_rows = max(1, job["chunk_rows"])
+        n_chunks = -(-len(X_train) // chunk_rows)
+        reporter = progress.IterationReporter(n_chunks * job["epochs"], metric="chunks")
+        for epoch in range(job["epochs"]):
+            for chunk in range(n_chunks):
+                rows = slice(chunk * chunk_rows, (chunk + 1) * chunk_rows)
+                estimator.partial_fit(X_train.iloc[rows], y_train.iloc[rows])
+                reporter(epoch * n_chunks + chunk + 1)
+
+
+def run_continuation_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Poursuivre l'entraînement d'un modèle existant (point d'entrée des workers).
+
+    Le modèle parent est rechargé puis complété selon son type (voir
+    CONTINUATION_MODES), sur toutes les données actuelles du projet ou,
+    avec `new_rows_only`, sur les seules lignes absentes des données du
+    parent. Le résultat contient en plus `continuation` : mode, volume
+    ajouté et temps gagné par rapport à un réentraînement complet
+    (mesuré avec `measure_full_retrain`, estimé sinon à partir du temps
+    d'ajustement du parent).
+    """
+    timings: Dict[str, Any] = {}
+    progress.set_experiment(job.get("experiment_id"))
+    try:
+        return _run_continuation_job(job, timings)
+    finally:
+        progress.set_experiment(None)
+
+
+def _run_continuation_job(job: Dict[str, Any], timings: Dict[str, Any]) -> Dict[str, Any]:
+    config = job["config"]
+    task_type = job["task_type"]
+    mode = CONTINUATION_MODES[config["model_type"]]
+
+    with phase_timer(timings, "load"):
+        parent = artifacts.load_model(job["parent_model_path"], mmap=False)
+        pipeline = parent.named_steps["preprocess"] if preprocessing.is_fused(parent) else None
+        estimator = preprocessing.get_estimator(parent)
+        X, y = continuation_data(job, pipeline)
+
+    parent_path = job.get("parent_processed_path")
+    parent_rows = datastore.count_rows(parent_path) if parent_path and os.path.exists(parent_path) else None
+    n_rows = len(X)
+    X_all, y_all = X, y
+    if job.get("new_rows_only"):
+        if parent_rows is None:
+            raise ValueError("Données du modèle parent introuvables : impossible d'isoler les nouvelles lignes")
+        parent_data = datastore.load_dataframe(parent_path).drop(columns=[job["target_column"]])
+        new = ~np.isin(row_hashes(X), row_hashes(parent_data))
+        if not new.any():
+            raise ValueError("Aucune nouvelle ligne depuis l'entraînement du modèle parent")
+        X, y = X[new].reset_index(drop=True), y[new].reset_index(drop=True)
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=1-config["train_test_split"], random_state=42
+    )
+    parent_estimators = n_estimators_of(estimator) if config["model_type"] in ENSEMBLE_MODEL_TYPES else None
+
+    with phase_timer(timings, "fit"):
+        continue_fit(estimator, mode, X_train, y_train, X_test, y_test, job)
+    with phase_timer(timings, "predict"):
+        y_pred_train = estimator.predict(X_train)
+        y_pred_test = estimator.predict(X_test)
+
+    with phase_timer(timings, "metrics"):
+        metrics = compute_metrics(task_type, y_train, y_pred_train, y_test, y_pred_test)
+
+    # Réentraînement complet équivalent : même modèle final, sur toutes les lignes d'entraînement
+    full_train_rows = int(round(n_rows * config["train_test_split"]))
+    total_estimators = n_estimators_of(estimator) if parent_estimators is not None else None
+    if job.get("measure_full_retrain"):
+        fresh = clone(estimator)
+        if mode == "warm_start":
+            fresh.set_params(warm_start=False)
+        X_full, y_full = X_train, y_train
+        if job.get("new_rows_only"):
+            X_full, _, y_full, _ = train_test_split(X_all, y_all, test_size=1-config["train_test_split"],
+                                                    random_state=42)
+        with phase_timer(timings, "full_retrain_benchmark"):
+            fresh.fit(X_full, y_full)
+        full_retrain_seconds = timings["full_retrain_benchmark"]
+    elif job.get("parent_training_time"):
+        # Coût proportionnel au nombre d'estimateurs et au nombre de lignes
+        parent_train_rows = parent_rows * config["train_test_split"] if parent_rows else full_train_rows
+        scale = full_train_rows / max(parent_train_rows, 1)
+        if parent_estimators:
+            scale *= total_estimators / parent_estimators
+        full_retrain_seconds = job["parent_training_time"] * scale
+    else:
+        full_retrain_seconds = None
+
+    continuation = {
+        "mode": mode,
+        "parent_model_id": job["parent_model_id"],
+        "parent_experiment_id": job.get("parent_experiment_id"),
+        "new_rows_only": bool(job.get("new_rows_only")),
+        "rows": len(X_train),
+        "parent_estimators": parent_estimators,
+        "added_estimators": total_estimators - parent_estimators if parent_estimators is not None else None,
+        "total_estimators": total_estimators,
+        "epochs": job["epochs"] if mode == "partial_fit" else None,
+        "fit_seconds": timings["fit"],
+        "full_retrain_seconds": full_retrain_seconds,
+        "full_retrain_measured": bool(job.get("measure_full_retrain")),
+        "time_saved_seconds": full_retrain_seconds - timings["fit"] if full_retrain_seconds is not None else None,
+        "speedup": full_retrain_seconds / timings["fit"] if full_retrain_seconds and timings["fit"] > 0 else None
+    }
+
+    result = package_model(job, config, estimator, pipeline, job.get("parent_pipeline_version"),
+                           X_test, metrics, timings)
+    result["continuation"] = continuation
+    if total_estimators is not None:
+        result["hyperparameters"] = {**config["hyperparameters"], "n_estimators": total_estimators}
+    return result
@@ -0,0 +1,347 @@
+"""
+Inférence compilée des ensembles d'arbres
+Fichier: backend/tree_inference.py
+
+Les arbres d'un Random Forest / Extra Trees / Gradient Boosting sklearn
+sont aplatis en tables de nœuds (feature, seuil, fils gauche, fils droit,
+valeur) concaténées, puis parcourus pour toutes les lignes et tous les
+arbres à la fois avec numpy. On évite ainsi la validation d'entrée et le
+Parallel de sklearn, qui dominent la latence pour quelques lignes.
+
+Les sorties sont identiques bit à bit à celles de sklearn : même
+conversion float32 des entrées, même règle pour les valeurs manquantes et
+mêmes opérations flottantes, dans le même ordre (somme arbre par arbre
+puis division pour les forêts, init + learning_rate * valeur étage par
+étage pour le boosting).
+"""
+
+import time
+import warnings
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sklearn.base import BaseEstimator
+from sklearn.dummy import DummyClassifier, DummyRegressor
+from sklearn.ensemble import (
+    ExtraTreesClassifier, ExtraTreesRegressor, GradientBoostingClassifier,
+    GradientBoostingRegressor, RandomForestClassifier, RandomForestRegressor
+)
+from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor
+
+import preprocessing
+
+INFERENCE_BACKENDS = ("sklearn", "compiled")
+BENCHMARK_BATCH_SIZES = (1, 32, 1024)
+
+FOREST_TYPES = (RandomForestClassifier, RandomForestRegressor, ExtraTreesClassifier, ExtraTreesRegressor)
+TREE_TYPES = (DecisionTreeClassifier, DecisionTreeRegressor)
+BOOSTING_TYPES = (GradientBoostingClassifier, GradientBoostingRegressor)
+
+TREE_LEAF = -1
+
+
+class NodeTable:
+    """
+    Tables de nœuds de plusieurs arbres, concaténées.
+
+    Les indices des fils sont globaux ; une feuille pointe sur elle-même,
+    ce qui permet d'avancer toutes les lignes d'un pas sans cas particulier.
+    """
+
+    def __init__(self, trees: List[Any], values: List[np.ndarray], handle_missing: bool):
+        sizes = [tree.node_count for tree in trees]
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.intp)
+
+        left, right = [], []
+        for tree, offset in zip(trees, offsets):
+            is_leaf = tree.children_left == TREE_LEAF
+            own = np.arange(tree.node_count, dtype=np.intp) + offset
+            left.append(np.where(is_leaf, own, tree.children_left + offset))
+            right.append(np.where(is_leaf, own, tree.children_right + offset))
+
+        self.roots = offsets
+        self.left = np.concatenate(left).astype(np.intp)
+        self.right = np.concatenate(right).astype(np.intp)
+        self.is_leaf = self.left == np.arange(self.left.size)
+        # Fils entrelacés : children[2 * nœud + aller_à_droite], un seul accès par pas
+        self.children = np.empty(2 * self.left.size, dtype=np.intp)
+        self.children[0::2] = self.left
+        self.children[1::2] = self.right
+        # Les feuilles ont feature = -2 dans sklearn : 0 évite un indice invalide
+        self.feature = np.concatenate([np.maximum(tree.feature, 0) for tree in trees]).astype(np.intp)
+        self.threshold = np.concatenate([tree.threshold for tree in trees])
+        self.missing_go_to_left = np.concatenate([tree.missing_go_to_left for tree in trees]).astype(bool)
+        self.value = np.concatenate(values)
+        # Les arbres sklearn envoient les NaN selon missing_go_to_left ; le
+        # boosting compare directement (NaN <= seuil est faux : à droite)
+        self.handle_missing = handle_missing
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in (
+            self.roots, self.left, self.right, self.children, self.is_leaf, self.feature,
+            self.threshold, self.missing_go_to_left, self.value
+        ))
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Indice de la feuille atteinte par chaque ligne dans chaque arbre, (n_arbres, n_lignes)"""
+        n_samples, n_features = X.shape
+        flat_X = X.ravel()
+        nodes = np.repeat(self.roots, n_samples)
+        row_offsets = np.tile(np.arange(n_samples, dtype=np.intp) * n_features, self.n_trees)
+
+        # On ne fait avancer que les couples (arbre, ligne) pas encore sur une feuille
+        active = np.flatnonzero(~self.is_leaf[nodes])
+        current = nodes[active]
+        row_offsets = row_offsets[active]
+        while active.size:
+            values = flat_X[row_offsets + self.feature[current]]
+            go_left = values <= self.threshold[current]
+            if self.handle_missing:
+                go_left |= np.isnan(values) & self.missing_go_to_left[current]
+            following = self.children[2 * current + ~go_left]
+            nodes[active] = following
+            keep = ~self.is_leaf[following]
+            active, current, row_offsets = active[keep], following[keep], row_offsets[keep]
+        return nodes.reshape(self.n_trees, n_samples)
+
+    def leaf_values(self, X: np.ndarray) -> np.ndarray:
+        """Valeurs des feuilles atteintes, (n_arbres, n_lignes, n_sorties)"""
+        return self.value[self.apply(X)]
+
+
+def _sequential_sum(slabs: np.ndarray) -> np.ndarray:
+    """
+    Somme sur le premier axe, strictement dans l'ordre. np.add.reduce
+    peut passer en sommation par paires (résultat différent au dernier
+    bit, ex: une seule ligne) ; accumulate additionne toujours dans l'ordre.
+    """
+    return np.add.accumulate(slabs, axis=0)[-1]
+
+
+def _as_float32(X) -> np.ndarray:
+    # Même conversion que la validation d'entrée des arbres sklearn
+    return np.ascontiguousarray(np.asarray(X, dtype=np.float32))
+
+
+class CompiledTreeEnsemble(BaseEstimator):
+    """
+    Ensemble d'arbres de régression compilé (prédiction seule).
+
+    Sur de gros lots la boucle Cython de sklearn redevient plus rapide que
+    le parcours numpy : au-delà de `fallback_rows` lignes on délègue à
+    l'estimateur d'origine (sorties identiques dans les deux cas).
+    Hérite de BaseEstimator pour pouvoir remplacer l'estimateur d'un
+    Pipeline fusionné.
+    """
+
+    def __init__(self, estimator, fallback_rows: Optional[int] = None):
+        self.estimator = estimator if fallback_rows else None
+        self.fallback_rows = fallback_rows
+        self.source_type = type(estimator).__name__
+        self.n_features_in_ = estimator.n_features_in_
+        if hasattr(estimator, "feature_names_in_"):
+            self.feature_names_in_ = estimator.feature_names_in_
+
+        if isinstance(estimator, BOOSTING_TYPES):
+            self.kind = "boosting"
+            stages = estimator.estimators_
+            self.n_outputs = stages.shape[1]
+            trees = [stage.tree_ for stage in stages.ravel()]
+            self.table = NodeTable(trees, [tree.value[:, 0, :1] for tree in trees], handle_missing=False)
+            self.learning_rate = float(estimator.learning_rate)
+            self.init_raw = _constant_init_raw(estimator)
+            self.loss = estimator._loss
+        else:
+            self.kind = "forest"
+            members = estimator.estimators_ if isinstance(estimator, FOREST_TYPES) else [estimator]
+            trees = [member.tree_ for member in members]
+            n_classes = getattr(estimator, "n_classes_", None)
+            self.n_outputs = int(n_classes) if n_classes is not None else 1
+            self.table = NodeTable(trees, [tree.value[:, 0, :self.n_outputs] for tree in trees],
+                                   handle_missing=True)
+
+    def fit(self, X, y=None):
+        raise TypeError("Un modèle compilé ne s'entraîne pas : ré-entraîner le modèle sklearn")
+
+    def _raw_output(self, X) -> np.ndarray:
+        X = _as_float32(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X a {X.shape[-1]} features, le modèle en attend {self.n_features_in_}"
+            )
+        values = self.table.leaf_values(X)
+
+        if self.kind == "boosting":
+            # out = init ; puis, étage par étage, out += learning_rate * valeur
+            n_stages = self.table.n_trees // self.n_outputs
+            scaled = self.learning_rate * values.reshape(n_stages, self.n_outputs, X.shape[0])
+            scaled = scaled.transpose(0, 2, 1)
+            init = np.broadcast_to(self.init_raw, (1, X.shape[0], self.n_outputs))
+            return _sequential_sum(np.concatenate([init, scaled]))
+
+        # Somme des arbres dans l'ordre (depuis 0, comme sklearn), puis moyenne
+        out = _sequential_sum(np.concatenate([np.zeros((1,) + values.shape[1:]), values]))
+        out /= self.table.n_trees
+        return out
+
+    def _delegate(self, X) -> bool:
+        return self.estimator is not None and len(X) > self.fallback_rows
+
+    def predict(self, X) -> np.ndarray:
+        if self._delegate(X):
+            return self.estimator.predict(X)
+        return self._raw_output(X)[:, 0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.table.nbytes
+
+
+class CompiledTreeClassifier(CompiledTreeEnsemble):
+    """Ensemble d'arbres de classification compilé"""
+
+    def __init__(self, estimator, fallback_rows: Optional[int] = None):
+        super().__init__(estimator, fallback_rows)
+        self.classes_ = estimator.classes_
+
+    def decision_function(self, X) -> np.ndarray:
+        raw = self._raw_output(X)
+        return raw.ravel() if raw.shape[1] == 1 else raw
+
+    def predict_proba(self, X) -> np.ndarray:
+        if self._delegate(X):
+            return self.estimator.predict_proba(X)
+        if self.kind == "boosting":
+            return self.loss.predict_proba(self.decision_function(X))
+        return self._raw_output(X)
+
+    def predict(self, X) -> np.ndarray:
+        if self._delegate(X):
+            return self.estimator.predict(X)
+        if self.kind == "boosting":
+            raw = self.decision_function(X)
+            encoded = (raw >= 0).astype(int) if raw.ndim == 1 else np.argmax(raw, axis=1)
+            return self.classes_[encoded]
+        return self.classes_.take(np.argmax(self._raw_output(X), axis=1), axis=0)
+
+
+def _constant_init_raw(estimator) -> np.ndarray:
+    """
+    Prédiction initiale du boosting. Avec init="zero" ou l'estimateur
+    par défaut (DummyClassifier/DummyRegressor) elle ne dépend pas de X :
+    on la calcule une fois sur une ligne quelconque.
+    """
+    dummy = np.zeros((1, estimator.n_features_in_), dtype=np.float32)
+    with warnings.catch_warnings():
+        # Modèle ajusté sur un DataFrame : avertissement sur les noms de colonnes
+        warnings.simplefilter("ignore", UserWarning)
+        return estimator._raw_predict_init(dummy)[0]
+
+
+# ==================== COMPILATION ====================
+
+def unsupported_reason(model) -> Optional[str]:
+    """None si le modèle est compilable, sinon la raison"""
+    estimator = preprocessing.get_estimator(model)
+    if not isinstance(estimator, FOREST_TYPES + TREE_TYPES + BOOSTING_TYPES):
+        return f"{type(estimator).__name__} n'est pas un ensemble d'arbres sklearn compilable"
+    if getattr(estimator, "n_outputs_", 1) > 1:
+        return "Les modèles multi-sorties ne sont pas supportés"
+    if isinstance(estimator, BOOSTING_TYPES):
+        if not (estimator.init_ == "zero" or isinstance(estimator.init_, (DummyClassifier, DummyRegressor))):
+            return "Le boosting avec un estimateur init personnalisé n'est pas supporté"
+    return None
+
+
+def is_compilable(model) -> bool:
+    return unsupported_reason(model) is None
+
+
+def compile_estimator(estimator, fallback_rows: Optional[int] = None) -> CompiledTreeEnsemble:
+    reason = unsupported_reason(estimator)
+    if reason is not None:
+        raise ValueError(reason)
+    if hasattr(estimator, "classes_"):
+        return CompiledTreeClassifier(estimator, fallback_rows)
+    return CompiledTreeEnsemble(estimator, fallback_rows)
+
+
+def compile_model(model, fallback_rows: Optional[int] = None):
+    """Remplacer l'estimateur (fusionné ou non) par sa version compilée"""
+    compiled = compile_estimator(preprocessing.get_estimator(model), fallback_rows)
+    if preprocessing.is_fused(model):
+        return preprocessing.fuse_with_estimator(model.named_steps["preprocess"], compiled)
+    return compiled
+
+
+def load_compiled(path: str, fallback_rows: Optional[int] = None):
+    """Chargeur pour le cache de modèles : fichier -> modèle compilé"""
+    from artifacts import load_model
+
+    return compile_model(load_model(path), fallback_rows)
+
+
+# ==================== BENCHMARK ====================
+
+def _best_time_ms(fn, X, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def _outputs(model, X) -> List[np.ndarray]:
+    outputs = [np.asarray(model.predict(X))]
+    if hasattr(model, "predict_proba"):
+        outputs.append(model.predict_proba(X))
+    return outputs
+
+
+def benchmark_inference(estimator, X, batch_sizes=BENCHMARK_BATCH_SIZES,
+                        repeats: int = 5) -> Dict[str, Any]:
+    """
+    Latence de sklearn et du moteur compilé par taille de lot.
+
+    `X` contient des features déjà transformées (entrée de l'estimateur) ;
+    les lignes sont répétées si besoin pour atteindre la taille de lot.
+    Vérifie aussi que les sorties sont identiques bit à bit pour chaque
+    taille de lot. Le moteur est mesuré seul (sans repli sur sklearn).
+    """
+    compiled = compile_estimator(estimator)
+    X = np.asarray(X, dtype=np.float64)
+    largest = max(batch_sizes)
+    X = np.resize(X, (max(largest, len(X)), X.shape[1]))
+
+    identical = all(
+        np.array_equal(expected, actual)
+        for batch_size in batch_sizes
+        for expected, actual in zip(_outputs(estimator, X[:batch_size]), _outputs(compiled, X[:batch_size]))
+    )
+
+    predict = estimator.predict_proba if hasattr(estimator, "predict_proba") else estimator.predict
+    predict_compiled = compiled.predict_proba if hasattr(compiled, "predict_proba") else compiled.predict
+    batches = {}
+    for batch_size in batch_sizes:
+        batch = X[:batch_size]
+        sklearn_ms = _best_time_ms(predict, batch, repeats)
+        compiled_ms = _best_time_ms(predict_compiled, batch, repeats)
+        batches[str(batch_size)] = {
+            "sklearn_ms": round(sklearn_ms, 3),
+            "compiled_ms": round(compiled_ms, 3),
+            "speedup": round(sklearn_ms / compiled_ms, 2) if compiled_ms > 0 else None
+        }
+
+    return {
+        "identical": bool(identical),
+        "n_trees": compiled.table.n_trees,
+        "n_nodes": int(compiled.table.left.size),
+        "size_mb": round(compiled.nbytes / (1024 * 1024), 4),
+        "batches": batches
+    }
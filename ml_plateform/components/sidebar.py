@@ -30,6 +30,23 @@ def render_sidebar():
     # st.page_link("config/settings.py", label="⚙️ Paramètres", icon="⚙️")
     st.divider()
     
+    # Panneau de debug : efficacité du cache HTTP du client API
+    with st.expander("🛠️ Debug API", expanded=False):
+        from utils.Client import api_client
+        cache = api_client.cache_stats()
+        col1, col2 = st.columns(2)
+        col1.metric("Hit rate", f"{cache['hit_rate'] * 100:.0f}%")
+        col2.metric("Requêtes GET", cache['requests'])
+        st.caption(
+            f"Frais: {cache['fresh_hits']} • 304: {cache['revalidated']} • "
+            f"Miss: {cache['misses']} • Entrées: {cache['entries']}"
+        )
+        st.caption(f"Octets évités: {cache['bytes_saved'] / 1024:.1f} Ko • Invalidations: {cache['invalidations']}")
+        if st.button("🧹 Vider le cache", use_container_width=True):
+            api_client.cache.clear()
+    
+    st.divider()
+    
     # Informations utilisateur
     if st.session_state.get('authenticated'):
         st.write(f"👤 {st.session_state.get('user_email', 'Utilisateur')}")
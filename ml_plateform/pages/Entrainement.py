@@ -1,11 +1,7 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
-import plotly.express as px
-from datetime import datetime, timedelta
-import time
-import random
+from datetime import datetime
 from utils.Client import api_client
 from utils.Helpers import show_loading, show_success, show_error
 
@@ -22,17 +18,45 @@ if 'training_config' not in st.session_state or 'experiment_id' not in st.sessio
     st.error("❌ Aucun entraînement configuré. Veuillez d'abord configurer un modèle.")
     st.switch_page("pages/config_model.py")
 
-# Initialisation de la session state
-if 'is_training' not in st.session_state:
-    st.session_state.is_training = False
-if 'current_epoch' not in st.session_state:
-    st.session_state.current_epoch = 0
-if 'total_epochs' not in st.session_state:
-    st.session_state.total_epochs = st.session_state.training_config.get('epochs', 50)
-if 'training_history' not in st.session_state:
-    st.session_state.training_history = {'epoch': [], 'train_loss': [], 'val_loss': [], 'train_acc': [], 'val_acc': []}
+TERMINAL_STATUSES = ("completed", "failed", "stopped")
+PHASE_LABELS = {
+    "load": "Chargement des données",
+    "cv": "Validation croisée",
+    "fit": "Ajustement du modèle",
+    "predict": "Prédictions",
+    "metrics": "Calcul des métriques",
+    "inference_benchmark": "Benchmark d'inférence",
+    "serialization": "Sauvegarde du modèle",
+    "format_benchmark": "Comparaison des formats"
+}
+
+def new_training_progress(experiment_id):
+    """Progression reçue du flux d'événements (conservée entre deux exécutions du script)"""
+    return {
+        'experiment_id': experiment_id,
+        'last_event_id': 0,
+        'status': None,
+        'error': None,
+        'phase': None,
+        'phases': {},
+        'cv_folds': [],
+        'n_folds': None,
+        'iterations': [],
+        'total_iterations': None,
+        'metric': None
+    }
+
+# Initialisation de la session state (réinitialisée quand un nouvel entraînement est lancé)
+if st.session_state.get('training_progress', {}).get('experiment_id') != st.session_state.experiment_id:
+    st.session_state.training_progress = new_training_progress(st.session_state.experiment_id)
+    st.session_state.follow_training = True
+    st.session_state.logs = []
+    st.session_state.experiment_data = None
+    st.session_state.training_results = None
 if 'logs' not in st.session_state:
     st.session_state.logs = []
+if 'follow_training' not in st.session_state:
+    st.session_state.follow_training = True
 if 'experiment_data' not in st.session_state:
     st.session_state.experiment_data = None
 if 'training_results' not in st.session_state:
@@ -237,6 +261,168 @@ def get_training_results():
         show_error(f"❌ Erreur lors de la récupération des résultats: {str(e)}")
         return None
 
+# Fonctions de suivi de la progression (flux SSE /api/train/events)
+def apply_event(event):
+    """Intégrer un événement de progression dans la session ; retourne les nouvelles lignes de graphique"""
+    state = st.session_state.training_progress
+    state['last_event_id'] = event.get('id', state['last_event_id'])
+    kind = event.get('type')
+    new_rows = {}
+    
+    if kind == 'status':
+        state['status'] = event['status']
+        state['error'] = event.get('error')
+        if event['status'] == 'queued':
+            add_log("⏳ Entraînement en file d'attente", "info")
+        elif event['status'] == 'running':
+            add_log("🚀 Démarrage de l'entraînement...", "info")
+        elif event['status'] == 'completed':
+            add_log("✅ Entraînement terminé avec succès!", "success")
+        else:
+            add_log(f"❌ Entraînement échoué: {event.get('error') or event['status']}", "error")
+    
+    elif kind == 'phase':
+        label = PHASE_LABELS.get(event['phase'], event['phase'])
+        if event.get('state') == 'started':
+            state['phase'] = event['phase']
+            add_log(f"⚙️ {label}...", "info")
+        else:
+            state['phases'][event['phase']] = state['phases'].get(event['phase'], 0.0) + event.get('seconds', 0.0)
+            add_log(f"{label} : {event.get('seconds', 0.0):.2f}s", "success")
+    
+    elif kind == 'cv_fold':
+        state['n_folds'] = event['n_folds']
+        state['cv_folds'].append({'fold': event['fold'] + 1, 'score': event['score']})
+        new_rows['cv'] = pd.DataFrame({'score': [event['score']]}, index=[f"Fold {event['fold'] + 1}"])
+        add_log(f"Fold {event['fold'] + 1}/{event['n_folds']} - Score: {event['score']:.4f} ({event['fit_seconds']:.2f}s)", "success")
+    
+    elif kind == 'iteration':
+        state['total_iterations'] = event['total']
+        state['metric'] = event.get('metric')
+        row = {'iteration': event['iteration'], 'train': event.get('train_loss'), 'valid': event.get('valid_loss')}
+        state['iterations'].append(row)
+        new_rows['loss'] = iterations_frame([row])
+        if event['iteration'] == event['total'] or len(state['iterations']) % 20 == 0:
+            add_log(f"Itération {event['iteration']}/{event['total']} - {state['metric']}: {event.get('train_loss') or 0:.4f}", "info")
+    
+    return new_rows
+
+def iterations_frame(rows):
+    frame = pd.DataFrame(rows, columns=['iteration', 'train', 'valid']).set_index('iteration')
+    return frame.astype(float)
+
+def cv_frame(folds):
+    return pd.DataFrame({'score': [fold['score'] for fold in folds]},
+                        index=[f"Fold {fold['fold']}" for fold in folds])
+
+def render_status(slot):
+    state = st.session_state.training_progress
+    status = state['status']
+    if status == 'completed':
+        status_class, status_icon = "completed", "✅"
+        status_title, status_subtitle = "Entraînement terminé!", "Modèle prêt pour l'évaluation"
+    elif status in TERMINAL_STATUSES:
+        status_class, status_icon = "error", "❌"
+        status_title, status_subtitle = "Entraînement échoué", state['error'] or status
+    elif status == 'running':
+        status_class, status_icon = "training", "⏳"
+        status_title = "Entraînement en cours..."
+        status_subtitle = PHASE_LABELS.get(state['phase'], "Démarrage")
+    elif status == 'queued':
+        status_class, status_icon = "training", "⏳"
+        status_title, status_subtitle = "En file d'attente", "L'entraînement démarrera dès qu'un worker sera libre"
+    else:
+        status_class, status_icon = "training", "⏸️"
+        status_title, status_subtitle = "En attente", "Cliquez sur Suivre pour afficher la progression"
+    
+    pulsing = 'pulsing' if status in ('queued', 'running') else ''
+    slot.markdown(f"""
+    <div class="status-card {status_class}">
+        <div class="status-icon {pulsing}">{status_icon}</div>
+        <div class="status-title">{status_title}</div>
+        <div class="status-subtitle">{status_subtitle}</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+def render_progress(slot):
+    state = st.session_state.training_progress
+    with slot.container():
+        if state['total_iterations'] and state['phase'] == 'fit':
+            current = state['iterations'][-1]['iteration'] if state['iterations'] else 0
+            fraction = current / state['total_iterations']
+            st.progress(min(fraction, 1.0))
+            st.markdown(f"**Progression:** Itération {current}/{state['total_iterations']} ({fraction*100:.1f}%)")
+        elif state['phase'] == 'cv' and state['n_folds']:
+            fraction = len(state['cv_folds']) / state['n_folds']
+            st.progress(min(fraction, 1.0))
+            st.markdown(f"**Validation croisée:** {len(state['cv_folds'])}/{state['n_folds']} folds")
+        else:
+            done = state['status'] == 'completed'
+            st.progress(1.0 if done else 0.0)
+            st.markdown(f"**Phase:** {PHASE_LABELS.get(state['phase'], '—') if not done else 'Terminé'}")
+        
+        col1, col2, col3 = st.columns(3)
+        last = state['iterations'][-1] if state['iterations'] else {}
+        scores = [fold['score'] for fold in state['cv_folds']]
+        with col1:
+            st.metric(f"Train ({state['metric'] or 'loss'})", f"{last['train']:.4f}" if last.get('train') is not None else "—")
+        with col2:
+            st.metric(f"Test ({state['metric'] or 'loss'})", f"{last['valid']:.4f}" if last.get('valid') is not None else "—")
+        with col3:
+            st.metric("Score CV moyen", f"{np.mean(scores):.4f}" if scores else "—")
+
+def render_phases(slot):
+    phases = st.session_state.training_progress['phases']
+    if not phases:
+        slot.info("Les durées des phases apparaîtront au fil de l'entraînement.")
+        return
+    slot.dataframe(pd.DataFrame({
+        'Phase': [PHASE_LABELS.get(phase, phase) for phase in phases],
+        'Durée (s)': [round(seconds, 3) for seconds in phases.values()]
+    }), use_container_width=True, hide_index=True)
+
+def render_logs(slot):
+    log_html = '<div class="log-container">'
+    for log in reversed(st.session_state.logs[-50:]):  # Afficher les 50 derniers logs
+        log_class = f"log-{log['type']}"
+        log_html += f'<div class="log-entry"><span class="log-time">[{log["time"]}]</span> <span class="{log_class}">{log["message"]}</span></div>'
+    
+    if not st.session_state.logs:
+        log_html += '<div class="log-entry"><span class="log-info">Aucun log disponible. Suivez l\'entraînement pour voir les logs.</span></div>'
+    
+    log_html += '</div>'
+    slot.markdown(log_html, unsafe_allow_html=True)
+
+def render_results(slot):
+    """Résultats finaux de l'API (métriques de l'expérience)"""
+    if not st.session_state.training_results:
+        slot.empty()
+        return
+    metrics = st.session_state.training_results.get('metrics') or {}
+    with slot.container():
+        st.markdown("### 📊 Résultats de l'Entraînement (API)")
+        col1, col2, col3, col4 = st.columns(4)
+        if 'test_r2' in metrics:
+            col1.metric("R² Test", f"{metrics.get('test_r2', 0):.4f}")
+            col2.metric("R² Train", f"{metrics.get('train_r2', 0):.4f}")
+            col3.metric("RMSE", f"{metrics.get('rmse', 0):.4f}")
+            col4.metric("MSE", f"{metrics.get('mse', 0):.4f}")
+        else:
+            col1.metric("Accuracy Test", f"{metrics.get('test_accuracy', 0)*100:.2f}%")
+            col2.metric("Precision", f"{metrics.get('precision', 0)*100:.2f}%")
+            col3.metric("Recall", f"{metrics.get('recall', 0)*100:.2f}%")
+            col4.metric("F1-Score", f"{metrics.get('f1_score', 0)*100:.2f}%")
+
+def render_results_button(slot):
+    """Bouton vers la page de résultats ; retourne False tant que les résultats ne sont pas connus"""
+    if not st.session_state.training_results:
+        return False
+    if slot.button("📊 Voir Résultats Détaillés", use_container_width=True, type="primary", key="show_results"):
+        # Sauvegarder les résultats pour la page suivante
+        st.session_state.final_results = st.session_state.training_results
+        st.switch_page("pages/Results.py")
+    return True
+
 # Sidebar
 with st.sidebar:
     st.markdown("### 🤖 FrameML")
@@ -248,12 +434,6 @@ with st.sidebar:
         st.markdown("#### 📊 Projet Actuel")
         st.markdown(f"**{project['name']}**")
         st.markdown(f"{project['task_type']} • {project['problem_type']}")
-
-
-        # print(f"====project from API de ENTRAINNEMENT: {project}==========")
-
-
-
     except:
         st.error("❌ Impossible de charger les infos du projet")
     
@@ -262,39 +442,30 @@ with st.sidebar:
     st.markdown("#### 🎯 Configuration")
     training_config = st.session_state.training_config
     st.info(f"**Modèle:** {training_config.get('model_type', 'N/A')}")
-    st.info(f"**Epochs:** {training_config.get('epochs', 50)}")
     st.info(f"**Train/Test:** {int(training_config.get('train_test_split', 0.8)*100)}/{int((1-training_config.get('train_test_split', 0.8))*100)}")
+    if training_config.get('use_cross_validation'):
+        st.info(f"**Validation croisée:** {training_config.get('cv_folds', 5)} folds")
     
     st.markdown("---")
     
-    # Contrôles d'entraînement
+    # Contrôles du suivi (l'entraînement lui-même tourne côté API)
     st.markdown("#### ⚙️ Contrôles")
     
-    if not st.session_state.is_training:
-        if st.button("▶️ Démarrer l'Entraînement", use_container_width=True, type="primary"):
-            st.session_state.is_training = True
-            st.session_state.current_epoch = 0
-            st.session_state.training_history = {'epoch': [], 'train_loss': [], 'val_loss': [], 'train_acc': [], 'val_acc': []}
-            st.session_state.logs = []
-            add_log("🚀 Démarrage de l'entraînement...", "info")
-            add_log("📊 Chargement des données...", "info")
-            add_log("⚙️ Initialisation du modèle...", "info")
+    finished = st.session_state.training_progress['status'] in TERMINAL_STATUSES
+    if not st.session_state.follow_training:
+        if st.button("📡 Suivre l'Entraînement", use_container_width=True, type="primary", disabled=finished):
+            st.session_state.follow_training = True
             st.rerun()
     else:
-        if st.button("⏸️ Pause", use_container_width=True):
-            st.session_state.is_training = False
-            add_log("⏸️ Entraînement mis en pause", "warning")
-            st.rerun()
-        
-        if st.button("⏹️ Arrêter", use_container_width=True):
-            st.session_state.is_training = False
-            st.session_state.current_epoch = 0
-            add_log("⏹️ Entraînement arrêté", "error")
+        if st.button("⏹️ Arrêter le suivi", use_container_width=True):
+            st.session_state.follow_training = False
+            add_log("⏹️ Suivi interrompu (l'entraînement continue côté API)", "warning")
             st.rerun()
     
     if st.button("🔄 Réinitialiser", use_container_width=True):
-        st.session_state.current_epoch = 0
-        st.session_state.training_history = {'epoch': [], 'train_loss': [], 'val_loss': [], 'train_acc': [], 'val_acc': []}
+        # Rejouer tout l'historique des événements depuis le début
+        st.session_state.training_progress = new_training_progress(st.session_state.experiment_id)
+        st.session_state.follow_training = True
         st.session_state.logs = []
         st.rerun()
     
@@ -313,259 +484,45 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# Status Card
-if st.session_state.is_training:
-    status_class = "training"
-    status_icon = "⏳"
-    status_title = "Entraînement en cours..."
-    status_subtitle = f"Epoch {st.session_state.current_epoch}/{st.session_state.total_epochs}"
-elif st.session_state.current_epoch >= st.session_state.total_epochs and st.session_state.current_epoch > 0:
-    status_class = "completed"
-    status_icon = "✅"
-    status_title = "Entraînement terminé!"
-    status_subtitle = "Modèle prêt pour l'évaluation"
-elif st.session_state.training_results:
-    status_class = "completed"
-    status_icon = "✅"
-    status_title = "Entraînement terminé (API)"
-    status_subtitle = "Résultats disponibles"
-else:
-    status_class = "training"
-    status_icon = "⏸️"
-    status_title = "En attente"
-    status_subtitle = "Cliquez sur Démarrer pour lancer l'entraînement"
-
-st.markdown(f"""
-<div class="status-card {status_class}">
-    <div class="status-icon {'pulsing' if st.session_state.is_training else ''}">{status_icon}</div>
-    <div class="status-title">{status_title}</div>
-    <div class="status-subtitle">{status_subtitle}</div>
-</div>
-""", unsafe_allow_html=True)
+# Emplacements mis à jour en place à chaque événement, sans réexécuter la page
+status_slot = st.empty()
+results_slot = st.empty()
+progress_slot = st.empty()
 
-# Simulation de l'entraînement (pour la démo)
-if st.session_state.is_training and st.session_state.current_epoch < st.session_state.total_epochs:
-    # Simulation des métriques d'entraînement
-    base_train_loss = 2.5 * np.exp(-0.05 * st.session_state.current_epoch) + random.uniform(-0.05, 0.05)
-    base_val_loss = 2.7 * np.exp(-0.045 * st.session_state.current_epoch) + random.uniform(-0.05, 0.05)
-    base_train_acc = 100 * (1 - np.exp(-0.08 * st.session_state.current_epoch)) + random.uniform(-1, 1)
-    base_val_acc = 100 * (1 - np.exp(-0.075 * st.session_state.current_epoch)) + random.uniform(-1, 1)
-    
-    data = {
-        'train_loss': max(0.1, base_train_loss),
-        'val_loss': max(0.1, base_val_loss),
-        'train_acc': min(99, max(0, base_train_acc)),
-        'val_acc': min(99, max(0, base_val_acc))
-    }
-    
-    st.session_state.training_history['epoch'].append(st.session_state.current_epoch + 1)
-    st.session_state.training_history['train_loss'].append(data['train_loss'])
-    st.session_state.training_history['val_loss'].append(data['val_loss'])
-    st.session_state.training_history['train_acc'].append(data['train_acc'])
-    st.session_state.training_history['val_acc'].append(data['val_acc'])
-    
-    # Ajouter des logs
-    if st.session_state.current_epoch % 5 == 0:
-        add_log(f"Epoch {st.session_state.current_epoch + 1}/{st.session_state.total_epochs} - Loss: {data['train_loss']:.4f} - Acc: {data['train_acc']:.2f}%", "success")
-    
-    st.session_state.current_epoch += 1
-    
-    if st.session_state.current_epoch >= st.session_state.total_epochs:
-        st.session_state.is_training = False
-        add_log("✅ Entraînement terminé avec succès!", "success")
-        add_log("💾 Sauvegarde du modèle...", "info")
-        st.balloons()
-    
-    time.sleep(0.3)  # Simulation du temps d'entraînement
-    st.rerun()
+state = st.session_state.training_progress
+render_status(status_slot)
+render_results(results_slot)
+render_progress(progress_slot)
 
-# Affichage des résultats de l'API si disponibles
-if st.session_state.training_results:
-    st.markdown('<div class="progress-container">', unsafe_allow_html=True)
-    st.markdown("### 📊 Résultats de l'Entraînement (API)")
-    
-    metrics = st.session_state.training_results.get('metrics', {})
-    
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.metric("Accuracy Test", f"{metrics.get('test_accuracy', 0)*100:.2f}%")
-    with col2:
-        st.metric("Precision", f"{metrics.get('precision', 0)*100:.2f}%")
-    with col3:
-        st.metric("Recall", f"{metrics.get('recall', 0)*100:.2f}%")
-    with col4:
-        st.metric("F1-Score", f"{metrics.get('f1_score', 0)*100:.2f}%")
-    
+st.markdown("<br>", unsafe_allow_html=True)
+col_chart1, col_chart2 = st.columns(2)
+
+with col_chart1:
+    st.markdown('<div class="chart-card">', unsafe_allow_html=True)
+    st.markdown('<div class="chart-title">📉 Courbes de Loss (par itération)</div>', unsafe_allow_html=True)
+    # add_rows ajoute les nouveaux points au graphique existant
+    loss_chart = st.line_chart(iterations_frame(state['iterations']), color=['#ef4444', '#f59e0b'], height=350)
+    st.caption("Modèles de boosting (XGBoost, Gradient Boosting) : perte après chaque arbre")
     st.markdown('</div>', unsafe_allow_html=True)
 
-# Progress bar et métriques (pour la simulation)
-if st.session_state.current_epoch > 0 and not st.session_state.training_results:
-    st.markdown('<div class="progress-container">', unsafe_allow_html=True)
-    
-    # Barre de progression
-    progress = st.session_state.current_epoch / st.session_state.total_epochs
-    st.progress(progress)
-    
-    col1, col2 = st.columns([3, 1])
-    with col1:
-        st.markdown(f"**Progression:** Epoch {st.session_state.current_epoch}/{st.session_state.total_epochs} ({progress*100:.1f}%)")
-    with col2:
-        remaining_epochs = st.session_state.total_epochs - st.session_state.current_epoch
-        estimated_time = remaining_epochs * 2  # Estimation: 2 secondes par epoch
-        st.markdown(f"**Temps restant:** ~{estimated_time}s")
-    
+with col_chart2:
+    st.markdown('<div class="chart-card">', unsafe_allow_html=True)
+    st.markdown('<div class="chart-title">📈 Scores de Validation Croisée</div>', unsafe_allow_html=True)
+    cv_chart = st.bar_chart(cv_frame(state['cv_folds']), color='#3b82f6', height=350)
     st.markdown('</div>', unsafe_allow_html=True)
-    
-    # Métriques actuelles
-    st.markdown("<br>", unsafe_allow_html=True)
-    
-    if len(st.session_state.training_history['epoch']) > 0:
-        latest_idx = -1
-        
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            st.markdown(f"""
-            <div class="metric-card" style="border-top-color: #ef4444;">
-                <div class="metric-label">Train Loss</div>
-                <div class="metric-value" style="color: #ef4444;">
-                    {st.session_state.training_history['train_loss'][latest_idx]:.4f}
-                </div>
-                <div class="metric-change" style="color: #10b981;">
-                    ↓ Diminution
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col2:
-            st.markdown(f"""
-            <div class="metric-card" style="border-top-color: #f59e0b;">
-                <div class="metric-label">Val Loss</div>
-                <div class="metric-value" style="color: #f59e0b;">
-                    {st.session_state.training_history['val_loss'][latest_idx]:.4f}
-                </div>
-                <div class="metric-change" style="color: #10b981;">
-                    ↓ Diminution
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col3:
-            st.markdown(f"""
-            <div class="metric-card" style="border-top-color: #3b82f6;">
-                <div class="metric-label">Train Accuracy</div>
-                <div class="metric-value" style="color: #3b82f6;">
-                    {st.session_state.training_history['train_acc'][latest_idx]:.2f}%
-                </div>
-                <div class="metric-change" style="color: #10b981;">
-                    ↗ Amélioration
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col4:
-            st.markdown(f"""
-            <div class="metric-card" style="border-top-color: #10b981;">
-                <div class="metric-label">Val Accuracy</div>
-                <div class="metric-value" style="color: #10b981;">
-                    {st.session_state.training_history['val_acc'][latest_idx]:.2f}%
-                </div>
-                <div class="metric-change" style="color: #10b981;">
-                    ↗ Amélioration
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-
-# Graphiques d'apprentissage (pour la simulation)
-if len(st.session_state.training_history['epoch']) > 0 and not st.session_state.training_results:
-    st.markdown("<br>", unsafe_allow_html=True)
-    
-    col_chart1, col_chart2 = st.columns(2)
-    
-    with col_chart1:
-        st.markdown('<div class="chart-card">', unsafe_allow_html=True)
-        st.markdown('<div class="chart-title">📉 Courbes de Loss</div>', unsafe_allow_html=True)
-        
-        fig_loss = go.Figure()
-        fig_loss.add_trace(go.Scatter(
-            x=st.session_state.training_history['epoch'],
-            y=st.session_state.training_history['train_loss'],
-            name='Train Loss',
-            line=dict(color='#ef4444', width=3),
-            mode='lines+markers'
-        ))
-        fig_loss.add_trace(go.Scatter(
-            x=st.session_state.training_history['epoch'],
-            y=st.session_state.training_history['val_loss'],
-            name='Val Loss',
-            line=dict(color='#f59e0b', width=3),
-            mode='lines+markers'
-        ))
-        
-        fig_loss.update_layout(
-            height=350,
-            margin=dict(l=0, r=0, t=20, b=0),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            xaxis=dict(title='Epoch', showgrid=True, gridcolor='rgba(0,0,0,0.05)'),
-            yaxis=dict(title='Loss', showgrid=True, gridcolor='rgba(0,0,0,0.05)'),
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-            hovermode='x unified'
-        )
-        
-        st.plotly_chart(fig_loss, use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    with col_chart2:
-        st.markdown('<div class="chart-card">', unsafe_allow_html=True)
-        st.markdown('<div class="chart-title">📈 Courbes d\'Accuracy</div>', unsafe_allow_html=True)
-        
-        fig_acc = go.Figure()
-        fig_acc.add_trace(go.Scatter(
-            x=st.session_state.training_history['epoch'],
-            y=st.session_state.training_history['train_acc'],
-            name='Train Accuracy',
-            line=dict(color='#3b82f6', width=3),
-            mode='lines+markers'
-        ))
-        fig_acc.add_trace(go.Scatter(
-            x=st.session_state.training_history['epoch'],
-            y=st.session_state.training_history['val_acc'],
-            name='Val Accuracy',
-            line=dict(color='#10b981', width=3),
-            mode='lines+markers'
-        ))
-        
-        fig_acc.update_layout(
-            height=350,
-            margin=dict(l=0, r=0, t=20, b=0),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            xaxis=dict(title='Epoch', showgrid=True, gridcolor='rgba(0,0,0,0.05)'),
-            yaxis=dict(title='Accuracy (%)', showgrid=True, gridcolor='rgba(0,0,0,0.05)'),
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-            hovermode='x unified'
-        )
-        
-        st.plotly_chart(fig_acc, use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+
+st.markdown('<div class="chart-card">', unsafe_allow_html=True)
+st.markdown('<div class="chart-title">⏱️ Durée des Phases</div>', unsafe_allow_html=True)
+phases_slot = st.empty()
+render_phases(phases_slot)
+st.markdown('</div>', unsafe_allow_html=True)
 
 # Logs d'entraînement
 st.markdown("<br>", unsafe_allow_html=True)
 st.markdown('<div class="chart-card">', unsafe_allow_html=True)
 st.markdown('<div class="chart-title">📋 Logs d\'Entraînement</div>', unsafe_allow_html=True)
-
-log_html = '<div class="log-container">'
-for log in reversed(st.session_state.logs[-50:]):  # Afficher les 50 derniers logs
-    log_class = f"log-{log['type']}"
-    log_html += f'<div class="log-entry"><span class="log-time">[{log["time"]}]</span> <span class="{log_class}">{log["message"]}</span></div>'
-
-if not st.session_state.logs:
-    log_html += '<div class="log-entry"><span class="log-info">Aucun log disponible. Démarrez l\'entraînement pour voir les logs.</span></div>'
-
-log_html += '</div>'
-st.markdown(log_html, unsafe_allow_html=True)
+logs_slot = st.empty()
+render_logs(logs_slot)
 st.markdown('</div>', unsafe_allow_html=True)
 
 # Boutons d'action
@@ -577,30 +534,40 @@ with col1:
         st.switch_page("pages/config_model.py")
 
 with col2:
-    if st.session_state.training_results or (st.session_state.current_epoch >= st.session_state.total_epochs and not st.session_state.is_training):
-        if st.button("📊 Voir Résultats Détaillés", use_container_width=True, type="primary"):
-            # Sauvegarder les résultats pour la page suivante
-            if st.session_state.training_results:
-                st.session_state.final_results = st.session_state.training_results
-            else:
-                # Créer des résultats simulés pour la démo
-                st.session_state.final_results = {
-                    'metrics': {
-                        'test_accuracy': random.uniform(0.85, 0.95),
-                        'precision': random.uniform(0.82, 0.92),
-                        'recall': random.uniform(0.83, 0.93),
-                        'f1_score': random.uniform(0.84, 0.94),
-                        'training_time': st.session_state.total_epochs * 0.3
-                    },
-                    'model_id': st.session_state.get('model_id', 'demo_model'),
-                    'experiment_id': st.session_state.get('experiment_id', 'demo_experiment')
-                }
-            st.switch_page("pages/Results.py")
+    results_button_slot = st.empty()
+    results_button_shown = render_results_button(results_button_slot)
 
 with col3:
     if st.button("📋 Liste des Modèles", use_container_width=True):
         st.switch_page("pages/Gestion_model.py")
 
+# Suivi en direct : un seul abonnement au flux d'événements, les emplacements
+# ci-dessus sont mis à jour en place (un clic sur un bouton interrompt le suivi)
+if st.session_state.follow_training and state['status'] not in TERMINAL_STATUSES:
+    try:
+        for event in api_client.stream_training_events(st.session_state.experiment_id, state['last_event_id']):
+            new_rows = apply_event(event)
+            if 'loss' in new_rows:
+                loss_chart.add_rows(new_rows['loss'])
+            if 'cv' in new_rows:
+                cv_chart.add_rows(new_rows['cv'])
+            if event['type'] in ('status', 'phase'):
+                render_status(status_slot)
+                render_phases(phases_slot)
+            render_progress(progress_slot)
+            if event['type'] != 'iteration' or event['iteration'] == event['total']:
+                render_logs(logs_slot)
+    except Exception as e:
+        show_error(f"❌ Suivi de l'entraînement interrompu: {str(e)}")
+    
+    if st.session_state.training_progress['status'] in TERMINAL_STATUSES:
+        st.session_state.follow_training = False
+        st.session_state.training_results = get_training_results()
+        render_results(results_slot)
+        if not results_button_shown:
+            render_results_button(results_button_slot)
+        if st.session_state.training_progress['status'] == 'completed':
+            st.balloons()
 
 # Session
 def print_session_state():
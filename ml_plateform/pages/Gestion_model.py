@@ -24,6 +24,8 @@ if 'models_list' not in st.session_state:
     st.session_state.models_list = []
 if 'last_refresh' not in st.session_state:
     st.session_state.last_refresh = None
+if 'models_next_cursor' not in st.session_state:
+    st.session_state.models_next_cursor = None
 
 # CSS personnalisé (identique)
 st.markdown("""
@@ -307,12 +309,57 @@ def format_primary_metric(value, problem_type):
         # Accuracy en pourcentage
         return f"{value * 100:.1f}%"
 
+# Filtres appliqués côté serveur (/api/models/list)
+STATUS_FILTERS = {"Tous": None, "Déployé": "deployed", "Actif": "active", "Archivé": "archived"}
+TASK_FILTERS = {"Tous": None, "Classification": "Classification", "Regression": "Régression"}
+SORT_OPTIONS = {
+    "Date (récent)": ("created_at", "desc"),
+    "Date (ancien)": ("created_at", "asc"),
+    "Performance": (None, "desc"),  # métrique principale selon la tâche filtrée
+    "Nom": ("name", "asc")
+}
+# Seuls les champs affichés dans la liste sont transférés (détails via get_model)
+LIST_FIELDS = [
+    "name", "model_type", "created_at", "size_mb", "status", "task_type", "problem_type",
+    "project_id", "version", "parent_model_id",
+    "metrics.test_accuracy", "metrics.accuracy", "metrics.test_r2", "metrics.train_r2",
+    "metrics.training_time", "metrics.n_samples", "metrics.n_features"
+]
+# Modèles chargés par page ; la suite est demandée via "Charger plus"
+PAGE_SIZE = 50
+# Modèles dont l'entraînement peut être poursuivi (/api/train/continue)
+CONTINUABLE_MODELS = ("Random Forest", "Gradient Boosting", "XGBoost", "Logistic Regression", "SGD")
+
+def current_model_filters():
+    """Paramètres de listing lus depuis les widgets de filtre (valeurs du dernier rerun)"""
+    task_type = TASK_FILTERS[st.session_state.get("models_task_filter", "Tous")]
+    sort, order = SORT_OPTIONS[st.session_state.get("models_sort_by", "Date (récent)")]
+    if sort is None:
+        sort = "metrics.test_r2" if task_type == "Régression" else "metrics.test_accuracy"
+    return {
+        "status": STATUS_FILTERS[st.session_state.get("models_status_filter", "Tous")],
+        "task_type": task_type,
+        "search": st.session_state.get("models_search") or None,
+        "sort": sort,
+        "order": order
+    }
+
 # Fonction pour charger les modèles depuis l'API
-def load_models_from_api():
-    """Charger la liste des modèles depuis l'API"""
+def load_models_from_api(cursor=None):
+    """
+    Charger une page de la liste filtrée des modèles depuis l'API (sans
+    curseur : la première page et le résumé global). Le curseur de la page
+    suivante est gardé pour le bouton "Charger plus".
+    """
+    filters = current_model_filters()
     try:
-        models = api_client.list_models()
-        st.session_state.models_list = models
+        page = api_client.list_models_page(cursor=cursor, limit=PAGE_SIZE, fields=LIST_FIELDS, **filters)
+        models = page["items"]
+        if cursor is None:
+            st.session_state.models_summary = api_client.get_models_summary()
+            st.session_state.models_list = models
+        st.session_state.models_next_cursor = page["next_cursor"]
+        st.session_state.models_filters = filters
         st.session_state.last_refresh = datetime.now()
         return models
     except Exception as e:
@@ -336,16 +383,9 @@ def format_model_data(api_models):
         # Obtenir la métrique principale
         primary_metric = get_primary_metric(model, problem_type)
         
-        # Déterminer le statut basé sur l'âge du modèle
         created_at = datetime.fromisoformat(model['created_at'].replace('Z', '+00:00'))
-        days_ago = (datetime.now(created_at.tzinfo) - created_at).days
-        
-        if days_ago <= 7:
-            status = 'deployed'
-        elif days_ago <= 30:
-            status = 'active'
-        else:
-            status = 'archived'
+        # Statut réel du modèle : c'est lui que filtre le serveur
+        status = model.get('status') or 'active'
         
         formatted_models.append({
             'id': model['id'],
@@ -355,12 +395,12 @@ def format_model_data(api_models):
             'primary_metric': primary_metric,
             'primary_metric_name': 'R²' if problem_type == 'Régression' else 'Accuracy',
             'date': created_at,
-            'size': model.get('size_mb', 10.0),
+            'size': model.get('size_mb') or 0.0,
             'status': status,
             'training_time': metrics.get('training_time', 15),
             'samples': metrics.get('n_samples', 5000),
             'features': metrics.get('n_features', 10),
-            'version': '1.0.0',
+            'version': model.get('version') or '1.0.0',
             'model_data': model,  # Données complètes de l'API
             'problem_type': problem_type  # ✅ Stocker le problem_type
         })
@@ -378,24 +418,34 @@ except:
 
 
 
-# Charger les modèles au démarrage
-if not st.session_state.models_list:
+if 'models_summary' not in st.session_state:
+    st.session_state.models_summary = None
+if 'models_filters' not in st.session_state:
+    st.session_state.models_filters = None
+
+# Charger les modèles au démarrage et à chaque changement de filtre
+if st.session_state.models_summary is None or st.session_state.models_filters != current_model_filters():
     with show_loading("Chargement des modèles..."):
         api_models = load_models_from_api()
         if api_models:
             st.session_state.models_list = format_model_data(api_models)
             show_success(f"✅ {len(api_models)} modèle(s) chargé(s)")
+        else:
+            st.session_state.models_list = []
+
+# Statistiques agrégées côté serveur, sur l'ensemble des modèles
+summary = st.session_state.models_summary or {}
+status_counts = summary.get('by_status', {})
+total_models = summary.get('total', 0)
+deployed_count = status_counts.get('deployed', 0)
+active_count = status_counts.get('active', 0)
+total_size = summary.get('size_mb', {}).get('total', 0.0)
 
 # Sidebar
 with st.sidebar:
     st.markdown("### 🤖 FrameML")
     st.markdown("---")
     
-    # Statistiques depuis l'API
-    total_models = len(st.session_state.models_list)
-    deployed_count = sum(1 for m in st.session_state.models_list if m['status'] == 'deployed')
-    active_count = sum(1 for m in st.session_state.models_list if m['status'] == 'active')
-    
     st.markdown("#### 📊 Vue d'Ensemble")
     st.info(f"**Total Modèles:** {total_models}")
     st.info(f"**Modèles Actifs:** {active_count}")
@@ -418,13 +468,11 @@ with st.sidebar:
     if st.button("🔄 Actualiser", use_container_width=True):
         with show_loading("Actualisation des modèles..."):
             api_models = load_models_from_api()
-            if api_models:
-                st.session_state.models_list = format_model_data(api_models)
-                st.rerun()
+            st.session_state.models_list = format_model_data(api_models)
+            st.rerun()
     
     st.markdown("---")
     st.markdown("#### 💾 Stockage")
-    total_size = sum(m['size'] for m in st.session_state.models_list)
     storage_limit = 500
     storage_percent = (total_size / storage_limit) * 100 if storage_limit > 0 else 0
     
@@ -447,12 +495,11 @@ with col1:
     st.markdown(f"""
     <div class="stats-mini" style="border-top-color: #667eea;">
         <div class="stats-mini-label">Total Modèles</div>
-        <div class="stats-mini-value" style="color: #667eea;">{len(st.session_state.models_list)}</div>
+        <div class="stats-mini-value" style="color: #667eea;">{total_models}</div>
     </div>
     """, unsafe_allow_html=True)
 
 with col2:
-    deployed_count = sum(1 for m in st.session_state.models_list if m['status'] == 'deployed')
     st.markdown(f"""
     <div class="stats-mini" style="border-top-color: #10b981;">
         <div class="stats-mini-label">Déployés</div>
@@ -463,23 +510,18 @@ with col2:
     
 
 with col3:
-    # Calculer la moyenne selon le type de modèle
-    if st.session_state.models_list:
-        print(f"===========MODEL LIST: {st.session_state.models_list}======================")
-        classification_models = [m for m in st.session_state.models_list if m['problem_type'] == 'Classification']
-        regression_models = [m for m in st.session_state.models_list if m['problem_type'] == 'Régression']
+    # Moyenne (calculée par le serveur) de la métrique de la tâche majoritaire
+    task_counts = summary.get('by_task_type', {})
+    summary_metrics = summary.get('metrics', {})
+    classification_count = task_counts.get('Classification', 0)
+    regression_count = task_counts.get('Régression', 0)
 
-        if len(classification_models) >= len(regression_models) and classification_models:
-            avg_metric = sum(m['primary_metric'] for m in classification_models) / len(classification_models)
-            metric_label = "Accuracy Moyenne"
-            metric_value = f"{avg_metric * 100:.1f}%"
-        elif regression_models:
-            avg_metric = sum(m['primary_metric'] for m in regression_models) / len(regression_models)
-            metric_label = "R² Moyen"
-            metric_value = f"{avg_metric:.3f}"
-        else:
-            metric_label = "Performance"
-            metric_value = "N/A"
+    if classification_count >= regression_count and 'test_accuracy' in summary_metrics:
+        metric_label = "Accuracy Moyenne"
+        metric_value = f"{summary_metrics['test_accuracy']['avg'] * 100:.1f}%"
+    elif 'test_r2' in summary_metrics:
+        metric_label = "R² Moyen"
+        metric_value = f"{summary_metrics['test_r2']['avg']:.3f}"
     else:
         metric_label = "Performance"
         metric_value = "N/A"
@@ -492,7 +534,6 @@ with col3:
     """, unsafe_allow_html=True)
 
 with col4:
-    total_size = sum(m['size'] for m in st.session_state.models_list)
     st.markdown(f"""
     <div class="stats-mini" style="border-top-color: #ef4444;">
         <div class="stats-mini-label">Stockage Total</div>
@@ -506,17 +547,18 @@ st.markdown("<br>", unsafe_allow_html=True)
 st.markdown('<div class="filter-section">', unsafe_allow_html=True)
 col_search, col_filter1, col_filter2, col_filter3 = st.columns([2, 1, 1, 1])
 
+# Les valeurs sont lues via st.session_state avant le chargement (filtrage côté serveur)
 with col_search:
-    search_query = st.text_input("🔍 Rechercher un modèle", placeholder="Nom, type, tâche...")
+    st.text_input("🔍 Rechercher un modèle", placeholder="Nom, type...", key="models_search")
 
 with col_filter1:
-    status_filter = st.selectbox("Statut", ["Tous", "Déployé", "Actif", "Archivé"])
+    st.selectbox("Statut", list(STATUS_FILTERS), key="models_status_filter")
 
 with col_filter2:
-    task_filter = st.selectbox("Tâche", ["Tous", "Classification", "Regression"])
+    st.selectbox("Tâche", list(TASK_FILTERS), key="models_task_filter")
 
 with col_filter3:
-    sort_by = st.selectbox("Trier par", ["Date (récent)", "Date (ancien)", "Performance", "Nom"])
+    st.selectbox("Trier par", list(SORT_OPTIONS), key="models_sort_by")
 
 st.markdown('</div>', unsafe_allow_html=True)
 
@@ -527,8 +569,11 @@ with view_col2:
 
 st.markdown("<br>", unsafe_allow_html=True)
 
-# Affichage des modèles
-if not st.session_state.models_list:
+# Affichage des modèles (déjà filtrés et triés par l'API)
+if not st.session_state.models_list and total_models:
+    st.info("ℹ️ Aucun modèle ne correspond aux filtres sélectionnés.")
+
+elif not st.session_state.models_list:
     st.info("ℹ️ Aucun modèle trouvé. Créez votre premier modèle pour commencer!")
     if st.button("➕ Créer un Premier Modèle", type="primary"):
         st.switch_page("pages/config_model.py")
@@ -536,15 +581,6 @@ if not st.session_state.models_list:
 elif "Liste" in view_mode:
     # Vue Liste
     for model in st.session_state.models_list:
-        # Appliquer les filtres
-        if status_filter != "Tous":
-            status_map = {"Déployé": "deployed", "Actif": "active", "Archivé": "archived"}
-            if model['status'] != status_map[status_filter]:
-                continue
-        
-        if task_filter != "Tous" and model['problem_type'] != task_filter:
-            continue
-        
         # Border color selon le statut
         border_color = "#10b981" if model['status'] == "deployed" else "#3b82f6" if model['status'] == "active" else "#9ca3af"
         
@@ -641,8 +677,7 @@ elif "Liste" in view_mode:
                         show_success("✅ Modèle supprimé avec succès!")
                         # Recharger la liste
                         api_models = load_models_from_api()
-                        if api_models:
-                            st.session_state.models_list = format_model_data(api_models)
+                        st.session_state.models_list = format_model_data(api_models)
                         st.rerun()
                     except Exception as e:
                         show_error(f"❌ Erreur lors de la suppression: {str(e)}")
@@ -658,10 +693,6 @@ else:
             if i + j < len(st.session_state.models_list):
                 model = st.session_state.models_list[i + j]
                 
-                # Appliquer les filtres
-                if task_filter != "Tous" and model['problem_type'] != task_filter:
-                    continue
-                
                 metric_display = format_primary_metric(model['primary_metric'], model['problem_type'])
                 
                 with col:
@@ -686,6 +717,14 @@ else:
                         st.session_state.view_mode = "detail"
                         st.rerun()
 
+# Page suivante de la liste, à la demande
+if st.session_state.models_list and st.session_state.models_next_cursor:
+    if st.button("⬇️ Charger plus", key="models_load_more", use_container_width=True):
+        with show_loading("Chargement des modèles..."):
+            api_models = load_models_from_api(st.session_state.models_next_cursor)
+            st.session_state.models_list = st.session_state.models_list + format_model_data(api_models)
+            st.rerun()
+
 # Vue détaillée d'un modèle
 if st.session_state.view_mode == "detail" and st.session_state.selected_model_id:
     st.markdown("<br><br>", unsafe_allow_html=True)
@@ -1104,13 +1143,41 @@ curl -X POST <span class="code-string">"http://localhost:8000/api/predict"</span
                             result = api_client.delete_model(selected_model['id'])
                             show_success("✅ Modèle supprimé avec succès!")
                             api_models = load_models_from_api()
-                            if api_models:
-                                st.session_state.models_list = format_model_data(api_models)
+                            st.session_state.models_list = format_model_data(api_models)
                             st.session_state.view_mode = "list"
                             st.rerun()
                         except Exception as e:
                             show_error(f"❌ Erreur lors de la suppression: {str(e)}")
         
+        # Poursuivre l'entraînement (nouvelle version liée à ce modèle)
+        if selected_model['type'] in CONTINUABLE_MODELS:
+            with st.expander("🔁 Poursuivre l'Entraînement"):
+                st.caption("Repart du modèle existant au lieu de réentraîner depuis zéro")
+                continue_col1, continue_col2 = st.columns(2)
+                with continue_col1:
+                    additional_estimators = st.number_input(
+                        "Estimateurs à ajouter", min_value=1, max_value=2000, value=50, step=10,
+                        key="continue_estimators",
+                        disabled=selected_model['type'] not in ("Random Forest", "Gradient Boosting", "XGBoost")
+                    )
+                with continue_col2:
+                    new_rows_only = st.checkbox("Nouvelles lignes uniquement", key="continue_new_rows",
+                                                help="Seulement les lignes ajoutées depuis l'entraînement de ce modèle")
+                if st.button("🔁 Lancer la reprise", key="continue_training", type="primary"):
+                    try:
+                        response = api_client.continue_training(
+                            selected_model['id'],
+                            additional_estimators=int(additional_estimators),
+                            new_rows_only=new_rows_only
+                        )
+                        st.session_state.project_id = selected_model['model_data'].get('project_id', st.session_state.get('project_id'))
+                        st.session_state.training_config = {'model_type': selected_model['type'], 'continued_from': selected_model['id']}
+                        st.session_state.experiment_id = response['experiment_id']
+                        st.session_state.model_id = response['model_id']
+                        st.switch_page("pages/Entrainement.py")
+                    except Exception as e:
+                        show_error(f"❌ Erreur lors de la reprise: {str(e)}")
+        
         st.markdown('</div>', unsafe_allow_html=True)
 
 # Graphique d'évolution des modèles (si en mode liste)
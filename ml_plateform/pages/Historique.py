@@ -5,6 +5,7 @@ import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime, timedelta
 import random
+from utils.Client import api_client
 
 # Configuration de la page
 st.set_page_config(
@@ -230,8 +231,8 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Données simulées des expériences
-experiments_data = [
+# Données simulées des expériences (affichées tant que l'API n'a aucune expérience)
+demo_experiments = [
     {
         'id': 1,
         'name': 'Exp-001: Random Forest Optimisé',
@@ -377,16 +378,127 @@ experiments_data = [
     }
 ]
 
+# Filtres appliqués côté serveur (/api/experiments/list)
+PERIOD_FILTERS = {"Tout": None, "7 derniers jours": 7, "30 derniers jours": 30, "90 derniers jours": 90}
+PERF_FILTERS = {"Toutes": (None, None), ">90%": (0.9, None), ">85%": (0.85, None), "<85%": (None, 0.85)}
+SORT_OPTIONS = {
+    "Date (récent)": ("created_at", "desc"),
+    "Date (ancien)": ("created_at", "asc"),
+    "Accuracy": ("metrics.test_accuracy", "desc"),
+    "Temps": ("training_time", "desc")
+}
+# Champs affichés : la matrice de confusion et le rapport de classification ne sont pas transférés
+LIST_FIELDS = [
+    "name", "model_type", "created_at", "training_time", "status", "hyperparameters",
+    "metrics.test_accuracy", "metrics.test_r2", "metrics.precision", "metrics.recall", "metrics.f1_score"
+]
+# Expériences chargées par page ; la suite est demandée via "Charger plus"
+PAGE_SIZE = 50
+# Widgets de filtre : la liste est rechargée depuis la première page quand l'un d'eux change
+FILTER_KEYS = ("history_model_filter", "history_period", "history_perf_filter", "history_sort_by", "history_search")
+
+def current_experiment_filters():
+    """Paramètres de listing lus depuis les widgets de filtre (valeurs du dernier rerun)"""
+    model_type = st.session_state.get("history_model_filter", "Tous")
+    days = PERIOD_FILTERS[st.session_state.get("history_period", "Tout")]
+    metric_min, metric_max = PERF_FILTERS[st.session_state.get("history_perf_filter", "Toutes")]
+    sort, order = SORT_OPTIONS[st.session_state.get("history_sort_by", "Date (récent)")]
+    filters = {
+        "model_type": None if model_type == "Tous" else model_type,
+        "search": st.session_state.get("history_search") or None,
+        "created_after": (datetime.utcnow() - timedelta(days=days)).isoformat() if days else None,
+        "sort": sort,
+        "order": order
+    }
+    if metric_min is not None or metric_max is not None:
+        filters.update(metric="test_accuracy", metric_min=metric_min, metric_max=metric_max)
+    return filters
+
+def to_history_entry(exp):
+    """Expérience de l'API -> format d'affichage de la page (pourcentages, minutes)"""
+    metrics = exp.get('metrics') or {}
+    score = metrics.get('test_accuracy')
+    if score is None:
+        score = metrics.get('test_r2') or 0.0
+    return {
+        'id': exp['id'],
+        'name': exp.get('name') or f"{exp['model_type']} ({exp['id'][:8]})",
+        'model': exp['model_type'],
+        'date': datetime.fromisoformat(exp['created_at']),
+        'accuracy': round(score * 100, 1),
+        'precision': round((metrics.get('precision') or 0.0) * 100, 1),
+        'recall': round((metrics.get('recall') or 0.0) * 100, 1),
+        'f1_score': metrics.get('f1_score') or 0.0,
+        'training_time': round((exp.get('training_time') or 0.0) / 60, 1),
+        'status': exp['status'],
+        'config': exp.get('hyperparameters') or {}
+    }
+
+def load_experiments_page(cursor=None):
+    """
+    Charger une page d'expériences avec les filtres de la première page
+    (sans curseur : nouvelle requête, liste remise à zéro)
+    """
+    if cursor is None:
+        st.session_state.history_query = current_experiment_filters()
+        st.session_state.history_experiments = []
+    page = api_client.list_experiments_page(
+        cursor=cursor, limit=PAGE_SIZE, fields=LIST_FIELDS, **st.session_state.history_query
+    )
+    st.session_state.history_experiments += [to_history_entry(exp) for exp in page["items"]]
+    st.session_state.history_next_cursor = page["next_cursor"]
+
+def load_experiments():
+    """
+    Expériences filtrées déjà chargées (première page au premier affichage
+    ou après un changement de filtre) + résumé global (agrégats calculés
+    par le serveur)
+    """
+    try:
+        summary = api_client.get_experiments_summary(metrics=["test_accuracy"])
+        if not summary['total']:
+            return None, None
+        filters_key = tuple(st.session_state.get(key) for key in FILTER_KEYS)
+        if st.session_state.get("history_filters_key") != filters_key or "history_experiments" not in st.session_state:
+            load_experiments_page()
+            st.session_state.history_filters_key = filters_key
+        return st.session_state.history_experiments, summary
+    except Exception:
+        return None, None
+
+experiments_data, experiments_summary = load_experiments()
+demo_mode = experiments_summary is None
+if demo_mode:
+    experiments_data = demo_experiments
+    accuracy_values = [e['accuracy'] for e in experiments_data]
+    stats = {
+        'total': len(experiments_data),
+        'completed': sum(1 for e in experiments_data if e['status'] == 'completed'),
+        'avg_accuracy': sum(accuracy_values) / len(accuracy_values),
+        'best_accuracy': max(accuracy_values),
+        'total_time': sum(e['training_time'] for e in experiments_data),
+        'models': sorted(set(e['model'] for e in experiments_data))
+    }
+else:
+    accuracy = experiments_summary['metrics'].get('test_accuracy', {})
+    stats = {
+        'total': experiments_summary['total'],
+        'completed': experiments_summary['by_status'].get('completed', 0),
+        'avg_accuracy': (accuracy.get('avg') or 0.0) * 100,
+        'best_accuracy': round((accuracy.get('max') or 0.0) * 100, 1),
+        'total_time': round(experiments_summary['training_time']['total'] / 60, 1),
+        'models': sorted(experiments_summary['by_model_type'])
+    }
+
 # Sidebar
 with st.sidebar:
     st.markdown("### 🤖 FrameML")
     st.markdown("---")
     
     st.markdown("#### 📊 Statistiques")
-    st.info(f"**Total Expériences:** {len(experiments_data)}")
-    st.info(f"**Complétées:** {sum(1 for e in experiments_data if e['status'] == 'completed')}")
-    best_acc = max(e['accuracy'] for e in experiments_data)
-    st.info(f"**Meilleure Accuracy:** {best_acc}%")
+    st.info(f"**Total Expériences:** {stats['total']}")
+    st.info(f"**Complétées:** {stats['completed']}")
+    st.info(f"**Meilleure Accuracy:** {stats['best_accuracy']}%")
     
     st.markdown("---")
     
@@ -421,34 +533,31 @@ with col1:
     st.markdown(f"""
     <div class="stats-card" style="border-top-color: #667eea;">
         <div class="stats-label">Total Expériences</div>
-        <div class="stats-value" style="color: #667eea;">{len(experiments_data)}</div>
+        <div class="stats-value" style="color: #667eea;">{stats['total']}</div>
     </div>
     """, unsafe_allow_html=True)
 
 with col2:
-    avg_accuracy = sum(e['accuracy'] for e in experiments_data) / len(experiments_data)
     st.markdown(f"""
     <div class="stats-card" style="border-top-color: #10b981;">
         <div class="stats-label">Accuracy Moyenne</div>
-        <div class="stats-value" style="color: #10b981;">{avg_accuracy:.1f}%</div>
+        <div class="stats-value" style="color: #10b981;">{stats['avg_accuracy']:.1f}%</div>
     </div>
     """, unsafe_allow_html=True)
 
 with col3:
-    best_exp = max(experiments_data, key=lambda x: x['accuracy'])
     st.markdown(f"""
     <div class="stats-card" style="border-top-color: #f59e0b;">
         <div class="stats-label">Meilleur Score</div>
-        <div class="stats-value" style="color: #f59e0b;">{best_exp['accuracy']}%</div>
+        <div class="stats-value" style="color: #f59e0b;">{stats['best_accuracy']}%</div>
     </div>
     """, unsafe_allow_html=True)
 
 with col4:
-    total_time = sum(e['training_time'] for e in experiments_data)
     st.markdown(f"""
     <div class="stats-card" style="border-top-color: #ef4444;">
         <div class="stats-label">Temps Total</div>
-        <div class="stats-value" style="color: #ef4444;">{total_time}min</div>
+        <div class="stats-value" style="color: #ef4444;">{stats['total_time']}min</div>
     </div>
     """, unsafe_allow_html=True)
 
@@ -458,23 +567,29 @@ st.markdown("<br>", unsafe_allow_html=True)
 st.markdown('<div class="filter-section">', unsafe_allow_html=True)
 col_search, col_filter1, col_filter2, col_filter3, col_filter4 = st.columns([2, 1, 1, 1, 1])
 
+# Les valeurs sont lues via st.session_state avant le chargement (filtrage côté serveur)
 with col_search:
-    search_query = st.text_input("🔍 Rechercher une expérience", placeholder="Nom, modèle...")
+    st.text_input("🔍 Rechercher une expérience", placeholder="Nom, modèle...", key="history_search")
 
 with col_filter1:
-    model_filter = st.selectbox("Modèle", ["Tous"] + list(set(e['model'] for e in experiments_data)))
+    st.selectbox("Modèle", ["Tous"] + stats['models'], key="history_model_filter")
 
 with col_filter2:
-    date_range = st.selectbox("Période", ["Tout", "7 derniers jours", "30 derniers jours", "90 derniers jours"])
+    st.selectbox("Période", list(PERIOD_FILTERS), key="history_period")
 
 with col_filter3:
-    perf_filter = st.selectbox("Performance", ["Toutes", ">90%", ">85%", "<85%"])
+    st.selectbox("Performance", list(PERF_FILTERS), key="history_perf_filter")
 
 with col_filter4:
-    sort_by = st.selectbox("Trier par", ["Date (récent)", "Date (ancien)", "Accuracy", "Temps"])
+    st.selectbox("Trier par", list(SORT_OPTIONS), key="history_sort_by")
 
 st.markdown('</div>', unsafe_allow_html=True)
 
+if demo_mode:
+    st.info("ℹ️ Aucune expérience enregistrée : affichage de données de démonstration (filtres inactifs).")
+elif not experiments_data:
+    st.info("ℹ️ Aucune expérience ne correspond aux filtres sélectionnés.")
+
 # Mode comparaison
 col_mode1, col_mode2 = st.columns([6, 1])
 with col_mode2:
@@ -489,20 +604,8 @@ if st.session_state.comparison_mode:
 
 st.markdown("<br>", unsafe_allow_html=True)
 
-# Liste des expériences
+# Liste des expériences (déjà filtrées et triées par l'API)
 for exp in experiments_data:
-    # Filtres
-    if model_filter != "Tous" and exp['model'] != model_filter:
-        continue
-    
-    if perf_filter != "Toutes":
-        if perf_filter == ">90%" and exp['accuracy'] <= 90:
-            continue
-        elif perf_filter == ">85%" and exp['accuracy'] <= 85:
-            continue
-        elif perf_filter == "<85%" and exp['accuracy'] >= 85:
-            continue
-    
     # Déterminer la couleur selon la performance
     if exp['accuracy'] >= 90:
         border_color = "#10b981"
@@ -603,6 +706,16 @@ for exp in experiments_data:
     
     st.markdown("<br>", unsafe_allow_html=True)
 
+# Page suivante, à la demande
+if not demo_mode and experiments_data and st.session_state.get("history_next_cursor"):
+    if st.button("⬇️ Charger plus", key="history_load_more", use_container_width=True):
+        with st.spinner("Chargement des expériences..."):
+            try:
+                load_experiments_page(st.session_state.history_next_cursor)
+            except Exception as e:
+                st.error(f"❌ Erreur lors du chargement: {str(e)}")
+        st.rerun()
+
 # Section Comparaison
 if st.session_state.comparison_mode and len(st.session_state.selected_experiments) > 1:
     st.markdown("<br><br>", unsafe_allow_html=True)
@@ -704,7 +817,7 @@ if st.session_state.comparison_mode and len(st.session_state.selected_experiment
     st.markdown('</div>', unsafe_allow_html=True)
 
 # Timeline des expériences
-if not st.session_state.comparison_mode:
+if not st.session_state.comparison_mode and experiments_data:
     st.markdown("<br><br>", unsafe_allow_html=True)
     st.markdown('<div class="comparison-section">', unsafe_allow_html=True)
     st.markdown('<div class="section-title">📅 Timeline des Expériences</div>', unsafe_allow_html=True)
@@ -890,7 +1003,8 @@ if not st.session_state.comparison_mode:
     
     with col_rec2:
         st.markdown("#### ⚡ Meilleur Rapport Perf/Temps")
-        efficiency = {e['id']: e['accuracy'] / e['training_time'] for e in experiments_data}
+        # Temps minimal de 0,1 min : un entraînement très court arrondi à 0 ne divise pas par zéro
+        efficiency = {e['id']: e['accuracy'] / max(e['training_time'], 0.1) for e in experiments_data}
         best_efficient_id = max(efficiency, key=efficiency.get)
         best_efficient = next(e for e in experiments_data if e['id'] == best_efficient_id)
         st.markdown(f"""
@@ -1,3 +1,4 @@
+import time
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
@@ -12,6 +13,11 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Suivi d'une recherche d'hyperparamètres lancée en arrière-plan : intervalle
+# de rafraîchissement et durée au-delà de laquelle la page arrête de la suivre
+SEARCH_POLL_S = 2
+SEARCH_FOLLOW_TIMEOUT_S = 3600
+
 # Vérifier qu'un projet existe
 if 'project_id' not in st.session_state:
     st.error("❌ Aucun projet trouvé. Veuillez d'abord créer un projet.")
@@ -736,6 +742,101 @@ if st.session_state.selected_model:
             st.session_state.selected_model = None
             st.session_state.training_config = {}
             st.rerun()
+        
+        # Recherche automatique d'hyperparamètres (espace par défaut du modèle)
+        if st.session_state.model_category != "Deep Learning":
+            with st.expander("🔍 Recherche d'Hyperparamètres"):
+                strategy = st.selectbox(
+                    "Stratégie",
+                    ["random", "halving", "hyperband", "grid"],
+                    format_func=lambda s: {"random": "Aléatoire", "halving": "Successive Halving",
+                                           "hyperband": "Hyperband", "grid": "Grille"}[s]
+                )
+                # La grille essaie toutes les combinaisons : pas de nombre d'essais
+                if strategy == "grid":
+                    n_trials = None
+                    st.caption("La grille essaie toutes les combinaisons de l'espace de recherche.")
+                else:
+                    n_trials = st.number_input("Nombre d'essais", 4, 200, 20)
+                refit = st.checkbox("Entraîner la meilleure configuration", value=True)
+                
+                if st.button("🔍 Lancer la Recherche", use_container_width=True):
+                    try:
+                        response = api_client.search_hyperparameters(
+                            st.session_state.project_id,
+                            st.session_state.selected_model,
+                            strategy=strategy,
+                            **({"n_trials": int(n_trials)} if n_trials is not None else {}),
+                            train_test_split=train_test_split,
+                            refit=refit
+                        )
+                        st.session_state.search_id = response["search_id"]
+                        st.session_state.search_started = time.time()
+                        st.session_state.search_results = None
+                    except Exception as e:
+                        show_error(f"❌ Erreur lors de la recherche: {str(e)}")
+                
+                # La recherche tourne en arrière-plan : seul ce fragment est
+                # réexécuté pour suivre son état, la page reste utilisable
+                @st.fragment(run_every=SEARCH_POLL_S)
+                def follow_search():
+                    search_id = st.session_state.get("search_id")
+                    if not search_id:
+                        return
+                    try:
+                        results = api_client.get_search(search_id)
+                    except Exception as e:
+                        st.session_state.search_id = None
+                        show_error(f"❌ Erreur lors du suivi de la recherche: {str(e)}")
+                        return
+                    
+                    if results["search_status"] == "running":
+                        elapsed = time.time() - st.session_state.search_started
+                        if elapsed > SEARCH_FOLLOW_TIMEOUT_S:
+                            st.session_state.search_id = None
+                            st.warning(f"⏱️ Recherche toujours en cours après {elapsed / 60:.0f} min : "
+                                       f"suivi arrêté (search_id {search_id}).")
+                            return
+                        st.info(f"⏳ Recherche en cours... {len(results['leaderboard'])} essai(s) terminé(s) "
+                                f"({elapsed:.0f}s)")
+                        return
+                    
+                    # Terminée : réafficher toute la page avec le classement
+                    st.session_state.search_id = None
+                    st.session_state.search_results = results
+                    st.rerun()
+                
+                follow_search()
+                
+                results = st.session_state.get("search_results")
+                if results:
+                    if results["search_status"] == "completed":
+                        show_success(
+                            f"✅ {results['n_completed']} essais complets, "
+                            f"{results['n_stopped']} arrêtés tôt ({results['search_time']:.1f}s)"
+                        )
+                    else:
+                        show_error(f"❌ Erreur lors de la recherche: {results.get('error') or 'recherche interrompue'}")
+                if results and results["leaderboard"]:
+                    leaderboard = pd.DataFrame([
+                        {"Rang": rank, "Statut": row["status"], "Score CV": (row["metrics"] or {}).get("cv_mean"),
+                         "Données": (row["metrics"] or {}).get("resource"), **(row["hyperparameters"] or {})}
+                        for rank, row in enumerate(results["leaderboard"], start=1)
+                    ])
+                    st.dataframe(leaderboard, use_container_width=True, hide_index=True)
+                    
+                    if results.get("refit"):
+                        if st.button("📈 Suivre l'Entraînement du Meilleur Modèle", use_container_width=True):
+                            st.session_state.training_config = {
+                                "model_type": st.session_state.selected_model,
+                                "problem_type": problem_type,
+                                "hyperparameters": results["best"]["hyperparameters"],
+                                "train_test_split": train_test_split,
+                                "use_cross_validation": True
+                            }
+                            st.session_state.experiment_id = results["refit"]["experiment_id"]
+                            st.session_state.model_id = results["refit"]["model_id"]
+                            st.switch_page("pages/Entrainement.py")
 
 else:
     # Message si aucun modèle sélectionné
@@ -1,30 +1,173 @@
 import requests
 import streamlit as st
 import pandas as pd
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, Optional, Union
+from collections import OrderedDict, defaultdict
 import io
+import json
+import threading
+import time
+
+class ResponseCache:
+    """
+    Cache local des réponses GET de l'API.
+    
+    Une entrée plus jeune que `ttl` secondes est réutilisée sans requête ;
+    au-delà, elle est revalidée (If-None-Match / If-Modified-Since) : un
+    304 évite le transfert et le décodage JSON. Les objets retournés sont
+    partagés entre les appels : ne pas les modifier.
+    """
+    
+    def __init__(self, ttl: float = 2.0, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = defaultdict(int)
+    
+    def get(self, key) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+    
+    def store(self, key, data, etag: Optional[str], last_modified: Optional[str], size: int):
+        with self._lock:
+            self._entries[key] = {
+                "data": data, "etag": etag, "last_modified": last_modified,
+                "size": size, "stored_at": time.monotonic()
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def touch(self, key):
+        """Entrée revalidée par un 304 : de nouveau fraîche pour `ttl` secondes"""
+        with self._lock:
+            if key in self._entries:
+                self._entries[key]["stored_at"] = time.monotonic()
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs pour le panneau de debug de la sidebar"""
+        requests_count = self.counters["fresh_hits"] + self.counters["revalidated"] + self.counters["misses"]
+        hits = self.counters["fresh_hits"] + self.counters["revalidated"]
+        return {
+            "entries": len(self._entries),
+            "requests": requests_count,
+            "fresh_hits": self.counters["fresh_hits"],
+            "revalidated": self.counters["revalidated"],
+            "misses": self.counters["misses"],
+            "invalidations": self.counters["invalidations"],
+            "bytes_saved": self.counters["bytes_saved"],
+            "hit_rate": round(hits / requests_count, 4) if requests_count else 0.0
+        }
 
 class MLAPIClient:
-    def __init__(self, base_url: str = "http://localhost:8000"):
+    def __init__(self, base_url: str = "http://localhost:8000", cache_ttl: float = 2.0,
+                 cache_max_entries: int = 256):
         self.base_url = base_url
         self.session = requests.Session()
+        # Cache partagé par toutes les sessions Streamlit du processus ; ttl=0 : revalider à chaque appel
+        self.cache = ResponseCache(cache_ttl, cache_max_entries)
     
-    def _make_request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
-        """Faire une requête à l'API avec gestion d'erreurs"""
+    def _make_request(self, method: str, endpoint: str, ttl: Optional[float] = None, **kwargs) -> Dict[str, Any]:
+        """
+        Faire une requête à l'API avec gestion d'erreurs. Les GET passent
+        par le cache local (`ttl` remplace la durée de fraîcheur par
+        défaut) ; toute autre méthode vide le cache.
+        """
         url = f"{self.base_url}{endpoint}"
         
         try:
+            if method == "GET":
+                return self._cached_get(url, ttl, **kwargs)
             response = self.session.request(method, url, **kwargs)
+            # Une écriture peut rendre obsolète n'importe quelle lecture en cache
+            self.cache.clear()
+            self.cache.counters["invalidations"] += 1
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             st.error(f"Erreur API: {str(e)}")
             raise
     
+    def _cached_get(self, url: str, ttl: Optional[float] = None, params: Optional[Dict] = None,
+                    headers: Optional[Dict] = None, **kwargs) -> Dict[str, Any]:
+        key = (url, json.dumps(params or {}, sort_keys=True, default=str))
+        entry = self.cache.get(key)
+        ttl = self.cache.ttl if ttl is None else ttl
+        if entry is not None and time.monotonic() - entry["stored_at"] < ttl:
+            self.cache.counters["fresh_hits"] += 1
+            return entry["data"]
+        
+        headers = dict(headers or {})
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        
+        response = self.session.request("GET", url, params=params, headers=headers, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            self.cache.counters["revalidated"] += 1
+            self.cache.counters["bytes_saved"] += entry["size"]
+            self.cache.touch(key)
+            return entry["data"]
+        
+        response.raise_for_status()
+        data = response.json()
+        self.cache.counters["misses"] += 1
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self.cache.store(key, data, etag, last_modified, len(response.content))
+        return data
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Efficacité du cache local (hits frais, revalidations 304, octets évités)"""
+        return self.cache.stats()
+    
+    @staticmethod
+    def _list_params(params: Dict[str, Any]) -> Dict[str, Any]:
+        """Filtres de listing : None ignoré, listes jointes par des virgules"""
+        return {
+            key: ",".join(map(str, value)) if isinstance(value, (list, tuple)) else value
+            for key, value in params.items() if value is not None
+        }
+    
+    def _get_page(self, endpoint: str, key: str, cursor: Optional[str] = None,
+                  limit: Optional[int] = None, **params) -> Dict:
+        """Une page d'un endpoint de liste : {"items": [...], "next_cursor": ...}"""
+        params = self._list_params({**params, "cursor": cursor, "limit": limit})
+        response = self._make_request("GET", endpoint, params=params)
+        return {"items": response[key], "next_cursor": response.get("next_cursor")}
+    
+    def _get_all_pages(self, endpoint: str, key: str, **params) -> List[Dict]:
+        """
+        Parcourir toutes les pages d'un endpoint de liste (pagination par
+        curseur). Pour l'affichage, préférer _get_page et charger la suite à la demande.
+        """
+        params = self._list_params(params)
+        items = []
+        cursor = None
+        while True:
+            if cursor:
+                params["cursor"] = cursor
+            response = self._make_request("GET", endpoint, params=params)
+            items.extend(response[key])
+            cursor = response.get("next_cursor")
+            if not cursor:
+                return items
+    
     def health_check(self) -> bool:
         """Vérifier que l'API est en ligne"""
         try:
-            response = self._make_request("GET", "/api/health")
+            response = self._make_request("GET", "/api/health", ttl=0)
             return response.get("status") == "healthy"
         except:
             return False
@@ -44,8 +187,7 @@ class MLAPIClient:
     
     def list_projects(self) -> List[Dict]:
         """Lister tous les projets"""
-        response = self._make_request("GET", "/api/projects/list")
-        return response["projects"]
+        return self._get_all_pages("/api/projects/list", "projects")
     
     def get_project(self, project_id: str) -> Dict:
         """Obtenir les détails d'un projet"""
@@ -60,6 +202,17 @@ class MLAPIClient:
         response = self._make_request("POST", f"/api/data/upload?project_id={project_id}", files=files)
         return response
     
+    def upload_data_stream(self, project_id: str, file_path: str) -> Dict:
+        """Uploader un gros fichier local en streaming (sans le charger en mémoire)"""
+        filename = file_path.replace("\\", "/").split("/")[-1]
+        with open(file_path, "rb") as f:
+            response = self._make_request(
+                "POST", "/api/data/upload/stream",
+                params={"project_id": project_id, "filename": filename},
+                data=f
+            )
+        return response
+    
     def configure_data(self, project_id: str, target_column: str, **config) -> Dict:
         """Configurer le preprocessing des données"""
         data = {
@@ -83,17 +236,92 @@ class MLAPIClient:
         response = self._make_request("POST", "/api/train/start", json=data)
         return response
     
+    def continue_training(self, model_id: str, **config) -> Dict:
+        """
+        Poursuivre l'entraînement d'un modèle (additional_estimators,
+        new_rows_only, epochs, chunk_rows, measure_full_retrain...)
+        """
+        return self._make_request("POST", f"/api/train/continue/{model_id}", json=config)
+    
+    def search_hyperparameters(self, project_id: str, model_type: str, **config) -> Dict:
+        """Lancer une recherche d'hyperparamètres (en arrière-plan) ; retourne son search_id"""
+        data = {
+            "project_id": project_id,
+            "model_type": model_type,
+            **config
+        }
+        return self._make_request("POST", "/api/train/search", json=data)
+    
+    def get_search(self, search_id: str) -> Dict:
+        """État (search_status), résumé et classement d'une recherche d'hyperparamètres"""
+        return self._make_request("GET", f"/api/train/search/{search_id}", ttl=0)
+    
     def get_training_status(self, experiment_id: str) -> Dict:
-        """Obtenir le statut d'un entraînement"""
-        response = self._make_request("GET", f"/api/train/status/{experiment_id}")
+        """Obtenir le statut d'un entraînement (toujours revalidé : 304 tant qu'il n'a pas changé)"""
+        response = self._make_request("GET", f"/api/train/status/{experiment_id}", ttl=0)
         return response["experiment"]
+    
+    def stream_training_events(self, experiment_id: str, last_event_id: Optional[int] = None,
+                               max_reconnects: int = 3) -> Iterator[Dict[str, Any]]:
+        """
+        Événements de progression d'un entraînement (Server-Sent Events),
+        jusqu'à l'état final. Une connexion coupée est reprise avec
+        Last-Event-ID : aucun événement n'est perdu ni répété.
+        """
+        url = f"{self.base_url}/api/train/events/{experiment_id}"
+        reconnects = 0
+        while True:
+            headers = {"Accept": "text/event-stream"}
+            if last_event_id:
+                headers["Last-Event-ID"] = str(last_event_id)
+            try:
+                # Pas de délai de lecture : le serveur envoie un keepalive quand rien ne se passe
+                with self.session.get(url, headers=headers, stream=True, timeout=(5, None)) as response:
+                    response.raise_for_status()
+                    for event in self._parse_sse(response.iter_lines(decode_unicode=True)):
+                        last_event_id = event.get("id", last_event_id)
+                        yield event
+                        if event.get("type") == "status" and event.get("status") in ("completed", "failed", "stopped"):
+                            return
+            except requests.exceptions.RequestException as e:
+                if reconnects >= max_reconnects:
+                    st.error(f"Erreur API: {str(e)}")
+                    raise
+            reconnects += 1
+            if reconnects > max_reconnects:
+                return
+            time.sleep(min(2 ** reconnects * 0.25, 2.0))
+    
+    @staticmethod
+    def _parse_sse(lines) -> Iterator[Dict[str, Any]]:
+        data = []
+        for line in lines:
+            if not line:
+                if data:
+                    yield json.loads("\n".join(data))
+                data = []
+            elif line.startswith("data:"):
+                data.append(line[5:].lstrip(" "))
+            # Les lignes "id:" et "event:" sont redondantes avec le JSON ; ": ..." = keepalive
 
     # ==================== MODÈLES ====================
     
-    def list_models(self) -> List[Dict]:
-        """Lister tous les modèles"""
-        response = self._make_request("GET", "/api/models/list")
-        return response["models"]
+    def list_models(self, **filters) -> List[Dict]:
+        """
+        Lister les modèles, filtrés et triés côté serveur : project_id,
+        model_type, status, task_type, deployed, search, created_after,
+        created_before, sort, order, fields (voir /api/models/list)
+        """
+        return self._get_all_pages("/api/models/list", "models", **filters)
+    
+    def list_models_page(self, cursor: Optional[str] = None, limit: Optional[int] = None, **filters) -> Dict:
+        """Une page de modèles (mêmes filtres que list_models) et le curseur de la suivante"""
+        return self._get_page("/api/models/list", "models", cursor=cursor, limit=limit, **filters)
+    
+    def get_models_summary(self, **filters) -> Dict:
+        """Effectifs et agrégats de métriques des modèles (mêmes filtres que list_models)"""
+        response = self._make_request("GET", "/api/models/summary", params=self._list_params(filters))
+        return response["summary"]
     
     def get_model(self, model_id: str) -> Dict:
         """Obtenir les détails d'un modèle"""
@@ -107,28 +335,68 @@ class MLAPIClient:
         response.raise_for_status()
         return response.content
     
+    def set_inference_backend(self, model_id: str, backend: str) -> Dict:
+        """Choisir le moteur d'inférence d'un modèle (sklearn ou compiled)"""
+        response = self._make_request("PUT", f"/api/models/{model_id}/inference", json={"backend": backend})
+        return response
+    
     def delete_model(self, model_id: str) -> Dict:
         """Supprimer un modèle"""
         response = self._make_request("DELETE", f"/api/models/{model_id}")
         return response
+    
+    def get_storage_stats(self) -> Dict:
+        """Objets du store adressé par contenu (références, octets dédupliqués, hits)"""
+        return self._make_request("GET", "/api/storage/stats", ttl=0)
+    
+    def collect_storage(self) -> Dict:
+        """Supprimer les artefacts sans référence et les fichiers orphelins"""
+        return self._make_request("POST", "/api/storage/gc")
 
     # ==================== PRÉDICTIONS ====================
     
-    def make_prediction(self, model_id: str, features: List[float]) -> Dict:
-        """Faire une prédiction avec un modèle"""
+    def make_prediction(self, model_id: str, features: Union[List[Any], Dict[str, Any]],
+                        preprocessed: bool = False) -> Dict:
+        """Faire une prédiction avec un modèle (données brutes, ou déjà transformées si preprocessed)"""
         data = {
             "model_id": model_id,
-            "features": features
+            "features": features,
+            "preprocessed": preprocessed
         }
         response = self._make_request("POST", "/api/predict", json=data)
         return response
+    
+    def make_batch_prediction(self, model_id: str, data: pd.DataFrame, chunk_size: int = 10000) -> pd.DataFrame:
+        """Faire des prédictions par lots (une seule requête, réponse en streaming CSV)"""
+        url = f"{self.base_url}/api/predict/batch"
+        params = {"model_id": model_id, "output": "csv", "chunk_size": chunk_size}
+        files = {"file": ("batch.csv", data.to_csv(index=False).encode(), "text/csv")}
+        try:
+            response = self.session.post(url, params=params, files=files, stream=True)
+            response.raise_for_status()
+            return pd.read_csv(io.StringIO(response.text))
+        except requests.exceptions.RequestException as e:
+            st.error(f"Erreur API: {str(e)}")
+            raise
 
     # ==================== EXPÉRIENCES ====================
     
-    def list_experiments(self) -> List[Dict]:
-        """Lister toutes les expériences"""
-        response = self._make_request("GET", "/api/experiments/list")
-        return response["experiments"]
+    def list_experiments(self, **filters) -> List[Dict]:
+        """
+        Lister les expériences, filtrées et triées côté serveur : project_id,
+        model_type, status, search, created_after, created_before, sort,
+        order, fields (voir /api/experiments/list)
+        """
+        return self._get_all_pages("/api/experiments/list", "experiments", **filters)
+    
+    def list_experiments_page(self, cursor: Optional[str] = None, limit: Optional[int] = None, **filters) -> Dict:
+        """Une page d'expériences (mêmes filtres que list_experiments) et le curseur de la suivante"""
+        return self._get_page("/api/experiments/list", "experiments", cursor=cursor, limit=limit, **filters)
+    
+    def get_experiments_summary(self, **filters) -> Dict:
+        """Effectifs, temps d'entraînement et agrégats de métriques des expériences"""
+        response = self._make_request("GET", "/api/experiments/summary", params=self._list_params(filters))
+        return response["summary"]
     
     def get_experiment(self, experiment_id: str) -> Dict:
         """Obtenir les détails d'une expérience"""
@@ -137,8 +405,7 @@ class MLAPIClient:
     
     def get_project_experiments(self, project_id: str) -> List[Dict]:
         """Obtenir toutes les expériences d'un projet"""
-        response = self._make_request("GET", f"/api/experiments/project/{project_id}")
-        return response["experiments"]
+        return self._get_all_pages(f"/api/experiments/project/{project_id}", "experiments")
 
 # Instance globale du client
 api_client = MLAPIClient()